@@ -0,0 +1 @@
+"""Hot-path benchmarks on synthetic data; run with ``python -m benchmarks.run``."""
@@ -0,0 +1,210 @@
+"""Benchmark cases for the pipeline's hot paths.
+
+Each ``bench_<name>(benchmark, ws)`` case calls ``benchmark(fn, *args)`` once
+(the ``pytest-benchmark`` calling convention) on a :class:`Workspace`
+generated by :mod:`benchmarks.synthetic`. The runner executes the cases with
+the workspace as the working directory, stdout silenced and dev mode on.
+Shared inputs such as the results history and the model are built lazily, so
+``--only`` runs pay only for what they use. ``benchmark.extra_info["rows"]``
+records the size of the work for the baseline.
+"""
+
+from __future__ import annotations
+
+import json
+from datetime import date
+from functools import cached_property
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.synthetic import Scale
+
+# Numeric model inputs produced by ``flatten_racecards_v3``
+FEATURES = [
+    "draw", "or", "rpr", "lbs", "age", "dist_f", "prize", "trainer_rtf",
+    "jockey_rtf", "form_score", "days_since_run", "stale_penalty",
+    "headgear_type", "draw_bias_rank",
+]  # fmt: skip
+
+
+class Workspace:
+    """A generated workspace plus the inputs several cases share."""
+
+    def __init__(self, root: Path, scale: Scale, day: str):
+        self.root = Path(root)
+        self.scale = scale
+        self.day = day
+        self.racecards = self.root / "rpscrape" / "racecards" / f"{day}.json"
+        self.results_csv = (
+            self.root
+            / "rpscrape"
+            / "data"
+            / "dates"
+            / "all"
+            / f"{day.replace('-', '_')}.csv"
+        )
+        self.warehouse_dir = self.root / "data" / "warehouse"
+
+    @cached_property
+    def rows(self) -> list[dict]:
+        from core.flatten_racecards_v3 import flatten_racecard
+
+        return flatten_racecard(self.racecards)
+
+    @cached_property
+    def batch_input(self) -> Path:
+        path = self.root / "rpscrape" / "batch_inputs" / f"{self.day}.jsonl"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for row in self.rows:
+                f.write(json.dumps(row) + "\n")
+        return path
+
+    @cached_property
+    def history(self):
+        from core.run_inference_and_select_top1 import load_combined_results
+
+        return load_combined_results()
+
+    @cached_property
+    def bundle(self):
+        import pandas as pd
+        import xgboost as xgb
+
+        from core.run_inference_and_select_top1 import ModelBundle
+
+        X = pd.DataFrame(self.rows)[FEATURES].apply(pd.to_numeric, errors="coerce")
+        y = np.random.default_rng(0).integers(0, 2, len(X))
+        model = xgb.XGBClassifier(n_estimators=self.scale.trees, max_depth=6)
+        model.fit(X.fillna(-1), y)
+        return ModelBundle("synthetic", model, FEATURES, None, [], None)
+
+    @cached_property
+    def top_tips(self) -> list[dict]:
+        from core.run_inference_and_select_top1 import main
+
+        return main(
+            ["--input", str(self.batch_input), "--dev"],
+            bundle=self.bundle,
+            combined_results=self.history,
+        )
+
+    @cached_property
+    def odds(self) -> list[dict]:
+        latest = sorted((self.root / "odds_snapshots").glob(f"{self.day}_*.json"))[-1]
+        return json.loads(latest.read_text())
+
+    @cached_property
+    def results(self):
+        import pandas as pd
+
+        return pd.read_csv(self.results_csv)
+
+
+def bench_flatten(benchmark, ws: Workspace) -> None:
+    from core.flatten_racecards_v3 import flatten_racecard
+
+    rows = benchmark(flatten_racecard, ws.racecards)
+    benchmark.extra_info["rows"] = len(rows)
+
+
+def bench_results_history(benchmark, ws: Workspace) -> None:
+    from core.run_inference_and_select_top1 import load_combined_results
+
+    history = benchmark(load_combined_results)
+    benchmark.extra_info["rows"] = len(history)
+
+
+def bench_inference(benchmark, ws: Workspace) -> None:
+    from core.run_inference_and_select_top1 import main
+
+    argv = ["--input", str(ws.batch_input), "--dev"]
+    bundle, history = ws.bundle, ws.history
+    tips = benchmark(main, argv, bundle=bundle, combined_results=history)
+    benchmark.extra_info["rows"] = len(ws.rows)
+    benchmark.extra_info["tips"] = len(tips)
+
+
+def bench_last_class(benchmark, ws: Workspace) -> None:
+    from core.run_inference_and_select_top1 import get_last_class
+
+    names = [tip["name"] for tip in ws.top_tips]
+    history, today = ws.history, date.fromisoformat(ws.day)
+
+    def lookup():
+        return [get_last_class(name, today, history) for name in names]
+
+    found = benchmark(lookup)
+    benchmark.extra_info["rows"] = len(names)
+    benchmark.extra_info["found"] = sum(c is not None for c in found)
+
+
+def bench_odds_merge(benchmark, ws: Workspace) -> None:
+    from core.merge_odds_into_tips import merge_tips
+
+    tips, odds = ws.top_tips, ws.odds
+    merged, _ = benchmark(merge_tips, tips, odds)
+    benchmark.extra_info["rows"] = len(odds)
+    benchmark.extra_info["matched"] = len(merged)
+
+
+def bench_realistic_odds(benchmark, ws: Workspace) -> None:
+    from core import extract_best_realistic_odds
+
+    benchmark(extract_best_realistic_odds.main, ws.day)
+    output = ws.root / "logs" / "dispatch" / f"sent_tips_{ws.day}_realistic.jsonl"
+    with open(output, "r", encoding="utf-8") as f:
+        tips = [json.loads(line) for line in f]
+    snapshots = extract_best_realistic_odds.load_snapshots(ws.day)
+    matched = 0
+    for tip in tips:
+        minutes, course = extract_best_realistic_odds.extract_race_key(tip["race"])
+        name = tip["name"].strip().lower()
+        found = extract_best_realistic_odds.find_best_odds(
+            minutes, course, name, snapshots
+        )
+        matched += found is not None
+    benchmark.extra_info["rows"] = len(tips)
+    benchmark.extra_info["matched"] = matched
+
+
+def bench_roi_settlement(benchmark, ws: Workspace) -> None:
+    from roi import roi_tracker_advised as tracker
+
+    # The bankroll files are resolved against the repo at import; keep the
+    # benchmark's writes inside the workspace
+    saved = tracker.BANKROLL_FILE, tracker.DRAWDOWN_STATS_FILE
+    tracker.BANKROLL_FILE = ws.root / "logs" / "roi" / "bankroll_tracker.csv"
+    tracker.DRAWDOWN_STATS_FILE = ws.root / "logs" / "drawdown_stats.csv"
+    try:
+        results = ws.results
+        benchmark(tracker.main, ws.day, "advised", 0.8, False, True, results=results)
+    finally:
+        tracker.BANKROLL_FILE, tracker.DRAWDOWN_STATS_FILE = saved
+    benchmark.extra_info["rows"] = len(ws.results)
+
+
+def bench_warehouse_build(benchmark, ws: Workspace) -> None:
+    from roi import warehouse
+
+    logs = [ws.root / "logs" / "roi"]
+    manifest = benchmark(warehouse.build, ws.warehouse_dir, logs, full=True)
+    benchmark.extra_info["rows"] = manifest["rows"]["tips"]
+
+
+def bench_dashboard_load(benchmark, ws: Workspace) -> None:
+    from roi import warehouse
+
+    if not (ws.warehouse_dir / "tips.parquet").exists():
+        warehouse.build(ws.warehouse_dir, [ws.root / "logs" / "roi"], full=True)
+
+    def load():
+        tips = warehouse.load("tips", ws.warehouse_dir, source="advised")
+        warehouse.load("daily", ws.warehouse_dir)
+        warehouse.load("tag_daily", ws.warehouse_dir)
+        fresh = tips[warehouse.tag_mask(tips["Tags"], ["⚡ Fresh"])]
+        return tips, fresh["Profit"].sum()
+
+    tips, _ = benchmark(load)
+    benchmark.extra_info["rows"] = len(tips)
@@ -0,0 +1,251 @@
+"""Run the benchmark suite and compare it with a stored JSON baseline.
+
+    python -m benchmarks.run                       # small scale, compare
+    python -m benchmarks.run --scale prod --workspace /tmp/tm-bench
+    python -m benchmarks.run --only inference last_class --set runners=16
+    python -m benchmarks.run --scale prod --save   # record a new baseline
+
+The synthetic workspace is generated in a temporary directory unless
+``--workspace`` names one. A workspace whose ``scale.json`` matches is reused,
+which saves regenerating ten years of results at production scale. Baselines
+live in ``benchmarks/baselines/<scale>.json``. A case regressed when its
+median is more than ``--tolerance`` slower than the baseline median (and by
+at least ``--min-seconds``, so sub-millisecond noise is ignored), and the run
+then exits 1. Baselines are only comparable on the machine that recorded
+them.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterable
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from benchmarks import bench_hot_paths  # noqa: E402
+from benchmarks.synthetic import (  # noqa: E402
+    DAY,
+    SCALES,
+    Scale,
+    generate,
+    parse_overrides,
+)
+
+BASELINES = Path(__file__).resolve().parent / "baselines"
+
+
+class Benchmark:
+    """Minimal ``pytest-benchmark`` stand-in: ``benchmark(fn, *args, **kwargs)``.
+
+    Runs ``fn`` ``warmup`` times untimed, then ``rounds`` times timed, and
+    returns the last result.
+    """
+
+    def __init__(self, rounds: int = 5, warmup: int = 1):
+        self.rounds = max(rounds, 1)
+        self.warmup = warmup
+        self.times: list[float] = []
+        self.extra_info: dict = {}
+
+    def __call__(self, fn: Callable, *args, **kwargs):
+        for _ in range(self.warmup):
+            fn(*args, **kwargs)
+        for _ in range(self.rounds):
+            started = time.perf_counter()
+            result = fn(*args, **kwargs)
+            self.times.append(time.perf_counter() - started)
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "median_s": round(statistics.median(self.times), 6),
+            "min_s": round(min(self.times), 6),
+            "mean_s": round(statistics.fmean(self.times), 6),
+            "rounds": len(self.times),
+            **self.extra_info,
+        }
+
+
+def cases() -> dict[str, Callable]:
+    """``bench_*`` functions of :mod:`benchmarks.bench_hot_paths`, in file order."""
+    return {
+        name[len("bench_") :]: fn
+        for name, fn in vars(bench_hot_paths).items()
+        if name.startswith("bench_") and callable(fn)
+    }
+
+
+@contextlib.contextmanager
+def _isolated(root: Path):
+    """Run inside ``root`` in dev mode, restoring cwd and environment after."""
+    cwd, environ = os.getcwd(), dict(os.environ)
+    os.chdir(root)
+    os.environ.update(TM_DEV_MODE="1", TM_LOG_DIR="logs/dev")
+    try:
+        yield
+    finally:
+        os.chdir(cwd)
+        os.environ.clear()
+        os.environ.update(environ)
+
+
+def run_suite(
+    root: Path,
+    scale: Scale,
+    only: Iterable[str] | None = None,
+    rounds: int = 5,
+    warmup: int = 1,
+    day: str = DAY,
+) -> dict:
+    """Generate (or reuse) the workspace at ``root`` and time each case."""
+    available = cases()
+    selected = list(only or available)
+    unknown = [name for name in selected if name not in available]
+    if unknown:
+        raise ValueError(f"Unknown benchmark(s): {unknown}")
+    root = generate(root, scale, day)
+    ws = bench_hot_paths.Workspace(root, scale, day)
+    results = {}
+    with _isolated(root):
+        for name in selected:
+            bench = Benchmark(rounds, warmup)
+            print(f"⏱️ {name}...", end=" ", flush=True)
+            with contextlib.redirect_stdout(io.StringIO()):
+                available[name](bench, ws)
+            results[name] = bench.stats()
+            print(f"{results[name]['median_s']:.4f}s")
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()} ({os.cpu_count()} cpu)",
+        "scale": asdict(scale),
+        "day": day,
+        "cases": results,
+    }
+
+
+def compare(
+    results: dict,
+    baseline: dict,
+    tolerance: float = 0.3,
+    min_seconds: float = 0.005,
+) -> list[dict]:
+    """Median change of each case against ``baseline``; flags regressions."""
+    rows = []
+    for name, stats in results["cases"].items():
+        before = baseline.get("cases", {}).get(name, {}).get("median_s")
+        change = (stats["median_s"] - before) / before if before else None
+        rows.append(
+            {
+                "case": name,
+                "median_s": stats["median_s"],
+                "baseline_s": before,
+                "change": change,
+                "regressed": bool(
+                    change is not None
+                    and change > tolerance
+                    and stats["median_s"] - before >= min_seconds
+                ),
+            }
+        )
+    return rows
+
+
+def print_comparison(rows: list[dict]) -> int:
+    print(f"\n{'case':<18} {'median':>10} {'baseline':>10} {'change':>8}")
+    for row in rows:
+        base = f"{row['baseline_s']:.4f}s" if row["baseline_s"] is not None else "-"
+        change = f"{row['change']:+.0%}" if row["change"] is not None else "new"
+        flag = " ▲" if row["regressed"] else ""
+        print(
+            f"{row['case']:<18} {row['median_s']:>9.4f}s {base:>10} {change:>8}{flag}"
+        )
+    regressions = sum(row["regressed"] for row in rows)
+    if regressions:
+        print(f"\n▲ {regressions} case(s) slower than the baseline")
+    return regressions
+
+
+def baseline_path(scale_name: str) -> Path:
+    return BASELINES / f"{scale_name}.json"
+
+
+def main(argv: Iterable[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Run the hot-path benchmarks")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument(
+        "--set", nargs="+", metavar="FIELD=N", help="Override scale fields"
+    )
+    parser.add_argument("--only", nargs="+", help="Run just these cases")
+    parser.add_argument("--rounds", type=int, default=5, help="Timed runs per case")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed runs first")
+    parser.add_argument("--workspace", help="Generate into (or reuse) this directory")
+    parser.add_argument("--baseline", help="Baseline JSON (default baselines/<scale>)")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.3, help="Allowed slowdown (0.3 = 30%%)"
+    )
+    parser.add_argument(
+        "--min-seconds",
+        type=float,
+        default=0.005,
+        help="Ignore slowdowns smaller than this many seconds",
+    )
+    parser.add_argument("--save", action="store_true", help="Write the baseline")
+    parser.add_argument(
+        "--no-compare", action="store_true", help="Just print the timings"
+    )
+    parser.add_argument("--out", help="Also write this run's results to a JSON file")
+    parser.add_argument("--list", action="store_true", help="List cases and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print("\n".join(cases()))
+        return
+    scale = parse_overrides(SCALES[args.scale], args.set)
+    with contextlib.ExitStack() as stack:
+        root = args.workspace or stack.enter_context(
+            tempfile.TemporaryDirectory(prefix="tm-bench-")
+        )
+        results = run_suite(Path(root), scale, args.only, args.rounds, args.warmup)
+
+    if args.out:
+        Path(args.out).write_text(json.dumps(results, indent=2) + "\n")
+    path = Path(args.baseline) if args.baseline else baseline_path(args.scale)
+    if args.no_compare:
+        return
+    if args.save:
+        previous = json.loads(path.read_text()) if path.exists() else {}
+        if previous.get("scale") == results["scale"]:
+            # Keep cases not re-run this time (e.g. with --only)
+            results["cases"] = {**previous.get("cases", {}), **results["cases"]}
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"💾 Baseline saved to {path}")
+        return
+    if not path.exists():
+        print(f"No baseline at {path}; record one with --save")
+        return
+    baseline = json.loads(path.read_text())
+    if baseline.get("scale") != results["scale"]:
+        print(f"Baseline {path} was recorded at a different scale; not comparing")
+        return
+    if print_comparison(compare(results, baseline, args.tolerance, args.min_seconds)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""Synthetic racing data in the shapes the pipeline reads, at any scale.
+
+``generate(root, scale)`` writes a self-contained workspace that mirrors the
+repo layout, so scripts that use relative paths run unchanged with ``root`` as
+their working directory:
+
+``rpscrape/racecards/<day>.json``
+    rpscrape racecards, ``{region: {course: {off: race}}}``
+``rpscrape/data/regions/gb/flat/2015-2025.csv``
+    ``history_years`` of results, read by ``load_combined_results``
+``rpscrape/data/dates/all/<day_>.csv``
+    the day's results for every declared runner
+``odds_snapshots/<day>_<HHMM>.json``
+    hourly Betfair snapshots in the ``fetch_betfair_odds`` format
+``logs/dispatch/sent_tips_<day>.jsonl``
+    the top tip per race, as dispatched
+``logs/roi/tips_results_<date>_advised.csv``
+    ``tip_days`` of settled tip logs ending the day before ``day``
+
+Everything is derived from ``seed``, so a given scale always produces the
+same data. The production preset is sized on a busy UK/IRE Saturday and ten
+years of GB+IRE results (about 1.6M runner rows).
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import asdict, dataclass, replace
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+__all__ = ["SCALES", "Scale", "generate", "parse_overrides"]
+
+DAY = "2025-06-07"
+MANIFEST = "scale.json"
+COURSES = [
+    "Ascot", "Ayr", "Bath", "Catterick", "Chelmsford", "Doncaster", "Epsom",
+    "Goodwood", "Haydock", "Kempton", "Leicester", "Lingfield", "Newbury",
+    "Newmarket", "Sandown", "Southwell", "Thirsk", "Wolverhampton", "York",
+    "Curragh", "Leopardstown", "Naas", "Punchestown", "Galway",
+]  # fmt: skip
+SYLLABLES = [
+    "al", "bar", "cor", "dan", "el", "fin", "gal", "har", "is", "jun", "kal",
+    "lor", "mon", "nor", "or", "pen", "quin", "ros", "sal", "tor", "val", "wyn",
+]  # fmt: skip
+GOINGS = ["Good", "Good To Firm", "Good To Soft", "Soft", "Standard", "Heavy"]
+TAGS = [
+    "🧠 Monster NAP", "⚡ Fresh", "🟢 Class Drop", "📈 In Form",
+    "📊 Draw Advantage", "⚖️ Light Weight", "🔥 Trainer 24%", "🚫 Layoff",
+    "❗ Confidence 90%+",
+]  # fmt: skip
+HISTORY_COLUMNS = ["date", "course", "off", "race_name", "type", "class", "num"]
+HISTORY_COLUMNS += ["pos", "horse"]
+
+
+@dataclass(frozen=True)
+class Scale:
+    """Sizes of one synthetic workspace."""
+
+    meetings: int = 8  # meetings on the day
+    races: int = 7  # races per meeting
+    runners: int = 12  # runners per race
+    horses: int = 40_000  # horse pool shared by racecards and history
+    history_years: int = 10
+    history_races: int = 36  # races per day of history
+    snapshots: int = 14  # hourly odds snapshots on the day
+    tip_days: int = 365  # days of settled tip logs
+    tips_per_day: int = 8
+    trees: int = 300  # boosting rounds of the synthetic model
+
+
+SCALES = {
+    "small": Scale(
+        meetings=2,
+        races=3,
+        runners=8,
+        horses=400,
+        history_years=1,
+        history_races=4,
+        snapshots=4,
+        tip_days=30,
+        tips_per_day=5,
+        trees=20,
+    ),
+    "prod": Scale(),
+}
+
+
+def parse_overrides(scale: Scale, pairs: list[str] | None) -> Scale:
+    """Apply ``field=value`` overrides such as ``runners=16`` to ``scale``."""
+    changes = {}
+    for pair in pairs or []:
+        key, _, value = pair.partition("=")
+        if key not in Scale.__dataclass_fields__:
+            raise ValueError(f"Unknown scale field: {key}")
+        changes[key] = int(value)
+    return replace(scale, **changes)
+
+
+def _names(n: int, rng: np.random.Generator) -> np.ndarray:
+    """``n`` distinct horse names; one in ten carries a country suffix."""
+    names = set()
+    while len(names) < n:
+        parts = rng.choice(SYLLABLES, size=rng.integers(2, 5))
+        names.add("".join(parts).title())
+    names = np.array(sorted(names), dtype=object)
+    rng.shuffle(names)
+    suffixed = rng.random(n) < 0.1
+    names[suffixed] = names[suffixed] + " (IRE)"
+    return names
+
+
+def _off(minutes: int) -> str:
+    """Racecard off time: 12-hour clock without am/pm, e.g. ``1:30``."""
+    hour, minute = divmod(minutes, 60)
+    return f"{(hour - 1) % 12 + 1}:{minute:02d}"
+
+
+def _offs(scale: Scale) -> list[tuple[str, int]]:
+    """``(course, minutes)`` of every race on the day, meetings staggered."""
+    courses = COURSES[: scale.meetings] if scale.meetings <= len(COURSES) else None
+    if courses is None:
+        courses = [f"Course {i}" for i in range(scale.meetings)]
+    return [
+        (course, 13 * 60 + 10 * (m % 3) + 35 * r)
+        for m, course in enumerate(courses)
+        for r in range(scale.races)
+    ]
+
+
+def _racecards(day: str, scale: Scale, runners: np.ndarray, rng) -> dict:
+    cards: dict = {"gb": {}}
+    it = iter(runners)
+    for course, minutes in _offs(scale):
+        race = {
+            "course": course,
+            "date": day,
+            "race_name": "Handicap" if rng.random() < 0.5 else "Maiden Stakes",
+            "race_class": f"Class {rng.integers(1, 7)}",
+            "distance_f": float(rng.choice([5, 6, 7, 8, 10, 12, 16])),
+            "going": str(rng.choice(GOINGS)),
+            "prize": f"£{rng.integers(3, 60) * 1000:,}",
+            "runners": [],
+        }
+        for draw in range(1, scale.runners + 1):
+            form = "".join(str(d) for d in rng.integers(1, 10, rng.integers(0, 6)))
+            race["runners"].append(
+                {
+                    "name": next(it),
+                    "horse_id": int(rng.integers(1, 10**7)),
+                    "draw": draw,
+                    "or": int(rng.integers(40, 110)),
+                    "rpr": int(rng.integers(40, 120)),
+                    "lbs": int(rng.integers(118, 140)),
+                    "age": int(rng.integers(2, 10)),
+                    "trainer": f"Trainer {rng.integers(0, 300)}",
+                    "jockey": f"Jockey {rng.integers(0, 200)}",
+                    "trainer_rtf": str(rng.integers(0, 40)),
+                    "jockey_rtf": int(rng.integers(0, 40)),
+                    "form": form,
+                    "last_run": f"{rng.integers(5, 200)} days",
+                    "headgear": str(rng.choice(["", "", "", "b", "v", "h", "t"])),
+                }
+            )
+        cards["gb"].setdefault(course, {})[_off(minutes)] = race
+    return cards
+
+
+def _history(day: str, scale: Scale, pool: np.ndarray, rng) -> pd.DataFrame:
+    days = scale.history_years * 365
+    dates = pd.date_range(end=pd.Timestamp(day) - pd.Timedelta(days=1), periods=days)
+    n_races = days * scale.history_races
+    n = n_races * scale.runners
+    race = np.repeat(np.arange(n_races), scale.runners)
+    slot = np.arange(n_races) % scale.history_races
+    handicap = rng.random(n_races) < 0.5
+    frame = {
+        "date": np.repeat(dates.strftime("%Y-%m-%d").to_numpy(), scale.history_races),
+        "course": np.array(COURSES, dtype=object)[
+            rng.integers(0, len(COURSES), n_races)
+        ],
+        "off": np.array([_off(13 * 60 + 35 * (s % 8)) for s in range(8)])[slot % 8],
+        "race_name": np.where(handicap, "Handicap", "Maiden Stakes"),
+        "type": np.where(rng.random(n_races) < 0.7, "Flat", "Hurdle"),
+        "class": np.char.add("Class ", rng.integers(1, 7, n_races).astype(str)),
+        "num": np.full(n_races, scale.runners),
+    }
+    history = pd.DataFrame({k: v[race] for k, v in frame.items()})
+    pos = (np.arange(n) % scale.runners + 1).astype(str).astype(object)
+    pos[rng.random(n) < 0.04] = "PU"
+    history["pos"] = pos
+    history["horse"] = pool[rng.integers(0, len(pool), n)]
+    return history[HISTORY_COLUMNS]
+
+
+def _day_results(cards: dict, rng) -> pd.DataFrame:
+    rows = []
+    for course, races in cards["gb"].items():
+        for off, race in races.items():
+            order = rng.permutation(len(race["runners"])) + 1
+            for runner, pos in zip(race["runners"], order):
+                rows.append(
+                    {
+                        "date": race["date"],
+                        "course": course,
+                        "off": off,
+                        "race_name": race["race_name"],
+                        "type": "Flat",
+                        "class": race["race_class"],
+                        "num": len(race["runners"]),
+                        "pos": str(pos),
+                        "horse": runner["name"],
+                    }
+                )
+    return pd.DataFrame(rows, columns=HISTORY_COLUMNS)
+
+
+def _snapshots(root: Path, day: str, scale: Scale, cards: dict, rng) -> None:
+    folder = root / "odds_snapshots"
+    folder.mkdir(parents=True, exist_ok=True)
+    runners = [
+        (f"{course} {_off(minutes)}", runner["name"])
+        for course, minutes in _offs(scale)
+        for runner in cards["gb"][course][_off(minutes)]["runners"]
+    ]
+    markets = {
+        race: f"1.{240_000_000 + i}"
+        for i, race in enumerate(dict.fromkeys(r for r, _ in runners))
+    }
+    base = rng.uniform(1.5, 40.0, len(runners))
+    for hour in range(7, 7 + scale.snapshots):
+        drift = base * rng.uniform(0.85, 1.15, len(runners))
+        snapshot = [
+            {
+                "race": race,
+                "horse": name,
+                "bf_sp": round(float(price), 2),
+                "selection_id": i,
+                "market_id": markets[race],
+                "is_fav": False,
+                "market_rank": i,
+            }
+            for i, ((race, name), price) in enumerate(zip(runners, drift))
+        ]
+        path = folder / f"{day}_{hour:02d}05.json"
+        path.write_text(json.dumps(snapshot))
+
+
+def _sent_tips(root: Path, day: str, cards: dict, rng) -> None:
+    folder = root / "logs" / "dispatch"
+    folder.mkdir(parents=True, exist_ok=True)
+    with open(folder / f"sent_tips_{day}.jsonl", "w", encoding="utf-8") as f:
+        for course, races in cards["gb"].items():
+            for off, race in races.items():
+                runner = race["runners"][int(rng.integers(0, len(race["runners"])))]
+                tip = {
+                    "race": f"{off} {course}",
+                    "name": runner["name"],
+                    "confidence": round(float(rng.uniform(0.8, 1.0)), 4),
+                    "bf_sp": round(float(rng.uniform(1.5, 20.0)), 2),
+                    "tags": list(rng.choice(TAGS, size=2, replace=False)),
+                }
+                f.write(json.dumps(tip) + "\n")
+
+
+def _tip_logs(root: Path, day: str, scale: Scale, pool: np.ndarray, rng) -> None:
+    folder = root / "logs" / "roi"
+    folder.mkdir(parents=True, exist_ok=True)
+    start = date.fromisoformat(day)
+    n = scale.tips_per_day
+    for back in range(scale.tip_days, 0, -1):
+        d = (start - timedelta(days=back)).isoformat()
+        pos = rng.integers(1, 12, n)
+        odds = rng.uniform(1.5, 20.0, n).round(2)
+        tags = [
+            str(list(rng.choice(TAGS, size=rng.integers(0, 4), replace=False)))
+            for _ in range(n)
+        ]
+        pd.DataFrame(
+            {
+                "Date": d,
+                "Race Time": [_off(13 * 60 + 35 * i) for i in range(n)],
+                "Course": rng.choice(COURSES, n),
+                "Horse": pool[rng.integers(0, len(pool), n)],
+                "Odds": odds,
+                "Confidence": rng.uniform(0.8, 1.0, n).round(4),
+                "Position": pos,
+                "Stake": 1.0,
+                "Profit": np.where(pos == 1, odds - 1, -1.0).round(2),
+                "tags": tags,
+            }
+        ).to_csv(folder / f"tips_results_{d}_advised.csv", index=False)
+
+
+def generate(root: Path | str, scale: Scale, day: str = DAY, seed: int = 0) -> Path:
+    """Write a workspace for ``scale`` under ``root`` (reused if already there)."""
+    root = Path(root)
+    spec = {"scale": asdict(scale), "day": day, "seed": seed}
+    manifest = root / MANIFEST
+    if manifest.exists() and json.loads(manifest.read_text()) == spec:
+        return root
+    rng = np.random.default_rng(seed)
+    pool = _names(scale.horses, rng)
+    declared = scale.meetings * scale.races * scale.runners
+    runners = rng.choice(pool, size=declared, replace=declared > len(pool))
+
+    cards = _racecards(day, scale, runners, rng)
+    path = root / "rpscrape" / "racecards" / f"{day}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(cards))
+
+    history = root / "rpscrape" / "data" / "regions" / "gb" / "flat"
+    history.mkdir(parents=True, exist_ok=True)
+    _history(day, scale, pool, rng).to_csv(history / "2015-2025.csv", index=False)
+    dates = root / "rpscrape" / "data" / "dates" / "all"
+    dates.mkdir(parents=True, exist_ok=True)
+    _day_results(cards, rng).to_csv(dates / f"{day.replace('-', '_')}.csv", index=False)
+
+    _snapshots(root, day, scale, cards, rng)
+    _sent_tips(root, day, cards, rng)
+    _tip_logs(root, day, scale, pool, rng)
+    manifest.write_text(json.dumps(spec, indent=2))
+    return root
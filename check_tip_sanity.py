@@ -4,13 +4,25 @@ from __future__ import annotations
 import argparse
 import json
 import re
+import sys
 from pathlib import Path
 from typing import Iterable, List
 
+sys.path.append(str(Path(__file__).resolve().parent))
+from tippingmonster.dispatch_journal import latest_date
+
 DATE_RE = re.compile(r"sent_tips_(\d{4}-\d{2}-\d{2})\.jsonl$")
 
 
 def find_latest_sent_file(logs_dir: Path = Path("logs")) -> Path:
+    """Return the newest sent tips file, using the dispatch journal index when
+    available and falling back to a directory scan."""
+    for directory in (logs_dir / "dispatch", logs_dir):
+        date = latest_date(directory)
+        if date:
+            candidate = directory / f"sent_tips_{date}.jsonl"
+            if candidate.exists():
+                return candidate
     files = []
     for f in logs_dir.glob("sent_tips_*.jsonl"):
         m = DATE_RE.match(f.name)
@@ -1,19 +1,37 @@
 #!/usr/bin/env python3
+import sys
 from io import BytesIO
+from pathlib import Path
 
 import matplotlib.pyplot as plt
 import pandas as pd
 import streamlit as st
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from roi import warehouse  # noqa: E402
+
 st.set_page_config(page_title="Paul's View - Tipping Monster", layout="wide")
 
-# === Load CSV ===
-uploaded_file = st.file_uploader("Upload _all.csv Tip Log", type="csv")
-if not uploaded_file:
-    st.stop()
 
-df = pd.read_csv(uploaded_file)
-df["Date"] = pd.to_datetime(df["Date"])
+@st.cache_data
+def load_warehouse_tips(version: str | None) -> pd.DataFrame:
+    """All tips from the warehouse, cached per build version."""
+    tips = warehouse.load("tips", source="all")
+    return tips if not tips.empty else warehouse.load("tips", source="advised")
+
+
+# === Load Data ===
+data_source = st.sidebar.radio("Data Source", ["Warehouse", "Upload CSV"])
+if data_source == "Upload CSV":
+    uploaded_file = st.file_uploader("Upload _all.csv Tip Log", type="csv")
+    if not uploaded_file:
+        st.stop()
+    df = warehouse.normalise(pd.read_csv(uploaded_file))
+else:
+    df = load_warehouse_tips(warehouse.load_manifest().get("version"))
+if df.empty:
+    st.error("No tip data found. Run `python -m roi.warehouse build`.")
+    st.stop()
 
 # === Sidebar Filters ===
 st.sidebar.header("\U0001f50d Filters")
@@ -22,9 +40,7 @@ selected_dates = st.sidebar.multiselect(
     "Date Range", all_dates, default=all_dates[-14:]
 )
 
-all_tags = sorted(
-    tag for sublist in df["Tags"].dropna().str.split(",") for tag in sublist
-)
+all_tags = sorted(warehouse.explode_tags(df)["Tag"].unique())
 selected_tags = st.sidebar.multiselect("Tags", all_tags)
 
 min_conf, max_conf = st.sidebar.slider("Confidence Range", 0.0, 1.0, (0.8, 1.0))
@@ -36,11 +52,9 @@ use_best_odds = st.sidebar.radio("Profit Mode", ["Default Odds", "Best Odds"], i
 df_filtered = df[df["Date"].dt.date.isin(selected_dates)]
 df_filtered = df_filtered[df_filtered["Confidence"].between(min_conf, max_conf)]
 if only_naps:
-    df_filtered = df_filtered[df_filtered["Tags"].str.contains("NAP", na=False)]
+    df_filtered = df_filtered[df_filtered["NAP"]]
 if selected_tags:
-    df_filtered = df_filtered[
-        df_filtered["Tags"].apply(lambda x: any(tag in str(x) for tag in selected_tags))
-    ]
+    df_filtered = df_filtered[warehouse.tag_mask(df_filtered["Tags"], selected_tags)]
 
 # === ROI Summary ===
 st.subheader("\U0001f4b8 ROI Summary")
@@ -53,12 +67,12 @@ summary = (
             "Profit": "sum",
             "Profit Best Odds": "sum",
             "Stake": "sum",
-            "Position": lambda x: (x == 1).sum(),
+            "Won": "sum",
         }
     )
-    .rename(columns={"Position": "Winners"})
+    .rename(columns={"Won": "Winners"})
 )
-summary["ROI"] = (summary[profit_col] / summary["Stake"]) * 100
+summary["ROI"] = warehouse.roi_pct(summary[profit_col], summary["Stake"])
 
 st.dataframe(summary.round(2))
 
@@ -71,7 +85,7 @@ st.pyplot(plt.gcf())
 # === 30-Day Rolling ROI ===
 st.subheader("\U0001f4c9 30-Day Rolling ROI")
 daily = df_filtered.groupby("Date").agg({profit_col: "sum", "Stake": "sum"})
-daily["ROI"] = (daily[profit_col] / daily["Stake"]) * 100
+daily["ROI"] = warehouse.roi_pct(daily[profit_col], daily["Stake"])
 rolling_roi = daily["ROI"].rolling(window=30, min_periods=1).mean()
 fig, ax = plt.subplots()
 rolling_roi.plot(ax=ax, marker="o", grid=True)
@@ -83,7 +97,7 @@ st.subheader("\U0001f4cc Full Tip Breakdown")
 show_cols = [
     "Date",
     "Time",
-    "Race",
+    "Course",
     "Horse",
     "Confidence",
     "Tags",
@@ -110,13 +124,13 @@ course_stats = (
     )
     .rename(columns={"Horse": "Tips"})
 )
-course_stats["ROI"] = (course_stats[profit_col] / course_stats["Stake"]) * 100
+course_stats["ROI"] = warehouse.roi_pct(course_stats[profit_col], course_stats["Stake"])
 course_stats = course_stats.sort_values("ROI", ascending=False)
 st.dataframe(course_stats.round(2))
 
 # === Flat vs Jumps Summary ===
 st.subheader("\U0001f3c7 Flat vs Jumps Performance")
-df_filtered["Type"] = df_filtered["Race Type"].fillna("Unknown")
+df_filtered = df_filtered.assign(Type=df_filtered["Race Type"].fillna("Unknown"))
 type_stats = (
     df_filtered.groupby("Type")
     .agg(
@@ -129,7 +143,7 @@ type_stats = (
     )
     .rename(columns={"Horse": "Tips"})
 )
-type_stats["ROI"] = (type_stats[profit_col] / type_stats["Stake"]) * 100
+type_stats["ROI"] = warehouse.roi_pct(type_stats[profit_col], type_stats["Stake"])
 st.dataframe(type_stats.round(2))
 
 # === Export CSV ===
@@ -1,8 +1,8 @@
 #!/usr/bin/env python3
-import json
 import os
 import sys
 from datetime import timedelta
+from pathlib import Path
 
 import boto3
 import matplotlib.pyplot as plt
@@ -11,8 +11,13 @@ import streamlit as st
 from botocore.exceptions import ClientError, NoCredentialsError
 from dotenv import load_dotenv
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from roi import warehouse  # noqa: E402
+
 load_dotenv()
 
+CONF_KEYS = ["Date", "course", "time", "horse"]
+
 
 def get_confidence_band(conf: float) -> str | None:
     """Return the confidence band label for `conf`."""
@@ -55,58 +60,48 @@ def load_recent_roi_stats(path: str, ref_date: str, window: int = 30) -> dict:
     return roi
 
 
-def load_sent_confidence(date_str: str) -> dict:
-    """Return mapping of (course, time, horse) to confidence for a date."""
-    path = f"logs/sent_tips_{date_str}.jsonl"
-    conf_map = {}
-    if not os.path.exists(path):
-        return conf_map
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            try:
-                tip = json.loads(line)
-                race = tip.get("race", "")
-                if " " not in race:
-                    continue
-                time_str, course = race.split(" ", 1)
-                horse = str(tip.get("name", "")).strip().lower()
-                key = (course.strip().lower(), time_str.lstrip("0"), horse)
-                conf_map[key] = float(tip.get("confidence", 0.0))
-            except (ValueError, KeyError) as err:
-                print(f"Skipping invalid tip line: {err}", file=sys.stderr)
-                continue
-            except Exception as err:
-                print(
-                    f"Unexpected error while parsing tip line: {err}",
-                    file=sys.stderr,
-                )
-                raise
-    return conf_map
+@st.cache_data
+def load_sent_confidence(version: str | None) -> pd.DataFrame:
+    """Confidence of each sent tip keyed by date, course, time and horse.
+
+    Read from the warehouse's typed ``sent`` tips rather than one
+    ``sent_tips_<date>.jsonl`` per row; ``version`` keys the cache.
+    """
+    sent = warehouse.load("tips", source="sent")
+    if sent.empty:
+        return pd.DataFrame(columns=[*CONF_KEYS, "Confidence"])
+    keys = pd.DataFrame(
+        {
+            "Date": sent["Date"],
+            "course": sent["Course"].str.lower(),
+            "time": sent["Time"].str.lstrip("0"),
+            "horse": sent["Horse"].str.lower(),
+            "Confidence": sent["Confidence"],
+        }
+    )
+    return keys.drop_duplicates(CONF_KEYS)
 
 
 st.set_page_config(page_title="Tipping Monster P&L", layout="wide")
 
 
-def calc_win_profit(row: pd.Series) -> float:
-    """Return profit for a win-only bet based on SP."""
-    if str(row.get("Result")) == "NR":
-        return 0.0
-    stake = row.get("Stake", 1.0)
-    sp = float(row.get("SP", 0.0))
-    return round((sp - 1) * stake if str(row.get("Result")) == "1" else -stake, 2)
-
-
-def calc_ew_profit(row: pd.Series) -> float:
-    """Return profit for an each-way bet assuming 1/5 odds, 3 places."""
-    if str(row.get("Result")) == "NR":
-        return 0.0
-    sp = float(row.get("SP", 0.0))
-    result = str(row.get("Result"))
-    win_part = (sp - 1) * 0.5 if result == "1" else 0.0
-    place_part = (
-        ((sp * 0.2) - 1) * 0.5 if result.isdigit() and int(result) <= 3 else -0.5
-    )
-    return round(win_part + place_part, 2)
+def calc_win_profit(df: pd.DataFrame) -> pd.Series:
+    """Return profit for win-only bets based on SP."""
+    result = df["Result"].astype(str)
+    sp = pd.to_numeric(df["SP"], errors="coerce").fillna(0.0)
+    stake = pd.to_numeric(df.get("Stake", 1.0), errors="coerce")
+    profit = ((sp - 1) * stake).where(result == "1", -stake)
+    return profit.mask(result == "NR", 0.0).round(2)
+
+
+def calc_ew_profit(df: pd.DataFrame) -> pd.Series:
+    """Return profit for each-way bets assuming 1/5 odds, 3 places."""
+    result = df["Result"].astype(str)
+    sp = pd.to_numeric(df["SP"], errors="coerce").fillna(0.0)
+    position = pd.to_numeric(result.where(result.str.isdigit()), errors="coerce")
+    win_part = ((sp - 1) * 0.5).where(result == "1", 0.0)
+    place_part = ((sp * 0.2 - 1) * 0.5).where(position <= 3, -0.5)
+    return (win_part + place_part).mask(result == "NR", 0.0).round(2)
 
 
 # === AWS S3 SETTINGS ===
@@ -133,8 +128,8 @@ except ClientError as e:
     st.error(f"❌ Could not download file from S3: {e}")
     st.stop()
 
-df["Profit Win"] = df.apply(calc_win_profit, axis=1)
-df["Profit EW"] = df.apply(calc_ew_profit, axis=1)
+df["Profit Win"] = calc_win_profit(df)
+df["Profit EW"] = calc_ew_profit(df)
 df["Running Profit Win"] = df["Profit Win"].cumsum()
 df["Running Profit EW"] = df["Profit EW"].cumsum()
 
@@ -150,22 +145,6 @@ roi_map = load_recent_roi_stats(
 positive_bins = {band for band, val in roi_map.items() if val > 0}
 
 
-def attach_confidence(row):
-    date_str = row["Date"].date().isoformat()
-    if date_str not in st.session_state.confidence_cache:
-        st.session_state.confidence_cache[date_str] = load_sent_confidence(date_str)
-    key = (
-        str(row["Meeting"]).strip().lower(),
-        str(row["Time"]).lstrip("0"),
-        str(row["Horse"]).strip().lower(),
-    )
-    return st.session_state.confidence_cache[date_str].get(key)
-
-
-# Initialize confidence_cache in Streamlit's session state
-if "confidence_cache" not in st.session_state:
-    st.session_state.confidence_cache = {}
-
 # Sidebar filters
 st.sidebar.header("🔎 Filters")
 all_dates = sorted(df["Date"].dt.date.unique())
@@ -178,9 +157,14 @@ roi_view = st.sidebar.radio("ROI View", ("Win Only", "Each-Way"))
 # Apply "Positive ROI Bands Only" filter if checked
 if st.sidebar.checkbox("Positive ROI Bands Only"):
     # Ensure confidence is attached only if this filter is active
-    filtered = filtered.copy()  # Operate on a copy to avoid SettingWithCopyWarning
-    filtered["Confidence"] = filtered.apply(attach_confidence, axis=1)
-    filtered["Band"] = filtered["Confidence"].apply(get_confidence_band)
+    conf = load_sent_confidence(warehouse.load_manifest().get("version"))
+    keyed = filtered.assign(
+        course=filtered["Meeting"].astype(str).str.strip().str.lower(),
+        time=filtered["Time"].astype(str).str.lstrip("0"),
+        horse=filtered["Horse"].astype(str).str.strip().str.lower(),
+    )
+    filtered = keyed.merge(conf, on=CONF_KEYS, how="left").drop(columns=CONF_KEYS[1:])
+    filtered["Band"] = filtered["Confidence"].map(get_confidence_band)
     filtered = filtered[filtered["Band"].isin(positive_bins)]
 
 # Optional sidebar filters for the table view
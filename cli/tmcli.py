@@ -1,20 +1,24 @@
 import argparse
 import os
-import subprocess
 import sys
 from datetime import date, datetime
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
-from model_feature_importance import generate_chart
-from tippingmonster import repo_path
+from tippingmonster import perf
+from tippingmonster.pipeline import (
+    PIPELINES,
+    Context,
+    StageError,
+    add_run_args,
+    call_main,
+    run_options,
+)
 from utils.ensure_sent_tips import ensure_sent_tips
 from utils.healthcheck_logs import check_logs
 from utils.validate_tips import main as validate_tips_main
 
-ROOT = Path(__file__).resolve().parents[1]
-
 
 def valid_date(value: str) -> str:
     """Return `value` if it matches `YYYY-MM-DD` else raise `ArgumentTypeError`."""
@@ -27,14 +31,6 @@ def valid_date(value: str) -> str:
     return value
 
 
-def run_command(cmd: list[str], dev: bool) -> None:
-    """Run `cmd` with optional `TM_DEV_MODE` set."""
-    env = os.environ.copy()
-    if dev:
-        env["TM_DEV_MODE"] = "1"
-    subprocess.run(cmd, check=True, env=env)
-
-
 def dispatch(
     date: str,
     telegram: bool = False,
@@ -42,29 +38,63 @@ def dispatch(
     comment_style: str | None = None,
     course: str | None = None,
 ) -> None:
-    cmd = [sys.executable, str(repo_path("core", "dispatch_tips.py")), "--date", date]
+    argv = ["--date", date]
     if telegram:
-        cmd.append("--telegram")
+        argv.append("--telegram")
     if dev:
-        cmd.append("--dev")
+        argv.append("--dev")
         os.environ["TM_DEV_MODE"] = "1"
         os.environ["TM_LOG_DIR"] = "logs/dev"
     if comment_style:
-        cmd += ["--comment-style", comment_style]
+        argv += ["--comment-style", comment_style]
     if course:
-        cmd += ["--course", course]
-    subprocess.run(cmd, check=True)
+        argv += ["--course", course]
+    call_main("core.dispatch_tips", argv)
 
 
 def send_roi(date: str | None = None, dev: bool = False) -> None:
-    cmd = [sys.executable, str(repo_path("roi", "send_daily_roi_summary.py"))]
-    if date:
-        cmd += ["--date", date]
+    argv = ["--date", date] if date else []
     if dev:
-        cmd.append("--dev")
+        argv.append("--dev")
         os.environ["TM_DEV_MODE"] = "1"
         os.environ["TM_LOG_DIR"] = "logs/dev"
-    subprocess.run(cmd, check=True)
+    call_main("roi.send_daily_roi_summary", argv)
+
+
+def run_pipeline(name: str, args: argparse.Namespace) -> None:
+    """Run pipeline ``name`` as a DAG in-process; ``--list`` prints its stages."""
+    pipeline = PIPELINES[name]
+    if args.list:
+        for stage in pipeline.order:
+            print(f"{stage.name:<16} after: {', '.join(stage.after) or '-'}")
+        return
+    ctx = Context(
+        date=getattr(args, "date", None) or date.today().isoformat(), dev=args.dev
+    )
+    try:
+        record = pipeline.run(
+            ctx,
+            start=args.start,
+            only=args.only,
+            resume=args.resume,
+            **run_options(args),
+        )
+    except StageError as exc:
+        print(f"Pipeline stopped at '{exc.stage}'. Re-run with --resume to continue.")
+        sys.exit(1)
+    for stage_name, entry in record["stages"].items():
+        print(
+            f"  {stage_name:<16} {entry['status']:<8} {entry.get('seconds', 0):8.2f}s"
+        )
+
+
+def add_stage_args(parser: argparse.ArgumentParser) -> None:
+    add_run_args(parser)
+    parser.add_argument("--from", dest="start", help="Start at this stage")
+    parser.add_argument(
+        "--resume", action="store_true", help="Start at the first unfinished stage"
+    )
+    parser.add_argument("--list", action="store_true", help="List stages and exit")
 
 
 def main(argv=None) -> None:
@@ -74,21 +104,24 @@ def main(argv=None) -> None:
     subparsers = parser.add_subparsers(dest="command", required=True)
 
     # pipeline subcommand
-    parser_pipe = subparsers.add_parser("pipeline", help="Run the full daily pipeline")
-    parser_pipe.add_argument(
-        "--dev",
-        action="store_true",
-        help="Enable development mode (no Telegram/S3 uploads)",
+    parser_pipe = subparsers.add_parser(
+        "pipeline", help="Run the full daily pipeline in-process"
     )
+    add_stage_args(parser_pipe)
 
     # roi subcommand
     parser_roi_pipe = subparsers.add_parser(
         "roi", help="Run ROI pipeline for a given date"
     )
     parser_roi_pipe.add_argument("--date", type=valid_date, help="Date YYYY-MM-DD")
-    parser_roi_pipe.add_argument(
-        "--dev", action="store_true", help="Enable development mode"
+    add_stage_args(parser_roi_pipe)
+
+    # nightly subcommand
+    parser_nightly = subparsers.add_parser(
+        "nightly", help="Upload results, recalibrate and run ROI as one DAG"
     )
+    parser_nightly.add_argument("--date", type=valid_date, help="Date YYYY-MM-DD")
+    add_stage_args(parser_nightly)
 
     # sniper subcommand (placeholder)
     parser_sniper = subparsers.add_parser(
@@ -156,19 +189,22 @@ def main(argv=None) -> None:
     parser_roi.add_argument("--date", help="Date YYYY-MM-DD", default=None)
     parser_roi.add_argument("--dev", action="store_true")
 
+    # perf subcommand
+    parser_perf = subparsers.add_parser(
+        "perf", help="Stage timings and day-over-day regressions"
+    )
+    perf.add_report_args(parser_perf)
+
     args = parser.parse_args(argv)
 
     if args.command == "pipeline":
-        cmd = [str(ROOT / "core" / "run_pipeline_with_venv.sh")]
-        if args.dev:
-            cmd.append("--dev")
-        run_command(["bash", *cmd], args.dev)
+        run_pipeline("morning", args)
 
     elif args.command == "roi":
-        cmd = [str(ROOT / "roi" / "run_roi_pipeline.sh")]
-        if args.date:
-            cmd.append(args.date)
-        run_command(["bash", *cmd], args.dev)
+        run_pipeline("roi", args)
+
+    elif args.command == "nightly":
+        run_pipeline("nightly", args)
 
     elif args.command == "sniper":
         raise RuntimeError("Sniper functionality is not included in this distribution")
@@ -184,6 +220,9 @@ def main(argv=None) -> None:
         )
 
     elif args.command == "model-feature-importance":
+        # SHAP/XGBoost are only imported for this subcommand
+        from model_feature_importance import generate_chart
+
         out = generate_chart(
             args.model,
             args.data,
@@ -210,6 +249,9 @@ def main(argv=None) -> None:
     elif args.command == "send-roi":
         send_roi(date=args.date, dev=args.dev)
 
+    elif args.command == "perf":
+        perf.run_report(args)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,196 @@
+"""Confidence calibration from cumulative (confidence bin, outcome) counts.
+
+Settled tips are folded into per-model win/tip counts over ``N_BINS`` equal
+confidence bins. Each update only touches the new day's tips, and refitting
+works on the bin counts rather than the tip history: an isotonic mapping once
+``MIN_TIPS_ISOTONIC`` tips have settled, a Platt (logistic) mapping before that.
+
+The fitted mapping is stored next to the model tarball as
+``<model>.calibration.json`` so inference and dispatch pick up the mapping
+that belongs to the active model.
+"""
+
+from __future__ import annotations
+
+import glob
+import json
+from pathlib import Path
+
+import numpy as np
+
+N_BINS = 100
+MIN_TIPS_PLATT = 50
+MIN_TIPS_ISOTONIC = 300
+MODEL_GLOB = "tipping-monster-xgb-model-*.tar.gz"
+COUNTS_DIR = Path("logs/roi")
+TARBALL_CALIBRATION = "confidence_calibration.json"
+
+
+def active_model_path() -> Path | None:
+    """Return the newest local model tarball (same rule as inference)."""
+    models = sorted(glob.glob(MODEL_GLOB))
+    return Path(models[-1]) if models else None
+
+
+def _model_stem(model_path: str | Path) -> str:
+    name = Path(model_path).name
+    for suffix in (".tar.gz", ".tgz", ".bst.gz", ".bst"):
+        if name.endswith(suffix):
+            return name[: -len(suffix)]
+    return Path(name).stem
+
+
+def calibration_path_for(model_path: str | Path) -> Path:
+    model_path = Path(model_path)
+    return model_path.with_name(f"{_model_stem(model_path)}.calibration.json")
+
+
+def counts_path_for(model_path: str | Path | None) -> Path:
+    stem = _model_stem(model_path) if model_path else "default"
+    return COUNTS_DIR / f"calibration_counts_{stem}.json"
+
+
+def bin_index(conf) -> np.ndarray:
+    conf = np.clip(np.asarray(conf, dtype=float), 0.0, 1.0)
+    return np.minimum((conf * N_BINS).astype(int), N_BINS - 1)
+
+
+def empty_counts() -> dict:
+    return {"tips": [0] * N_BINS, "wins": [0] * N_BINS, "days": {}}
+
+
+def load_counts(path: Path) -> dict:
+    if not Path(path).exists():
+        return empty_counts()
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_counts(state: dict, path: Path) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    tmp.replace(path)
+
+
+def _sparse(counts: np.ndarray) -> dict[str, int]:
+    return {str(i): int(n) for i, n in enumerate(counts) if n}
+
+
+def _dense(sparse: dict[str, int]) -> np.ndarray:
+    out = np.zeros(N_BINS, dtype=np.int64)
+    for i, n in sparse.items():
+        out[int(i)] = n
+    return out
+
+
+def update_counts(state: dict, date_str: str, conf, won) -> dict:
+    """Add one day's settled tips to ``state``.
+
+    Re-running a date first removes that day's previous contribution, so the
+    cost is proportional to the new tips rather than the stored history.
+    """
+    tips = np.asarray(state["tips"], dtype=np.int64)
+    wins = np.asarray(state["wins"], dtype=np.int64)
+    previous = state["days"].get(date_str)
+    if previous:
+        tips -= _dense(previous["tips"])
+        wins -= _dense(previous["wins"])
+
+    idx = bin_index(conf)
+    won = np.asarray(won, dtype=bool)
+    day_tips = np.bincount(idx, minlength=N_BINS)
+    day_wins = np.bincount(idx[won], minlength=N_BINS)
+    state["tips"] = (tips + day_tips).tolist()
+    state["wins"] = (wins + day_wins).tolist()
+    state["days"][date_str] = {"tips": _sparse(day_tips), "wins": _sparse(day_wins)}
+    return state
+
+
+class Calibrator:
+    """Monotone mapping from raw model confidence to win probability."""
+
+    def __init__(self, method: str, params: dict, tips: int = 0):
+        self.method = method
+        self.params = params
+        self.tips = tips
+
+    def transform(self, conf) -> np.ndarray:
+        conf = np.clip(np.asarray(conf, dtype=float), 0.0, 1.0)
+        if self.method == "isotonic":
+            return np.interp(conf, self.params["x"], self.params["y"])
+        eps = 1e-6
+        logit = np.log(np.clip(conf, eps, 1 - eps) / np.clip(1 - conf, eps, 1))
+        return 1.0 / (1.0 + np.exp(-(self.params["a"] * logit + self.params["b"])))
+
+    def __call__(self, conf: float) -> float:
+        return float(self.transform([conf])[0])
+
+    def to_dict(self) -> dict:
+        return {"method": self.method, "params": self.params, "tips": self.tips}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Calibrator":
+        return cls(data["method"], data["params"], data.get("tips", 0))
+
+
+def fit_calibration(state: dict) -> Calibrator | None:
+    """Fit a calibrator from bin counts or return ``None`` if data is too thin."""
+    tips = np.asarray(state["tips"], dtype=float)
+    wins = np.asarray(state["wins"], dtype=float)
+    total = int(tips.sum())
+    if total < MIN_TIPS_PLATT:
+        return None
+
+    used = tips > 0
+    centres = (np.arange(N_BINS) + 0.5) / N_BINS
+
+    if total >= MIN_TIPS_ISOTONIC:
+        from sklearn.isotonic import IsotonicRegression
+
+        iso = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds="clip")
+        fitted = iso.fit_transform(
+            centres[used], wins[used] / tips[used], sample_weight=tips[used]
+        )
+        params = {"x": centres[used].tolist(), "y": fitted.tolist()}
+        return Calibrator("isotonic", params, total)
+
+    from sklearn.linear_model import LogisticRegression
+
+    logit = np.log(centres / (1 - centres))[used]
+    losses = tips[used] - wins[used]
+    X = np.concatenate([logit, logit]).reshape(-1, 1)
+    y = np.concatenate([np.ones(used.sum()), np.zeros(used.sum())])
+    weight = np.concatenate([wins[used], losses])
+    keep = weight > 0
+    if len(set(y[keep])) < 2:
+        return None
+    lr = LogisticRegression(C=1e6)
+    lr.fit(X[keep], y[keep], sample_weight=weight[keep])
+    params = {"a": float(lr.coef_[0][0]), "b": float(lr.intercept_[0])}
+    return Calibrator("platt", params, total)
+
+
+def save_calibration(calibrator: Calibrator, path: Path) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(calibrator.to_dict(), f, indent=2)
+
+
+def load_calibration(path: str | Path | None) -> Calibrator | None:
+    if not path or not Path(path).exists():
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return Calibrator.from_dict(json.load(f))
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def load_active_calibration() -> Calibrator | None:
+    """Return the calibrator shipped with the active model, if any."""
+    model = active_model_path()
+    return load_calibration(calibration_path_for(model)) if model else None
@@ -22,5 +22,10 @@ else
     aws s3 cp "$RACE_OUTPUT" "s3://tipping-monster/racecards/${TODAY}.json"
 fi
 
+# The SQLite copy is optional; a failed ingest must not stop the tips
+echo "🗃️ Ingesting racecards into SQLite"
+(cd "$REPO_ROOT" && python -m tippingmonster.racecard_db "$RACE_OUTPUT") \
+    || echo "⚠️ racecard_db ingest failed"
+
 echo "✅ Racecard upload complete for $TODAY"
 
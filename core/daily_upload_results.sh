@@ -1,10 +1,13 @@
 #!/bin/bash
 set -euo pipefail
 
-TODAY=$(date +"%Y/%m/%d")
+# Optional first argument: the race day (YYYY-MM-DD); defaults to today
+DAY="${1:-$(date +%F)}"
+TODAY=$(date -d "$DAY" +"%Y/%m/%d")
+DAY_FILE=$(date -d "$DAY" +"%Y_%m_%d")
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 REPO_ROOT="${TIPPING_MONSTER_HOME:-$(git -C "$SCRIPT_DIR" rev-parse --show-toplevel)}"
-OUTPUT_CSV="$REPO_ROOT/rpscrape/data/dates/all/$(date +"%Y_%m_%d").csv"
+OUTPUT_CSV="$REPO_ROOT/rpscrape/data/dates/all/$DAY_FILE.csv"
 SCRIPT_PATH="$REPO_ROOT/rpscrape/scripts"
 VENV="$REPO_ROOT/.venv/bin/activate"
 
@@ -15,10 +18,10 @@ echo "📅 Scraping results for $TODAY"
 python rpscrape.py -d "$TODAY"
 
 echo "☁️ Uploading results CSV to S3"
-if [ "$TM_DEV_MODE" = "1" ]; then
+if [ "${TM_DEV_MODE:-0}" = "1" ]; then
     echo "[DEV] Skipping S3 upload"
 else
-    aws s3 cp "$OUTPUT_CSV" "s3://tipping-monster/results/$(date +"%Y_%m_%d").csv"
+    aws s3 cp "$OUTPUT_CSV" "s3://tipping-monster/results/$DAY_FILE.csv"
 fi
 
 echo "✅ Results upload complete for $TODAY"
@@ -5,7 +5,6 @@ import os
 import sys
 from datetime import date, timedelta
 from pathlib import Path
-from time import sleep
 
 import pandas as pd
 from dotenv import load_dotenv
@@ -14,10 +13,13 @@ load_dotenv()
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
+from core.calibration import load_active_calibration
 from core.tip import Tip
 from generate_lay_candidates import standardize_course_only
-from tippingmonster import logs_path, send_telegram_message
+from tippingmonster import logs_path, send_telegram_message, tip_index
+from tippingmonster.dispatch_journal import DispatchJournal
 from tippingmonster.env_loader import load_env
+from tippingmonster.telegram_dispatch import dispatch_messages, resolve_chat_ids
 from tippingmonster.utils import load_override_or_default
 from utils.commentary import generate_commentary
 
@@ -208,10 +210,23 @@ def load_recent_roi_stats(path: str, ref_date: str, window: int = 30) -> dict:
     return roi
 
 
-def should_skip_by_roi(conf: float, roi_map: dict, min_conf: float) -> bool:
-    """Return True if ``conf`` should be skipped based on ROI mapping."""
+def should_skip_by_roi(
+    conf: float,
+    roi_map: dict,
+    min_conf: float,
+    calibrated: float | None = None,
+    odds: float | None = None,
+) -> bool:
+    """Return True if ``conf`` should be skipped based on ROI mapping.
+
+    When a calibrated win probability and odds are available the tip is kept
+    only if it has a positive expected return at those odds; otherwise the
+    recent ROI of its raw confidence band decides.
+    """
     if conf >= min_conf:
         return False
+    if calibrated is not None and odds:
+        return calibrated * float(odds) <= 1.0
     band = get_confidence_band(conf)
     if not band:
         return True
@@ -316,11 +331,74 @@ def send_to_telegram(text):
         print(f"❌ Message content:\n{text}")
 
 
-def send_batched_messages(tips, batch_size):
-    for i in range(0, len(tips), batch_size):
-        batch = "\n\n".join(tips[i : i + batch_size])
-        send_to_telegram(batch)
-        sleep(1.5)
+def send_batched_messages(
+    tips, batch_size, keys=None, journal=None, chats=None, include_in_doubt=False
+):
+    """Queue tips in batches of ``batch_size`` for async Telegram delivery.
+
+    Pacing, 429 back-off and fan-out to every chat in ``chats`` (default: the
+    channel plus ``TELEGRAM_EXTRA_CHAT_IDS``) are handled by
+    :mod:`tippingmonster.telegram_dispatch`; receipts are logged per message.
+    When ``journal`` and per-tip ``keys`` are given, each chat only gets the
+    tips not yet delivered to it. Every (batch, chat) is journaled as sent just
+    before its request and acked or failed as soon as its receipt arrives, so
+    a crash leaves at most the batches then in flight in doubt.
+    """
+    if LOG_TO_CLI_ONLY:
+        for i in range(0, len(tips), batch_size):
+            print("\n\n".join(tips[i : i + batch_size]))
+        return []
+    chats = resolve_chat_ids(chats)
+    keys = list(keys) if keys else [None] * len(tips)
+    due = None
+    if journal is not None and any(keys):
+        due = set(journal.undelivered(chats, include_in_doubt))
+
+    messages, batch_keys = [], []
+    for chat in chats:
+        todo = [(k, t) for k, t in zip(keys, tips) if due is None or (k, chat) in due]
+        for i in range(0, len(todo), batch_size):
+            batch = todo[i : i + batch_size]
+            messages.append((chat, "\n\n".join(text for _, text in batch)))
+            batch_keys.append([k for k, _ in batch if k is not None])
+    if not messages:
+        return []
+
+    received = []
+
+    def on_send(index, chat_id):
+        if journal is not None:
+            journal.record_send(batch_keys[index], chat=chat_id)
+
+    def on_receipt(index, receipt):
+        received.append(receipt)
+        if journal is None:
+            return
+        if receipt.get("ok"):
+            journal.record_ack(
+                batch_keys[index], receipt.get("message_id"), chat=receipt["chat_id"]
+            )
+        else:
+            journal.record_failure(
+                batch_keys[index], receipt.get("error"), chat=receipt["chat_id"]
+            )
+
+    try:
+        receipts = dispatch_messages(
+            messages,
+            token=TELEGRAM_BOT_TOKEN,
+            on_send=on_send,
+            on_receipt=on_receipt,
+        )
+    except Exception as e:
+        # Deliveries already acked stay acked; any in flight stay in doubt
+        print(f"❌ Telegram error: {e}")
+        return received
+    failed = [r for r in receipts if not r.get("ok")]
+    print(f"✅ Sent {len(receipts) - len(failed)}/{len(receipts)} Telegram messages")
+    for r in failed:
+        print(f"❌ Telegram error for chat {r['chat_id']}: {r['error']}")
+    return receipts
 
 
 def main(argv=None):
@@ -331,6 +409,11 @@ def main(argv=None):
     parser.add_argument("--mode", default="advised")
     parser.add_argument("--min_conf", type=float, default=0.80)
     parser.add_argument("--telegram", action="store_true")
+    parser.add_argument(
+        "--resend-in-doubt",
+        action="store_true",
+        help="Resend tips whose previous send was never acknowledged",
+    )
     parser.add_argument("--dev", action="store_true")
     parser.add_argument("--course", help="Filter tips for a racecourse")
     parser.add_argument(
@@ -367,6 +450,7 @@ def main(argv=None):
 
     roi_file = "monster_confidence_per_day_with_roi.csv"
     roi_map = load_recent_roi_stats(roi_file, args.date, 30)
+    calibrator = load_active_calibration()
 
     explanations = {}
     if args.explain:
@@ -396,8 +480,12 @@ def main(argv=None):
         stake = calculate_monster_stake(
             tip.get("confidence", 0.0), odds, min_conf=min_conf
         )
+        calibrated = tip.get("calibrated_confidence")
+        if calibrated is None and calibrator is not None:
+            calibrated = calibrator(tip.get("confidence", 0.0))
+            tip["calibrated_confidence"] = round(calibrated, 4)
         if stake == 0.0 and should_skip_by_roi(
-            tip.get("confidence", 0.0), roi_map, min_conf
+            tip.get("confidence", 0.0), roi_map, min_conf, calibrated, odds
         ):
             continue
         if stake == 0.0:
@@ -414,21 +502,64 @@ def main(argv=None):
     for t in sorted(enriched, key=lambda x: x.get("race_time", "99:99")):
         msg = format_tip_message(t, max_id)
         if msg:
-            formatted.append(msg)
+            formatted.append((get_tip_composite_id(t), msg))
 
     os.makedirs(os.path.dirname(summary_path), exist_ok=True)
     with open(summary_path, "w", encoding="utf-8") as f:
-        f.write("\n\n".join(formatted))
-    with open(sent_path, "w", encoding="utf-8") as f:
+        f.write("\n\n".join(msg for _, msg in formatted))
+    sent_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = sent_path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
         for tip in enriched:
             json.dump(tip.to_dict(), f)
             f.write("\n")
+    tmp_path.replace(sent_path)
+    try:
+        conn = tip_index.connect()
+        try:
+            tip_index.update_file(conn, sent_path)
+        finally:
+            conn.close()
+    except Exception as exc:  # the bot index must never block dispatch
+        print(f"⚠️ Could not update tip index: {exc}")
+
+    journal = DispatchJournal(args.date)
+    journal.record_intents((get_tip_composite_id(t), t.to_dict()) for t in enriched)
 
     print(f"📄 Tip summary and sent tips saved to: {sent_path}")
 
     if args.telegram:
-        print("📤 Sending to Telegram...")
-        send_batched_messages(formatted, TELEGRAM_BATCH_SIZE)
+        chats = resolve_chat_ids()
+        if not chats:
+            print("⚠️ No Telegram chat configured; set TELEGRAM_CHAT_ID")
+            return
+        keys = {key for key, _ in formatted}
+        in_doubt = [p for p in journal.doubtful(chats) if p[0] in keys]
+        if in_doubt and not args.resend_in_doubt:
+            print(
+                f"⚠️ {len(in_doubt)} tip delivery(ies) may already have been sent; "
+                "use --resend-in-doubt to send them again"
+            )
+        due = [
+            p
+            for p in journal.undelivered(chats, include_in_doubt=args.resend_in_doubt)
+            if p[0] in keys
+        ]
+        if not due:
+            print("✅ All tips already delivered; nothing to send.")
+            return
+        print(
+            f"📤 Sending {len({key for key, _ in due})} tip(s) "
+            f"to {len(chats)} chat(s)..."
+        )
+        send_batched_messages(
+            [msg for _, msg in formatted],
+            TELEGRAM_BATCH_SIZE,
+            keys=[key for key, _ in formatted],
+            journal=journal,
+            chats=chats,
+            include_in_doubt=args.resend_in_doubt,
+        )
     else:
         print("ℹ️ Telegram not triggered. Use `--telegram`.")
 
@@ -1,23 +1,41 @@
 #!/usr/bin/env python3
 import argparse
 import json
+import sys
 from datetime import datetime
 from pathlib import Path
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from tippingmonster.utils import racecard_minutes
+
 
 def extract_race_key(race_str):
-    """Parse a race string like '15:30 Chelmsford' into minutes and course."""
+    """Parse a race string like '15:30 Chelmsford' into minutes and course.
+
+    Racecard times ('1:30 Ascot') are read with ``racecard_minutes``, to
+    compare with the 24h snapshot labels.
+    """
     try:
         time_part, course = race_str.split(" ", 1)
         h, m = map(int, time_part.strip().split(":"))
         course = course.strip().lower()
         if not course:
             return None, None
-        return h * 60 + m, course
+        return racecard_minutes(h, m), course
     except Exception:
         return None, None
 
 
+def snapshot_course(race_str):
+    """Course of a snapshot race label, 'Chelmsford 15:30' or '15:30 Chelmsford'."""
+    _, course = extract_race_key(race_str)
+    if course is None:
+        course, _, time_part = race_str.strip().rpartition(" ")
+        course = course.strip().lower() if ":" in time_part else None
+    return course or None
+
+
 def load_snapshots(date_str):
     snapshot_dir = Path("odds_snapshots")
     data_by_time = []
@@ -40,10 +58,11 @@ def find_best_odds(race_time_minutes, course, horse_name, snapshots):
         if label_minutes >= race_time_minutes:
             continue
         for r in runners:
-            snap_course = r.get("race", "").split(" ", 1)[-1].strip().lower()
+            snap_course = snapshot_course(r.get("race", ""))
             snap_name = r.get("horse", "").strip().lower()
             if snap_course == course and snap_name == horse_name:
-                return r.get("price")
+                # fetch_betfair_odds writes ``bf_sp``; older snapshots ``price``
+                return r.get("bf_sp", r.get("price"))
     return None
 
 
@@ -1,4 +1,6 @@
 #!/usr/bin/env python3
+from __future__ import annotations
+
 import argparse
 import json
 import os
@@ -26,7 +28,8 @@ load_dotenv()
 load_env()
 
 
-def main():
+def main(argv: list[str] | None = None) -> list[dict] | None:
+    """Save today's Betfair WIN prices as a snapshot and return its rows."""
     # === Parse --label for snapshot override ===
     parser = argparse.ArgumentParser()
     parser.add_argument(
@@ -36,7 +39,7 @@ def main():
         default=None,
     )
     parser.add_argument("--dev", action="store_true", help="Enable dev mode")
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     if args.dev:
         os.environ["TM_DEV_MODE"] = "1"
@@ -85,7 +88,7 @@ def main():
 
         if not markets:
             print("[!] No markets found matching criteria")
-            return
+            return None
 
         # === Fetch Prices in Batches ===
         market_ids = [m.market_id for m in markets]
@@ -156,6 +159,7 @@ def main():
                 print(f"[?] Uploaded to s3://{bucket}/{key}")
             except Exception as e:
                 print(f"[!] S3 upload failed: {e}")
+        return all_data
 
     finally:
         trading.logout()
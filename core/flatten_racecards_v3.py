@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
+from __future__ import annotations
+
 import json
 import sys
+from pathlib import Path
 
 
 def form_score(form):
@@ -35,81 +38,139 @@ def stale_penalty(form: str, days_since: float) -> int:
     return -1 if poor_form or long_break else 0
 
 
-def flatten_racecard(input_json):
+def add_horse_form(rows, cards, horse_form):
+    """Add ``hf_*`` history features (see ``core.horse_form``) to ``rows``."""
+    import pandas as pd
+
+    feats = horse_form.for_runners(pd.DataFrame(cards))
+    for row, values in zip(rows, feats.to_dict("records")):
+        row.update({k: (-1 if pd.isna(v) else float(v)) for k, v in values.items()})
+    return rows
+
+
+def add_form_stats(rows, cards, form_stats):
+    """Add rolling trainer/jockey form (see ``core.form_stats``) to ``rows``."""
+    import pandas as pd
+
+    runners = pd.DataFrame(cards)
+    runners["trainer"] = [row["trainer"] for row in rows]
+    runners["jockey"] = [row["jockey"] for row in rows]
+    attached = form_stats.attach(runners)
+    feats = attached[[c for c in attached.columns if c not in runners.columns]]
+    for row, values in zip(rows, feats.to_dict("records")):
+        row.update({k: float(v) for k, v in values.items()})
+    return rows
+
+
+def flatten_runner(race_time, race, runner, field_size):
+    """One model input row from the racecard ``race`` and one of its runners."""
+    # Days since run
+    try:
+        days_since = float(str(runner.get("last_run", "-1")).split()[0])
+    except:
+        days_since = -1
+
+    # Prize
+    try:
+        prize_val = float(
+            str(race.get("prize", "0"))
+            .replace("£", "")
+            .replace("€", "")
+            .replace(",", "")
+            .strip()
+            or 0
+        )
+    except:
+        prize_val = 0.0
+
+    # Draw bias rank
+    try:
+        draw_val = float(runner.get("draw", 0))
+    except:
+        draw_val = 0
+
+    return {
+        "race": f"{race_time} {race['course']}",
+        "name": runner.get("name", ""),
+        "draw": runner.get("draw", -1),
+        "or": runner.get("or", runner.get("ofr", -1)),
+        "rpr": runner.get("rpr", -1),
+        "lbs": runner.get("lbs", -1),
+        "age": runner.get("age", -1),
+        "dist_f": race.get("distance_f", -1),
+        "class": race.get("race_class", -1),
+        "going": race.get("going", -1),
+        "prize": prize_val,
+        "trainer": runner.get("trainer", ""),
+        "jockey": runner.get("jockey", ""),
+        "trainer_rtf": runner.get("trainer_rtf", -1),
+        "jockey_rtf": runner.get("jockey_rtf", -1),
+        "form_score": form_score(runner.get("form", "")),
+        "days_since_run": days_since,
+        "stale_penalty": stale_penalty(runner.get("form", ""), days_since),
+        "headgear_type": encode_headgear(runner.get("headgear", "")),
+        "draw_bias_rank": draw_val / max(field_size, 1),
+    }
+
+
+def flatten_racecard(input_json, horse_form=None, form_stats=None):
     with open(input_json) as f:
         data = json.load(f)
 
     output = []
+    cards = []
 
     for country_data in data.values():
         for meeting_data in country_data.values():
             for race_time, race in meeting_data.items():
                 field_size = len(race["runners"])
                 for runner in race["runners"]:
-                    # Days since run
-                    try:
-                        days_since = float(str(runner.get("last_run", "-1")).split()[0])
-                    except:
-                        days_since = -1
-
-                    # Prize
-                    try:
-                        prize_val = float(
-                            str(race.get("prize", "0"))
-                            .replace("£", "")
-                            .replace("€", "")
-                            .replace(",", "")
-                            .strip()
-                            or 0
-                        )
-                    except:
-                        prize_val = 0.0
-
-                    # Draw bias rank
-                    try:
-                        draw_val = float(runner.get("draw", 0))
-                    except:
-                        draw_val = 0
-
-                    flat = {
-                        "race": f"{race_time} {race['course']}",
-                        "name": runner.get("name", ""),
-                        "draw": runner.get("draw", -1),
-                        "or": runner.get("or", -1),
-                        "rpr": runner.get("rpr", -1),
-                        "lbs": runner.get("lbs", -1),
-                        "age": runner.get("age", -1),
-                        "dist_f": race.get("distance_f", -1),
-                        "class": race.get("race_class", -1),
-                        "going": race.get("going", -1),
-                        "prize": prize_val,
-                        "trainer": runner.get("trainer", ""),
-                        "jockey": runner.get("jockey", ""),
-                        "trainer_rtf": runner.get("trainer_rtf", -1),
-                        "jockey_rtf": runner.get("jockey_rtf", -1),
-                        "form_score": form_score(runner.get("form", "")),
-                        "days_since_run": days_since,
-                        "stale_penalty": stale_penalty(
-                            runner.get("form", ""), days_since
-                        ),
-                        "headgear_type": encode_headgear(runner.get("headgear", "")),
-                        "draw_bias_rank": draw_val / max(field_size, 1),
-                    }
+                    flat = flatten_runner(race_time, race, runner, field_size)
                     output.append(flat)
+                    cards.append(
+                        {
+                            "date": race.get("date"),
+                            "horse_id": runner.get("horse_id"),
+                            "name": flat["name"],
+                            "course": race.get("course", ""),
+                            "distance_f": race.get("distance_f"),
+                            "going": race.get("going", ""),
+                        }
+                    )
+    if horse_form is not None and output:
+        add_horse_form(output, cards, horse_form)
+    if form_stats is not None and output:
+        add_form_stats(output, cards, form_stats)
     return output
 
 
-if __name__ == "__main__":
-    if len(sys.argv) < 3:
+def main(argv: list[str] | None = None) -> list[dict]:
+    """Flatten ``<input.json>`` into the ``<output.jsonl>`` batch input."""
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) < 2:
         print("Usage: python flatten_racecards_v3.py <input.json> <output.jsonl>")
         sys.exit(1)
 
-    input_path = sys.argv[1]
-    output_path = sys.argv[2]
-    rows = flatten_racecard(input_path)
+    input_path = argv[0]
+    output_path = argv[1]
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from core import form_stats, horse_form
+
+    history = horse_form.default_dir() / "history.pkl"
+    tables = form_stats.FormStats.load(form_stats.default_dir())
+    rows = flatten_racecard(
+        input_path,
+        horse_form.HorseForm.load(history.parent) if history.exists() else None,
+        tables if tables.tables else None,
+    )
 
     with open(output_path, "w", encoding="utf-8") as out:
         for row in rows:
             out.write(json.dumps(row) + "\n")
 
     print(f"✅ Flattened {len(rows)} runners to {output_path}")
+    return rows
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""Precomputed rolling trainer, jockey and course form.
+
+Results are reduced once to per-day aggregates (runs, wins, places and
+level-stakes profit) for each entity:
+
+``trainer``, ``jockey``, ``trainer_course`` and ``jockey_trainer``
+
+Each table carries running totals per entity, so the form over any window is
+the difference of two cumulative sums looked up by day. ``FormStats.attach``
+does those lookups for a whole runner frame with ``merge_asof``. Windows end
+the day *before* each runner's race, so training rows never see their own
+result. ``FormStats.snapshot`` returns a per-entity summary for one date,
+which replaces per-run rescans of the results directory.
+
+Tables persist under ``data/form_stats`` and are extended one results file at
+a time with ``update``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+ENTITIES: dict[str, list[str]] = {
+    "trainer": ["trainer"],
+    "jockey": ["jockey"],
+    "trainer_course": ["trainer", "course"],
+    "jockey_trainer": ["jockey", "trainer"],
+}
+WINDOWS = (14, 30, 90)
+METRICS = ["runs", "wins", "places", "profit"]
+
+# Column spellings used by rpscrape results and by the tip/ROI logs
+ALIASES = {
+    "Trainer": "trainer",
+    "Jockey": "jockey",
+    "Course": "course",
+    "Position": "pos",
+    "Date": "date",
+    "Runners": "ran",
+    "Race Name": "race_name",
+    "BFSP": "odds",
+    "dec": "odds",
+}
+
+
+def _canonical(df: pd.DataFrame) -> pd.DataFrame:
+    renames: dict[str, str] = {}
+    for source, target in ALIASES.items():
+        if source in df.columns and target not in df.columns:
+            if target not in renames.values():
+                renames[source] = target
+    return df.rename(columns=renames)
+
+
+def _day(dates) -> np.ndarray:
+    """Days since the epoch as int64, the dense index the sums are keyed on."""
+    values = pd.to_datetime(pd.Series(dates), errors="coerce").to_numpy(
+        dtype="datetime64[D]"
+    )
+    return values.astype("int64")
+
+
+def place_places(ran: pd.Series, race_name: pd.Series) -> np.ndarray:
+    """Vectorised number of paid places (see ``tippingmonster.utils.get_place_terms``)."""
+    ran = pd.to_numeric(ran, errors="coerce").fillna(0).to_numpy()
+    hcp = race_name.astype(str).str.lower().str.contains("hcp|handicap").to_numpy()
+    return np.select(
+        [hcp & (ran >= 16), hcp & (ran >= 12), ran >= 8, ran >= 5],
+        [4, 3, 3, 2],
+        default=1,
+    )
+
+
+def normalise_results(df: pd.DataFrame) -> pd.DataFrame:
+    """Return ``date``/``day`` plus entity columns and per-run win/place/profit."""
+    df = _canonical(df)
+    out = pd.DataFrame(index=df.index)
+    for col in ("trainer", "jockey", "course"):
+        out[col] = df[col].astype(str).str.strip() if col in df.columns else pd.NA
+    out["day"] = _day(df["date"])
+    pos = pd.to_numeric(df.get("pos"), errors="coerce")
+    odds = pd.to_numeric(df.get("odds"), errors="coerce")
+    places = place_places(
+        df.get("ran", pd.Series(0, index=df.index)),
+        df.get("race_name", pd.Series("", index=df.index)),
+    )
+    win = (pos == 1).to_numpy()
+    out["runs"] = 1
+    out["wins"] = win.astype(int)
+    out["places"] = ((pos >= 1) & (pos <= places)).astype(int).to_numpy()
+    out["profit"] = np.where(win, odds - 1, -1.0)
+    return out[out["day"] >= 0]
+
+
+def daily_aggregates(runs: pd.DataFrame, key: list[str]) -> pd.DataFrame:
+    """Sum runs per entity and day, with running totals per entity."""
+    runs = runs.dropna(subset=key)
+    daily = runs.groupby(key + ["day"], sort=True)[METRICS].sum().reset_index()
+    return _with_cumulative(daily, key)
+
+
+def _with_cumulative(daily: pd.DataFrame, key: list[str]) -> pd.DataFrame:
+    daily = daily.sort_values(key + ["day"], kind="stable").reset_index(drop=True)
+    cums = daily.groupby(key, sort=False)[METRICS].cumsum()
+    for m in METRICS:
+        daily[f"cum_{m}"] = cums[m]
+    return daily
+
+
+class FormStats:
+    """Per-entity daily aggregates with cumulative sums for window lookups."""
+
+    def __init__(self, tables: dict[str, pd.DataFrame]):
+        self.tables = tables
+
+    # --- building -----------------------------------------------------------
+    @classmethod
+    def from_results(cls, df: pd.DataFrame) -> "FormStats":
+        runs = normalise_results(df)
+        return cls(
+            {name: daily_aggregates(runs, key) for name, key in ENTITIES.items()}
+        )
+
+    def update(self, df: pd.DataFrame) -> "FormStats":
+        """Fold new results in; days already present for an entity are replaced."""
+        runs = normalise_results(df)
+        for name, key in ENTITIES.items():
+            new = daily_aggregates(runs, key)[key + ["day"] + METRICS]
+            old = self.tables.get(name)
+            if old is not None and not old.empty:
+                old = old[key + ["day"] + METRICS]
+                merged = pd.concat([old, new], ignore_index=True)
+                new = merged.drop_duplicates(key + ["day"], keep="last")
+            self.tables[name] = _with_cumulative(new, key)
+        return self
+
+    # --- persistence --------------------------------------------------------
+    def save(self, directory: Path | str) -> None:
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name, table in self.tables.items():
+            tmp = directory / f"{name}.pkl.tmp"
+            table.to_pickle(tmp)
+            os.replace(tmp, directory / f"{name}.pkl")
+
+    @classmethod
+    def load(cls, directory: Path | str) -> "FormStats":
+        directory = Path(directory)
+        return cls(
+            {
+                name: pd.read_pickle(directory / f"{name}.pkl")
+                for name in ENTITIES
+                if (directory / f"{name}.pkl").exists()
+            }
+        )
+
+    # --- lookups ------------------------------------------------------------
+    def _cumulative_at(
+        self, name: str, keys: pd.DataFrame, day: np.ndarray
+    ) -> pd.DataFrame:
+        """Running totals for each row of ``keys`` as of ``day`` (inclusive)."""
+        key = ENTITIES[name]
+        table = self.tables[name]
+        left = keys[key].astype(str).copy()
+        left["day"] = day
+        left["_row"] = np.arange(len(left))
+        left = left.sort_values("day", kind="stable")
+        right = table[key + ["day"] + [f"cum_{m}" for m in METRICS]].sort_values(
+            "day", kind="stable"
+        )
+        joined = pd.merge_asof(left, right, on="day", by=key, direction="backward")
+        joined = joined.sort_values("_row")
+        return joined[[f"cum_{m}" for m in METRICS]].fillna(0).reset_index(drop=True)
+
+    def window(
+        self,
+        name: str,
+        keys: pd.DataFrame,
+        end_day: np.ndarray,
+        days: int,
+    ) -> pd.DataFrame:
+        """Totals over ``(end_day - days, end_day]`` for each row of ``keys``."""
+        upper = self._cumulative_at(name, keys, end_day)
+        lower = self._cumulative_at(name, keys, end_day - days)
+        out = pd.DataFrame(
+            {
+                m: upper[f"cum_{m}"].to_numpy() - lower[f"cum_{m}"].to_numpy()
+                for m in METRICS
+            }
+        )
+        out[["runs", "wins", "places"]] = out[["runs", "wins", "places"]].astype(int)
+        out["win_pct"] = (
+            out["wins"] / out["runs"].where(out["runs"] > 0) * 100
+        ).fillna(0.0)
+        return out
+
+    def attach(
+        self,
+        runners: pd.DataFrame,
+        windows: Iterable[int] = WINDOWS,
+        entities: Iterable[str] | None = None,
+        as_of: str | None = None,
+    ) -> pd.DataFrame:
+        """Add ``<entity>_<w>d_<metric>`` columns to ``runners`` without leakage.
+
+        Each runner sees form up to the day before its ``date`` column (or
+        ``as_of`` when given), so the same call serves training and inference.
+        """
+        runners = _canonical(runners)
+        dates = [as_of] * len(runners) if as_of else runners["date"]
+        end_day = _day(dates) - 1
+        out = runners.copy()
+        for name in entities or ENTITIES:
+            if name not in self.tables or not set(ENTITIES[name]) <= set(
+                runners.columns
+            ):
+                continue
+            keys = runners[ENTITIES[name]].astype(str).apply(lambda s: s.str.strip())
+            for w in windows:
+                stats = self.window(name, keys, end_day, w)
+                for m in ("runs", "wins", "places", "profit", "win_pct"):
+                    out[f"{name}_{w}d_{m}"] = stats[m].to_numpy()
+        return out
+
+    def snapshot(
+        self, name: str, ref_date: str, days: int = 30, inclusive: bool = True
+    ) -> pd.DataFrame:
+        """Per-entity totals for the ``days`` days ending on ``ref_date``.
+
+        With ``inclusive=False`` the window ends the day before ``ref_date``.
+        """
+        key = ENTITIES[name]
+        table = self.tables[name]
+        end = _day([ref_date])[0] - (0 if inclusive else 1)
+        recent = table[(table["day"] <= end) & (table["day"] > end - days)]
+        summary = recent.groupby(key)[METRICS].sum().reset_index()
+        summary["win_pct"] = (summary["wins"] / summary["runs"] * 100).round(2)
+        summary["roi_pct"] = (summary["profit"] / summary["runs"] * 100).round(2)
+        return summary
+
+
+def load_results_dir(results_dir: Path | str) -> pd.DataFrame:
+    """Read every ``YYYY_MM_DD.csv`` once, filling ``date`` from the file name."""
+    frames = []
+    for path in sorted(Path(results_dir).glob("*.csv")):
+        try:
+            day = datetime.strptime(path.stem, "%Y_%m_%d").strftime("%Y-%m-%d")
+            df = pd.read_csv(path)
+        except Exception:
+            continue
+        if "date" not in df.columns and "Date" not in df.columns:
+            df["date"] = day
+        frames.append(df)
+    if not frames:
+        return pd.DataFrame(columns=["date"])
+    return pd.concat(frames, ignore_index=True)
+
+
+def default_dir() -> Path:
+    from tippingmonster.utils import repo_path
+
+    return Path(os.getenv("TM_FORM_STATS", repo_path("data", "form_stats")))
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Rolling form tables")
+    parser.add_argument("--out", default=None, help="Table directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser(
+        "build", help="Rebuild from a results directory or the store"
+    )
+    build.add_argument("--results_dir", help="Directory of YYYY_MM_DD.csv results")
+    update = sub.add_parser("update", help="Fold new results files into the tables")
+    update.add_argument("paths", nargs="+")
+    show = sub.add_parser("show", help="Print a snapshot")
+    show.add_argument("--entity", default="trainer", choices=list(ENTITIES))
+    show.add_argument("--date", default=datetime.today().strftime("%Y-%m-%d"))
+    show.add_argument("--window", type=int, default=30)
+    args = parser.parse_args(argv)
+
+    directory = Path(args.out) if args.out else default_dir()
+
+    if args.command == "build":
+        if args.results_dir:
+            df = load_results_dir(args.results_dir)
+        else:
+            from tippingmonster.results_store import ResultsStore
+
+            df = ResultsStore().load()
+        FormStats.from_results(df).save(directory)
+        print(f"Built form tables from {len(df)} results rows into {directory}")
+    elif args.command == "update":
+        stats = FormStats.load(directory)
+        frames = []
+        for path in args.paths:
+            df = pd.read_csv(path)
+            if "date" not in df.columns and "Date" not in df.columns:
+                df["date"] = datetime.strptime(Path(path).stem, "%Y_%m_%d").strftime(
+                    "%Y-%m-%d"
+                )
+            frames.append(df)
+        if stats.tables:
+            stats.update(pd.concat(frames, ignore_index=True))
+        else:
+            stats = FormStats.from_results(pd.concat(frames, ignore_index=True))
+        stats.save(directory)
+        print(f"Updated form tables in {directory}")
+    else:
+        snap = FormStats.load(directory).snapshot(args.entity, args.date, args.window)
+        print(snap.sort_values("runs", ascending=False).to_csv(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""Per-horse lagged form features from the historical results.
+
+Every run in the history gets features describing only the horse's *earlier*
+runs, so the same values are valid training inputs and match what was known
+before the off:
+
+``hf_runs`` / ``hf_wins``
+    career runs and wins so far
+``hf_last_rpr``, ``hf_rpr_mean_3``, ``hf_rpr_mean_5``
+    previous RPR and the mean RPR over the last 3 and 5 runs
+``hf_best_rpr_band``
+    best earlier RPR in the same distance band (sprint/mile/middle/staying)
+``hf_last_btn``, ``hf_btn_mean_3``
+    lengths beaten last time and over the last 3 runs
+``hf_days_since``, ``hf_gap_mean_3``
+    days since the last run and the mean gap between the last runs
+``hf_course_runs``/``_wins``, ``hf_band_runs``/``_wins``, ``hf_going_runs``/``_wins``
+    record at the course, at the distance band and on the going group
+
+The history is sorted once by horse and date. Each feature is then a grouped
+``shift`` or a difference of grouped cumulative sums, with no per-horse
+Python loop. ``HorseForm.for_runners`` computes the features for a racecard
+by re-running the same code on only the horses in that card. ``update`` adds
+new days to the persisted history.
+
+Runs are keyed by ``horse_id``. Older results carry no ids, so an id-less run
+takes the id of the only horse seen with its name, and stays keyed by name
+when no id or several ids share it.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BANDS = [(7.5, "sprint"), (9.5, "mile"), (12.5, "middle"), (np.inf, "staying")]
+HISTORY_COLUMNS = [
+    "key",
+    "name",
+    "horse_id",
+    "day",
+    "course",
+    "band",
+    "going_group",
+    "pos",
+    "rpr",
+    "btn",
+    "pending",
+]
+FEATURES = [
+    "hf_runs",
+    "hf_wins",
+    "hf_last_rpr",
+    "hf_rpr_mean_3",
+    "hf_rpr_mean_5",
+    "hf_best_rpr_band",
+    "hf_last_btn",
+    "hf_btn_mean_3",
+    "hf_days_since",
+    "hf_gap_mean_3",
+    "hf_course_runs",
+    "hf_course_wins",
+    "hf_band_runs",
+    "hf_band_wins",
+    "hf_going_runs",
+    "hf_going_wins",
+]
+
+
+def horse_name(df: pd.DataFrame) -> pd.Series:
+    """Lower-cased name without (IRE)-style suffix, prefixed ``n:``."""
+    name = df.get("horse", df.get("name", pd.Series("", index=df.index)))
+    return (
+        "n:"
+        + name.astype(str)
+        .str.replace(r"\s*\([A-Z]{2,3}\)$", "", regex=True)
+        .str.strip()
+        .str.lower()
+    )
+
+
+def link_keys(runs: pd.DataFrame) -> pd.Series:
+    """``id:<horse_id>`` keys for ``runs`` (``name``/``horse_id`` columns).
+
+    An id-less run takes the id of the only horse with its name in ``runs``;
+    otherwise it keeps its name key.
+    """
+    ids = runs["horse_id"]
+    known = runs[ids.notna()].groupby("name")["horse_id"].agg(["nunique", "first"])
+    unique = known.loc[known["nunique"] == 1, "first"]
+    linked = ids.fillna(runs["name"].map(unique)).astype("Int64")
+    return ("id:" + linked.astype(str)).where(linked.notna(), runs["name"])
+
+
+def distance_band(dist_f) -> pd.Series:
+    furlongs = pd.to_numeric(
+        pd.Series(dist_f).astype(str).str.extract(r"([\d.]+)", expand=False),
+        errors="coerce",
+    )
+    bands = pd.Series(pd.NA, index=furlongs.index, dtype="object")
+    for limit, name in reversed(BANDS):
+        bands = bands.mask(furlongs <= limit, name)
+    return bands.fillna("unknown")
+
+
+def going_group(going) -> pd.Series:
+    g = pd.Series(going).astype(str).str.lower()
+    return pd.Series(
+        np.select(
+            [
+                g.str.contains("standard|slow|fast|polytrack|tapeta"),
+                g.str.contains("heavy"),
+                g.str.contains("soft|yielding"),
+                g.str.contains("firm|hard"),
+                g.str.contains("good"),
+            ],
+            ["aw", "heavy", "soft", "firm", "good"],
+            default="unknown",
+        ),
+        index=g.index,
+    )
+
+
+def canonical_runs(df: pd.DataFrame, pending: bool = False) -> pd.DataFrame:
+    """Reduce results (or racecard runners when ``pending``) to ``HISTORY_COLUMNS``."""
+    out = pd.DataFrame(index=df.index)
+    out["name"] = horse_name(df)
+    out["horse_id"] = pd.to_numeric(
+        df.get("horse_id", pd.Series(np.nan, index=df.index)), errors="coerce"
+    ).astype("Int64")
+    out["key"] = link_keys(out)
+    out["day"] = (
+        pd.to_datetime(df["date"], errors="coerce")
+        .to_numpy(dtype="datetime64[D]")
+        .astype("int64")
+    )
+    out["course"] = (
+        df.get("course", pd.Series("", index=df.index)).astype(str).str.strip()
+    )
+    missing = pd.Series(np.nan, index=df.index)
+    out["band"] = distance_band(
+        df.get("dist_f", df.get("distance_f", missing))
+    ).to_numpy()
+    out["going_group"] = going_group(df.get("going", missing)).to_numpy()
+    if pending:
+        for col in ("pos", "rpr", "btn"):
+            out[col] = np.nan
+    else:
+        out["pos"] = pd.to_numeric(df.get("pos"), errors="coerce")
+        out["rpr"] = pd.to_numeric(
+            df.get("rpr", pd.Series(dtype=str))
+            .astype(str)
+            .str.extract(r"(\d+)", expand=False),
+            errors="coerce",
+        )
+        out["btn"] = pd.to_numeric(df.get("ovr_btn", df.get("btn")), errors="coerce")
+    out["pending"] = pending
+    return out
+
+
+def _shifted_sum(values: pd.Series, groups, n: int | None = None) -> pd.Series:
+    """Sum of the previous ``n`` (or all) values within each group."""
+    cum = values.groupby(groups).cumsum() - values
+    if n is None:
+        return cum
+    lagged = cum.groupby(groups).shift(n).fillna(0)
+    return cum - lagged
+
+
+def compute_features(runs: pd.DataFrame) -> pd.DataFrame:
+    """Lagged ``FEATURES`` for every row of ``runs`` (indexed like the input)."""
+    order = runs.sort_values(["key", "day", "pending"], kind="stable")
+    key = order["key"]
+    win = (order["pos"] == 1).astype(int)
+    done = (~order["pending"].astype(bool)).astype(int)
+    rpr = order["rpr"]
+    btn = order["btn"]
+    out = pd.DataFrame(index=order.index)
+
+    out["hf_runs"] = _shifted_sum(done, key)
+    out["hf_wins"] = _shifted_sum(win, key)
+
+    prev = order.groupby("key")[["rpr", "btn", "day"]].shift(1)
+    out["hf_last_rpr"] = prev["rpr"]
+    out["hf_last_btn"] = prev["btn"]
+    out["hf_days_since"] = order["day"] - prev["day"]
+
+    rpr_n = rpr.notna().astype(int)
+    btn_n = btn.notna().astype(int)
+    for n in (3, 5):
+        total = _shifted_sum(rpr.fillna(0), key, n)
+        count = _shifted_sum(rpr_n, key, n)
+        out[f"hf_rpr_mean_{n}"] = total / count.where(count > 0)
+    total = _shifted_sum(btn.fillna(0), key, 3)
+    count = _shifted_sum(btn_n, key, 3)
+    out["hf_btn_mean_3"] = total / count.where(count > 0)
+
+    gap = order.groupby("key")["day"].diff()
+    gap_n = gap.notna().astype(int)
+    total = _shifted_sum(gap.fillna(0), key, 3)
+    count = _shifted_sum(gap_n, key, 3)
+    out["hf_gap_mean_3"] = total / count.where(count > 0)
+
+    band_groups = [key, order["band"]]
+    best = rpr.groupby(band_groups).cummax().groupby(band_groups).ffill()
+    out["hf_best_rpr_band"] = best.groupby(band_groups).shift(1)
+    for name, column in (
+        ("course", "course"),
+        ("band", "band"),
+        ("going", "going_group"),
+    ):
+        groups = [key, order[column]]
+        out[f"hf_{name}_runs"] = _shifted_sum(done, groups)
+        out[f"hf_{name}_wins"] = _shifted_sum(win, groups)
+
+    return out[FEATURES].reindex(runs.index)
+
+
+class HorseForm:
+    """Canonical run history with point-in-time feature computation."""
+
+    def __init__(self, history: pd.DataFrame | None = None):
+        if history is None:
+            history = pd.DataFrame(columns=HISTORY_COLUMNS)
+        if "name" not in history.columns:
+            # Saved before ids were kept: every key is a name key
+            history = history.assign(name=history["key"], horse_id=pd.NA)
+        self.history = history.astype({"horse_id": "Int64"})
+
+    @classmethod
+    def from_results(cls, df: pd.DataFrame) -> "HorseForm":
+        return cls(canonical_runs(df).reset_index(drop=True))
+
+    def features(self) -> pd.DataFrame:
+        """Features for every historical run, aligned with ``self.history``."""
+        return compute_features(self.history)
+
+    def update(self, df: pd.DataFrame) -> "HorseForm":
+        """Append new results; a horse's run on an existing day is replaced."""
+        new = canonical_runs(df)
+        merged = pd.concat([self.history, new], ignore_index=True)
+        # New ids can link older id-less runs of the same name
+        merged["key"] = link_keys(merged)
+        self.history = merged.drop_duplicates(["key", "day"], keep="last").reset_index(
+            drop=True
+        )
+        return self
+
+    def for_runners(self, runners: pd.DataFrame) -> pd.DataFrame:
+        """Features for racecard ``runners`` (``date`` column) from earlier runs only."""
+        pending = canonical_runs(runners, pending=True)
+        # Link the card's ids to id-less history of the same name, and back
+        columns = ["name", "horse_id"]
+        keys = link_keys(
+            pd.concat([self.history[columns], pending[columns]], ignore_index=True)
+        ).to_numpy()
+        history = self.history.assign(key=keys[: len(self.history)])
+        pending["key"] = keys[len(self.history) :]
+        # Only runs before each horse's racecard day, even if that day's
+        # results are already in the history
+        first_day = pending.groupby("key")["day"].min()
+        past = history[history["key"].isin(first_day.index)]
+        past = past[past["day"] < past["key"].map(first_day)]
+        combined = pd.concat([past, pending.reset_index(drop=True)], ignore_index=True)
+        feats = compute_features(combined).iloc[len(past) :]
+        feats.index = runners.index
+        return feats
+
+    def save(self, directory: Path | str) -> None:
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        tmp = directory / "history.pkl.tmp"
+        self.history.to_pickle(tmp)
+        os.replace(tmp, directory / "history.pkl")
+
+    @classmethod
+    def load(cls, directory: Path | str) -> "HorseForm":
+        path = Path(directory) / "history.pkl"
+        if not path.exists():
+            return cls()
+        return cls(pd.read_pickle(path))
+
+
+def default_dir() -> Path:
+    from tippingmonster.utils import repo_path
+
+    return Path(os.getenv("TM_HORSE_FORM", repo_path("data", "horse_form")))
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Horse form history")
+    parser.add_argument("--out", default=None, help="History directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("build", help="Rebuild from the results store")
+    update = sub.add_parser("update", help="Append results CSVs")
+    update.add_argument("paths", nargs="+")
+    args = parser.parse_args(argv)
+
+    directory = Path(args.out) if args.out else default_dir()
+    if args.command == "build":
+        from tippingmonster.results_store import ResultsStore
+
+        form = HorseForm.from_results(ResultsStore().load())
+    else:
+        form = HorseForm.load(directory)
+        form.update(pd.concat([pd.read_csv(p) for p in args.paths], ignore_index=True))
+    form.save(directory)
+    print(f"{len(form.history)} runs in {directory}")
+
+
+if __name__ == "__main__":
+    main()
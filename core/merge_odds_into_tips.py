@@ -1,29 +1,13 @@
 #!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
 import json
 import re
+import sys
 from datetime import datetime
 from pathlib import Path
 
-# === PATHS ===
-today = datetime.utcnow().date().isoformat()
-odds_files = sorted(Path("odds_snapshots").glob(f"{today}_*.json"))
-if not odds_files:
-    print(f"[!] No odds snapshot found for {today}")
-    exit(1)
-
-odds_file = odds_files[-1]
-tips_file = Path(f"predictions/{today}/output.jsonl")
-output_file = Path(f"predictions/{today}/tips_with_odds.jsonl")
-
-print(f"[+] Using odds: {odds_file}")
-print(f"[+] Reading tips: {tips_file}")
-
-# === LOAD DATA ===
-with open(odds_file) as f:
-    odds = json.load(f)
-with open(tips_file) as f:
-    tips = [json.loads(line) for line in f]
-
 # === NORMALIZATION ===
 
 
@@ -39,51 +23,102 @@ def standardize_course_only(race: str) -> str:
     return race
 
 
-print("\n[🧪] Sample standardization output for debugging:\n")
+def index_odds(odds: list[dict]) -> dict[tuple[str, str], dict]:
+    """Odds rows keyed by ``(course, horse)``; the first row for a key wins."""
+    index = {}
+    for o in odds:
+        key = (standardize_course_only(o["race"]), o["horse"].strip().lower())
+        index.setdefault(key, o)
+    return index
 
-# Show 5 examples from each
-for tip in tips[:5]:
-    print(f"[TIP]   {tip['race']}  |  Horse: {tip['name']}")
-for odd in odds[:5]:
-    print(f"[ODDS]  {odd['race']}  |  Horse: {odd['horse']}")
 
 # === MERGE LOGIC ===
-merged = []
-unmatched = []
 
-for tip in tips:
-    tip_course = standardize_course_only(tip["race"])
-    tip_name = tip["name"].strip().lower()
-    match = None
 
-    for o in odds:
-        o_course = standardize_course_only(o["race"])
-        o_name = o["horse"].strip().lower()
-        if o_course == tip_course and o_name == tip_name:
-            match = o
-            break
-
-    if match:
-        tip["bf_sp"] = match["bf_sp"]
-        try:
-            conf = float(tip.get("confidence", 0))
-            bf_sp = float(tip["bf_sp"])
-            if bf_sp > 0:
-                tip["value_score"] = round((conf / bf_sp) * 100, 2)
-        except Exception:
-            pass
-        merged.append(tip)
-    else:
-        unmatched.append(f"{tip['name']} in {tip['race']}")
-
-# === SAVE OUTPUT ===
-output_file.parent.mkdir(parents=True, exist_ok=True)
-with open(output_file, "w", encoding="utf-8") as f:
-    for row in merged:
-        f.write(json.dumps(row) + "\n")
-
-print(f"[✓] Merged {len(merged)} tips with odds → {output_file}")
-if unmatched:
-    print("[!] Unmatched tips:")
-    for u in unmatched:
-        print(f"   - {u}")
+def merge_tips(tips: list[dict], odds: list[dict]) -> tuple[list[dict], list[str]]:
+    """Attach ``bf_sp``/``value_score`` to ``tips``; return merged and unmatched."""
+    index = index_odds(odds)
+    merged = []
+    unmatched = []
+
+    for tip in tips:
+        tip_course = standardize_course_only(tip["race"])
+        tip_name = tip["name"].strip().lower()
+        match = index.get((tip_course, tip_name))
+
+        if match:
+            tip["bf_sp"] = match["bf_sp"]
+            try:
+                conf = float(tip.get("confidence", 0))
+                bf_sp = float(tip["bf_sp"])
+                if bf_sp > 0:
+                    tip["value_score"] = round((conf / bf_sp) * 100, 2)
+            except Exception:
+                pass
+            merged.append(tip)
+        else:
+            unmatched.append(f"{tip['name']} in {tip['race']}")
+    return merged, unmatched
+
+
+def main(
+    argv: list[str] | None = None,
+    *,
+    tips: list[dict] | None = None,
+    odds: list[dict] | None = None,
+) -> list[dict]:
+    """Merge the day's tips with the latest odds snapshot.
+
+    ``tips`` and ``odds`` may be passed in by the in-process pipeline, in
+    which case ``output.jsonl`` and the snapshot are not re-read.
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--date", default=datetime.utcnow().date().isoformat())
+    args = parser.parse_args(argv)
+    today = args.date
+
+    # === PATHS ===
+    tips_file = Path(f"predictions/{today}/output.jsonl")
+    output_file = Path(f"predictions/{today}/tips_with_odds.jsonl")
+
+    # === LOAD DATA ===
+    if odds is None:
+        odds_files = sorted(Path("odds_snapshots").glob(f"{today}_*.json"))
+        if not odds_files:
+            print(f"[!] No odds snapshot found for {today}")
+            sys.exit(1)
+        odds_file = odds_files[-1]
+        print(f"[+] Using odds: {odds_file}")
+        with open(odds_file) as f:
+            odds = json.load(f)
+    if tips is None:
+        print(f"[+] Reading tips: {tips_file}")
+        with open(tips_file) as f:
+            tips = [json.loads(line) for line in f]
+
+    print("\n[🧪] Sample standardization output for debugging:\n")
+
+    # Show 5 examples from each
+    for tip in tips[:5]:
+        print(f"[TIP]   {tip['race']}  |  Horse: {tip['name']}")
+    for odd in odds[:5]:
+        print(f"[ODDS]  {odd['race']}  |  Horse: {odd['horse']}")
+
+    merged, unmatched = merge_tips(tips, odds)
+
+    # === SAVE OUTPUT ===
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_file, "w", encoding="utf-8") as f:
+        for row in merged:
+            f.write(json.dumps(row) + "\n")
+
+    print(f"[✓] Merged {len(merged)} tips with odds → {output_file}")
+    if unmatched:
+        print("[!] Unmatched tips:")
+        for u in unmatched:
+            print(f"   - {u}")
+    return merged
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 #!/usr/bin/env python3
+from __future__ import annotations
 
 # --- Standard Library ---
 import argparse
@@ -10,6 +11,7 @@ import pickle
 import sys
 import tarfile
 import tempfile
+from dataclasses import dataclass
 from datetime import date, datetime
 from pathlib import Path
 
@@ -22,11 +24,17 @@ import xgboost as xgb
 
 # --- Local Modules ---
 sys.path.append(str(Path(__file__).resolve().parents[1]))
+from core.calibration import (
+    TARBALL_CALIBRATION,
+    calibration_path_for,
+    load_calibration,
+)
 from core.model_fetcher import download_if_missing
 from tippingmonster.env_loader import load_env
 
 logger = logging.getLogger(__name__)
 
+
 def generate_reason(tip: dict) -> str:
     reason = []
     try:
@@ -191,44 +199,39 @@ def extract_race_sort_key(race: str) -> int:
         return 9999
 
 
-def main() -> None:
-    logging.basicConfig(level=logging.INFO)
-    load_env()
-
+def latest_model() -> str:
+    """Newest ``tipping-monster-xgb-model-*.tar.gz`` in the working directory."""
     models = sorted(glob.glob("tipping-monster-xgb-model-*.tar.gz"))
     if not models:
         raise FileNotFoundError(
             "No model tarball found. Download one from S3 or run training."
         )
-    latest_model = models[-1]
-    parser = argparse.ArgumentParser()
-    parser.add_argument(
-        "--model",
-        default=latest_model,
-        help="Path to model .tar.gz (S3-relative or local)",
-    )
-    parser.add_argument("--input", default=None, help="Path to input JSONL")
-    parser.add_argument("--dev", action="store_true", help="Enable dev mode")
-    args = parser.parse_args()
+    return models[-1]
 
-    if args.dev:
-        os.environ["TM_DEV_MODE"] = "1"
 
-    date_str = date.today().isoformat()
-    input_path = args.input or f"rpscrape/batch_inputs/{date_str}.jsonl"
-    output_path = f"predictions/{date_str}/output.jsonl"
-    os.makedirs(f"predictions/{date_str}", exist_ok=True)
+def resolve_model(model_arg: str, bucket: str = "tipping-monster") -> str:
+    """Local path for ``model_arg``, downloading it from S3 if needed."""
+    if os.path.exists(model_arg):
+        return model_arg
+    local_model_file = os.path.basename(model_arg)
+    download_if_missing(bucket, model_arg, local_model_file)
+    return local_model_file
 
-    model_arg = args.model
-    bucket = "tipping-monster"
 
-    if os.path.exists(model_arg):
-        model_path = model_arg
-    else:
-        local_model_file = os.path.basename(model_arg)
-        download_if_missing(bucket, model_arg, local_model_file)
-        model_path = local_model_file
+@dataclass
+class ModelBundle:
+    """Everything unpacked from a model tarball that inference needs."""
 
+    path: str
+    model: object
+    features: list | None
+    meta_place_model: object | None
+    meta_place_features: list
+    calibrator: object | None
+
+
+def load_model_bundle(model_path: str) -> ModelBundle:
+    """Extract ``model_path`` and load the win/place models and calibration."""
     model_dir = tempfile.mkdtemp()
     with tarfile.open(model_path, "r:gz") as tar:
         tar.extractall(model_dir)
@@ -250,14 +253,70 @@ def main() -> None:
     else:
         meta_place_features = []
 
+    features = None
+    if os.path.exists(features_file):
+        with open(features_file) as f:
+            features = json.load(f)
+
+    calibrator = load_calibration(
+        os.path.join(model_dir, TARBALL_CALIBRATION)
+    ) or load_calibration(calibration_path_for(model_path))
+    return ModelBundle(
+        path=model_path,
+        model=model,
+        features=features,
+        meta_place_model=meta_place_model,
+        meta_place_features=meta_place_features,
+        calibrator=calibrator,
+    )
+
+
+def main(
+    argv: list[str] | None = None,
+    *,
+    bundle: ModelBundle | None = None,
+    combined_results: pd.DataFrame | None = None,
+) -> list[dict]:
+    """Score today's runners and write the top tip per race.
+
+    The in-process pipeline passes an already loaded ``bundle`` and results
+    history so a long-running process loads them once.
+    """
+    logging.basicConfig(level=logging.INFO)
+    load_env()
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--model",
+        default=None,
+        help="Path to model .tar.gz (S3-relative or local; default newest local)",
+    )
+    parser.add_argument("--input", default=None, help="Path to input JSONL")
+    parser.add_argument("--dev", action="store_true", help="Enable dev mode")
+    args = parser.parse_args(argv)
+
+    if args.dev:
+        os.environ["TM_DEV_MODE"] = "1"
+
+    date_str = date.today().isoformat()
+    input_path = args.input or f"rpscrape/batch_inputs/{date_str}.jsonl"
+    output_path = f"predictions/{date_str}/output.jsonl"
+    os.makedirs(f"predictions/{date_str}", exist_ok=True)
+
+    bucket = "tipping-monster"
+    if bundle is None:
+        bundle = load_model_bundle(resolve_model(args.model or latest_model(), bucket))
+    model = bundle.model
+    meta_place_model = bundle.meta_place_model
+    meta_place_features = bundle.meta_place_features
+
     with open(input_path) as f:
         rows = [json.loads(line) for line in f]
     df = pd.DataFrame(rows)
 
-    model_features = list(df.columns)
-    if os.path.exists(features_file):
-        with open(features_file) as f:
-            model_features = json.load(f)
+    model_features = bundle.features
+    if model_features is None:
+        model_features = list(df.columns)
 
     missing = [f for f in model_features if f not in df.columns]
     if missing:
@@ -269,6 +328,11 @@ def main() -> None:
 
     df["confidence"] = model.predict_proba(X)[:, 1]
 
+    calibrator = bundle.calibrator
+    if calibrator is not None:
+        df["calibrated_confidence"] = calibrator.transform(df["confidence"])
+        print(f"Applied {calibrator.method} confidence calibration")
+
     if meta_place_model and meta_place_features:
         missing_meta = [f for f in meta_place_features if f not in df.columns]
         if missing_meta:
@@ -282,9 +346,12 @@ def main() -> None:
     top_tips["sort_key"] = top_tips["race"].apply(extract_race_sort_key)
     top_tips = top_tips.sort_values("sort_key").drop(columns="sort_key")
 
-    combined_results_df = load_combined_results()
+    combined_results_df = (
+        load_combined_results() if combined_results is None else combined_results
+    )
     today_date = datetime.today().date()
 
+    saved = []
     with open(output_path, "w", encoding="utf-8") as f:
         max_conf = top_tips["confidence"].max()
         for row in top_tips.to_dict(orient="records"):
@@ -296,6 +363,7 @@ def main() -> None:
             row["commentary"] = generate_reason(row)
             row_safe = make_json_safe(row)
             f.write(orjson.dumps(row_safe).decode() + "\n")
+            saved.append(row_safe)
 
     print(f"Saved {len(top_tips)} top tips to {output_path}")
 
@@ -305,7 +373,8 @@ def main() -> None:
         s3 = boto3.client("s3")
         s3.upload_file(output_path, bucket, f"predictions/{date_str}/output.jsonl")
         print(f"✅ Uploaded to s3://{bucket}/predictions/{date_str}/output.jsonl")
+    return saved
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
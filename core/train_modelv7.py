@@ -16,12 +16,17 @@ from sklearn.metrics import accuracy_score, classification_report
 from sklearn.model_selection import train_test_split
 
 from core.validate_features import validate_dataset_features
+from tippingmonster.results_store import load_history
 from tippingmonster.utils import in_dev_mode, upload_to_s3
 
 BUCKET = "tipping-monster"
 
 
-def load_all_results(s3_keys):
+def load_all_results(s3_keys=None):
+    if s3_keys is None:
+        # Partitioned store: only partitions changed since the last run are
+        # downloaded and unchanged years load from their parsed cache
+        return load_history()
     s3 = boto3.client("s3")
     paths = []
     for key in s3_keys:
@@ -161,14 +166,8 @@ if __name__ == "__main__":
     if args.dev:
         os.environ["TM_DEV_MODE"] = "1"
 
-    s3_keys = [
-        "results/gb-flat-2015-2025.csv",
-        "results/gb-jumps-2015-2025.csv",
-        "results/ire-flat-2015-2025.csv",
-        "results/ire-jumps-2015-2025.csv",
-    ]
-    print("📅 Downloading historical data from S3...")
-    df = load_all_results(s3_keys)
+    print("📅 Loading historical results from the results store...")
+    df = load_all_results()
     print("🔧 Preprocessing...")
     df = preprocess(df)
     log_base = os.getenv("TM_LOG_DIR", "logs")
@@ -189,8 +188,6 @@ if __name__ == "__main__":
         "going",
         "prize",
         "was_tipped",
-        "tip_confidence",
-        "tip_profit",
     ]
     print("🚀 Training model...")
     train_model(df, feature_cols)
@@ -45,15 +45,9 @@ def compute_trainer_stats(df: pd.DataFrame) -> pd.DataFrame:
     if df.empty:
         return pd.DataFrame(columns=["Trainer", "Runs", "Wins", "Win %", "ROI %"])
     df["Position"] = df["Position"].astype(str).str.lower()
-    df["Win"] = df["Position"].apply(lambda x: str(x) == "1")
+    df["Win"] = df["Position"] == "1"
     df["BFSP"] = pd.to_numeric(df.get("BFSP"), errors="coerce")
-
-    def profit(row):
-        if row["Win"]:
-            return row.get("BFSP", 0.0) - 1
-        return -1.0
-
-    df["Profit"] = df.apply(profit, axis=1)
+    df["Profit"] = (df["BFSP"] - 1).where(df["Win"], -1.0)
     summary = df.groupby("Trainer").agg(
         Runs=("Win", "count"),
         Wins=("Win", "sum"),
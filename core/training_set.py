@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""Point-in-time training set builder.
+
+Each historical runner gets the feature row the live pipeline would have
+produced before the off:
+
+* the racecard from ``tippingmonster.racecard_db`` is run through
+  ``flatten_racecards_v3.flatten_runner``, the same code that builds
+  inference inputs. Races without a stored card fall back to a card
+  rebuilt from the pre-race columns of the result (draw, weight, rating,
+  class, going, runners). Post-race columns such as ``rpr`` and the
+  per-runner ``prize`` are never used.
+* ``hf_*`` horse form from ``core.horse_form``, which only uses earlier runs
+* ``<entity>_<w>d_*`` trainer/jockey form from ``core.form_stats``, up to
+  the day before the race
+
+Labels (``won``, ``placed``) come from the result, and tip-log columns
+(``tip_confidence``, ``tip_profit``...) are never joined. Months are built
+independently in a process pool, so a multi-year build is one job.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from core.flatten_racecards_v3 import flatten_runner
+from core.form_stats import FormStats, place_places
+from core.horse_form import FEATURES as HORSE_FEATURES
+from core.horse_form import HorseForm
+
+CARD_FEATURES = [
+    "draw",
+    "or",
+    "rpr",
+    "lbs",
+    "age",
+    "dist_f",
+    "class",
+    "going",
+    "prize",
+    "trainer_rtf",
+    "jockey_rtf",
+    "form_score",
+    "days_since_run",
+    "stale_penalty",
+    "headgear_type",
+    "draw_bias_rank",
+]
+KEY_COLUMNS = ["date", "race_id", "horse_id", "course", "race", "name", "source"]
+LABELS = ["won", "placed"]
+# Known only after the race (or derived from our own tips); never features
+LEAKY_COLUMNS = {
+    "pos",
+    "btn",
+    "ovr_btn",
+    "time",
+    "secs",
+    "sp",
+    "dec",
+    "was_tipped",
+    "tip_confidence",
+    "tip_profit",
+    "confidence_band",
+}
+
+_worker: dict = {}
+
+
+def _init_worker(form_stats: FormStats, db: str | None) -> None:
+    _worker["form_stats"] = form_stats
+    _worker["db"] = db
+
+
+def serving_matrix(df: pd.DataFrame, features: list[str]) -> pd.DataFrame:
+    """Coerce ``features`` exactly as ``run_inference_and_select_top1`` does."""
+    return df[features].apply(pd.to_numeric, errors="coerce").fillna(-1)
+
+
+def prepare_results(results: pd.DataFrame) -> pd.DataFrame:
+    """Results with ``hf_*`` features, labels and a ``month`` column."""
+    results = results.reset_index(drop=True)
+    hf = HorseForm.from_results(results).features()
+    out = results.copy()
+    pos = pd.to_numeric(out["pos"], errors="coerce")
+    places = place_places(
+        out.get("ran", pd.Series(0, index=out.index)),
+        out.get("race_name", pd.Series("", index=out.index)),
+    )
+    out["won"] = (pos == 1).astype(int)
+    out["placed"] = ((pos >= 1) & (pos <= places)).astype(int)
+    out["date"] = pd.to_datetime(out["date"], errors="coerce").dt.strftime("%Y-%m-%d")
+    out["month"] = out["date"].str[:7]
+    for col in ("race_id", "horse_id"):
+        out[col] = pd.to_numeric(out.get(col), errors="coerce").astype("Int64")
+    out[HORSE_FEATURES] = hf.to_numpy()
+    return out.dropna(subset=["date"])
+
+
+def _stored_cards(db: str | None, month: str) -> dict[int, dict]:
+    """``{race_id: race}`` for ``month`` with runners, shaped like the JSON card."""
+    from tippingmonster.racecard_db import connect, db_path
+
+    if db is None and not db_path().exists():
+        return {}
+    conn = connect(db)
+    try:
+        bounds = (f"{month}-01", f"{month}-32")
+        races = {
+            row["race_id"]: {**dict(row), "runners": []}
+            for row in conn.execute(
+                "SELECT * FROM races WHERE date >= ? AND date < ?", bounds
+            )
+        }
+        for row in conn.execute(
+            "SELECT * FROM runners WHERE date >= ? AND date < ?"
+            " ORDER BY race_id, number",
+            bounds,
+        ):
+            if row["race_id"] in races:
+                runner = {k: v for k, v in dict(row).items() if v is not None}
+                races[row["race_id"]]["runners"].append(runner)
+    finally:
+        conn.close()
+    return races
+
+
+def _results_card(rows: pd.DataFrame) -> dict:
+    """A racecard rebuilt from the pre-race columns of one race's results."""
+    first = rows.iloc[0]
+    prize = pd.to_numeric(
+        rows.get("prize", pd.Series(dtype=str))
+        .astype(str)
+        .str.replace(r"[^\d.]", "", regex=True),
+        errors="coerce",
+    ).max()
+    race = {
+        "course": str(first.get("course", "")).strip(),
+        "date": first["date"],
+        "off_time": first.get("off", ""),
+        "distance_f": first.get("dist_f"),
+        "race_class": first.get("class"),
+        "going": first.get("going"),
+        "prize": None if pd.isna(prize) else f"{prize:.0f}",
+        "runners": [],
+    }
+    for row in rows.to_dict("records"):
+        race["runners"].append(
+            {
+                "horse_id": row.get("horse_id"),
+                "name": row.get("horse"),
+                "age": row.get("age"),
+                "draw": row.get("draw"),
+                "lbs": row.get("lbs"),
+                "ofr": row.get("or"),
+                "headgear": row.get("hg"),
+                "trainer": row.get("trainer"),
+                "jockey": row.get("jockey"),
+            }
+        )
+    ran = pd.to_numeric(first.get("ran"), errors="coerce")
+    race["field_size"] = int(ran) if pd.notna(ran) else len(rows)
+    return race
+
+
+def _flatten(race: dict, field_size: int) -> list[dict]:
+    rows = []
+    for runner in race["runners"]:
+        flat = flatten_runner(race.get("off_time", ""), race, runner, field_size)
+        flat["horse_id"] = runner.get("horse_id")
+        flat["course"] = race["course"]
+        flat["date"] = race["date"]
+        rows.append(flat)
+    return rows
+
+
+def build_month(month: str, results: pd.DataFrame) -> pd.DataFrame:
+    """Feature rows for the results of one ``YYYY-MM`` month."""
+    results = results.reset_index(drop=True)
+    cards = _stored_cards(_worker.get("db"), month)
+    rows: list[dict] = []
+    matched = np.zeros(len(results), dtype=bool)
+
+    by_runner = defaultdict(list)
+    for i, (race_id, horse_id) in enumerate(
+        zip(results["race_id"].tolist(), results["horse_id"].tolist())
+    ):
+        if race_id is not pd.NA and horse_id is not pd.NA:
+            by_runner[(int(race_id), int(horse_id))].append(i)
+
+    for race_id, race in cards.items():
+        for flat in _flatten(race, len(race["runners"])):
+            for i in by_runner.get((race_id, flat["horse_id"]), []):
+                rows.append({**flat, "_row": i, "race_id": race_id, "source": "card"})
+                matched[i] = True
+
+    rest = results[~matched]
+    off = rest["off"].astype(str) if "off" in rest.columns else ""
+    race_key = (
+        rest["race_id"]
+        .astype(str)
+        .where(rest["race_id"].notna(), rest["date"] + " " + off + " " + rest["course"])
+    )
+    for _key, race_rows in rest.groupby(race_key, sort=False):
+        race = _results_card(race_rows)
+        for i, flat in zip(race_rows.index, _flatten(race, race["field_size"])):
+            rows.append(
+                {
+                    **flat,
+                    "_row": i,
+                    "race_id": results.at[i, "race_id"],
+                    "source": "results",
+                }
+            )
+
+    if not rows:
+        return pd.DataFrame(columns=KEY_COLUMNS + CARD_FEATURES)
+    out = pd.DataFrame(rows).sort_values("_row", kind="stable")
+    labelled = results.loc[out["_row"], HORSE_FEATURES + LABELS].reset_index(drop=True)
+    out = pd.concat([out.reset_index(drop=True), labelled], axis=1)
+    form_stats = _worker.get("form_stats")
+    if form_stats is not None and form_stats.tables:
+        attached = form_stats.attach(out[["date", "course", "trainer", "jockey"]])
+        extra = [c for c in attached.columns if c not in out.columns]
+        out[extra] = attached[extra].to_numpy()
+    return out.drop(columns="_row")
+
+
+def feature_columns(df: pd.DataFrame) -> list[str]:
+    """Model inputs in a built training set, excluding keys and labels."""
+    skip = set(KEY_COLUMNS) | set(LABELS) | {"trainer", "jockey"}
+    cols = [c for c in df.columns if c not in skip]
+    check_leakage(cols)
+    return cols
+
+
+def check_leakage(columns: Iterable[str]) -> None:
+    leaked = sorted(set(columns) & LEAKY_COLUMNS)
+    if leaked:
+        raise ValueError(f"Outcome-derived columns in features: {leaked}")
+
+
+def build_training_set(
+    results: pd.DataFrame,
+    form_stats: FormStats | None = None,
+    db: Path | str | None = None,
+    workers: int = 4,
+    months: Iterable[str] | None = None,
+) -> pd.DataFrame:
+    """Point-in-time feature rows for ``results``, built month by month.
+
+    Horse form is computed over the whole of ``results``, so pass the full
+    history even when only some ``months`` are wanted.
+    """
+    prepared = prepare_results(results)
+    if form_stats is None:
+        form_stats = FormStats.from_results(results)
+    db = None if db is None else str(db)
+    wanted = set(months) if months else None
+    groups = [
+        (month, frame)
+        for month, frame in prepared.groupby("month", sort=True)
+        if wanted is None or month in wanted
+    ]
+
+    if workers <= 1:
+        _init_worker(form_stats, db)
+        parts = [build_month(month, frame) for month, frame in groups]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(form_stats, db),
+        ) as pool:
+            futures = [
+                pool.submit(build_month, month, frame) for month, frame in groups
+            ]
+            parts = [f.result() for f in futures]
+
+    parts = [p for p in parts if not p.empty]
+    if not parts:
+        return pd.DataFrame(columns=KEY_COLUMNS + CARD_FEATURES + LABELS)
+    out = pd.concat(parts, ignore_index=True)
+    check_leakage(c for c in out.columns if c not in LABELS)
+    return out
+
+
+def default_path() -> Path:
+    from tippingmonster.utils import repo_path
+
+    return Path(os.getenv("TM_TRAINING_SET", repo_path("data", "training_set.csv.gz")))
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Point-in-time training set")
+    parser.add_argument("--out", default=None, help="Output CSV (default data/)")
+    parser.add_argument("--since", help="Only results on or after YYYY-MM-DD")
+    parser.add_argument("--months", nargs="*", help="Only these YYYY-MM months")
+    parser.add_argument("--db", help="Racecard SQLite database")
+    parser.add_argument("--form_dir", help="Rolling form tables directory")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    from core.form_stats import default_dir
+    from tippingmonster.results_store import load_history
+
+    results = load_history()
+    form_stats = FormStats.load(args.form_dir or default_dir())
+    months = args.months
+    if args.since:
+        dates = pd.to_datetime(results["date"], errors="coerce")
+        keep = dates >= pd.Timestamp(args.since)
+        months = sorted(set(dates[keep].dt.strftime("%Y-%m").dropna()))
+    df = build_training_set(
+        results,
+        form_stats if form_stats.tables else None,
+        db=args.db,
+        workers=args.workers,
+        months=months,
+    )
+    out = Path(args.out) if args.out else default_path()
+    out.parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(out, index=False)
+    print(
+        f"Wrote {len(df)} rows ({(df['source'] == 'card').sum()} from cards) to {out}"
+    )
+
+
+if __name__ == "__main__":
+    main()
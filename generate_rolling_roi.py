@@ -1,10 +1,11 @@
 #!/usr/bin/env python3
-"""Compute a rolling 30-day ROI for sent tips.
+"""Compute rolling 7/14/30/90-day ROI for sent tips.
 
 Scans ``logs/`` for either ``tips_results_YYYY-MM-DD_advised_sent.csv`` or
-``sent_tips_YYYY-MM-DD.jsonl`` and outputs a CSV with daily profit, stake, tips,
-wins, places and strike rate. 30‑day rolling totals are written to
-``logs/roi/rolling_roi_30.csv``.
+``sent_tips_YYYY-MM-DD.jsonl`` for days not yet settled and appends one row per
+day to ``logs/roi/daily_roi_summary.csv`` (see :mod:`roi.rolling_metrics`).
+30‑day rolling totals are written to ``logs/roi/rolling_roi_30.csv`` and all
+windows to ``logs/roi/rolling_roi_windows.csv``.
 """
 
 from __future__ import annotations
@@ -17,6 +18,7 @@ from pathlib import Path
 
 import pandas as pd
 
+from roi import rolling_metrics
 from tippingmonster import calculate_profit, logs_path, repo_path
 
 
@@ -33,7 +35,7 @@ def parse_sent_csv(path: Path) -> tuple[float, float, int, int, int]:
     stake = float(df["Stake"].sum())
     tips = len(df)
     wins = int((df["Position"] == 1).sum())
-    places = int(df["Position"].apply(lambda x: 2 <= x <= 4).sum())
+    places = int(df["Position"].between(2, 4).sum())
     return profit, stake, wins, places, tips
 
 
@@ -114,70 +116,81 @@ def parse_sent_jsonl(date: str) -> tuple[float, float, int, int, int] | None:
     stake = float(merged["Stake"].sum())
     tips = len(merged)
     wins = int((merged["Position"] == "1").sum())
-    places = int(
-        merged["Position"].apply(lambda x: str(x).isdigit() and 2 <= int(x) <= 4).sum()
-    )
+    places = int(pd.to_numeric(merged["Position"], errors="coerce").between(2, 4).sum())
     return profit, stake, wins, places, tips
 
 
-def collect_daily_results(days: int) -> pd.DataFrame:
+def settle_day(date_str: str) -> dict | None:
+    """Return the settled summary row for ``date_str`` or ``None``."""
+    csv_path = logs_path(f"tips_results_{date_str}_advised_sent.csv")
+    result = None
+    if os.path.exists(csv_path):
+        try:
+            result = parse_sent_csv(csv_path)
+        except Exception as exc:
+            print(f"Error reading {csv_path}: {exc}")
+    if result is None:
+        result = parse_sent_jsonl(date_str)
+    if result is None:
+        return None
+    profit, stake, wins, places, tips = result
+    return {
+        "Date": date_str,
+        "Tips": tips,
+        "Wins": wins,
+        "Places": places,
+        "Profit": profit,
+        "Stake": stake,
+    }
+
+
+def update_daily_summary(days: int, rebuild: bool = False) -> pd.DataFrame:
+    """Settle any of the last ``days`` days missing from the daily store.
+
+    Days that are already stored are not re-read unless ``rebuild`` is set, so
+    a nightly run normally settles only today's tips.
+    """
     today = datetime.utcnow().date()
-    rows = []
-    for i in range(days):
-        d = today - timedelta(days=i)
-        date_str = d.strftime("%Y-%m-%d")
-        csv_path = logs_path(f"tips_results_{date_str}_advised_sent.csv")
-        profit: float | None = None
-        stake: float | None = None
-        wins: int | None = None
-        places: int | None = None
-        tips: int | None = None
-        if os.path.exists(csv_path):
-            try:
-                profit, stake, wins, places, tips = parse_sent_csv(csv_path)
-            except Exception as exc:
-                print(f"Error reading {csv_path}: {exc}")
-        if profit is None:
-            result = parse_sent_jsonl(date_str)
-            if result:
-                profit, stake, wins, places, tips = result
-        if profit is None:
+    start = (today - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+    daily = rolling_metrics.load_daily()
+    if rebuild:
+        daily = daily[daily["Date"] < start].reset_index(drop=True)
+    settled = set(daily["Date"])
+    for i in reversed(range(days)):
+        date_str = (today - timedelta(days=i)).strftime("%Y-%m-%d")
+        # today is always re-settled in case results landed after the last run
+        if date_str in settled and i > 0:
             continue
-        roi = (profit / stake * 100) if stake else 0.0
-        strike = (wins / tips * 100) if tips else 0.0
-        rows.append(
-            {
-                "Date": date_str,
-                "Tips": tips,
-                "Wins": wins,
-                "Places": places,
-                "Profit": profit,
-                "Stake": stake,
-                "ROI": roi,
-                "StrikeRate": strike,
-            }
-        )
-
-    df = pd.DataFrame(sorted(rows, key=lambda r: r["Date"]))
-    if df.empty:
-        return df
-
-    df["RollingProfit"] = df["Profit"].rolling(window=30, min_periods=1).sum()
-    df["RollingStake"] = df["Stake"].rolling(window=30, min_periods=1).sum()
-    df["RollingWins"] = df["Wins"].rolling(window=30, min_periods=1).sum()
-    df["RollingTips"] = df["Tips"].rolling(window=30, min_periods=1).sum()
-    df["RollingROI"] = df.apply(
-        lambda r: (r.RollingProfit / r.RollingStake * 100) if r.RollingStake else 0.0,
-        axis=1,
-    )
-    df["RollingStrikeRate"] = df.apply(
-        lambda r: (r.RollingWins / r.RollingTips * 100) if r.RollingTips else 0.0,
-        axis=1,
-    )
-    return df
-
-
-def main(days: int) -> None:
+        row = settle_day(date_str)
+        if row is not None:
+            daily = rolling_metrics.upsert_day(daily, row)
+    rolling_metrics.save_daily(daily)
+    return daily
+
+
+def collect_daily_results(days: int, window: int = 30) -> pd.DataFrame:
+    """Return the last ``days`` settled days with ``window``-day rolling totals."""
+    daily = update_daily_summary(days)
+    if daily.empty:
+        return pd.DataFrame()
+    series = rolling_metrics.rolling_series(daily, windows=(window,))
+    start = (datetime.utcnow().date() - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+    series = series[series["Date"] >= start].reset_index(drop=True)
+    return series.rename(
+        columns={
+            f"Profit{window}d": "RollingProfit",
+            f"Stake{window}d": "RollingStake",
+            f"Wins{window}d": "RollingWins",
+            f"Tips{window}d": "RollingTips",
+            f"ROI{window}d": "RollingROI",
+            f"StrikeRate{window}d": "RollingStrikeRate",
+        }
+    ).drop(columns=[f"Places{window}d"])
+
+
+def main(days: int, rebuild: bool = False) -> None:
+    if rebuild:
+        update_daily_summary(days, rebuild=True)
     df = collect_daily_results(days)
     if df.empty:
         print("No ROI data found for the given period")
@@ -185,7 +198,10 @@ def main(days: int) -> None:
     out_path = logs_path("roi", "rolling_roi_30.csv")
     out_path.parent.mkdir(parents=True, exist_ok=True)
     df.to_csv(out_path, index=False)
+    series_path = logs_path("roi", "rolling_roi_windows.csv")
+    rolling_metrics.rolling_series().to_csv(series_path, index=False)
     print(f"✅ Saved {out_path}")
+    print(f"✅ Saved {series_path}")
 
 
 if __name__ == "__main__":
@@ -193,5 +209,10 @@ if __name__ == "__main__":
     parser.add_argument(
         "--days", type=int, default=30, help="Number of days to include"
     )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Re-settle every day in the period instead of only missing days",
+    )
     args = parser.parse_args()
-    main(args.days)
+    main(args.days, rebuild=args.rebuild)
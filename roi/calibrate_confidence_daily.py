@@ -1,4 +1,12 @@
 #!/usr/bin/env python3
+"""Track ROI per confidence bin daily and refit the confidence calibrator.
+
+Each run settles one day (yesterday by default): per-bin ROI rows are appended
+to ``logs/roi/monster_confidence_per_day_with_roi.csv`` and the day's
+(confidence, won) outcomes are folded into the active model's calibration
+counts before the mapping is refitted (see :mod:`core.calibration`).
+"""
+
 import argparse
 import json
 import sys
@@ -9,21 +17,7 @@ import numpy as np
 import pandas as pd
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
-from core.tip import Tip
-
-# === ARGUMENTS ===
-parser = argparse.ArgumentParser()
-parser.add_argument(
-    "--date",
-    help=("Target date (YYYY-MM-DD). Defaults to yesterday."),
-)
-args = parser.parse_args()
-
-if args.date:
-    START_DATE = END_DATE = datetime.strptime(args.date, "%Y-%m-%d")
-else:
-    today = datetime.today()
-    START_DATE = END_DATE = today - timedelta(days=1)
+from core import calibration
 
 # === CONFIG ===
 PLACE_LIMIT = 3
@@ -37,151 +31,214 @@ CSV_OUTPUT = Path("logs/roi/monster_confidence_per_day_with_roi.csv")
 
 bins = [(round(c, 2), round(c + 0.1, 2)) for c in np.arange(0.5, 0.99, 0.1)]
 bins.append((0.99, 1.01))
+BIN_LABELS = [f"{low:.2f}–{high:.2f}" for (low, high) in bins]
 
 
-def clean_time(t):
-    t = str(t).strip()
-    try:
-        return datetime.strptime(t, "%I:%M").strftime("%H:%M")
-    except Exception:
-        try:
-            return datetime.strptime(t, "%H:%M").strftime("%H:%M")
-        except Exception:
-            return t
+def clean_time(times: pd.Series) -> pd.Series:
+    """Normalise race times to ``HH:MM``; unparseable values are kept as-is."""
+    t = times.astype(str).str.strip()
+    parsed = pd.to_datetime(t, format="%H:%M", errors="coerce")
+    return parsed.dt.strftime("%H:%M").fillna(t)
 
 
-def clean_course(name):
-    return name.strip().lower().split(" (")[0]
+def clean_course(names: pd.Series) -> pd.Series:
+    return names.astype(str).str.strip().str.lower().str.split(" (", regex=False).str[0]
 
 
-def clean_horse(name):
-    return name.lower().split(" (")[0].strip()
+def clean_horse(names: pd.Series) -> pd.Series:
+    return names.astype(str).str.lower().str.split(" (", regex=False).str[0].str.strip()
 
 
-# === MAIN ===
+def assign_bin(conf: pd.Series) -> pd.Series:
+    """Return the bin label for each confidence (first matching bin wins)."""
+    conf = conf.to_numpy(dtype=float)
+    conditions = [(conf >= low) & (conf < high) for (low, high) in bins]
+    return pd.Series(np.select(conditions, BIN_LABELS, default=""))
 
-per_day_data = []
-current = START_DATE
 
-while current <= END_DATE:
-    date_str = current.strftime("%Y-%m-%d")
+def load_day(date_str: str) -> pd.DataFrame | None:
+    """Return the day's tips matched to results, or ``None`` if unavailable."""
     pred_path = PRED_DIR / date_str / "tips_with_odds.jsonl"
-    result_path = RESULT_DIR / f"{current.strftime('%Y_%m_%d')}.csv"
-
+    result_path = RESULT_DIR / f"{date_str.replace('-', '_')}.csv"
     if not pred_path.exists() or not result_path.exists():
-        current += timedelta(days=1)
-        continue
+        return None
 
     with open(pred_path) as f:
-        tips = [Tip.from_dict(json.loads(line)) for line in f]
-
-    df_results = pd.read_csv(result_path)
-    df_results["clean_course"] = df_results["course"].apply(clean_course)
-    df_results["clean_time"] = df_results["off"].apply(clean_time)
-    df_results["horse_lower"] = df_results["horse"].apply(clean_horse)
-    df_results["pos"] = (
-        pd.to_numeric(df_results["pos"], errors="coerce").fillna(99).astype(int)
+        tips = pd.DataFrame([json.loads(line) for line in f if line.strip()])
+    if tips.empty:
+        return None
+    race = tips.get("race", pd.Series("", index=tips.index)).astype(str).str.strip()
+    parts = race.str.split(" ", n=1, expand=True).reindex(columns=[0, 1])
+    tips = pd.DataFrame(
+        {
+            "clean_time": clean_time(parts[0].fillna("")),
+            "clean_course": clean_course(parts[1].fillna("")),
+            "horse_lower": clean_horse(
+                tips.get("name", pd.Series("", index=tips.index))
+            ),
+            "confidence": pd.to_numeric(
+                tips.get("confidence", pd.Series(0, index=tips.index)), errors="coerce"
+            ).fillna(0),
+            "odds": pd.to_numeric(
+                tips.get("bf_sp", pd.Series(0, index=tips.index)), errors="coerce"
+            ).fillna(0),
+        }
     )
 
-    daily_bins = {
-        f"{low:.2f}–{high:.2f}": {
-            "tips": 0,
-            "wins": 0,
-            "places": 0,
-            "win_pnl": 0.0,
-            "ew_pnl": 0.0,
+    results = pd.read_csv(result_path)
+    results = pd.DataFrame(
+        {
+            "clean_course": clean_course(results["course"]),
+            "clean_time": clean_time(results["off"]),
+            "horse_lower": clean_horse(results["horse"]),
+            "pos": pd.to_numeric(results["pos"], errors="coerce")
+            .fillna(99)
+            .astype(int),
         }
-        for (low, high) in bins
-    }
-
-    for tip in tips:
-        try:
-            time_part, course_part = tip["race"].strip().split(" ", 1)
-            tip_time = clean_time(time_part)
-            tip_course = clean_course(course_part)
-            tip_name = clean_horse(tip["name"])
-            conf = float(tip.get("confidence", 0))
-            odds = float(tip.get("bf_sp", 0))
-
-            bin_key = next(
-                (f"{low:.2f}–{high:.2f}" for (low, high) in bins if low <= conf < high),
-                None,
+    ).drop_duplicates(subset=["clean_course", "clean_time", "horse_lower"])
+
+    return tips.merge(
+        results, on=["clean_course", "clean_time", "horse_lower"], how="inner"
+    )
+
+
+def summarise_day(date_str: str, matched: pd.DataFrame) -> pd.DataFrame:
+    """Return one ROI row per confidence bin for ``date_str``."""
+    df = matched.assign(bin=assign_bin(matched["confidence"]).to_numpy())
+    df = df[df["bin"] != ""]
+    is_win = df["pos"] == 1
+    is_place = df["pos"] <= PLACE_LIMIT
+    odds = df["odds"]
+    df = df.assign(
+        wins=is_win.astype(int),
+        places=is_place.astype(int),
+        win_pnl=np.where(is_win, (odds - 1) * STAKE, -STAKE),
+        ew_pnl=np.where(
+            odds >= 5.0,
+            np.where(
+                is_place, (odds * PLACE_ODDS_FRACTION - 1) * (STAKE / 2), -STAKE / 2
             )
-            if not bin_key:
-                continue
-
-            match = df_results[
-                (df_results["clean_course"] == tip_course)
-                & (df_results["clean_time"] == tip_time)
-                & (df_results["horse_lower"] == tip_name)
-            ]
-
-            if match.empty:
-                continue
-
-            pos = match.iloc[0]["pos"]
-            is_win = pos == 1
-            is_place = pos <= PLACE_LIMIT
-            win_pnl = (odds - 1) * STAKE if is_win else -STAKE
-
-            if odds >= 5.0:
-                place_pnl = (
-                    (odds * PLACE_ODDS_FRACTION - 1) * (STAKE / 2)
-                    if is_place
-                    else -(STAKE / 2)
-                )
-                ew_pnl = place_pnl + (STAKE / 2 if is_win else -(STAKE / 2))
-            else:
-                ew_pnl = 0.0
-
-            stats = daily_bins[bin_key]
-            stats["tips"] += 1
-            stats["wins"] += int(is_win)
-            stats["places"] += int(is_place)
-            stats["win_pnl"] += win_pnl
-            stats["ew_pnl"] += ew_pnl
-
-        except Exception:
-            continue
-
-    for bin_key, stats in daily_bins.items():
-        tips = stats["tips"]
-        win_pnl = stats["win_pnl"]
-        ew_pnl = stats["ew_pnl"]
-        win_roi = (win_pnl / tips * 100) if tips else 0
-        ew_roi = (ew_pnl / tips * 100) if tips else 0
-
-        per_day_data.append(
-            {
-                "Date": date_str,
-                "Confidence Bin": bin_key,
-                "Tips": tips,
-                "Wins": stats["wins"],
-                "Win %": round(stats["wins"] / tips * 100, 2) if tips else 0,
-                "Places": stats["places"],
-                "Place %": round(stats["places"] / tips * 100, 2) if tips else 0,
-                "Win PnL": round(win_pnl, 2),
-                "EW PnL (5.0+)": round(ew_pnl, 2),
-                "Win ROI %": round(win_roi, 2),
-                "EW ROI %": round(ew_roi, 2),
-                "Win Profit £": round(win_pnl * STAKE_GBP, 2),
-                "EW Profit £": round(ew_pnl * STAKE_GBP, 2),
-            }
+            + np.where(is_win, STAKE / 2, -STAKE / 2),
+            0.0,
+        ),
+    )
+    grouped = (
+        df.groupby("bin")
+        .agg(
+            tips=("wins", "size"),
+            wins=("wins", "sum"),
+            places=("places", "sum"),
+            win_pnl=("win_pnl", "sum"),
+            ew_pnl=("ew_pnl", "sum"),
         )
+        .reindex(BIN_LABELS, fill_value=0)
+    )
 
-    current += timedelta(days=1)
-
-# === SAVE (DEDUPLICATED) CSV ===
-df = pd.DataFrame(per_day_data)
+    tips = grouped["tips"]
+    per_tip = tips.where(tips > 0)
+    out = pd.DataFrame(
+        {
+            "Date": date_str,
+            "Confidence Bin": grouped.index,
+            "Tips": tips.to_numpy(),
+            "Wins": grouped["wins"].to_numpy(),
+            "Win %": (grouped["wins"] / per_tip * 100).round(2).fillna(0).to_numpy(),
+            "Places": grouped["places"].to_numpy(),
+            "Place %": (grouped["places"] / per_tip * 100)
+            .round(2)
+            .fillna(0)
+            .to_numpy(),
+            "Win PnL": grouped["win_pnl"].round(2).to_numpy(),
+            "EW PnL (5.0+)": grouped["ew_pnl"].round(2).to_numpy(),
+            "Win ROI %": (grouped["win_pnl"] / per_tip * 100)
+            .round(2)
+            .fillna(0)
+            .to_numpy(),
+            "EW ROI %": (grouped["ew_pnl"] / per_tip * 100)
+            .round(2)
+            .fillna(0)
+            .to_numpy(),
+            "Win Profit £": (grouped["win_pnl"] * STAKE_GBP).round(2).to_numpy(),
+            "EW Profit £": (grouped["ew_pnl"] * STAKE_GBP).round(2).to_numpy(),
+        }
+    )
+    return out
+
+
+def _last_logged_date(path: Path, chunk: int = 4096) -> str | None:
+    """Return the ``Date`` of the last row in ``path`` without reading it all."""
+    if not path.exists() or path.stat().st_size == 0:
+        return None
+    with open(path, "rb") as f:
+        f.seek(max(path.stat().st_size - chunk, 0))
+        lines = f.read().decode("utf-8", errors="ignore").strip().splitlines()
+    return lines[-1].split(",", 1)[0] if lines else None
+
+
+def save_rows(rows: pd.DataFrame, path: Path = CSV_OUTPUT) -> None:
+    """Append ``rows`` to ``path``, rewriting only when back-filling a date."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if rows.empty:
+        print("⚠️ No new data to append.")
+        return
+    last = _last_logged_date(path)
+    if last is None:
+        rows.to_csv(path, index=False)
+    elif rows["Date"].min() > last:
+        rows.to_csv(path, mode="a", header=False, index=False)
+    else:
+        existing = pd.read_csv(path)
+        existing = existing[~existing["Date"].isin(rows["Date"])]
+        pd.concat([existing, rows], ignore_index=True).sort_values(
+            "Date", kind="stable"
+        ).to_csv(path, index=False)
+    print(f"✅ Logged confidence ROI rows for {', '.join(sorted(set(rows['Date'])))}")
+
+
+def update_calibration(date_str: str, matched: pd.DataFrame) -> None:
+    """Fold the day's outcomes into the active model's calibration."""
+    model = calibration.active_model_path()
+    counts_path = calibration.counts_path_for(model)
+    state = calibration.load_counts(counts_path)
+    state = calibration.update_counts(
+        state, date_str, matched["confidence"], matched["pos"] == 1
+    )
+    calibration.save_counts(state, counts_path)
+
+    calibrator = calibration.fit_calibration(state)
+    if calibrator is None:
+        print(f"ℹ️ Not enough settled tips to calibrate ({sum(state['tips'])})")
+        return
+    if model is None:
+        print("ℹ️ No local model tarball; calibration counts saved only")
+        return
+    out = calibration.calibration_path_for(model)
+    calibration.save_calibration(calibrator, out)
+    print(f"✅ {calibrator.method} calibration ({calibrator.tips} tips) saved to {out}")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--date",
+        help=("Target date (YYYY-MM-DD). Defaults to yesterday."),
+    )
+    args = parser.parse_args(argv)
 
-if CSV_OUTPUT.exists():
-    existing = pd.read_csv(CSV_OUTPUT)
-    if not df.empty and "Date" in df.columns:
-        existing = existing[~existing["Date"].isin(df["Date"])]
-        df = pd.concat([existing, df], ignore_index=True)
+    if args.date:
+        target = datetime.strptime(args.date, "%Y-%m-%d")
     else:
-        print("⚠️ No new data to append or missing " "'Date' column in new DataFrame.")
-        df = existing
+        target = datetime.today() - timedelta(days=1)
+    date_str = target.strftime("%Y-%m-%d")
+
+    matched = load_day(date_str)
+    if matched is None:
+        print(f"⚠️ Missing predictions or results for {date_str}")
+        return
+
+    save_rows(summarise_day(date_str, matched))
+    update_calibration(date_str, matched)
+
 
-df.to_csv(CSV_OUTPUT, index=False)
-print(f"✅ Overwrote ROI report with deduplicated data to {CSV_OUTPUT}")
+if __name__ == "__main__":
+    main()
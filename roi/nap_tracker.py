@@ -10,6 +10,7 @@ from pathlib import Path
 
 import pandas as pd
 
+from roi.tip_log import read_tip_log, tip_log_path
 from tippingmonster import logs_path, send_telegram_message
 
 HISTORY_FILE = logs_path("roi", "nap_history.csv")
@@ -28,34 +29,28 @@ def save_history(df: pd.DataFrame, file_path: Path = HISTORY_FILE) -> None:
     df.to_csv(file_path, index=False)
 
 
-def parse_tags(val: str) -> str:
-    """Return lowercase tag string."""
-    return str(val).lower()
-
-
 def log_day(
     date_str: str,
     history_file: Path = HISTORY_FILE,
     csv_file: Path | None = None,
 ) -> dict | None:
     csv_file = csv_file or logs_path("roi", f"tips_results_{date_str}_advised.csv")
-    if not os.path.exists(csv_file):
+    if not (os.path.exists(csv_file) or tip_log_path(csv_file).exists()):
         print(f"Missing ROI CSV: {csv_file}")
         return None
 
-    df = pd.read_csv(csv_file)
-    if "tags" not in df.columns:
-        print("CSV missing 'tags' column")
+    log = read_tip_log(csv_file)
+    if not log.vocab:
+        print(f"No tags recorded in {csv_file}")
         return None
 
-    df["tags"] = df["tags"].apply(parse_tags)
-    nap_df = df[df["tags"].str.contains("nap", na=False)]
+    nap_df = log.frame[log.has_any(log.matching("nap"))]
     if nap_df.empty:
         print(f"No NAP tips found for {date_str}")
         return None
 
     tips = len(nap_df)
-    wins = (nap_df["Position"] == 1).sum()
+    wins = (nap_df["Position"] == "1").sum()
     profit = nap_df["Profit"].sum()
     stake = nap_df["Stake"].sum()
     roi = profit / stake * 100 if stake else 0.0
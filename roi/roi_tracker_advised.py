@@ -11,6 +11,7 @@ import pandas as pd
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 from core.tip import Tip
+from roi import tip_log
 
 # isort: off
 from tippingmonster import (
@@ -127,7 +128,17 @@ def calculate_profit(row):
         return round(win_profit, 2)
 
 
-def main(date_str, mode, min_conf, send_to_telegram, use_sent, show=False, tag=None):
+def main(
+    date_str,
+    mode,
+    min_conf,
+    send_to_telegram,
+    use_sent,
+    show=False,
+    tag=None,
+    results=None,
+):
+    """Settle the day's tips; ``results`` is the raw results CSV if already loaded."""
     date_obj = datetime.strptime(date_str, "%Y-%m-%d")
     date_display = date_obj.strftime("%Y-%m-%d")
 
@@ -177,7 +188,7 @@ def main(date_str, mode, min_conf, send_to_telegram, use_sent, show=False, tag=N
     tips_df = pd.DataFrame(tip.to_dict() for tip in tips)
 
     try:
-        results_df = pd.read_csv(results_path)
+        results_df = pd.read_csv(results_path) if results is None else results.copy()
         results_df.rename(
             columns={
                 "off": "Race Time",
@@ -287,22 +298,26 @@ def main(date_str, mode, min_conf, send_to_telegram, use_sent, show=False, tag=N
         return
 
     output_path = f"logs/roi/tips_results_{date_str}_{mode}.csv"
-    merged_df[
-        [
-            "Date",
-            "Race Time",
-            "Course",
-            "Horse",
-            "Odds",
-            "odds_delta",
-            "Confidence",
-            "Position",
-            "Mode",
-            "Stake",
-            "Profit",
-        ]
-    ].to_csv(output_path, index=False)
-    print(f"✅ Saved: {output_path}")
+    columns = [
+        "Date",
+        "Race Time",
+        "Course",
+        "Horse",
+        "Odds",
+        "odds_delta",
+        "Confidence",
+        "Position",
+        "Mode",
+        "Stake",
+        "Profit",
+    ]
+    merged_df[columns].to_csv(output_path, index=False)
+    # The typed log also keeps the tags, which the CSV never had
+    log_columns = columns + ["tags"] if "tags" in merged_df.columns else columns
+    log_path = tip_log.write_tip_log(
+        merged_df[log_columns], tip_log.tip_log_path(output_path)
+    )
+    print(f"✅ Saved: {output_path} (+ {log_path.name})")
 
     if send_to_telegram:
         message = f"""📊 *Tipping Monster Daily ROI – {date_display} ({mode.capitalize()})*
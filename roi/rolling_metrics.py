@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""Incremental rolling ROI metrics backed by one settled row per day.
+
+Each settled day is stored once in ``logs/roi/daily_roi_summary.csv`` together
+with running totals (``Cum*`` columns). The total for any trailing window is
+then ``cum[today] - cum[today - window]`` so adding a new day costs the same
+regardless of how long the windows are.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from tippingmonster import logs_path
+
+WINDOWS = (7, 14, 30, 90)
+BASE_COLUMNS = ["Tips", "Wins", "Places", "Profit", "Stake"]
+CUM_COLUMNS = [f"Cum{c}" for c in BASE_COLUMNS]
+DAILY_COLUMNS = ["Date", *BASE_COLUMNS, "ROI", "StrikeRate", *CUM_COLUMNS]
+
+
+def daily_summary_path() -> Path:
+    return logs_path("roi", "daily_roi_summary.csv")
+
+
+def _ratio(num, den) -> np.ndarray:
+    num = np.asarray(num, dtype=float)
+    den = np.asarray(den, dtype=float)
+    out = np.zeros_like(num)
+    np.divide(num, den, out=out, where=den != 0)
+    return out * 100
+
+
+def load_daily(file_path: Path | None = None) -> pd.DataFrame:
+    """Return the stored daily summary sorted by date."""
+    file_path = file_path or daily_summary_path()
+    if not file_path.exists():
+        return pd.DataFrame(columns=DAILY_COLUMNS)
+    df = pd.read_csv(file_path, dtype={"Date": str})
+    return df.sort_values("Date").reset_index(drop=True)
+
+
+def save_daily(df: pd.DataFrame, file_path: Path | None = None) -> None:
+    file_path = file_path or daily_summary_path()
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(file_path, index=False)
+
+
+def _recompute_cumulative(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.sort_values("Date").reset_index(drop=True)
+    for col, cum in zip(BASE_COLUMNS, CUM_COLUMNS):
+        df[cum] = pd.to_numeric(df[col], errors="coerce").fillna(0).cumsum()
+    return df
+
+
+def upsert_day(df: pd.DataFrame, row: dict) -> pd.DataFrame:
+    """Insert or replace the settled ``row`` for its date.
+
+    Appending (or re-settling) the latest day only extends the running totals
+    from the previous row. Replacing or back-filling an earlier day rebuilds the
+    running totals, which is only needed when late results are re-settled.
+    """
+    row = {c: row.get(c, 0) for c in ["Date", *BASE_COLUMNS]}
+    row["ROI"] = float(_ratio(row["Profit"], row["Stake"]))
+    row["StrikeRate"] = float(_ratio(row["Wins"], row["Tips"]))
+
+    if not df.empty and row["Date"] == df["Date"].iloc[-1]:
+        df = df.iloc[:-1]
+    if df.empty or row["Date"] > df["Date"].iloc[-1]:
+        last = df.iloc[-1] if not df.empty else None
+        for col, cum in zip(BASE_COLUMNS, CUM_COLUMNS):
+            prev = float(last[cum]) if last is not None else 0.0
+            row[cum] = prev + float(row[col])
+        new = pd.DataFrame([row], columns=DAILY_COLUMNS)
+        return new if df.empty else pd.concat([df, new], ignore_index=True)
+
+    df = df[df["Date"] != row["Date"]]
+    df = pd.concat([df, pd.DataFrame([row])], ignore_index=True)
+    return _recompute_cumulative(df)[DAILY_COLUMNS]
+
+
+def _window_totals(df: pd.DataFrame, window: int) -> dict[str, np.ndarray]:
+    """Return trailing ``window``-day totals for each row of ``df``."""
+    dates = pd.to_datetime(df["Date"]).to_numpy()
+    start = dates - np.timedelta64(window, "D")
+    # index of the last row strictly before the window starts
+    prev_idx = np.searchsorted(dates, start, side="right") - 1
+    totals = {}
+    for col, cum in zip(BASE_COLUMNS, CUM_COLUMNS):
+        values = df[cum].to_numpy(dtype=float)
+        prev = np.where(prev_idx >= 0, values[np.clip(prev_idx, 0, None)], 0.0)
+        totals[col] = values - prev
+    return totals
+
+
+def rolling_series(
+    df: pd.DataFrame | None = None, windows: tuple[int, ...] = WINDOWS
+) -> pd.DataFrame:
+    """Return daily rows with trailing totals, ROI and strike rate per window."""
+    df = load_daily() if df is None else df
+    if df.empty:
+        return pd.DataFrame(columns=["Date"])
+    out = df[["Date", *BASE_COLUMNS, "ROI", "StrikeRate"]].copy()
+    for window in windows:
+        totals = _window_totals(df, window)
+        for col in BASE_COLUMNS:
+            out[f"{col}{window}d"] = totals[col]
+        out[f"ROI{window}d"] = _ratio(totals["Profit"], totals["Stake"])
+        out[f"StrikeRate{window}d"] = _ratio(totals["Wins"], totals["Tips"])
+    return out
+
+
+def latest_windows(
+    df: pd.DataFrame | None = None,
+    windows: tuple[int, ...] = WINDOWS,
+    as_of: str | None = None,
+) -> dict[int, dict]:
+    """Return totals for each window ending on ``as_of`` (default: last row)."""
+    df = load_daily() if df is None else df
+    if df.empty:
+        return {}
+    if as_of is not None:
+        df = df[df["Date"] <= as_of]
+        if df.empty:
+            return {}
+    end = as_of or df["Date"].iloc[-1]
+    end_cum = df.iloc[-1]
+    out = {}
+    for window in windows:
+        start = (datetime.strptime(end, "%Y-%m-%d") - timedelta(days=window)).strftime(
+            "%Y-%m-%d"
+        )
+        before = df[df["Date"] <= start]
+        prev = before.iloc[-1] if not before.empty else None
+        totals = {
+            col: float(end_cum[cum]) - (float(prev[cum]) if prev is not None else 0.0)
+            for col, cum in zip(BASE_COLUMNS, CUM_COLUMNS)
+        }
+        totals["ROI"] = float(_ratio(totals["Profit"], totals["Stake"]))
+        totals["StrikeRate"] = float(_ratio(totals["Wins"], totals["Tips"]))
+        out[window] = totals
+    return out
+
+
+__all__ = [
+    "WINDOWS",
+    "daily_summary_path",
+    "load_daily",
+    "save_daily",
+    "upsert_day",
+    "rolling_series",
+    "latest_windows",
+]
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""Per-day tag ROI cube for fast roll-ups by tag, date range and band.
+
+Settled tips are aggregated once per day into ``logs/roi/tag_cube.csv`` keyed
+by ``Date``, ``TagSet``, ``Band``, ``Mode`` and ``Source``. ``TagSet`` holds the
+tip's sorted tags joined by ``" | "`` so queries for a combination such as
+"Class Drop + Fresh" are a superset match over a handful of distinct sets
+instead of a rescan of every ``tips_with_odds.jsonl``.
+"""
+
+from __future__ import annotations
+
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from roi_by_confidence_band import BANDS
+
+CUBE_FILE = Path("logs/roi/tag_cube.csv")
+TAG_SEP = " | "
+KEY_COLUMNS = ["Date", "TagSet", "Band", "Mode", "Source"]
+VALUE_COLUMNS = ["Runs", "Wins", "Places", "Stake", "Profit"]
+CUBE_COLUMNS = KEY_COLUMNS + VALUE_COLUMNS
+
+BAND_EDGES = [0.0] + [low for low, _, _ in BANDS] + [BANDS[-1][1]]
+BAND_LABELS = [f"<{BANDS[0][0]:.2f}"] + [label for _, _, label in BANDS]
+BAND_LOWS = dict(zip(BAND_LABELS, BAND_EDGES[:-1]))
+
+
+def empty_cube() -> pd.DataFrame:
+    return pd.DataFrame(columns=CUBE_COLUMNS)
+
+
+def load_cube(file_path: Path = CUBE_FILE) -> pd.DataFrame:
+    file_path = Path(file_path)
+    if not file_path.exists():
+        return empty_cube()
+    return pd.read_csv(
+        file_path, dtype={"Date": str, "TagSet": str}, keep_default_na=False
+    )
+
+
+def save_cube(df: pd.DataFrame, file_path: Path = CUBE_FILE) -> None:
+    file_path = Path(file_path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(file_path, index=False)
+
+
+def tag_key(tags: Iterable[str]) -> str:
+    """Return the canonical ``TagSet`` key for ``tags``."""
+    return TAG_SEP.join(sorted({str(t).strip() for t in tags if str(t).strip()}))
+
+
+def assign_bands(conf: pd.Series) -> pd.Series:
+    """Vectorised confidence band labels including a bucket below 0.80."""
+    conf = pd.to_numeric(conf, errors="coerce").fillna(0.0).clip(0.0, 1.0)
+    return pd.cut(conf, BAND_EDGES, labels=BAND_LABELS, right=False).astype(str)
+
+
+def cube_rows(
+    merged: pd.DataFrame, date_str: str, mode: str, source: str
+) -> pd.DataFrame:
+    """Aggregate one day's settled tips into cube rows.
+
+    ``merged`` needs ``tags``, ``Position``, ``Profit`` and a confidence column
+    (``Confidence`` or ``confidence``). ``Stake`` defaults to 1 pt.
+    """
+    if merged.empty:
+        return empty_cube()
+    conf_col = "Confidence" if "Confidence" in merged.columns else "confidence"
+    conf = merged[conf_col] if conf_col in merged.columns else 0.0
+    stake = merged["Stake"] if "Stake" in merged.columns else 1.0
+    tags = merged["tags"] if "tags" in merged.columns else [[]] * len(merged)
+    pos = pd.to_numeric(merged["Position"], errors="coerce")
+    frame = pd.DataFrame(
+        {
+            "Date": date_str,
+            "TagSet": [tag_key(t) if isinstance(t, list) else "" for t in tags],
+            "Band": assign_bands(pd.Series(conf, index=merged.index)).to_numpy(),
+            "Mode": mode,
+            "Source": source,
+            "Runs": 1,
+            "Wins": (pos == 1).astype(int).to_numpy(),
+            "Places": pos.between(2, 4).astype(int).to_numpy(),
+            "Stake": pd.to_numeric(
+                pd.Series(stake, index=merged.index), errors="coerce"
+            )
+            .fillna(0)
+            .to_numpy(),
+            "Profit": pd.to_numeric(merged["Profit"], errors="coerce")
+            .fillna(0)
+            .to_numpy(),
+        }
+    )
+    return frame.groupby(KEY_COLUMNS, as_index=False)[VALUE_COLUMNS].sum()
+
+
+def update_cube(
+    cube: pd.DataFrame, rows: pd.DataFrame, date_str: str, mode: str, source: str
+) -> pd.DataFrame:
+    """Replace the slice for (``date_str``, ``mode``, ``source``) with ``rows``.
+
+    Re-running a day is idempotent.
+    """
+    if not cube.empty:
+        keep = ~(
+            (cube["Date"] == date_str)
+            & (cube["Mode"] == mode)
+            & (cube["Source"] == source)
+        )
+        cube = cube[keep]
+    parts = [df for df in (cube, rows) if not df.empty]
+    if not parts:
+        return empty_cube()
+    return pd.concat(parts, ignore_index=True)[CUBE_COLUMNS]
+
+
+def settled_dates(cube: pd.DataFrame, mode: str, source: str) -> set[str]:
+    if cube.empty:
+        return set()
+    mask = (cube["Mode"] == mode) & (cube["Source"] == source)
+    return set(cube.loc[mask, "Date"])
+
+
+def _split_tags(query: str | Iterable[str] | None) -> list[str]:
+    if query is None:
+        return []
+    if isinstance(query, str):
+        query = query.split("+")
+    return [t.strip() for t in query if t and t.strip()]
+
+
+def _tag_mask(tagsets: pd.Series, tags: list[str]) -> np.ndarray:
+    """Return True where every tag in ``tags`` appears in the set.
+
+    Matching is a case-insensitive substring test per tag, mirroring
+    :func:`tippingmonster.tip_has_tag`, and is evaluated once per distinct set.
+    """
+    if not tags:
+        return np.ones(len(tagsets), dtype=bool)
+    wanted = [t.lower() for t in tags]
+    unique = pd.Series(tagsets.unique())
+    matches = unique[
+        unique.map(
+            lambda s: all(
+                any(w in part.lower() for part in s.split(TAG_SEP)) for w in wanted
+            )
+        )
+    ]
+    return tagsets.isin(set(matches)).to_numpy()
+
+
+def select(
+    cube: pd.DataFrame,
+    tags: str | Iterable[str] | None = None,
+    start: str | None = None,
+    end: str | None = None,
+    days: int | None = None,
+    mode: str | None = None,
+    source: str | None = None,
+    min_conf: float | None = None,
+) -> pd.DataFrame:
+    """Return cube rows matching the filters.
+
+    ``days`` selects the trailing window ending on ``end`` (or the last date in
+    the cube). ``min_conf`` keeps bands whose lower edge is at least
+    ``min_conf``, so values between band edges snap up to the next edge.
+    """
+    if cube.empty:
+        return cube
+    mask = np.ones(len(cube), dtype=bool)
+    if mode:
+        mask &= (cube["Mode"] == mode).to_numpy()
+    if source:
+        mask &= (cube["Source"] == source).to_numpy()
+    if days:
+        end = end or cube["Date"].max()
+        start = (
+            datetime.strptime(end, "%Y-%m-%d") - timedelta(days=days - 1)
+        ).strftime("%Y-%m-%d")
+    if start:
+        mask &= (cube["Date"] >= start).to_numpy()
+    if end:
+        mask &= (cube["Date"] <= end).to_numpy()
+    if min_conf:
+        bands = [b for b, low in BAND_LOWS.items() if low >= min_conf - 1e-9]
+        mask &= cube["Band"].isin(bands).to_numpy()
+    mask &= _tag_mask(cube["TagSet"], _split_tags(tags))
+    return cube[mask]
+
+
+def _add_rates(df: pd.DataFrame) -> pd.DataFrame:
+    stake = df["Stake"].where(df["Stake"] != 0)
+    runs = df["Runs"].where(df["Runs"] != 0)
+    df["ROI %"] = (df["Profit"] / stake * 100).fillna(0.0).round(2)
+    df["Win %"] = (df["Wins"] / runs * 100).fillna(0.0).round(2)
+    return df
+
+
+def rollup(cube: pd.DataFrame, **filters) -> dict:
+    """Return total runs, wins, places, stake, profit and ROI for ``filters``.
+
+    Accepts the same keyword filters as :func:`select`.
+    """
+    rows = select(cube, **filters)
+    totals = {c: float(rows[c].sum()) if not rows.empty else 0.0 for c in VALUE_COLUMNS}
+    totals["ROI %"] = (
+        round(totals["Profit"] / totals["Stake"] * 100, 2) if totals["Stake"] else 0.0
+    )
+    totals["Win %"] = (
+        round(totals["Wins"] / totals["Runs"] * 100, 2) if totals["Runs"] else 0.0
+    )
+    return totals
+
+
+def tag_summary(cube: pd.DataFrame, by: list[str] | None = None, **filters):
+    """Return per-tag totals (optionally also grouped by ``by`` columns)."""
+    rows = select(cube, **filters)
+    by = by or []
+    if rows.empty:
+        return pd.DataFrame(columns=["Tag", *by, *VALUE_COLUMNS, "ROI %", "Win %"])
+    exploded = rows.assign(Tag=rows["TagSet"].str.split(TAG_SEP, regex=False)).explode(
+        "Tag"
+    )
+    exploded = exploded[exploded["Tag"] != ""]
+    summary = exploded.groupby(["Tag", *by], as_index=False)[VALUE_COLUMNS].sum()
+    return _add_rates(summary)
+
+
+__all__ = [
+    "CUBE_FILE",
+    "empty_cube",
+    "load_cube",
+    "save_cube",
+    "tag_key",
+    "assign_bands",
+    "cube_rows",
+    "update_cube",
+    "settled_dates",
+    "select",
+    "rollup",
+    "tag_summary",
+]
@@ -10,6 +10,7 @@ import pandas as pd
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 from core.tip import Tip
+from roi import tag_cube, tip_log
 from tippingmonster import get_place_terms, send_telegram_message, tip_has_tag
 
 
@@ -72,16 +73,72 @@ def load_tips(date_str, min_conf, use_sent, tag=None):
     return tips
 
 
+def settle_tips(tips, results_df):
+    """Merge ``tips`` with the day's results and add each tip's ``Profit``."""
+    tips_df = pd.DataFrame(tip.to_dict() for tip in tips)
+    tips_df["Horse"] = tips_df["Horse"].astype(str).str.strip().str.lower()
+    tips_df["Course"] = tips_df["Course"].astype(str).str.strip().str.lower()
+    tips_df["Race Time"] = tips_df["Race Time"].astype(str).str.strip().str.lower()
+
+    merged_df = pd.merge(
+        tips_df,
+        results_df,
+        how="left",
+        left_on=["Horse", "Race Time", "Course"],
+        right_on=["Horse", "Race Time", "Course"],
+    )
+
+    merged_df["Position"] = merged_df["Position"].fillna("NR")
+    merged_df["Profit"] = merged_df.apply(
+        lambda row: 0.0 if row["Position"] == "NR" else calculate_profit(row),
+        axis=1,
+    )
+    return merged_df
+
+
+def tag_value_wins(merged_df):
+    """Normalise ``tags`` to lists and tag big-drift winners as value wins."""
+    merged_df["tags"] = merged_df["tags"].apply(
+        lambda x: x if isinstance(x, list) else []
+    )
+    value_mask = (merged_df["odds_delta"] > 5.0) & (merged_df["Position"] == "1")
+    merged_df.loc[value_mask, "tags"] = merged_df.loc[value_mask, "tags"].apply(
+        lambda t: t + ["💸 Value Win"]
+    )
+
+
+def update_tag_cube(merged_df, date_str, mode, source, cube_file=None):
+    """Replace the day's (``mode``, ``source``) cube slice with ``merged_df``."""
+    if "tags" not in merged_df.columns:
+        return
+    merged_df = merged_df.copy()
+    tag_value_wins(merged_df)
+    cube_file = cube_file or tag_cube.CUBE_FILE
+    cube_day = tag_cube.cube_rows(merged_df, date_str, mode, source)
+    cube = tag_cube.load_cube(cube_file)
+    cube = tag_cube.update_cube(cube, cube_day, date_str, mode, source)
+    tag_cube.save_cube(cube, cube_file)
+    print(f"✅ Tag cube updated: {cube_file}")
+
+
 def main(
-    date_str, mode, min_conf, send_to_telegram, show=False, tag=None, filter_tag=None
+    date_str,
+    mode,
+    min_conf,
+    send_to_telegram,
+    show=False,
+    tag=None,
+    filter_tag=None,
+    results=None,
 ):
+    """Per-tag ROI for the day; ``results`` is the raw results CSV if loaded."""
     date_display = date_str
     results_path = f"rpscrape/data/dates/all/{date_str.replace('-', '_')}.csv"
     if not os.path.exists(results_path):
         print(f"Missing results file: {results_path}")
         return
 
-    results_df = pd.read_csv(results_path)
+    results_df = pd.read_csv(results_path) if results is None else results.copy()
     results_df.rename(
         columns={
             "off": "Race Time",
@@ -112,28 +169,16 @@ def main(
 
     for source in ["sent", "all"]:
         use_sent = source == "sent"
+        # The cube holds every tip of the day so --tag/--min_conf runs do not
+        # replace the day's slice with a filtered subset
+        day_tips = load_tips(date_str, 0.0, use_sent)
+        if day_tips:
+            update_tag_cube(settle_tips(day_tips, results_df), date_str, mode, source)
+
         tips = load_tips(date_str, min_conf, use_sent, tag)
         if not tips:
             continue
-
-        tips_df = pd.DataFrame(tip.to_dict() for tip in tips)
-        tips_df["Horse"] = tips_df["Horse"].astype(str).str.strip().str.lower()
-        tips_df["Course"] = tips_df["Course"].astype(str).str.strip().str.lower()
-        tips_df["Race Time"] = tips_df["Race Time"].astype(str).str.strip().str.lower()
-
-        merged_df = pd.merge(
-            tips_df,
-            results_df,
-            how="left",
-            left_on=["Horse", "Race Time", "Course"],
-            right_on=["Horse", "Race Time", "Course"],
-        )
-
-        merged_df["Position"] = merged_df["Position"].fillna("NR")
-        merged_df["Profit"] = merged_df.apply(
-            lambda row: 0.0 if row["Position"] == "NR" else calculate_profit(row),
-            axis=1,
-        )
+        merged_df = settle_tips(tips, results_df)
 
         num_nrs = (merged_df["Position"] == "NR").sum()
         wins = (merged_df["Position"] == "1").sum()
@@ -163,35 +208,24 @@ def main(
         output_path = f"logs/roi/tips_results_{date_str}_{mode}_{source}.csv"
         merged_df["Mode"] = mode
         merged_df.to_csv(output_path, index=False)
-        print(f"✅ Saved: {output_path}")
+        log_path = tip_log.write_tip_log(merged_df, tip_log.tip_log_path(output_path))
+        print(f"✅ Saved: {output_path} (+ {log_path.name})")
 
         tag_output = f"logs/roi/tag_roi_summary_{source}.csv"
         if "tags" in merged_df.columns:
-            merged_df["tags"] = merged_df["tags"].apply(
-                lambda x: x if isinstance(x, list) else []
-            )
-            value_mask = (merged_df["odds_delta"] > 5.0) & (
-                merged_df["Position"] == "1"
+            tag_value_wins(merged_df)
+            tag_df = (
+                merged_df[["tags", "Profit", "Position"]]
+                .explode("tags")
+                .dropna(subset=["tags"])
+                .rename(columns={"tags": "Tag"})
             )
-            merged_df.loc[value_mask, "tags"] = merged_df.loc[value_mask, "tags"].apply(
-                lambda t: t + ["💸 Value Win"]
-            )
-            all_rows = []
-            for _, row in merged_df.iterrows():
-                for tag in row["tags"]:
-                    all_rows.append(
-                        {
-                            "Tag": tag,
-                            "Profit": row["Profit"],
-                            "Position": row["Position"],
-                        }
-                    )
-            tag_df = pd.DataFrame(all_rows)
             if not tag_df.empty:
+                tag_df["Win"] = (tag_df["Position"].astype(str) == "1").astype(int)
                 tag_summary = tag_df.groupby("Tag").agg(
                     Tips=("Profit", "count"),
                     Profit=("Profit", "sum"),
-                    Wins=("Position", lambda x: (x == "1").sum()),
+                    Wins=("Win", "sum"),
                 )
                 tag_summary["ROI %"] = tag_summary["Profit"] / tag_summary["Tips"] * 100
                 if filter_tag:
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""Typed tip-result logs with bitset-encoded tags.
+
+``tips_results_*`` CSVs store each tip's tags as a Python list literal, so
+every reader re-parsed them with ``ast.literal_eval`` row by row. A tip log
+is instead a parquet file written next to the CSV (same name, ``.parquet``):
+
+* tags are dictionary-encoded. The file metadata holds the tag vocabulary and
+  each row stores a bitset in ``_tag_bits0``, ``_tag_bits1``, ... (``uint64``
+  words, bit ``i`` = ``vocab[i]``)
+* ``Confidence``, ``Odds`` and ``odds_delta`` are ``float32``, and
+  ``Position`` is a string (``"1"``, ``"NR"``, ...)
+
+:func:`read_tip_log` loads one or many logs into a :class:`TipLog` and merges
+their vocabularies. For a CSV without a parquet sibling it falls back to the
+old format, parsing each distinct tag string once. Filtering by a tag
+combination is then a vectorised ``bits & mask`` over all rows.
+"""
+
+from __future__ import annotations
+
+import ast
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+__all__ = ["TipLog", "parse_tag_value", "read_tip_log", "tip_log_path", "write_tip_log"]
+
+VOCAB_KEY = b"tm_tag_vocab"
+BITS_PREFIX = "_tag_bits"
+TAG_COLUMNS = ("tags", "Tags")
+FLOAT32_COLUMNS = ("Confidence", "confidence", "Odds", "odds_delta")
+
+
+def parse_tag_value(value) -> list[str]:
+    """Tags from a list, a list literal (``"['a', 'b']"``) or ``"a, b"``."""
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [str(t).strip() for t in value if str(t).strip()]
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return []
+    text = str(value).strip()
+    if not text or text == "nan":
+        return []
+    if text.startswith("["):
+        try:
+            out = ast.literal_eval(text)
+        except (ValueError, SyntaxError):
+            return []
+        return parse_tag_value(out) if isinstance(out, list) else []
+    return [t.strip() for t in text.split(",") if t.strip()]
+
+
+def _words(size: int) -> int:
+    return max(1, (size + 63) // 64)
+
+
+def _bit(index: int) -> tuple[int, np.uint64]:
+    return index // 64, np.uint64(1) << np.uint64(index % 64)
+
+
+def _encode(values: Sequence) -> tuple[list[str], np.ndarray]:
+    """Vocabulary and ``(rows, words)`` bitsets for raw tag values."""
+    # Lists are keyed by their repr so equal lists share one parse
+    keys = [v if isinstance(v, str) else repr(v) for v in values]
+    codes, uniques = pd.factorize(pd.Series(keys, dtype=object), use_na_sentinel=False)
+    raw = dict(zip(keys, values))
+    parsed = [parse_tag_value(raw[k]) for k in uniques]
+    vocab = sorted({t for tags in parsed for t in tags})
+    index = {t: i for i, t in enumerate(vocab)}
+    unique_bits = np.zeros((len(uniques), _words(len(vocab))), dtype=np.uint64)
+    for row, tags in enumerate(parsed):
+        for tag in tags:
+            word, bit = _bit(index[tag])
+            unique_bits[row, word] |= bit
+    return vocab, unique_bits[codes]
+
+
+def _remap(bits: np.ndarray, vocab: list[str], target: dict[str, int]) -> np.ndarray:
+    out = np.zeros((len(bits), _words(len(target))), dtype=np.uint64)
+    for i, tag in enumerate(vocab):
+        src_word, src_bit = _bit(i)
+        dst_word, dst_bit = _bit(target[tag])
+        hit = (bits[:, src_word] & src_bit) != 0
+        out[hit, dst_word] |= dst_bit
+    return out
+
+
+@dataclass
+class TipLog:
+    """Tip rows in ``frame`` with their tags as bitsets over ``vocab``."""
+
+    frame: pd.DataFrame
+    vocab: list[str]
+    bits: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def tag_mask(self, tags: Iterable[str]) -> np.ndarray | None:
+        """One-row bitset for ``tags``; ``None`` if any tag is unknown."""
+        index = {t: i for i, t in enumerate(self.vocab)}
+        mask = np.zeros(self.bits.shape[1], dtype=np.uint64)
+        for tag in tags:
+            if tag not in index:
+                return None
+            word, bit = _bit(index[tag])
+            mask[word] |= bit
+        return mask
+
+    def has_all(self, tags: Iterable[str]) -> np.ndarray:
+        """Rows carrying every tag in ``tags``."""
+        mask = self.tag_mask(tags)
+        if mask is None:
+            return np.zeros(len(self), dtype=bool)
+        return ((self.bits & mask) == mask).all(axis=1)
+
+    def has_any(self, tags: Iterable[str]) -> np.ndarray:
+        """Rows carrying at least one tag in ``tags``."""
+        vocab = set(self.vocab)
+        mask = self.tag_mask(t for t in tags if t in vocab)
+        return (self.bits & mask).any(axis=1)
+
+    def matching(self, text: str) -> list[str]:
+        """Vocabulary entries containing ``text`` (case-insensitive)."""
+        return [t for t in self.vocab if text.lower() in t.lower()]
+
+    def filter(self, rows: np.ndarray) -> "TipLog":
+        rows = np.asarray(rows)
+        frame = self.frame[rows].reset_index(drop=True)
+        return TipLog(frame, self.vocab, self.bits[rows])
+
+    def joined(self, sep: str = " | ") -> pd.Series:
+        """Each row's tags joined by ``sep`` in vocabulary (sorted) order."""
+        if not len(self):
+            return pd.Series([], dtype="string")
+        uniques, inverse = np.unique(self.bits, axis=0, return_inverse=True)
+        labels = []
+        for words in uniques:
+            labels.append(
+                sep.join(
+                    t
+                    for i, t in enumerate(self.vocab)
+                    if words[i // 64] & (np.uint64(1) << np.uint64(i % 64))
+                )
+            )
+        return pd.Series(np.asarray(labels, dtype=object)[inverse.ravel()]).astype(
+            "string"
+        )
+
+    def tag_lists(self) -> list[list[str]]:
+        return [s.split(" | ") if s else [] for s in self.joined(" | ")]
+
+
+def tip_log_path(path: Path | str) -> Path:
+    """Parquet tip log for a ``tips_results_*.csv`` path."""
+    return Path(path).with_suffix(".parquet")
+
+
+def _positions(values: pd.Series) -> pd.Series:
+    """Finishing positions as strings: ``1.0`` -> ``"1"``, ``"NR"`` kept."""
+    numeric = pd.to_numeric(values, errors="coerce")
+    whole = numeric.notna() & (numeric == numeric.round())
+    out = values.astype("string").str.strip()
+    out[whole] = numeric[whole].astype("int64").astype("string")
+    return out
+
+
+def _arrow_safe(frame: pd.DataFrame) -> pd.DataFrame:
+    frame = frame.copy()
+    for col in frame.columns:
+        if col in FLOAT32_COLUMNS:
+            frame[col] = pd.to_numeric(frame[col], errors="coerce").astype("float32")
+        elif col == "Position":
+            frame[col] = _positions(frame[col])
+        elif frame[col].dtype == object:
+            nested = frame[col].map(lambda v: isinstance(v, (list, dict)))
+            if nested.any():
+                frame[col] = frame[col].map(
+                    lambda v: (
+                        json.dumps(v, ensure_ascii=False)
+                        if isinstance(v, (list, dict))
+                        else v
+                    )
+                )
+            frame[col] = frame[col].astype("string")
+    return frame
+
+
+def write_tip_log(df: pd.DataFrame, path: Path | str) -> Path:
+    """Write ``df`` as a typed tip log, encoding its ``tags`` column."""
+    path = Path(path)
+    tag_col = next((c for c in TAG_COLUMNS if c in df.columns), None)
+    values = df[tag_col].tolist() if tag_col else [[]] * len(df)
+    vocab, bits = _encode(values)
+    frame = _arrow_safe(df.drop(columns=[tag_col]) if tag_col else df)
+    frame = frame.reset_index(drop=True)
+    for w in range(bits.shape[1]):
+        frame[f"{BITS_PREFIX}{w}"] = bits[:, w]
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[VOCAB_KEY] = json.dumps(vocab, ensure_ascii=False).encode()
+    table = table.replace_schema_metadata(metadata)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".parquet.tmp")
+    pq.write_table(table, tmp)
+    tmp.replace(path)
+    return path
+
+
+def _read_one(path: Path) -> TipLog:
+    if path.suffix == ".csv" and tip_log_path(path).exists():
+        path = tip_log_path(path)
+    if path.suffix == ".parquet":
+        table = pq.read_table(path)
+        vocab = json.loads((table.schema.metadata or {}).get(VOCAB_KEY, b"[]"))
+        names = sorted(
+            (n for n in table.column_names if n.startswith(BITS_PREFIX)),
+            key=lambda n: int(n[len(BITS_PREFIX) :]),
+        )
+        if names:
+            bits = np.column_stack(
+                [table.column(n).to_numpy().astype(np.uint64) for n in names]
+            )
+        else:
+            bits = np.zeros((table.num_rows, 1), dtype=np.uint64)
+        frame = table.drop_columns(names).to_pandas()
+        return TipLog(frame, vocab, bits)
+
+    df = pd.read_csv(path)
+    tag_col = next((c for c in TAG_COLUMNS if c in df.columns), None)
+    values = df.pop(tag_col).tolist() if tag_col else [[]] * len(df)
+    vocab, bits = _encode(values)
+    for col in FLOAT32_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float32")
+    if "Position" in df.columns:
+        df["Position"] = _positions(df["Position"])
+    return TipLog(df, vocab, bits)
+
+
+def read_tip_log(paths: Path | str | Iterable[Path | str]) -> TipLog:
+    """Load tip logs (parquet, or legacy CSV) into one :class:`TipLog`.
+
+    A ``.csv`` path with a ``.parquet`` sibling is read from the parquet.
+    """
+    if isinstance(paths, (str, Path)):
+        paths = [paths]
+    logs = [_read_one(Path(p)) for p in paths]
+    if not logs:
+        return TipLog(pd.DataFrame(), [], np.zeros((0, 1), dtype=np.uint64))
+    if len(logs) == 1:
+        return logs[0]
+    vocab = sorted({t for log in logs for t in log.vocab})
+    target = {t: i for i, t in enumerate(vocab)}
+    bits = np.concatenate([_remap(log.bits, log.vocab, target) for log in logs])
+    frame = pd.concat([log.frame for log in logs], ignore_index=True)
+    return TipLog(frame, vocab, bits)
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""Precomputed analytics warehouse shared by the Streamlit dashboards.
+
+``python -m roi.warehouse build`` runs nightly from ``roi/run_roi_pipeline.sh``.
+It turns every ``tips_results_<date>_advised[_sent|_all].csv`` under ``logs/``
+and ``logs/roi/`` (or its typed ``.parquet`` tip log, see :mod:`roi.tip_log`)
+into typed parquet tables under ``data/warehouse/`` (override with
+``TM_WAREHOUSE_DIR``):
+
+``tips``
+    one row per settled tip with typed ``Date``/``Confidence``/``Profit``
+    columns, ``Won``/``Placed`` flags, confidence ``Band`` and canonical
+    ``Tags`` (see :func:`roi.tag_cube.tag_key`)
+``tip_tags``
+    ``tips`` exploded to one row per tag
+``daily`` / ``weekly`` / ``bands`` / ``tag_daily``
+    pre-aggregated Tips, Winners, Placed, Stake and Profit
+
+Each table has a ``Source`` column: ``advised`` for ``_advised.csv`` files,
+``sent`` for ``_advised_sent.csv`` and ``all`` for ``_advised_all.csv``.
+Builds are incremental. Only files whose mtime or size changed since the last
+build are re-read, and the aggregates are then recomputed from the typed
+``tips`` table. ``manifest.json`` records the inputs and a ``version`` that
+dashboards use as their cache key.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from roi.tag_cube import TAG_SEP, assign_bands, tag_key
+from roi.tip_log import parse_tag_value, read_tip_log
+from tippingmonster import logs_path, repo_path
+
+__all__ = [
+    "TABLES",
+    "TIP_COLUMNS",
+    "build",
+    "default_dir",
+    "explode_tags",
+    "find_sources",
+    "load",
+    "load_manifest",
+    "normalise",
+    "parse_tags",
+    "roi_pct",
+    "tag_mask",
+]
+
+FILE_RE = re.compile(
+    r"^tips_results_(\d{4}-\d{2}-\d{2})_advised(?:_(sent|all))?\.(csv|parquet)$"
+)
+SOURCES = {None: "advised", "sent": "sent", "all": "all"}
+TABLES = ("tips", "tip_tags", "daily", "weekly", "bands", "tag_daily")
+MANIFEST = "manifest.json"
+
+# Column -> dtype of the typed ``tips`` table
+TIP_COLUMNS = {
+    "Date": "datetime64[ns]",
+    "Source": "category",
+    "Course": "string",
+    "Time": "string",
+    "Horse": "string",
+    "Trainer": "string",
+    "Race Type": "string",
+    "EW/Win": "string",
+    "Confidence": "float64",
+    "Odds": "float64",
+    "Position": "Int16",
+    "Won": "bool",
+    "Placed": "bool",
+    "NAP": "bool",
+    "Band": "category",
+    "Tags": "string",
+    "Stake": "float64",
+    "Profit": "float64",
+    "Profit Best Odds": "float64",
+}
+# First alias present wins
+ALIASES = {
+    "Course": ["Course", "course", "Meeting"],
+    "Time": ["Time", "Race Time", "time"],
+    "Horse": ["Horse", "name", "horse"],
+    "Trainer": ["Trainer", "trainer"],
+    "Race Type": ["Race Type", "race_type"],
+    "EW/Win": ["EW/Win"],
+    "Confidence": ["Confidence", "confidence"],
+    "Odds": ["Odds", "bf_sp", "odds", "SP"],
+    "Position": ["Position", "position", "Result"],
+    "Tags": ["tags", "Tags"],
+    "Stake": ["Stake", "stake"],
+    "Profit": ["Profit", "profit"],
+    "Profit Best Odds": ["Profit Best Odds"],
+}
+MEASURES = {
+    "Tips": ("Profit", "size"),
+    "Winners": ("Won", "sum"),
+    "Placed": ("Placed", "sum"),
+    "Stake": ("Stake", "sum"),
+    "Profit": ("Profit", "sum"),
+}
+
+
+def default_dir() -> Path:
+    return Path(os.getenv("TM_WAREHOUSE_DIR", repo_path("data", "warehouse")))
+
+
+def roi_pct(profit, stake) -> np.ndarray:
+    """ROI % with 0 where nothing was staked."""
+    profit = np.asarray(profit, dtype=float)
+    stake = np.asarray(stake, dtype=float)
+    out = np.zeros_like(profit)
+    np.divide(profit, stake, out=out, where=stake != 0)
+    return out * 100
+
+
+def parse_tags(values: pd.Series) -> pd.Series:
+    """Canonical ``TAG_SEP``-joined tags for raw list reprs or comma lists.
+
+    Each distinct raw value is parsed once, so the cost is bounded by the
+    number of distinct tag combinations rather than the number of rows.
+    """
+    keys = values.map(
+        lambda v: repr(v) if isinstance(v, list) else ("" if pd.isna(v) else str(v))
+    )
+    lookup = {key: tag_key(parse_tag_value(key)) for key in pd.unique(keys)}
+    return keys.map(lookup).astype("string")
+
+
+def normalise(
+    df: pd.DataFrame,
+    date: str | None = None,
+    source: str = "advised",
+    tags: pd.Series | None = None,
+):
+    """Return ``df`` as a typed ``tips`` frame with :data:`TIP_COLUMNS`.
+
+    ``tags`` are canonical ``TAG_SEP``-joined tags when already decoded (from
+    a tip log); otherwise the raw tag column of ``df`` is parsed.
+    """
+    n = len(df)
+    out = pd.DataFrame(index=range(n))
+
+    def column(name):
+        for alias in ALIASES.get(name, [name]):
+            if alias in df.columns:
+                return df[alias].reset_index(drop=True)
+        return pd.Series([pd.NA] * n, dtype=object)
+
+    if date is not None:
+        out["Date"] = pd.Timestamp(date)
+    else:
+        out["Date"] = pd.to_datetime(column("Date"), errors="coerce")
+    out["Source"] = source
+    for name in ("Course", "Time", "Horse", "Trainer", "Race Type", "EW/Win"):
+        out[name] = column(name).astype("string").str.strip()
+    for name in ("Confidence", "Odds", "Profit Best Odds"):
+        out[name] = pd.to_numeric(column(name), errors="coerce")
+    out["Stake"] = pd.to_numeric(column("Stake"), errors="coerce").fillna(0.0)
+    out["Profit"] = pd.to_numeric(column("Profit"), errors="coerce").fillna(0.0)
+    position = pd.to_numeric(column("Position"), errors="coerce")
+    out["Position"] = position.round().astype("Int16")
+    out["Won"] = (position == 1).to_numpy()
+    out["Placed"] = position.between(1, 3).to_numpy()
+    out["Band"] = assign_bands(out["Confidence"])
+    if tags is None:
+        out["Tags"] = parse_tags(column("Tags"))
+    else:
+        out["Tags"] = tags.reset_index(drop=True).astype("string")
+    out["NAP"] = out["Tags"].str.contains("NAP", regex=False).fillna(False)
+    return out[list(TIP_COLUMNS)].astype(TIP_COLUMNS)
+
+
+def find_sources(logs_dirs: Iterable[Path] | None = None) -> dict[str, tuple]:
+    """Map each results CSV to ``(date, source, mtime_ns, size)``.
+
+    ``logs/`` and ``logs/roi/`` can both hold a day's advised file, so each
+    ``(date, source)`` keeps one file, from the last of ``logs_dirs`` that
+    has it (``logs/roi`` by default).
+    """
+    if logs_dirs is None:
+        logs_dirs = [logs_path(), logs_path("roi")]
+    chosen = {}
+    for folder in logs_dirs:
+        folder = Path(folder)
+        if not folder.is_dir():
+            continue
+        for path in sorted(folder.glob("tips_results_*_advised*")):
+            match = FILE_RE.match(path.name)
+            if not match:
+                continue
+            if match.group(3) == "csv" and path.with_suffix(".parquet").exists():
+                continue  # the typed tip log supersedes its CSV
+            st = path.stat()
+            key = (match.group(1), SOURCES[match.group(2)])
+            chosen[key] = (str(path), (*key, st.st_mtime_ns, st.st_size))
+    return dict(chosen.values())
+
+
+def _read(path: str, date: str, source: str) -> pd.DataFrame:
+    try:
+        log = read_tip_log(path)
+    except (pd.errors.EmptyDataError, pd.errors.ParserError):
+        return normalise(pd.DataFrame(), date, source)
+    return normalise(log.frame, date, source, tags=log.joined(TAG_SEP))
+
+
+def explode_tags(tips: pd.DataFrame, extra: Iterable[str] = ()) -> pd.DataFrame:
+    """One row per (tip, tag) for tips carrying at least one tag."""
+    cols = ["Date", "Source", "Band", "Confidence", "Won", "Placed", "Stake"]
+    cols += ["Profit", *extra, "Tags"]
+    tagged = tips.loc[tips["Tags"].fillna("") != "", cols]
+    tagged = tagged.reset_index(drop=True)
+    tagged["Tag"] = tagged.pop("Tags").str.split(TAG_SEP, regex=False)
+    out = tagged.explode("Tag", ignore_index=True)
+    out["Tag"] = out["Tag"].astype("category")
+    return out
+
+
+def tag_mask(tags: pd.Series, wanted: Iterable[str], every: bool = False):
+    """Rows whose canonical ``Tags`` carry any (or ``every``) tag in ``wanted``."""
+    padded = TAG_SEP + tags.fillna("").astype(str) + TAG_SEP
+    masks = [
+        padded.str.contains(TAG_SEP + t.strip() + TAG_SEP, regex=False) for t in wanted
+    ]
+    if not masks:
+        return pd.Series(True, index=tags.index)
+    combined = masks[0]
+    for mask in masks[1:]:
+        combined = (combined & mask) if every else (combined | mask)
+    return combined
+
+
+def _aggregate(frame: pd.DataFrame, keys: list[str]) -> pd.DataFrame:
+    grouped = frame.groupby(keys, observed=True, as_index=False).agg(**MEASURES)
+    grouped["ROI %"] = roi_pct(grouped["Profit"], grouped["Stake"])
+    return grouped.sort_values(keys, ignore_index=True)
+
+
+def aggregates(tips: pd.DataFrame, tip_tags: pd.DataFrame) -> dict:
+    weeks = tips.assign(Week=tips["Date"].dt.strftime("%G-W%V"))
+    return {
+        "daily": _aggregate(tips, ["Source", "Date"]),
+        "weekly": _aggregate(weeks, ["Source", "Week"]),
+        "bands": _aggregate(tips, ["Source", "Date", "Band"]),
+        "tag_daily": _aggregate(tip_tags, ["Source", "Date", "Tag"]),
+    }
+
+
+def load_manifest(out_dir: Path | None = None) -> dict:
+    path = Path(out_dir or default_dir()) / MANIFEST
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text())
+
+
+def load(table: str, out_dir: Path | None = None, source: str | None = None):
+    """Read ``table`` from the warehouse, optionally for one ``Source``."""
+    if table not in TABLES:
+        raise ValueError(f"Unknown warehouse table: {table}")
+    path = Path(out_dir or default_dir()) / f"{table}.parquet"
+    if not path.exists():
+        return pd.DataFrame()
+    filters = [("Source", "==", source)] if source else None
+    df = pd.read_parquet(path, filters=filters)
+    if "Source" in df.columns:
+        df["Source"] = df["Source"].astype(str)
+    return df
+
+
+def build(
+    out_dir: Path | None = None,
+    logs_dirs: Iterable[Path] | None = None,
+    full: bool = False,
+) -> dict:
+    """Bring the warehouse up to date; return the new manifest."""
+    out_dir = Path(out_dir or default_dir())
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest = {} if full else load_manifest(out_dir)
+    known = {k: tuple(v) for k, v in manifest.get("files", {}).items()}
+    found = find_sources(logs_dirs)
+
+    tips = pd.DataFrame() if full else load("tips", out_dir)
+    # (date, source) slices whose files changed, appeared or disappeared
+    touched = {v[:2] for p, v in found.items() if known.get(p) != v}
+    touched |= {tuple(v[:2]) for p, v in known.items() if p not in found}
+    if not tips.empty and touched:
+        day = tips["Date"].dt.strftime("%Y-%m-%d")
+        keys = pd.Series(list(zip(day, tips["Source"].astype(str))), index=tips.index)
+        tips = tips[~keys.isin(touched)]
+    # Re-read the file of every touched slice
+    reread = [p for p, v in found.items() if v[:2] in touched]
+    parts = [_read(p, *found[p][:2]) for p in reread]
+    frames = [f for f in [tips, *parts] if not f.empty]
+    if frames:
+        tips = pd.concat(frames, ignore_index=True).astype(TIP_COLUMNS)
+    else:
+        tips = normalise(pd.DataFrame())
+    tips = tips.sort_values(["Date", "Source"], kind="stable", ignore_index=True)
+    tips["Source"] = tips["Source"].astype("category")
+
+    if touched or not (out_dir / "tips.parquet").exists():
+        tip_tags = explode_tags(tips)
+        tables = {"tips": tips, "tip_tags": tip_tags, **aggregates(tips, tip_tags)}
+        for name, frame in tables.items():
+            tmp = out_dir / f"{name}.parquet.tmp"
+            frame.to_parquet(tmp, index=False)
+            tmp.replace(out_dir / f"{name}.parquet")
+        signature = json.dumps(sorted(found.items())).encode()
+        manifest = {
+            "version": hashlib.sha1(signature).hexdigest()[:16],
+            "files": found,
+            "rows": {name: len(frame) for name, frame in tables.items()},
+        }
+        (out_dir / MANIFEST).write_text(json.dumps(manifest, indent=2))
+    manifest["reread"] = len(reread)
+    return manifest
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Build the dashboard warehouse")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_cmd = sub.add_parser("build", help="Re-read new or changed result CSVs")
+    build_cmd.add_argument("--out", type=Path, help="Warehouse directory")
+    build_cmd.add_argument(
+        "--logs", type=Path, nargs="+", help="Directories with tips_results CSVs"
+    )
+    build_cmd.add_argument("--full", action="store_true", help="Rebuild from scratch")
+    args = parser.parse_args(argv)
+
+    manifest = build(args.out, args.logs, full=args.full)
+    rows = ", ".join(f"{k}={v}" for k, v in manifest.get("rows", {}).items())
+    print(
+        f"Warehouse {manifest.get('version')}: re-read {manifest['reread']} file(s); {rows}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 import argparse
 import os
+import sys
 from datetime import datetime, timedelta
+from pathlib import Path
 
 import matplotlib.pyplot as plt
 import pandas as pd
@@ -9,6 +11,8 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from roi.rolling_metrics import latest_windows
 from roi_by_confidence_band import assign_band
 from tippingmonster.env_loader import load_env
 from tippingmonster.utils import logs_path, send_telegram_message
@@ -167,6 +171,15 @@ def main(week, send_telegram=False):
         f"Bankroll: {bankroll:+.2f} | Worst DD: {worst_dd:.2f}"
     )
 
+    rolling = latest_windows(as_of=week_dates[-1])
+    rolling_lines = [
+        f"{window}d ROI: {totals['ROI']:.2f}% ({totals['Profit']:+.2f} pts, "
+        f"{int(totals['Tips'])} tips)"
+        for window, totals in rolling.items()
+    ]
+    for line in rolling_lines:
+        print(f"📈 {line}")
+
     summary = (
         df.groupby("Date", as_index=False)
         .agg({"Horse": "count", "Position": list, "Profit": "sum", "Stake": "sum"})
@@ -233,6 +246,12 @@ def main(week, send_telegram=False):
             f"🔻 Worst DD: {worst_dd:.2f} pts\n"
             f"🪙 Staked: {stake:.2f} pts\n"
         )
+        if rolling_lines:
+            msg += (
+                "\n*Rolling*\n"
+                + "\n".join(f"📈 {line}" for line in rolling_lines)
+                + "\n"
+            )
         for _, row in summary.iterrows():
             msg += (
                 f"\n📆 {row.Date} → {int(row.Tips)} tips, "
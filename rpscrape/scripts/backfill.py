@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""Parallel, resumable historical backfill.
+
+Splits a (region, years, code) request into shards, either one per course and
+year or one per calendar month, and scrapes the shards in worker processes.
+Each finished shard is written to its own file and recorded in progress.json,
+so a re-run only scrapes what is missing. Completed shards are merged into
+../data/regions/<region>/<code>/<years>.csv.
+
+    ./backfill.py -r gb -y 2015-2025 -t flat
+    ./backfill.py -r ire -y 2020-2024 -t jumps --by month -w 8
+"""
+
+import argparse
+import os
+import sys
+import time
+import traceback
+
+from calendar import monthrange
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import date
+
+from orjson import OPT_INDENT_2, dumps, loads
+
+from utils.course import courses
+from utils.date import parse_years, valid_years
+from utils.region import valid_region
+
+
+@dataclass(frozen=True)
+class Shard:
+    key: str
+    course: tuple = ()
+    year: str = ''
+    dates: tuple = field(default=(), repr=False)
+
+
+def course_shards(region, years):
+    return [
+        Shard(f'{course[0]}_{year}', course=tuple(course), year=year)
+        for course in courses(region)
+        for year in years
+    ]
+
+
+def month_shards(years):
+    shards = []
+    today = date.today()
+
+    for year in years:
+        for month in range(1, 13):
+            first = date(int(year), month, 1)
+            if first > today:
+                break
+            days = monthrange(first.year, month)[1]
+            dates = tuple(
+                d.isoformat()
+                for d in (date(first.year, month, day) for day in range(1, days + 1))
+                if d <= today
+            )
+            shards.append(Shard(f'{year}-{month:02}', dates=dates))
+
+    return shards
+
+
+def plan_shards(region, years, by='course'):
+    if by == 'month':
+        return month_shards(years)
+    return course_shards(region, years)
+
+
+def work_dir(region, code, years, root='../data/backfill'):
+    return os.path.join(root, region, code, years)
+
+
+def shard_path(directory, shard):
+    return os.path.join(directory, 'shards', f'{shard.key}.csv')
+
+
+def load_progress(directory):
+    try:
+        with open(os.path.join(directory, 'progress.json'), 'rb') as f:
+            return loads(f.read())
+    except (OSError, ValueError):
+        return {}
+
+
+def save_progress(directory, progress):
+    path = os.path.join(directory, 'progress.json')
+    with open(path + '.tmp', 'wb') as f:
+        f.write(dumps(progress, option=OPT_INDENT_2))
+    os.replace(path + '.tmp', path)
+
+
+def is_done(progress, directory, shard):
+    entry = progress.get(shard.key)
+    return bool(entry) and entry.get('status') == 'done' and os.path.exists(shard_path(directory, shard))
+
+
+def scrape_shard(shard, region, code, path):
+    # Runs in a worker process; rpscrape loads its settings and session there
+    import rpscrape
+
+    if shard.dates:
+        urls = rpscrape.get_race_urls_date(shard.dates, region)
+    else:
+        urls = rpscrape.get_race_urls([shard.course], [shard.year], code)
+
+    rows = 0
+    tmp = path + '.tmp'
+
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(rpscrape.settings.csv_header + '\n')
+        for url in urls:
+            r = rpscrape.get_cached(url)
+            if r is None:
+                continue
+            if r.status_code != 200:
+                print(f'Failed to get race {url}: {r.status_code}')
+                continue
+            for row in rpscrape.parse_race(url, r.content, code, rpscrape.settings.fields):
+                f.write(row + '\n')
+                rows += 1
+
+    os.replace(tmp, path)
+    return {'races': len(urls), 'rows': rows}
+
+
+def backfill(shards, region, code, directory, workers=4, scrape=scrape_shard):
+    os.makedirs(os.path.join(directory, 'shards'), exist_ok=True)
+
+    progress = load_progress(directory)
+    todo = [shard for shard in shards if not is_done(progress, directory, shard)]
+
+    print(f'{len(shards) - len(todo)}/{len(shards)} shards already done, {len(todo)} to scrape')
+
+    if not todo:
+        return progress
+
+    with ProcessPoolExecutor(workers) as executor:
+        futures = {
+            executor.submit(scrape, shard, region, code, shard_path(directory, shard)): shard
+            for shard in todo
+        }
+
+        for n, future in enumerate(as_completed(futures), 1):
+            shard = futures[future]
+            try:
+                result = future.result()
+            except Exception:
+                progress[shard.key] = {'status': 'failed', 'error': traceback.format_exc(limit=1).strip()}
+                print(f'[{n}/{len(todo)}] {shard.key} failed')
+            else:
+                progress[shard.key] = {'status': 'done', 'finished': time.time(), **result}
+                print(f'[{n}/{len(todo)}] {shard.key}: {result["races"]} races')
+            save_progress(directory, progress)
+
+    return progress
+
+
+def merge(shards, directory, dest):
+    # Concatenates shard files in shard order, keeping the first header only
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    header = None
+    rows = 0
+
+    with open(dest + '.tmp', 'w', encoding='utf-8') as out:
+        for shard in shards:
+            path = shard_path(directory, shard)
+            if not os.path.exists(path):
+                continue
+            with open(path, encoding='utf-8') as f:
+                first = f.readline()
+                if header is None:
+                    header = first
+                    out.write(header)
+                for line in f:
+                    out.write(line)
+                    rows += 1
+
+    os.replace(dest + '.tmp', dest)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parallel resumable rpscrape backfill')
+    parser.add_argument('-r', '--region', required=True, help='Region code, e.g gb')
+    parser.add_argument('-y', '--years', required=True, help='Year or range, e.g 2015-2025')
+    parser.add_argument('-t', '--type', required=True, choices=['flat', 'jumps'])
+    parser.add_argument('--by', choices=['course', 'month'], default='course',
+                        help='Shard by course and year, or by month of results pages')
+    parser.add_argument('-w', '--workers', type=int, default=4)
+    parser.add_argument('--no-merge', action='store_true', help='Scrape shards only')
+    args = parser.parse_args()
+
+    if not valid_region(args.region):
+        sys.exit(f'Invalid region: {args.region}')
+
+    years = parse_years(args.years)
+    if not valid_years(years):
+        sys.exit(f'Invalid years: {args.years}')
+
+    directory = work_dir(args.region, args.type, args.years)
+    shards = plan_shards(args.region, years, args.by)
+    progress = backfill(shards, args.region, args.type, directory, args.workers)
+
+    failed = [shard.key for shard in shards if not is_done(progress, directory, shard)]
+    if failed:
+        sys.exit(f'{len(failed)} shards incomplete, re-run to retry: {", ".join(failed[:10])}')
+
+    if not args.no_merge:
+        dest = f'../data/regions/{args.region}/{args.type}/{args.years}.csv'
+        rows = merge(shards, directory, dest)
+        print(f'Merged {rows} rows into rpscrape/{dest.lstrip("../")}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""Micro-benchmark for results page parsing.
+
+Parses a corpus of saved results pages with the single-pass engine and the
+per-query XPath engine, checks both give identical rows and reports pages/sec.
+
+    ./bench_parse.py                     # pages from the response cache
+    ./bench_parse.py --pages DIR         # saved *.html files (url in <link rel=canonical>)
+    ./bench_parse.py --synthetic 50      # generated pages, no corpus needed
+"""
+
+import argparse
+import gzip
+import os
+import sys
+import time
+import tomllib
+
+from lxml import html
+from orjson import loads
+
+from utils.cache import DEFAULT_DIR, page_type
+from utils.race import Race, VoidRaceError
+
+
+def load_fields(path='../settings/default_settings.toml'):
+    with open(path, 'rb') as f:
+        toml = tomllib.load(f)
+    return [field for group in toml['fields'].values() for field, on in group.items() if on]
+
+
+def cached_pages(directory=DEFAULT_DIR):
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if not name.endswith('.json'):
+                continue
+            with open(os.path.join(root, name), 'rb') as f:
+                url = loads(f.read())['url']
+            if page_type(url) != 'results':
+                continue
+            with gzip.open(os.path.join(root, name[:-5] + '.gz'), 'rb') as f:
+                yield url, f.read()
+
+
+def saved_pages(directory):
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.html'):
+            with open(os.path.join(directory, name), 'rb') as f:
+                content = f.read()
+            url = html.fromstring(content).xpath('//link[@rel="canonical"]/@href')
+            if url:
+                yield url[0], content
+
+
+def synthetic_page(race_id, runners=12):
+    # Minimal results page with the markup the parser reads
+    rows = []
+    peds = []
+
+    for i in range(runners):
+        length = '<span></span>' if i == 0 else f'<span>{i % 3 + 1}</span><span>[{i * 2}]</span>'
+        headgear = '<span class="rp-horseTable__headGear">p</span>' if i % 3 == 0 else ''
+        rows.append(
+            '<tr class="rp-horseTable__mainRow">'
+            f'<td><span data-test-selector="text-horsePosition">{i + 1}'
+            f'<sup class="rp-horseTable__pos__draw">({runners - i})</sup> </span>'
+            f'<span class="rp-horseTable__pos__length">{length}</span></td>'
+            f'<td><div data-test-selector="text-prizeMoney">£{(runners - i) * 1000:,}</div></td>'
+            f'<td><span class="rp-horseTable__saddleClothNo">{i + 1}.</span>'
+            f'<a data-test-selector="link-silk" href="/profile/owner/{500 + i}/owner-{i}">'
+            f'<img class="rp-horseTable__silk" src="https://img/silk{i}.png"></a>'
+            f'<a data-test-selector="link-horseName" href="/profile/horse/{1000 + i}/horse-{i}">Horse {i}</a>'
+            f'<span class="rp-horseTable__horse__country">{"(IRE)" if i % 2 else " "}</span>'
+            f'<span class="rp-horseTable__horse__price">{i + 2}/1{"F" if i == 0 else ""}</span></td>'
+            f'<td data-test-selector="horse-age">{3 + i % 4}</td>'
+            f'<td class="rp-horseTable__wgt"><span data-ending="st">9</span><span data-ending="lb">{i % 14}</span>'
+            f'{headgear}</td>'
+            f'<td><a data-test-selector="link-jockeyName" href="/profile/jockey/{200 + i}/j">Jockey {i}<sup>3</sup> </a>'
+            f'<a data-test-selector="link-jockeyName" href="/profile/jockey/{200 + i}/j">Jockey {i}</a>'
+            f'<a data-test-selector="link-trainerName" href="/profile/trainer/{300 + i}/t">Trainer {i}<sup>x</sup> </a>'
+            f'<a data-test-selector="link-trainerName" href="/profile/trainer/{300 + i}/t">Trainer {i}<sup>x</sup> </a></td>'
+            f'<td data-ending="OR">{70 + i}</td><td data-ending="RPR">{80 + i}</td><td data-ending="TS">{60 + i}</td>'
+            '</tr>'
+            '<tr class="rp-horseTable__commentRow ng-cloak">'
+            f'<td>Led, kept on well, runner {i}</td></tr>'
+        )
+        peds.append(
+            '<tr data-test-selector="block-pedigreeInfoFullResults"><td>b g '
+            f'<a href="/profile/horse/{2000 + i}/s">Sire {i} (IRE)</a> - '
+            f'<a href="/profile/horse/{3000 + i}/d">Dam {i}<span>(FR)</span></a> '
+            f'<a href="/profile/horse/{4000 + i}/ds">(Damsire {i})</a></td></tr>'
+        )
+
+    page = (
+        '<html><head><meta charset="utf-8"></head><body>'
+        '<h1 data-test-selector="RC-courseHeader__name">Ascot</h1>'
+        '<span data-test-selector="text-raceTime">2:30</span>'
+        '<span class="rp-raceTimeCourseName_condition">Good To Firm</span>'
+        '<h2 class="rp-raceTimeCourseName__title">Benchmark Handicap (Class 4)</h2>'
+        '<span class="rp-raceTimeCourseName_class">(Class 4)</span>'
+        '<span class="rp-raceTimeCourseName_ratingBandAndAgesAllowed">(0-85, 3yo+)</span>'
+        '<span data-test-selector="block-distanceInd">1m2f</span>'
+        '<span data-test-selector="block-fullDistanceInd">(1m2f10yds)</span>'
+        '<div data-test-selector="text-prizeMoney">Prize</div>'
+        f'<table>{"".join(rows)}{"".join(peds)}</table>'
+        '<div class="rp-raceInfo"><ul><li>'
+        '<span class="rp-raceInfo__value">2m 5.40s</span>'
+        '<span class="rp-raceInfo__value">£10,000</span>'
+        '</li></ul></div>'
+        '</body></html>'
+    )
+    url = f'https://www.racingpost.com/results/2/ascot/2025-06-01/{race_id}'
+    return url, page.encode('utf-8')
+
+
+def parse(pages, fields, single_pass):
+    rows = []
+    for url, content in pages:
+        try:
+            race = Race(url, html.fromstring(content), 'flat', fields, single_pass=single_pass)
+        except VoidRaceError:
+            continue
+        rows.append(race.csv_data)
+    return rows
+
+
+def bench(pages, fields, repeat=3):
+    results = {}
+
+    for name, single_pass in (('xpath', False), ('single-pass', True)):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rows = parse(pages, fields, single_pass)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        results[name] = (best, rows)
+
+    if results['xpath'][1] != results['single-pass'][1]:
+        sys.exit('Engines disagree on parsed rows')
+
+    for name, (elapsed, _) in results.items():
+        print(f'{name:<12} {len(pages) / elapsed:8.1f} pages/sec  ({elapsed * 1000:.1f} ms)')
+
+    return {name: elapsed for name, (elapsed, _) in results.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark results page parsing')
+    parser.add_argument('--pages', help='Directory of saved results pages (*.html)')
+    parser.add_argument('--cache', default=DEFAULT_DIR, help='Response cache directory')
+    parser.add_argument('--synthetic', type=int, default=0, help='Number of generated pages')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        pages = [synthetic_page(n) for n in range(args.synthetic)]
+    elif args.pages:
+        pages = list(saved_pages(args.pages))
+    else:
+        pages = list(cached_pages(args.cache))
+
+    if not pages:
+        sys.exit('No pages found; use --synthetic N to generate some')
+
+    print(f'{len(pages)} pages')
+    bench(pages, load_fields(), args.repeat)
+
+
+if __name__ == '__main__':
+    main()
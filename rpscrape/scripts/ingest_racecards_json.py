@@ -5,10 +5,12 @@ import logging
 import os
 import sys
 from datetime import datetime
+from pathlib import Path
 from subprocess import PIPE, run
 
-import psycopg2
-from psycopg2.extras import execute_values
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from tippingmonster import racecard_db  # noqa: E402
 
 # --- CLI ---
 parser = argparse.ArgumentParser(description="Scrape and ingest racecards JSON files")
@@ -22,7 +24,16 @@ parser.add_argument(
     action="store_true",
     help="Skip scraping; ingest existing JSON in folder",
 )
-parser.add_argument("--db-host", default=os.getenv("DB_HOST"), help="Database host")
+parser.add_argument(
+    "--sqlite",
+    default=None,
+    help="SQLite racecard database (default data/racecards.sqlite or TM_RACECARD_DB)",
+)
+parser.add_argument(
+    "--db-host",
+    default=os.getenv("DB_HOST"),
+    help="Postgres host; when set the legacy racecards table is also filled",
+)
 parser.add_argument(
     "--db-port", default=os.getenv("DB_PORT", "5432"), help="Database port"
 )
@@ -70,6 +81,20 @@ if not os.path.isfile(json_file):
 with open(json_file) as f:
     data = json.load(f)
 
+# Full card into the indexed SQLite store
+conn = racecard_db.connect(args.sqlite)
+try:
+    races, runners = racecard_db.ingest_card(conn, data)
+finally:
+    conn.close()
+logger.info(f"Upserted {races} races and {runners} runners into SQLite")
+
+if not args.db_host:
+    sys.exit(0)
+
+import psycopg2  # noqa: E402
+from psycopg2.extras import execute_values  # noqa: E402
+
 # Extract meetings: each region key holds meeting dicts
 meetings = []
 for region_val in data.values():
@@ -126,4 +151,4 @@ else:
     logger.info(f"Ingested {len(rows)} runners from {json_file}")
 
 cur.close()
-conn.close()
\ No newline at end of file
+conn.close()
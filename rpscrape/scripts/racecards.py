@@ -1,14 +1,16 @@
 #!/usr/bin/env python3
 import os
-import requests
 import sys
 
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from lxml import etree, html
 from orjson import loads, dumps, OPT_NON_STR_KEYS
 from re import search
+from requests.adapters import HTTPAdapter
 
+from utils.cache import CachedSession, OfflineMiss, ResponseCache
 from utils.going import get_surface
 from utils.header import RandomHeader
 from utils.lxml_funcs import find
@@ -19,6 +21,10 @@ from utils.stats import Stats
 
 random_header = RandomHeader()
 
+# Concurrent fetches of runner profiles, and races built at once
+PROFILE_WORKERS = 16
+RACE_WORKERS = 4
+
 
 def clean_name(name):
     if name:
@@ -58,7 +64,15 @@ def get_odds(session, url):
 
 
 def get_going_info(session, date):
-    r = session.get(f'https://www.racingpost.com/non-runners/{date}', headers=random_header.header())
+    url = f'https://www.racingpost.com/non-runners/{date}'
+
+    try:
+        r = session.get(url, headers=random_header.header())
+    except OfflineMiss:
+        # Races are still built, just without going and stalls details
+        print(f'Offline: {url} not in cache, skipping going info')
+        return defaultdict(dict)
+
     doc = html.fromstring(r.content.decode())
 
     json_str = (
@@ -141,7 +155,12 @@ def get_race_type(doc, race, distance):
 
 
 def get_race_urls(session, racecard_url):
-    r = session.get(racecard_url, headers=random_header.header())
+    try:
+        r = session.get(racecard_url, headers=random_header.header())
+    except OfflineMiss:
+        print(f'Offline: {racecard_url} not in cache, no races to build')
+        return []
+
     doc = html.fromstring(r.content)
 
     race_urls = []
@@ -155,146 +174,166 @@ def get_race_urls(session, racecard_url):
     return sorted(list(set(race_urls)))
 
 
-def get_runners(session, profile_urls):
+def get_session(pool_size=PROFILE_WORKERS + RACE_WORKERS * 2, cache=None):
+    session = CachedSession(cache)
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def fetch_profile(session, url):
+    return url, session.get(url, headers=random_header.header()).content
+
+
+def get_runners(session, profile_urls, executor=None):
+    if executor is None:
+        pages = [fetch_profile(session, url) for url in profile_urls]
+    else:
+        pages = executor.map(lambda url: fetch_profile(session, url), profile_urls)
+
     runners = {}
 
-    for url in profile_urls:
-        r = session.get(url, headers=random_header.header())
-        doc = html.fromstring(r.content)
+    for url, content in pages:
+        runner = parse_runner(url, content)
+        runners[runner['horse_id']] = runner
 
-        runner = {}
+    return runners
 
-        try:
-            json_str = (
-                doc.xpath('//body/script')[0]
-                .text.split('window.PRELOADED_STATE =')[1]
-                .split('\n')[0]
-                .strip()
-                .strip(';')
-            )
-            js = loads(json_str)
-        except IndexError:
-            split = url.split('/')
-            runner['horse_id'] = int(split[5])
-            runner['name'] = split[6].replace('-', ' ').title()
-            runner['broken_url'] = url
-            runners[runner['horse_id']] = runner
-            continue
 
-        try:
-            runner['age'] = int(js['profile']['age'].split('-')[0])
-        except ValueError:
-            age = js['profile']['age'].replace('Died as a', '')
-            runner['age'] = int(age.split('-')[0])
-
-        runner['horse_id'] = js['profile']['horseUid']
-        runner['name'] = clean_name(js['profile']['horseName'])
-        runner['dob'] = js['profile']['horseDateOfBirth'].split('T')[0]
-        runner['sex'] = js['profile']['horseSex']
-        runner['sex_code'] = js['profile']['horseSexCode']
-        runner['colour'] = js['profile']['horseColour']
-        runner['region'] = js['profile']['horseCountryOriginCode']
-
-        runner['breeder'] = js['profile']['breederName']
-        runner['dam'] = clean_name(js['profile']['damHorseName'])
-        runner['dam_region'] = js['profile']['damCountryOriginCode']
-        runner['sire'] = clean_name(js['profile']['sireHorseName'])
-        runner['sire_region'] = js['profile']['sireCountryOriginCode']
-        runner['grandsire'] = clean_name(js['profile']['siresSireName'])
-        runner['damsire'] = clean_name(js['profile']['damSireHorseName'])
-        runner['damsire_region'] = js['profile']['damSireCountryOriginCode']
-
-        runner['trainer'] = clean_name(js['profile']['trainerName'])
-        runner['trainer_id'] = js['profile']['trainerUid']
-        runner['trainer_location'] = js['profile']['trainerLocation']
-        runner['trainer_14_days'] = js['profile']['trainerLast14Days']
-
-        runner['owner'] = clean_name(js['profile']['ownerName'])
-
-        runner['prev_trainers'] = js['profile']['previousTrainers']
-
-        if runner['prev_trainers']:
-            prev_trainers = []
-
-            for trainer in runner['prev_trainers']:
-                prev_trainer = {}
-                prev_trainer['trainer'] = trainer['trainerStyleName']
-                prev_trainer['trainer_id'] = trainer['trainerUid']
-                prev_trainer['change_date'] = trainer['trainerChangeDate'].split('T')[0]
-                prev_trainers.append(prev_trainer)
-
-            runner['prev_trainers'] = prev_trainers
-
-        runner['prev_owners'] = js['profile']['previousOwners']
-
-        if runner['prev_owners']:
-            prev_owners = []
-
-            for owner in runner['prev_owners']:
-                prev_owner = {}
-                prev_owner['owner'] = owner['ownerStyleName']
-                prev_owner['owner_id'] = owner['ownerUid']
-                prev_owner['change_date'] = owner['ownerChangeDate'].split('T')[0]
-                prev_owners.append(prev_owner)
-
-            runner['prev_owners'] = prev_owners
-
-        if js['profile']['comments']:
-            runner['comment'] = js['profile']['comments'][0]['individualComment']
-            runner['spotlight'] = js['profile']['comments'][0]['individualSpotlight']
-        else:
-            runner['comment'] = None
-            runner['spotlight'] = None
+def parse_runner(url, content):
+    doc = html.fromstring(content)
+
+    runner = {}
 
-        if js['profile']['medical']:
-            medicals = []
+    try:
+        json_str = (
+            doc.xpath('//body/script')[0]
+            .text.split('window.PRELOADED_STATE =')[1]
+            .split('\n')[0]
+            .strip()
+            .strip(';')
+        )
+        js = loads(json_str)
+    except IndexError:
+        split = url.split('/')
+        runner['horse_id'] = int(split[5])
+        runner['name'] = split[6].replace('-', ' ').title()
+        runner['broken_url'] = url
+        return runner
+
+    try:
+        runner['age'] = int(js['profile']['age'].split('-')[0])
+    except ValueError:
+        age = js['profile']['age'].replace('Died as a', '')
+        runner['age'] = int(age.split('-')[0])
+
+    runner['horse_id'] = js['profile']['horseUid']
+    runner['name'] = clean_name(js['profile']['horseName'])
+    runner['dob'] = js['profile']['horseDateOfBirth'].split('T')[0]
+    runner['sex'] = js['profile']['horseSex']
+    runner['sex_code'] = js['profile']['horseSexCode']
+    runner['colour'] = js['profile']['horseColour']
+    runner['region'] = js['profile']['horseCountryOriginCode']
+
+    runner['breeder'] = js['profile']['breederName']
+    runner['dam'] = clean_name(js['profile']['damHorseName'])
+    runner['dam_region'] = js['profile']['damCountryOriginCode']
+    runner['sire'] = clean_name(js['profile']['sireHorseName'])
+    runner['sire_region'] = js['profile']['sireCountryOriginCode']
+    runner['grandsire'] = clean_name(js['profile']['siresSireName'])
+    runner['damsire'] = clean_name(js['profile']['damSireHorseName'])
+    runner['damsire_region'] = js['profile']['damSireCountryOriginCode']
+
+    runner['trainer'] = clean_name(js['profile']['trainerName'])
+    runner['trainer_id'] = js['profile']['trainerUid']
+    runner['trainer_location'] = js['profile']['trainerLocation']
+    runner['trainer_14_days'] = js['profile']['trainerLast14Days']
+
+    runner['owner'] = clean_name(js['profile']['ownerName'])
+
+    runner['prev_trainers'] = js['profile']['previousTrainers']
+
+    if runner['prev_trainers']:
+        prev_trainers = []
+
+        for trainer in runner['prev_trainers']:
+            prev_trainer = {}
+            prev_trainer['trainer'] = trainer['trainerStyleName']
+            prev_trainer['trainer_id'] = trainer['trainerUid']
+            prev_trainer['change_date'] = trainer['trainerChangeDate'].split('T')[0]
+            prev_trainers.append(prev_trainer)
+
+        runner['prev_trainers'] = prev_trainers
+
+    runner['prev_owners'] = js['profile']['previousOwners']
+
+    if runner['prev_owners']:
+        prev_owners = []
+
+        for owner in runner['prev_owners']:
+            prev_owner = {}
+            prev_owner['owner'] = owner['ownerStyleName']
+            prev_owner['owner_id'] = owner['ownerUid']
+            prev_owner['change_date'] = owner['ownerChangeDate'].split('T')[0]
+            prev_owners.append(prev_owner)
+
+        runner['prev_owners'] = prev_owners
+
+    if js['profile']['comments']:
+        runner['comment'] = js['profile']['comments'][0]['individualComment']
+        runner['spotlight'] = js['profile']['comments'][0]['individualSpotlight']
+    else:
+        runner['comment'] = None
+        runner['spotlight'] = None
 
-            for med in js['profile']['medical']:
-                medical = {}
-                medical['date'] = med['medicalDate'].split('T')[0]
-                medical['type'] = med['medicalType']
-                medicals.append(medical)
+    if js['profile']['medical']:
+        medicals = []
 
-            runner['medical'] = medicals
+        for med in js['profile']['medical']:
+            medical = {}
+            medical['date'] = med['medicalDate'].split('T')[0]
+            medical['type'] = med['medicalType']
+            medicals.append(medical)
 
-        runner['quotes'] = None
+        runner['medical'] = medicals
 
-        if js['quotes']:
-            quotes = []
+    runner['quotes'] = None
 
-            for q in js['quotes']:
-                quote = {}
-                quote['date'] = q['raceDate'].split('T')[0]
-                quote['horse'] = q['horseStyleName']
-                quote['horse_id'] = q['horseUid']
-                quote['race'] = q['raceTitle']
-                quote['race_id'] = q['raceId']
-                quote['course'] = q['courseStyleName']
-                quote['course_id'] = q['courseUid']
-                quote['distance_f'] = q['distanceFurlong']
-                quote['distance_y'] = q['distanceYard']
-                quote['quote'] = q['notes']
-                quotes.append(quote)
+    if js['quotes']:
+        quotes = []
 
-            runner['quotes'] = quotes
+        for q in js['quotes']:
+            quote = {}
+            quote['date'] = q['raceDate'].split('T')[0]
+            quote['horse'] = q['horseStyleName']
+            quote['horse_id'] = q['horseUid']
+            quote['race'] = q['raceTitle']
+            quote['race_id'] = q['raceId']
+            quote['course'] = q['courseStyleName']
+            quote['course_id'] = q['courseUid']
+            quote['distance_f'] = q['distanceFurlong']
+            quote['distance_y'] = q['distanceYard']
+            quote['quote'] = q['notes']
+            quotes.append(quote)
 
-        runner['stable_tour'] = None
+        runner['quotes'] = quotes
 
-        if js['stableTourQuotes']:
-            quotes = []
+    runner['stable_tour'] = None
 
-            for q in js['stableTourQuotes']:
-                quote = {}
-                quote['horse'] = q['horseName']
-                quote['horse_id'] = q['horseUid']
-                quote['quote'] = q['notes']
-                quotes.append(quote)
+    if js['stableTourQuotes']:
+        quotes = []
 
-            runner['stable_tour'] = quotes
+        for q in js['stableTourQuotes']:
+            quote = {}
+            quote['horse'] = q['horseName']
+            quote['horse_id'] = q['horseUid']
+            quote['quote'] = q['notes']
+            quotes.append(quote)
 
-        runners[runner['horse_id']] = runner
+        runner['stable_tour'] = quotes
 
-    return runners
+    return runner
 
 
 def parse_going(going_info):
@@ -311,222 +350,289 @@ def parse_going(going_info):
     return going, rail_movements
 
 
-def parse_races(session, race_urls, date):
-    races = defaultdict(lambda: defaultdict(lambda: defaultdict(dict)))
+def build_race(session, url, going_info, executor=None):
+    accordion = executor.submit(get_accordion, session, url) if executor else None
+    r = session.get(url, headers=random_header.header(), allow_redirects=False)
 
-    going_info = get_going_info(session, date)
+    accordion = accordion.result() if executor else get_accordion(session, url)
+    stats = Stats(accordion)
 
-    for url in race_urls:
-        r = session.get(url, headers=random_header.header(), allow_redirects=False)
+    if r.status_code != 200:
+        print('Failed to get racecard.')
+        print(f'URL: {url}')
+        print(f'Response: {r.status_code}')
+        return None
 
-        accordion = get_accordion(session, url)
-        stats = Stats(accordion)
+    try:
+        doc = html.fromstring(r.content)
+    except etree.ParserError:
+        return None
 
-        if r.status_code != 200:
-            print('Failed to get racecard.')
-            print(f'URL: {url}')
-            print(f'Response: {r.status_code}')
-            continue
+    race = {}
 
-        try:
-            doc = html.fromstring(r.content)
-        except etree.ParserError:
-            continue
+    url_split = url.split('/')
+
+    race['course'] = find(doc, 'h1', 'RC-courseHeader__name')
+
+    if race['course'] == 'Belmont At The Big A':
+        race['course_id'] = 255
+        race['course'] = 'Aqueduct'
+    else:
+        race['course_id'] = int(url_split[4])
+
+    race['race_id'] = int(url_split[7])
+    race['date'] = url_split[6]
+    race['off_time'] = find(doc, 'span', 'RC-courseHeader__time')
+    race['race_name'] = find(doc, 'span', 'RC-header__raceInstanceTitle')
+    race['distance_round'] = find(doc, 'strong', 'RC-header__raceDistanceRound')
+    race['distance'] = find(doc, 'span', 'RC-header__raceDistance')
+    race['distance'] = (
+        race['distance_round'] if not race['distance'] else race['distance'].strip('()')
+    )
+    race['distance_f'] = distance_to_furlongs(race['distance_round'])
+    race['region'] = get_region(str(race['course_id']))
+    race['pattern'] = get_pattern(race['race_name'].lower())
+    race['race_class'] = find(doc, 'span', 'RC-header__raceClass')
+    race['race_class'] = race['race_class'].strip('()') if race['race_class'] else ''
+    race['type'] = get_race_type(doc, race['race_name'].lower(), race['distance_f'])
+
+    if not race['race_class']:
+        if race['pattern']:
+            race['race_class'] = 'Class 1'
+
+    try:
+        band = find(doc, 'span', 'RC-header__rpAges').strip('()').split()
+        if band:
+            race['age_band'] = band[0]
+            race['rating_band'] = band[1] if len(band) > 1 else None
+        else:
+            race['age_band'] = None
+            race['rating_band'] = None
+    except AttributeError:
+        race['age_band'] = None
+        race['rating_band'] = None
+
+    prize = find(doc, 'div', 'RC-headerBox__winner').lower()
+    race['prize'] = prize.split('winner:')[1].strip() if 'winner:' in prize else None
+    field_size = find(doc, 'div', 'RC-headerBox__runners').lower()
+    if field_size:
+        race['field_size'] = int(field_size.split('runners:')[1].split('(')[0].strip())
+    else:
+        race['field_size'] = ''
 
-        race = {}
+    try:
+        race['going_detailed'] = going_info[race['course_id']]['going']
+        race['rail_movements'] = going_info[race['course_id']]['rail_movements']
+        race['stalls'] = going_info[race['course_id']]['stalls']
+        race['weather'] = going_info[race['course_id']]['weather']
+    except KeyError:
+        race['going'] = None
+        race['rail_movements'] = None
+        race['stalls'] = None
+        race['weather'] = None
 
-        url_split = url.split('/')
+    going = find(doc, 'div', 'RC-headerBox__going').lower()
+    race['going'] = going.split('going:')[1].strip().title() if 'going:' in going else ''
 
-        race['course'] = find(doc, 'h1', 'RC-courseHeader__name')
+    race['surface'] = get_surface(race['going'])
 
-        if race['course'] == 'Belmont At The Big A':
-            race['course_id'] = 255
-            race['course'] = 'Aqueduct'
-        else:
-            race['course_id'] = int(url_split[4])
-
-        race['race_id'] = int(url_split[7])
-        race['date'] = url_split[6]
-        race['off_time'] = find(doc, 'span', 'RC-courseHeader__time')
-        race['race_name'] = find(doc, 'span', 'RC-header__raceInstanceTitle')
-        race['distance_round'] = find(doc, 'strong', 'RC-header__raceDistanceRound')
-        race['distance'] = find(doc, 'span', 'RC-header__raceDistance')
-        race['distance'] = (
-            race['distance_round'] if not race['distance'] else race['distance'].strip('()')
+    profile_hrefs = doc.xpath("//a[@data-test-selector='RC-cardPage-runnerName']/@href")
+    profile_urls = ['https://www.racingpost.com' + a.split('#')[0] + '/form' for a in profile_hrefs]
+
+    runners = get_runners(session, profile_urls, executor)
+
+    for horse in doc.xpath("//div[contains(@class, ' js-PC-runnerRow')]"):
+        horse_id = int(find(horse, 'a', 'RC-cardPage-runnerName', attrib='href').split('/')[3])
+
+        if 'broken_url' in runners[horse_id]:
+            sire = find(horse, 'a', 'RC-pedigree__sire').split('(')
+            dam = find(horse, 'a', 'RC-pedigree__dam').split('(')
+            damsire = find(horse, 'a', 'RC-pedigree__damsire').lstrip('(').rstrip(')').split('(')
+
+            runners[horse_id]['sire'] = clean_name(sire[0])
+            runners[horse_id]['dam'] = clean_name(dam[0])
+            runners[horse_id]['damsire'] = clean_name(damsire[0])
+
+            runners[horse_id]['sire_region'] = sire[1].replace(')', '').strip()
+            runners[horse_id]['dam_region'] = dam[1].replace(')', '').strip()
+            runners[horse_id]['damsire_region'] = damsire[1].replace(')', '').strip()
+
+            runners[horse_id]['age'] = find(
+                horse, 'span', 'RC-cardPage-runnerAge', attrib='data-order-age'
+            )
+
+            sex = find(horse, 'span', 'RC-pedigree__color-sex').split()
+
+            runners[horse_id]['colour'] = sex[0]
+            runners[horse_id]['sex_code'] = sex[1].capitalize()
+
+            runners[horse_id]['trainer'] = clean_name(
+                find(horse, 'a', 'RC-cardPage-runnerTrainer-name', attrib='data-order-trainer')
+            )
+
+        runners[horse_id]['number'] = int(
+            find(horse, 'span', 'RC-cardPage-runnerNumber-no', attrib='data-order-no')
         )
-        race['distance_f'] = distance_to_furlongs(race['distance_round'])
-        race['region'] = get_region(str(race['course_id']))
-        race['pattern'] = get_pattern(race['race_name'].lower())
-        race['race_class'] = find(doc, 'span', 'RC-header__raceClass')
-        race['race_class'] = race['race_class'].strip('()') if race['race_class'] else ''
-        race['type'] = get_race_type(doc, race['race_name'].lower(), race['distance_f'])
 
-        if not race['race_class']:
-            if race['pattern']:
-                race['race_class'] = 'Class 1'
+        try:
+            runners[horse_id]['draw'] = int(
+                find(horse, 'span', 'RC-cardPage-runnerNumber-draw', attrib='data-order-draw')
+            )
+        except ValueError:
+            runners[horse_id]['draw'] = None
+
+        runners[horse_id]['headgear'] = find(horse, 'span', 'RC-cardPage-runnerHeadGear')
+        runners[horse_id]['headgear_first'] = find(horse, 'span', 'RC-cardPage-runnerHeadGear-first')
 
         try:
-            band = find(doc, 'span', 'RC-header__rpAges').strip('()').split()
-            if band:
-                race['age_band'] = band[0]
-                race['rating_band'] = band[1] if len(band) > 1 else None
-            else:
-                race['age_band'] = None
-                race['rating_band'] = None
-        except AttributeError:
-            race['age_band'] = None
-            race['rating_band'] = None
+            runners[horse_id]['lbs'] = int(
+                find(horse, 'span', 'RC-cardPage-runnerWgt-carried', attrib='data-order-wgt')
+            )
+        except ValueError:
+            runners[horse_id]['lbs'] = None
+
+        try:
+            runners[horse_id]['ofr'] = int(
+                find(horse, 'span', 'RC-cardPage-runnerOr', attrib='data-order-or')
+            )
+        except ValueError:
+            runners[horse_id]['ofr'] = None
 
-        prize = find(doc, 'div', 'RC-headerBox__winner').lower()
-        race['prize'] = prize.split('winner:')[1].strip() if 'winner:' in prize else None
-        field_size = find(doc, 'div', 'RC-headerBox__runners').lower()
-        if field_size:
-            race['field_size'] = int(field_size.split('runners:')[1].split('(')[0].strip())
+        try:
+            runners[horse_id]['rpr'] = int(
+                find(horse, 'span', 'RC-cardPage-runnerRpr', attrib='data-order-rpr')
+            )
+        except ValueError:
+            runners[horse_id]['rpr'] = None
+
+        try:
+            runners[horse_id]['ts'] = int(
+                find(horse, 'span', 'RC-cardPage-runnerTs', attrib='data-order-ts')
+            )
+        except ValueError:
+            runners[horse_id]['ts'] = None
+
+        claim = find(horse, 'span', 'RC-cardPage-runnerJockey-allowance')
+        jockey = horse.find('.//a[@data-test-selector="RC-cardPage-runnerJockey-name"]')
+
+        if jockey is not None:
+            jock = clean_name(jockey.attrib['data-order-jockey'])
+            runners[horse_id]['jockey'] = jock if not claim else jock + f'({claim})'
+            runners[horse_id]['jockey_id'] = int(jockey.attrib['href'].split('/')[3])
         else:
-            race['field_size'] = ''
+            runners[horse_id]['jockey'] = None
+            runners[horse_id]['jockey_id'] = None
+
+        try:
+            runners[horse_id]['last_run'] = find(horse, 'div', 'RC-cardPage-runnerStats-lastRun')
+        except TypeError:
+            runners[horse_id]['last_run'] = None
+
+        runners[horse_id]['form'] = find(horse, 'span', 'RC-cardPage-runnerForm')
 
         try:
-            race['going_detailed'] = going_info[race['course_id']]['going']
-            race['rail_movements'] = going_info[race['course_id']]['rail_movements']
-            race['stalls'] = going_info[race['course_id']]['stalls']
-            race['weather'] = going_info[race['course_id']]['weather']
+            runners[horse_id]['trainer_rtf'] = find(horse, 'span', 'RC-cardPage-runnerTrainer-rtf')
+        except TypeError:
+            runners[horse_id]['trainer_rtf'] = None
+
+        if runners[horse_id]['jockey'] is None:
+            runners[horse_id]['stats'] = {}
+            continue
+
+        jockey_name = runners[horse_id]['jockey'].split('(')[0].strip()
+
+        if jockey_name.lower() == 'non-runner':
+            runners[horse_id]['stats'] = {}
+            continue
+
+        try:
+            runner_stats = stats.horses[runners[horse_id]['name']]
+            jockey_stats = stats.jockeys[jockey_name]
+            trainer_stats = stats.trainers[runners[horse_id]['trainer']]
+
+            runners[horse_id]['stats'] = {
+                'course': runner_stats['course'],
+                'distance': runner_stats['distance'],
+                'going': runner_stats['going'],
+                'jockey': jockey_stats,
+                'trainer': trainer_stats,
+            }
         except KeyError:
-            race['going'] = None
-            race['rail_movements'] = None
-            race['stalls'] = None
-            race['weather'] = None
+            runners[horse_id]['stats'] = {}
 
-        going = find(doc, 'div', 'RC-headerBox__going').lower()
-        race['going'] = going.split('going:')[1].strip().title() if 'going:' in going else ''
+    race['runners'] = [runner for runner in runners.values()]
 
-        race['surface'] = get_surface(race['going'])
+    return race
 
-        profile_hrefs = doc.xpath("//a[@data-test-selector='RC-cardPage-runnerName']/@href")
-        profile_urls = ['https://www.racingpost.com' + a.split('#')[0] + '/form' for a in profile_hrefs]
 
-        runners = get_runners(session, profile_urls)
+def load_partial(partial_path):
+    built = {}
 
-        for horse in doc.xpath("//div[contains(@class, ' js-PC-runnerRow')]"):
-            horse_id = int(find(horse, 'a', 'RC-cardPage-runnerName', attrib='href').split('/')[3])
+    if partial_path and os.path.exists(partial_path):
+        with open(partial_path, 'rb') as f:
+            for line in f:
+                try:
+                    entry = loads(line)
+                except ValueError:
+                    continue
+                built[entry['url']] = entry['race']
 
-            if 'broken_url' in runners[horse_id]:
-                sire = find(horse, 'a', 'RC-pedigree__sire').split('(')
-                dam = find(horse, 'a', 'RC-pedigree__dam').split('(')
-                damsire = find(horse, 'a', 'RC-pedigree__damsire').lstrip('(').rstrip(')').split('(')
+    return built
 
-                runners[horse_id]['sire'] = clean_name(sire[0])
-                runners[horse_id]['dam'] = clean_name(dam[0])
-                runners[horse_id]['damsire'] = clean_name(damsire[0])
 
-                runners[horse_id]['sire_region'] = sire[1].replace(')', '').strip()
-                runners[horse_id]['dam_region'] = dam[1].replace(')', '').strip()
-                runners[horse_id]['damsire_region'] = damsire[1].replace(')', '').strip()
+def parse_races(session, race_urls, date, partial_path=None):
+    races = defaultdict(lambda: defaultdict(lambda: defaultdict(dict)))
 
-                runners[horse_id]['age'] = find(
-                    horse, 'span', 'RC-cardPage-runnerAge', attrib='data-order-age'
-                )
+    # Races already built by an interrupted run are reused from partial_path,
+    # new ones are appended to it as soon as they are assembled.
+    built = load_partial(partial_path)
+    todo = [url for url in race_urls if url not in built]
 
-                sex = find(horse, 'span', 'RC-pedigree__color-sex').split()
+    if built:
+        print(f'Resuming: {len(built)} races already built, {len(todo)} to go.')
 
-                runners[horse_id]['colour'] = sex[0]
-                runners[horse_id]['sex_code'] = sex[1].capitalize()
+    going_info = get_going_info(session, date)
 
-                runners[horse_id]['trainer'] = clean_name(
-                    find(horse, 'a', 'RC-cardPage-runnerTrainer-name', attrib='data-order-trainer')
-                )
+    partial = open(partial_path, 'ab') if partial_path else None
 
-            runners[horse_id]['number'] = int(
-                find(horse, 'span', 'RC-cardPage-runnerNumber-no', attrib='data-order-no')
-            )
+    # Start on a fresh line if the last run died mid-write
+    if partial and partial.tell():
+        with open(partial_path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                partial.write(b'\n')
 
-            try:
-                runners[horse_id]['draw'] = int(
-                    find(horse, 'span', 'RC-cardPage-runnerNumber-draw', attrib='data-order-draw')
-                )
-            except ValueError:
-                runners[horse_id]['draw'] = None
-
-            runners[horse_id]['headgear'] = find(horse, 'span', 'RC-cardPage-runnerHeadGear')
-            runners[horse_id]['headgear_first'] = find(horse, 'span', 'RC-cardPage-runnerHeadGear-first')
-
-            try:
-                runners[horse_id]['lbs'] = int(
-                    find(horse, 'span', 'RC-cardPage-runnerWgt-carried', attrib='data-order-wgt')
-                )
-            except ValueError:
-                runners[horse_id]['lbs'] = None
-
-            try:
-                runners[horse_id]['ofr'] = int(
-                    find(horse, 'span', 'RC-cardPage-runnerOr', attrib='data-order-or')
-                )
-            except ValueError:
-                runners[horse_id]['ofr'] = None
-
-            try:
-                runners[horse_id]['rpr'] = int(
-                    find(horse, 'span', 'RC-cardPage-runnerRpr', attrib='data-order-rpr')
-                )
-            except ValueError:
-                runners[horse_id]['rpr'] = None
-
-            try:
-                runners[horse_id]['ts'] = int(
-                    find(horse, 'span', 'RC-cardPage-runnerTs', attrib='data-order-ts')
-                )
-            except ValueError:
-                runners[horse_id]['ts'] = None
-
-            claim = find(horse, 'span', 'RC-cardPage-runnerJockey-allowance')
-            jockey = horse.find('.//a[@data-test-selector="RC-cardPage-runnerJockey-name"]')
-
-            if jockey is not None:
-                jock = clean_name(jockey.attrib['data-order-jockey'])
-                runners[horse_id]['jockey'] = jock if not claim else jock + f'({claim})'
-                runners[horse_id]['jockey_id'] = int(jockey.attrib['href'].split('/')[3])
-            else:
-                runners[horse_id]['jockey'] = None
-                runners[horse_id]['jockey_id'] = None
-
-            try:
-                runners[horse_id]['last_run'] = find(horse, 'div', 'RC-cardPage-runnerStats-lastRun')
-            except TypeError:
-                runners[horse_id]['last_run'] = None
-
-            runners[horse_id]['form'] = find(horse, 'span', 'RC-cardPage-runnerForm')
-
-            try:
-                runners[horse_id]['trainer_rtf'] = find(horse, 'span', 'RC-cardPage-runnerTrainer-rtf')
-            except TypeError:
-                runners[horse_id]['trainer_rtf'] = None
-
-            if runners[horse_id]['jockey'] is None:
-                runners[horse_id]['stats'] = {}
-                continue
-
-            jockey_name = runners[horse_id]['jockey'].split('(')[0].strip()
-
-            if jockey_name.lower() == 'non-runner':
-                runners[horse_id]['stats'] = {}
-                continue
-
-            try:
-                runner_stats = stats.horses[runners[horse_id]['name']]
-                jockey_stats = stats.jockeys[jockey_name]
-                trainer_stats = stats.trainers[runners[horse_id]['trainer']]
-
-                runners[horse_id]['stats'] = {
-                    'course': runner_stats['course'],
-                    'distance': runner_stats['distance'],
-                    'going': runner_stats['going'],
-                    'jockey': jockey_stats,
-                    'trainer': trainer_stats,
-                }
-            except KeyError:
-                runners[horse_id]['stats'] = {}
+    try:
+        with ThreadPoolExecutor(PROFILE_WORKERS) as fetcher, ThreadPoolExecutor(RACE_WORKERS) as builder:
+            futures = {
+                builder.submit(build_race, session, url, going_info, fetcher): url for url in todo
+            }
+
+            for future in as_completed(futures):
+                url = futures[future]
+
+                try:
+                    race = future.result()
+                except OfflineMiss as e:
+                    print(f'Offline: {e} not in cache, skipping {url}')
+                    continue
 
-        race['runners'] = [runner for runner in runners.values()]
-        races[race['region']][race['course']][race['off_time']] = race
+                if race is None:
+                    continue
+
+                built[url] = race
+
+                if partial:
+                    partial.write(dumps({'url': url, 'race': race}, option=OPT_NON_STR_KEYS) + b'\n')
+                    partial.flush()
+    finally:
+        if partial:
+            partial.close()
+
+    for url in race_urls:
+        race = built.get(url)
+        if race:
+            races[race['region']][race['course']][race['off_time']] = race
 
     return races
 
@@ -548,17 +654,30 @@ def main():
         racecard_url += '/tomorrow'
         date = (datetime.today() + timedelta(days=1)).strftime('%Y-%m-%d')
 
-    session = requests.Session()
-
-    race_urls = get_race_urls(session, racecard_url)
-    races = parse_races(session, race_urls, date)
+    cache = ResponseCache.from_env()
+    session = get_session(cache=cache)
 
     if not os.path.exists('../racecards'):
         os.makedirs('../racecards')
 
+    partial_path = f'../racecards/{date}.partial.jsonl'
+
+    race_urls = get_race_urls(session, racecard_url)
+
+    if not race_urls and cache and cache.offline:
+        # Keep any racecards already on disk rather than writing an empty day
+        return
+
+    races = parse_races(session, race_urls, date, partial_path)
+
     with open(f'../racecards/{date}.json', 'w', encoding='utf-8') as f:
         f.write(dumps(races, option=OPT_NON_STR_KEYS).decode('utf-8'))
 
+    os.remove(partial_path)
+
+    if cache and not cache.offline:
+        cache.prune()
+
 
 if __name__ == '__main__':
     main()
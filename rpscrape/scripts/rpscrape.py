@@ -1,16 +1,20 @@
 #!/usr/bin/env python3
 
+import asyncio
 import gzip
-import requests
 import os
 import sys
 
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
+from functools import partial
 
 from lxml import html
 from orjson import loads
 
 from utils.argparser import ArgParser
+from utils.async_funcs import scrape_concurrently
+from utils.cache import CachedSession, OfflineMiss, ResponseCache
 from utils.completer import Completer
 from utils.header import RandomHeader
 from utils.race import Race, VoidRaceError
@@ -22,6 +26,8 @@ from utils.lxml_funcs import xpath
 
 settings = Settings()
 random_header = RandomHeader()
+cache = ResponseCache.from_env()
+session = CachedSession(cache)
 
 
 @dataclass
@@ -47,6 +53,15 @@ def check_for_update():
         sys.exit()
 
 
+def get_cached(url):
+    # Offline runs skip pages missing from the cache, like scrape_concurrently
+    try:
+        return session.get(url, headers=random_header.header())
+    except OfflineMiss:
+        print(f'Offline: {url} not in cache')
+        return None
+
+
 def get_race_urls(tracks, years, code):
     urls = set()
 
@@ -62,7 +77,9 @@ def get_race_urls(tracks, years, code):
             race_lists.append(race_list)
 
     for race_list in race_lists:
-        r = requests.get(race_list.url, headers=random_header.header())
+        r = get_cached(race_list.url)
+        if r is None:
+            continue
         races = loads(r.text)['data']['principleRaceResults']
 
         if races:
@@ -86,7 +103,9 @@ def get_race_urls_date(dates, region):
     course_ids = {course[0] for course in courses(region)}
 
     for day in days:
-        r = requests.get(day, headers=random_header.header())
+        r = get_cached(day)
+        if r is None:
+            continue
         doc = html.fromstring(r.content)
 
         races = xpath(doc, 'a', 'link-listCourseNameLink')
@@ -98,6 +117,25 @@ def get_race_urls_date(dates, region):
     return sorted(list(urls))
 
 
+def parse_race(url, content, code, fields):
+    doc = html.fromstring(content)
+
+    try:
+        race = Race(url, doc, code, fields)
+    except VoidRaceError:
+        return []
+
+    if code == 'flat':
+        if race.race_info['type'] != 'Flat':
+            return []
+    elif code == 'jumps':
+        if race.race_info['type'] not in {
+                'Chase', 'Hurdle', 'NH Flat'}:
+            return []
+
+    return race.csv_data
+
+
 def scrape_races(
         races,
         folder_name,
@@ -112,28 +150,42 @@ def scrape_races(
 
     file_path = f'{out_dir}/{file_name}.{file_extension}'
 
+    concurrency = settings.toml.get('concurrency', 0)
+
     with file_writer(file_path) as csv:
         csv.write(settings.csv_header + '\n')
 
-        for url in races:
-            r = requests.get(url, headers=random_header.header())
-            doc = html.fromstring(r.content)
-
-            try:
-                race = Race(url, doc, code, settings.fields)
-            except VoidRaceError:
-                continue
+        def write_rows(rows):
+            for row in rows:
+                csv.write(row + '\n')
 
-            if code == 'flat':
-                if race.race_info['type'] != 'Flat':
-                    continue
-            elif code == 'jumps':
-                if race.race_info['type'] not in {
-                        'Chase', 'Hurdle', 'NH Flat'}:
+        if concurrency > 0:
+            parse = partial(parse_race, code=code, fields=settings.fields)
+
+            with ProcessPoolExecutor(settings.toml.get('parse_workers') or None) as executor:
+                asyncio.run(
+                    scrape_concurrently(
+                        races,
+                        parse,
+                        write_rows,
+                        concurrency=concurrency,
+                        per_host=settings.toml.get('per_host', 4),
+                        delay=settings.toml.get('request_delay', 0.0),
+                        retries=settings.toml.get('retries', 3),
+                        executor=executor,
+                        headers=random_header.header,
+                        cache=cache,
+                    )
+                )
+        else:
+            for url in races:
+                r = get_cached(url)
+                if r is None:
                     continue
+                write_rows(parse_race(url, r.content, code, settings.fields))
 
-            for row in race.csv_data:
-                csv.write(row + '\n')
+        if cache and not cache.offline:
+            cache.prune()
 
         print(
             'Finished scraping.\n'
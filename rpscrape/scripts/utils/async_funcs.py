@@ -1,6 +1,8 @@
 import aiohttp
 import asyncio
 
+from urllib.parse import urlsplit
+
 from lxml import html
 
 
@@ -34,3 +36,117 @@ async def get_json(course, session):
 def get_session():
     session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=50), headers={'User-Agent': 'Mozilla/5.0'})
     return session
+
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class HostLimiter:
+    # Caps in-flight requests per host and spaces request starts by `delay`
+    def __init__(self, per_host=4, delay=0.0):
+        self.per_host = per_host
+        self.delay = delay
+        self.semaphores = {}
+        self.next_start = {}
+
+    def semaphore(self, host):
+        if host not in self.semaphores:
+            self.semaphores[host] = asyncio.Semaphore(self.per_host)
+        return self.semaphores[host]
+
+    async def wait_turn(self, host):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        start = max(now, self.next_start.get(host, now))
+        self.next_start[host] = start + self.delay
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+async def fetch_page(url, session, limiter, retries=3, backoff=1.0, headers=None, cache=None):
+    host = urlsplit(url).netloc
+    hit = cache.lookup(url) if cache else None
+
+    if hit and hit[2]:
+        return hit[1]
+
+    if cache and cache.offline:
+        print(f'Offline: {url} not in cache')
+        return None
+
+    for attempt in range(retries + 1):
+        retry_after = None
+        request_headers = headers() if headers else {}
+
+        if hit:
+            request_headers.update(cache.validators(hit[0]))
+
+        async with limiter.semaphore(host):
+            await limiter.wait_turn(host)
+            try:
+                async with session.get(url, headers=request_headers or None) as response:
+                    if response.status == 304 and hit:
+                        cache.touch(url)
+                        return hit[1]
+                    if response.status not in RETRY_STATUS:
+                        content = await response.read()
+                        if cache and response.status == 200:
+                            cache.store(url, content, 200, response.headers)
+                        return content
+                    retry_after = response.headers.get('Retry-After')
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == retries:
+                    print(f'Failed to fetch {url}: {e}')
+                    return None
+
+        if attempt == retries:
+            print(f'Failed to fetch {url}: giving up after {retries + 1} attempts')
+            return None
+
+        try:
+            wait = float(retry_after)
+        except (TypeError, ValueError):
+            wait = backoff * 2 ** attempt
+        await asyncio.sleep(wait)
+
+
+async def scrape_concurrently(
+        urls,
+        parse,
+        write,
+        concurrency=8,
+        per_host=4,
+        delay=0.0,
+        retries=3,
+        backoff=1.0,
+        executor=None,
+        headers=None,
+        cache=None):
+    # Fetches overlap with parsing in `executor`; results are written in the
+    # order of `urls` as soon as every earlier url has been written.
+    loop = asyncio.get_running_loop()
+    limiter = HostLimiter(per_host, delay)
+    fetch_slots = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=per_host)
+
+    async with aiohttp.ClientSession(connector=connector) as session:
+
+        async def job(index, url):
+            async with fetch_slots:
+                content = await fetch_page(url, session, limiter, retries, backoff, headers, cache)
+            if content is None:
+                return index, None
+            return index, await loop.run_in_executor(executor, parse, url, content)
+
+        done = {}
+        next_index = 0
+
+        for finished in asyncio.as_completed([job(i, url) for i, url in enumerate(urls)]):
+            index, result = await finished
+            done[index] = result
+
+            while next_index in done:
+                result = done.pop(next_index)
+                if result is not None:
+                    write(result)
+                next_index += 1
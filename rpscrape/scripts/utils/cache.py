@@ -0,0 +1,196 @@
+import gzip
+import hashlib
+import os
+import threading
+import time
+
+from orjson import loads, dumps
+
+import requests
+
+
+# Seconds a cached page is served without asking the server again
+TTLS = {
+    'profile': 12 * 3600,
+    'results': 30 * 86400,
+    'non_runners': 600,
+    'racecards': 900,
+    'default': 3600,
+}
+
+DEFAULT_DIR = '../cache'
+DEFAULT_MAX_MB = 2048
+
+
+def page_type(url):
+    if '/profile/' in url:
+        return 'profile'
+    if '/non-runners/' in url:
+        return 'non_runners'
+    if '/results/' in url and url.count('/') >= 7:
+        # Individual race results are final; day listings are not
+        return 'results'
+    if '/racecards' in url:
+        return 'racecards'
+    return 'default'
+
+
+class OfflineMiss(Exception):
+    pass
+
+
+class ResponseCache:
+    # Compressed page bodies keyed by URL with a small JSON metadata file each:
+    #   <dir>/<aa>/<sha1>.gz    gzip'd body
+    #   <dir>/<aa>/<sha1>.json  url, status, etag, last_modified, stored
+    def __init__(self, directory=DEFAULT_DIR, max_mb=DEFAULT_MAX_MB, ttls=None, offline=False):
+        self.directory = directory
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.ttls = {**TTLS, **(ttls or {})}
+        self.offline = offline
+
+    @classmethod
+    def from_env(cls):
+        # RPSCRAPE_CACHE=0 disables caching, RPSCRAPE_OFFLINE=1 serves from cache only
+        directory = os.getenv('RPSCRAPE_CACHE', DEFAULT_DIR)
+        offline = os.getenv('RPSCRAPE_OFFLINE', '0') == '1'
+        if directory == '0' and not offline:
+            return None
+        if directory == '0':
+            directory = DEFAULT_DIR
+        max_mb = float(os.getenv('RPSCRAPE_CACHE_MB', DEFAULT_MAX_MB))
+        return cls(directory, max_mb, offline=offline)
+
+    def _paths(self, url):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.directory, key[:2], key)
+        return base + '.gz', base + '.json'
+
+    def lookup(self, url):
+        # Returns (meta, body, fresh) or None
+        body_path, meta_path = self._paths(url)
+
+        try:
+            with open(meta_path, 'rb') as f:
+                meta = loads(f.read())
+            with gzip.open(body_path, 'rb') as f:
+                body = f.read()
+        except (OSError, ValueError, EOFError):
+            return None
+
+        os.utime(body_path)
+        age = time.time() - meta['stored']
+        fresh = self.offline or age < self.ttls[page_type(url)]
+        return meta, body, fresh
+
+    def validators(self, meta):
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def store(self, url, body, status=200, headers=None):
+        headers = headers or {}
+        body_path, meta_path = self._paths(url)
+        os.makedirs(os.path.dirname(body_path), exist_ok=True)
+
+        meta = {
+            'url': url,
+            'status': status,
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'stored': time.time(),
+        }
+
+        tmp = f'.{os.getpid()}.{threading.get_ident()}.tmp'
+
+        with gzip.open(body_path + tmp, 'wb', compresslevel=6) as f:
+            f.write(body)
+        os.replace(body_path + tmp, body_path)
+
+        with open(meta_path + tmp, 'wb') as f:
+            f.write(dumps(meta))
+        os.replace(meta_path + tmp, meta_path)
+
+    def touch(self, url):
+        # Server answered 304: restart the TTL without rewriting the body
+        _, meta_path = self._paths(url)
+        with open(meta_path, 'rb') as f:
+            meta = loads(f.read())
+        meta['stored'] = time.time()
+        with open(meta_path, 'wb') as f:
+            f.write(dumps(meta))
+
+    def prune(self):
+        # Evict least recently used pages until the cache fits in max_bytes
+        entries = []
+        total = 0
+
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith('.gz'):
+                    path = os.path.join(root, name)
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime, stat.st_size, path))
+                    total += stat.st_size
+
+        entries.sort()
+
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            try:
+                os.remove(path[:-3] + '.json')
+            except OSError:
+                pass
+            total -= size
+
+        return total
+
+
+def cached_response(url, meta, body):
+    response = requests.Response()
+    response.url = url
+    response.status_code = meta.get('status', 200)
+    response._content = body
+    response.headers['X-Cache'] = 'HIT'
+    return response
+
+
+class CachedSession(requests.Session):
+    # requests.Session whose GETs go through a ResponseCache
+
+    def __init__(self, cache=None):
+        super().__init__()
+        self.cache = cache
+
+    def get(self, url, **kwargs):
+        if self.cache is None:
+            return super().get(url, **kwargs)
+
+        hit = self.cache.lookup(url)
+
+        if hit and hit[2]:
+            return cached_response(url, hit[0], hit[1])
+
+        if self.cache.offline:
+            raise OfflineMiss(url)
+
+        if hit:
+            headers = dict(kwargs.pop('headers', None) or {})
+            headers.update(self.cache.validators(hit[0]))
+            kwargs['headers'] = headers
+
+        response = super().get(url, **kwargs)
+
+        if response.status_code == 304 and hit:
+            self.cache.touch(url)
+            return cached_response(url, hit[0], hit[1])
+
+        if response.status_code == 200:
+            self.cache.store(url, response.content, 200, response.headers)
+
+        return response
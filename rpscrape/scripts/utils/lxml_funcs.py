@@ -1,3 +1,13 @@
+from collections import defaultdict
+from functools import lru_cache
+
+from lxml.etree import XPath
+
+
+@lru_cache(maxsize=None)
+def compiled(expression):
+    # XPath expressions compiled once per process and reused for every page
+    return XPath(expression)
 
 
 def find(doc, tag, value, property="data-test-selector", **kwargs):
@@ -21,7 +31,98 @@ def find_element(doc, tag, value, property="data-test-selector", **kwargs):
 
 
 def xpath(doc, tag, value, property="data-test-selector", fn=""):
-    elements = doc.xpath(f'.//{tag}[@{property}="{value}"]{fn}')
+    elements = compiled(f'.//{tag}[@{property}="{value}"]{fn}')(doc)
     if fn == "/text()":
         elements = [element.strip() for element in elements]
     return elements
+
+
+class XPathIndex:
+    # Same interface as DocIndex, answering each query with its own (compiled)
+    # XPath over the whole document
+    def __init__(self, doc, selectors=(), contains=()):
+        self.doc = doc
+
+    def elements(self, tag, value, property='data-test-selector'):
+        return compiled(f'.//{tag}[@{property}="{value}"]')(self.doc)
+
+    def containing(self, tag, value, property='class'):
+        return compiled(f"//{tag}[contains(@{property}, '{value}')]")(self.doc)
+
+    def find(self, tag, value, property='data-test-selector', **kwargs):
+        return find(self.doc, tag, value, property, **kwargs)
+
+    def xpath(self, tag, value, property='data-test-selector', fn=''):
+        return xpath(self.doc, tag, value, property, fn)
+
+
+class DocIndex:
+    # Single pass over a document that buckets every element matching one of
+    # `selectors` ((tag, property, value) triples) in document order, so
+    # repeated find/xpath calls become dict lookups. `contains` holds
+    # (tag, property, substring) triples matched with contains(@property, ...).
+    def __init__(self, doc, selectors, contains=()):
+        self.matches = {selector: [] for selector in selectors}
+        self.contains = {selector: [] for selector in contains}
+
+        wanted = defaultdict(set)
+        for tag, prop, _ in list(selectors) + list(contains):
+            wanted[tag].add(prop)
+
+        partial = defaultdict(list)
+        for tag, prop, value in contains:
+            partial[(tag, prop)].append(value)
+
+        root = doc.getroot() if hasattr(doc, 'getroot') else doc
+
+        for element in root.iter(*wanted):
+            if element is root:
+                continue
+            tag = element.tag
+            for prop in wanted[tag]:
+                value = element.get(prop)
+                if value is None:
+                    continue
+                bucket = self.matches.get((tag, prop, value))
+                if bucket is not None:
+                    bucket.append(element)
+                for substring in partial.get((tag, prop), ()):
+                    if substring in value:
+                        self.contains[(tag, prop, substring)].append(element)
+
+    def elements(self, tag, value, property='data-test-selector'):
+        return self.matches[(tag, property, value)]
+
+    def containing(self, tag, value, property='class'):
+        return self.contains[(tag, property, value)]
+
+    def find(self, tag, value, property='data-test-selector', **kwargs):
+        elements = self.elements(tag, value, property)
+        if not elements:
+            return ''
+        if 'attrib' in kwargs:
+            return elements[0].attrib[kwargs['attrib']]
+        return elements[0].text_content().strip()
+
+    def xpath(self, tag, value, property='data-test-selector', fn=''):
+        return apply_fn(self.elements(tag, value, property), fn)
+
+
+def text_nodes(element):
+    # Equivalent of element.xpath('text()')
+    nodes = [element.text] if element.text is not None else []
+    nodes.extend(child.tail for child in element if child.tail is not None)
+    return nodes
+
+
+def apply_fn(elements, fn):
+    if fn == '':
+        return list(elements)
+    if fn == '/text()':
+        return [node.strip() for element in elements for node in text_nodes(element)]
+    if fn.startswith('/@'):
+        name = fn[2:]
+        return [element.get(name) for element in elements if element.get(name) is not None]
+    if fn.startswith('/') and fn[1:].isalnum():
+        return [child for element in elements for child in element if child.tag == fn[1:]]
+    raise ValueError(f'Unsupported fn: {fn}')
@@ -1,17 +1,60 @@
 import sys
 
-from re import search, sub
+import re
 
 from utils.pedigree import Pedigree
 
 from utils.date import convert_date
 from utils.going import get_surface
-from utils.lxml_funcs import find, xpath
+from utils.lxml_funcs import DocIndex, XPathIndex, apply_fn
 from utils.region import get_region
 
 
-regex_class = r'(\(|\s)(C|c)lass (\d|[A-Ha-h])(\)|\s)'
-regex_group = r'(\(|\s)((G|g)rade|(G|g)roup) (\d|[A-Ca-c]|I*)(\)|\s)'
+regex_class = re.compile(r'(\(|\s)(C|c)lass (\d|[A-Ha-h])(\)|\s)')
+regex_group = re.compile(r'(\(|\s)((G|g)rade|(G|g)roup) (\d|[A-Ca-c]|I*)(\)|\s)')
+regex_sp_flags = re.compile('(F|J|C)')
+
+# Every (tag, attribute, value) the parser reads, collected in one pass over
+# the page by DocIndex
+SELECTORS = (
+    ('a', 'data-test-selector', 'link-horseName'),
+    ('a', 'data-test-selector', 'link-jockeyName'),
+    ('a', 'data-test-selector', 'link-silk'),
+    ('a', 'data-test-selector', 'link-trainerName'),
+    ('div', 'class', 'rp-raceInfo'),
+    ('div', 'data-test-selector', 'text-prizeMoney'),
+    ('h1', 'data-test-selector', 'RC-courseHeader__name'),
+    ('h2', 'class', 'rp-raceTimeCourseName__title'),
+    ('img', 'class', 'rp-horseTable__silk'),
+    ('span', 'class', 'rp-horseTable__horse__country'),
+    ('span', 'class', 'rp-horseTable__horse__price'),
+    ('span', 'class', 'rp-horseTable__pos__draw'),
+    ('span', 'class', 'rp-horseTable__pos__length'),
+    ('span', 'class', 'rp-horseTable__saddleClothNo'),
+    ('span', 'class', 'rp-raceTimeCourseName_class'),
+    ('span', 'class', 'rp-raceTimeCourseName_condition'),
+    ('span', 'class', 'rp-raceTimeCourseName_ratingBandAndAgesAllowed'),
+    ('span', 'data-ending', 'lb'),
+    ('span', 'data-ending', 'st'),
+    ('span', 'data-test-selector', 'block-distanceInd'),
+    ('span', 'data-test-selector', 'block-fullDistanceInd'),
+    ('span', 'data-test-selector', 'rp-raceInfo__value rp-raceInfo__value_black'),
+    ('span', 'data-test-selector', 'rp-raceTimeCourseName_hurdles'),
+    ('span', 'data-test-selector', 'text-horsePosition'),
+    ('span', 'data-test-selector', 'text-raceTime'),
+    ('sup', 'class', 'rp-horseTable__pos__draw'),
+    ('td', 'data-ending', 'OR'),
+    ('td', 'data-ending', 'RPR'),
+    ('td', 'data-ending', 'TS'),
+    ('td', 'data-test-selector', 'horse-age'),
+    ('tr', 'class', 'rp-horseTable__commentRow ng-cloak'),
+    ('tr', 'data-test-selector', 'block-pedigreeInfoFullResults'),
+)
+
+CONTAINS = (
+    ('a', 'class', 'rp-raceTimeCourseName__name'),
+    ('td', 'class', 'rp-horseTable__wgt'),
+)
 
 
 class VoidRaceError(Exception):
@@ -19,9 +62,11 @@ class VoidRaceError(Exception):
 
 
 class Race:
-    def __init__(self, url, document, code, fields):
+    def __init__(self, url, document, code, fields, single_pass=True):
         self.url = url
         self.doc = document
+        index = DocIndex if single_pass else XPathIndex
+        self.index = index(document, SELECTORS, CONTAINS)
         self.race_info = {}
         self.runner_info = {}
 
@@ -39,18 +84,17 @@ class Race:
         self.race_info['date'] = convert_date(url_split[6])
         self.race_info['region'] = get_region(self.race_info['course_id'])
         self.race_info['race_id'] = url_split[7]
-        self.race_info['going'] = find(
-            self.doc,
+        self.race_info['going'] = self.index.find(
             'span',
             'rp-raceTimeCourseName_condition',
             property='class')
         self.race_info['surface'] = get_surface(self.race_info['going'])
-        self.race_info['off'] = find(self.doc, 'span', 'text-raceTime')
-        self.race_info['race_name'] = find(
-            self.doc, 'h2', 'rp-raceTimeCourseName__title', property='class'
+        self.race_info['off'] = self.index.find('span', 'text-raceTime')
+        self.race_info['race_name'] = self.index.find(
+            'h2', 'rp-raceTimeCourseName__title', property='class'
         )
-        self.race_info['class'] = find(
-            self.doc, 'span', 'rp-raceTimeCourseName_class', property='class'
+        self.race_info['class'] = self.index.find(
+            'span', 'rp-raceTimeCourseName_class', property='class'
         ).strip('()')
         self.race_info['race_name'] = self.clean(self.race_info['race_name'])
 
@@ -76,8 +120,7 @@ class Race:
         self.race_info['ran'] = self.get_num_runners()
 
         pedigree = Pedigree(
-            xpath(
-                self.doc,
+            self.index.xpath(
                 'tr',
                 'block-pedigreeInfoFullResults',
                 fn='/td'))
@@ -115,14 +158,14 @@ class Race:
         self.runner_info['hg'] = self.get_headgear()
 
         self.runner_info['wgt'], self.runner_info['lbs'] = self.get_weights()
-        self.runner_info['or'] = xpath(
-            self.doc, 'td', 'OR', 'data-ending', fn='/text()')
-        self.runner_info['rpr'] = xpath(
-            self.doc, 'td', 'RPR', 'data-ending', fn='/text()')
-        self.runner_info['ts'] = xpath(
-            self.doc, 'td', 'TS', 'data-ending', fn='/text()')
-        self.runner_info['silk_url'] = xpath(
-            self.doc, 'img', 'rp-horseTable__silk', 'class', fn='/@src')
+        self.runner_info['or'] = self.index.xpath(
+            'td', 'OR', 'data-ending', fn='/text()')
+        self.runner_info['rpr'] = self.index.xpath(
+            'td', 'RPR', 'data-ending', fn='/text()')
+        self.runner_info['ts'] = self.index.xpath(
+            'td', 'TS', 'data-ending', fn='/text()')
+        self.runner_info['silk_url'] = self.index.xpath(
+            'img', 'rp-horseTable__silk', 'class', fn='/@src')
 
         self.runner_info['time'] = self.get_finishing_times()
         self.runner_info['secs'] = self.time_to_seconds(
@@ -203,7 +246,7 @@ class Race:
             return race.replace(x, '').strip()
 
         if 'class' in race_name.lower():
-            match = search(regex_class, race_name)
+            match = regex_class.search(race_name)
             if match:
                 return clean_name(race_name, match.group())
 
@@ -211,7 +254,7 @@ class Race:
             return 'Sandown Mile'
 
         if any(x in race_name.lower() for x in {'group', 'grade'}):
-            match = search(regex_group, race_name)
+            match = regex_group.search(race_name)
             if match:
                 return clean_name(race_name, match.group())
 
@@ -340,31 +383,31 @@ class Race:
             return x.strip().replace('  ', '').replace(
                 ',', ' -').replace('\n', ' ').replace('\r', '')
 
-        coms = self.doc.xpath(
-            "//tr[@class='rp-horseTable__commentRow ng-cloak']/td/text()")
+        rows = self.index.elements(
+            'tr', 'rp-horseTable__commentRow ng-cloak', 'class')
+        coms = apply_fn(apply_fn(rows, '/td'), '/text()')
         return [clean_comment(com) for com in coms]
 
     def get_course(self, course_url):
-        course = find(self.doc, 'h1', 'RC-courseHeader__name')
+        course = self.index.find('h1', 'RC-courseHeader__name')
         if course == '':
             try:
-                course = self.doc.xpath(
-                    "//a[contains(@class, 'rp-raceTimeCourseName__name')]/text()")[0].strip()
+                course = apply_fn(self.index.containing(
+                    'a', 'rp-raceTimeCourseName__name'), '/text()')[0].strip()
             except IndexError:
                 course = course_url.title()
 
         return course
 
     def get_decimal_odds(self):
-        odds = [sub('(F|J|C)', '', sp) for sp in self.runner_info['sp']]
+        odds = [regex_sp_flags.sub('', sp) for sp in self.runner_info['sp']]
         return self.fraction_to_decimal(odds)
 
     def get_distance_btn(self):
         btn = []
         ovr_btn = []
 
-        for x in xpath(
-            self.doc,
+        for x in self.index.xpath(
             'span',
             'rp-horseTable__pos__length',
                 'class'):
@@ -413,8 +456,7 @@ class Race:
         return ovr_btn, btn
 
     def get_draws(self):
-        draws = xpath(
-            self.doc,
+        draws = self.index.xpath(
             'sup',
             'rp-horseTable__pos__draw',
             'class',
@@ -455,8 +497,7 @@ class Race:
     def get_headgear(self):
         headgear = []
 
-        for horse in self.doc.xpath(
-                "//td[contains(@class, 'rp-horseTable__wgt')]"):
+        for horse in self.index.containing('td', 'rp-horseTable__wgt'):
             hg = horse.find('span[@class="rp-horseTable__headGear"]')
             if hg is not None:
                 try:
@@ -469,28 +510,27 @@ class Race:
         return headgear
 
     def get_horse_ages(self):
-        ages = xpath(self.doc, 'td', 'horse-age', fn='/text()')
+        ages = self.index.xpath('td', 'horse-age', fn='/text()')
         return [age.strip() for age in ages]
 
     def get_ids_horse(self):
-        horse_ids = xpath(self.doc, 'a', 'link-horseName', fn='/@href')
+        horse_ids = self.index.xpath('a', 'link-horseName', fn='/@href')
         return [horse_id.split('/')[3] for horse_id in horse_ids]
 
     def get_ids_jockey(self):
-        jockey_ids = xpath(self.doc, 'a', 'link-jockeyName', fn='/@href')
+        jockey_ids = self.index.xpath('a', 'link-jockeyName', fn='/@href')
         return [jockey_id.split('/')[3] for jockey_id in jockey_ids[::2]]
 
     def get_ids_owner(self):
-        owner_ids = self.doc.xpath(
-            "//a[@data-test-selector='link-silk']/@href")
+        owner_ids = self.index.xpath('a', 'link-silk', fn='/@href')
         return [owner_id.split('/')[3] for owner_id in owner_ids]
 
     def get_ids_trainer(self):
-        trainer_ids = xpath(self.doc, 'a', 'link-trainerName', fn='/@href')
+        trainer_ids = self.index.xpath('a', 'link-trainerName', fn='/@href')
         return [trainer_id.split('/')[3] for trainer_id in trainer_ids[::2]]
 
     def get_names_horse(self):
-        horses = xpath(self.doc, 'a', 'link-horseName', fn='/text()')
+        horses = self.index.xpath('a', 'link-horseName', fn='/text()')
 
         joined = []
 
@@ -500,21 +540,20 @@ class Race:
         return joined
 
     def get_names_jockey(self):
-        jockeys = xpath(self.doc, 'a', 'link-jockeyName', fn='/text()')
+        jockeys = self.index.xpath('a', 'link-jockeyName', fn='/text()')
         return [self.clean(jock.strip()) for jock in jockeys[::3]]
 
     def get_names_owner(self):
-        owners = self.doc.xpath("//a[@data-test-selector='link-silk']/@href")
+        owners = self.index.xpath('a', 'link-silk', fn='/@href')
         return [owner.split('/')[4].replace('-', ' ').title()
                 for owner in owners]
 
     def get_names_trainer(self):
-        trainers = xpath(self.doc, 'a', 'link-trainerName', fn='/text()')
+        trainers = self.index.xpath('a', 'link-trainerName', fn='/text()')
         return [self.clean(trainer.strip()) for trainer in trainers[::2][::2]]
 
     def get_nationaliies(self):
-        nats = xpath(
-            self.doc,
+        nats = self.index.xpath(
             'span',
             'rp-horseTable__horse__country',
             'class',
@@ -530,8 +569,7 @@ class Race:
         return nationalities
 
     def get_num_runners(self):
-        ran = find(
-            self.doc,
+        ran = self.index.find(
             'span',
             'rp-raceInfo__value rp-raceInfo__value_black')
 
@@ -541,8 +579,7 @@ class Race:
         return None
 
     def get_numbers(self):
-        nums = xpath(
-            self.doc,
+        nums = self.index.xpath(
             'span',
             'rp-horseTable__saddleClothNo',
             'class',
@@ -550,7 +587,7 @@ class Race:
         return [num.strip('.') for num in nums]
 
     def get_positions(self):
-        positions = xpath(self.doc, 'span', 'text-horsePosition', fn='/text()')
+        positions = self.index.xpath('span', 'text-horsePosition', fn='/text()')
         del positions[1::2]
         positions = [pos.strip() for pos in positions]
 
@@ -560,7 +597,7 @@ class Race:
         return positions
 
     def get_prizemoney(self):
-        prizes = xpath(self.doc, 'div', 'text-prizeMoney', fn='/text()')
+        prizes = self.index.xpath('div', 'text-prizeMoney', fn='/text()')
         prize = [p.strip().replace(',', '').replace('£', '') for p in prizes]
         pos = self.runner_info['pos']
 
@@ -589,7 +626,7 @@ class Race:
             'h': '7',
         }
 
-        match = search(regex_class, self.race_info['race_name'])
+        match = regex_class.search(self.race_info['race_name'])
 
         if match:
             race_class = match.groups()[2].lower()
@@ -603,8 +640,8 @@ class Race:
         return ''
 
     def get_race_distances(self):
-        dist = find(self.doc, 'span', 'block-distanceInd')
-        dist_y = find(self.doc, 'span', 'block-fullDistanceInd').strip('()')
+        dist = self.index.find('span', 'block-distanceInd')
+        dist_y = self.index.find('span', 'block-fullDistanceInd').strip('()')
 
         try:
             dist_f = self.distance_to_furlongs(dist)
@@ -627,7 +664,7 @@ class Race:
         return dist, dist_y, dist_f, dist_m
 
     def get_race_pattern(self):
-        match = search(regex_group, self.race_info['race_name'])
+        match = regex_group.search(self.race_info['race_name'])
 
         if match:
             pattern = f'{match.groups()[1]} {match.groups()[4]}'.title()
@@ -649,7 +686,7 @@ class Race:
         if self.race_info['code'] == 'flat' and 'national hunt flat' not in race:
             race_type = 'Flat'
         else:
-            fences = find(self.doc, 'span', 'rp-raceTimeCourseName_hurdles')
+            fences = self.index.find('span', 'rp-raceTimeCourseName_hurdles')
 
             if 'hurdle' in fences.lower():
                 race_type = 'Hurdle'
@@ -707,8 +744,7 @@ class Race:
         return sexs
 
     def get_starting_prices(self):
-        sps = xpath(
-            self.doc,
+        sps = self.index.xpath(
             'span',
             'rp-horseTable__horse__price',
             'class',
@@ -716,8 +752,8 @@ class Race:
         return [sp.replace('No Odds', '').strip() for sp in sps]
 
     def get_weights(self):
-        st = xpath(self.doc, 'span', 'st', 'data-ending', fn='/text()')
-        lb = xpath(self.doc, 'span', 'lb', 'data-ending', fn='/text()')
+        st = self.index.xpath('span', 'st', 'data-ending', fn='/text()')
+        lb = self.index.xpath('span', 'lb', 'data-ending', fn='/text()')
 
         wgt = [f'{s}-{l}' for s, l in zip(st, lb)]
         lbs = [int(s) * 14 + int(l) for s, l in zip(st, lb)]
@@ -725,7 +761,8 @@ class Race:
         return wgt, lbs
 
     def get_winning_time(self):
-        result_info = self.doc.xpath('//div[@class="rp-raceInfo"]/ul/li')[0]
+        result_info = apply_fn(apply_fn(
+            self.index.elements('div', 'rp-raceInfo', 'class'), '/ul'), '/li')[0]
         time_info = result_info.findall('.//span[@class="rp-raceInfo__value"]')
 
         n = len(time_info)
@@ -766,8 +803,7 @@ class Race:
         return winning_time
 
     def parse_race_bands(self):
-        band = find(
-            self.doc,
+        band = self.index.find(
             'span',
             'rp-raceTimeCourseName_ratingBandAndAgesAllowed',
             property='class')
@@ -1,14 +1,25 @@
+from functools import lru_cache
+
 from orjson import loads
 
 
-def get_region(course_id):
+@lru_cache(maxsize=None)
+def course_regions():
+    # course_id -> region, read once per process instead of once per race
     courses = loads(open('../courses/_courses', 'r').read())
     courses.pop('all')
 
+    lookup = {}
+
     for region, course in courses.items():
         for _id in course.keys():
-            if _id == course_id:
-                return region.upper()
+            lookup.setdefault(_id, region.upper())
+
+    return lookup
+
+
+def get_region(course_id):
+    return course_regions().get(course_id)
 
 
 def print_region(code, region):
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""In-process load test for ``stats_api``.
+
+Drives the ASGI app directly through ``httpx.ASGITransport``, with no network
+or uvicorn involved, from ``--clients`` concurrent clients. It reports the
+p50/p99 latency and requests per second for each endpoint. By default a
+synthetic ROI history and prediction file are generated in a temporary
+directory. Pass ``--real`` to use the configured ``logs``/``predictions``.
+
+    python scripts/load_test_stats_api.py --clients 200 --requests 5000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+ENDPOINTS = ["/roi", "/tags", "/rolling", "/tips", "/roi?limit=50"]
+
+
+def make_fixtures(root: Path, days: int = 365, tips: int = 40) -> None:
+    """Write a synthetic ROI history and one day of predictions under ``root``."""
+    rng = np.random.default_rng(0)
+    roi = root / "logs" / "roi"
+    roi.mkdir(parents=True, exist_ok=True)
+    dates = pd.date_range("2025-01-01", periods=days).strftime("%Y-%m-%d")
+    daily = pd.DataFrame(
+        {
+            "Date": dates,
+            "Tips": 6,
+            "Wins": rng.integers(0, 4, days),
+            "Places": rng.integers(0, 3, days),
+            "Profit": rng.normal(0, 3, days).round(2),
+            "Stake": 6.0,
+        }
+    )
+    daily["ROI"] = daily["Profit"] / daily["Stake"] * 100
+    daily["StrikeRate"] = daily["Wins"] / daily["Tips"] * 100
+    for col in ("Tips", "Wins", "Places", "Profit", "Stake"):
+        daily[f"Cum{col}"] = daily[col].cumsum()
+    daily.to_csv(roi / "daily_roi_summary.csv", index=False)
+    pd.DataFrame(
+        {"Tag": [f"tag{i}" for i in range(30)], "ROI": rng.normal(0, 20, 30)}
+    ).to_csv(roi / "tag_roi_summary_sent.csv", index=False)
+    # Written last so it is the newest CSV served by /roi
+    daily[["Date", "Tips", "Wins", "Profit", "ROI"]].to_csv(
+        roi / "roi_summary.csv", index=False
+    )
+
+    pred = root / "predictions" / dates[-1]
+    pred.mkdir(parents=True, exist_ok=True)
+    with (pred / "output.jsonl").open("w", encoding="utf-8") as fh:
+        for i in range(tips):
+            fh.write(
+                json.dumps(
+                    {"race": f"{13 + i // 6}:{i % 6 * 10:02d} Ascot", "name": f"H{i}"}
+                )
+                + "\n"
+            )
+
+
+def percentile(values: list[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+async def run_load(
+    app, clients: int, requests: int, endpoints: list[str], etag: bool = False
+) -> dict:
+    """Fire ``requests`` requests from ``clients`` concurrent clients."""
+    import httpx
+
+    latencies: dict[str, list[float]] = {e: [] for e in endpoints}
+    errors = 0
+    counter = iter(range(requests))
+    transport = httpx.ASGITransport(app=app)
+
+    async def client_loop(client: httpx.AsyncClient) -> None:
+        nonlocal errors
+        tags: dict[str, str] = {}
+        for n in counter:
+            url = endpoints[n % len(endpoints)]
+            headers = {"Accept-Encoding": "gzip"}
+            if etag and url in tags:
+                headers["If-None-Match"] = tags[url]
+            t0 = time.perf_counter()
+            resp = await client.get(url, headers=headers)
+            latencies[url].append(time.perf_counter() - t0)
+            if resp.status_code not in (200, 304):
+                errors += 1
+            elif "etag" in resp.headers:
+                tags[url] = resp.headers["etag"]
+
+    start = time.perf_counter()
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        await asyncio.gather(*(client_loop(c) for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+
+    every = [v for values in latencies.values() for v in values]
+    report = {
+        "clients": clients,
+        "requests": len(every),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "rps": round(len(every) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(every, 50) * 1000, 3),
+        "p99_ms": round(percentile(every, 99) * 1000, 3),
+        "endpoints": {
+            url: {
+                "requests": len(values),
+                "p50_ms": round(percentile(values, 50) * 1000, 3),
+                "p99_ms": round(percentile(values, 99) * 1000, 3),
+            }
+            for url, values in latencies.items()
+        },
+    }
+    return report
+
+
+async def _main(args) -> dict:
+    import stats_api
+
+    if not args.real:
+        root = Path(tempfile.mkdtemp(prefix="tm_load_"))
+        make_fixtures(root, days=args.days)
+        stats_api.LOGS_DIR = root / "logs"
+        stats_api.PRED_DIR = root / "predictions"
+    async with stats_api.lifespan(stats_api.app):
+        # Let the background task build every payload before timing
+        await asyncio.to_thread(stats_api.app.state.watcher.refresh)
+        return await run_load(
+            stats_api.app, args.clients, args.requests, ENDPOINTS, args.etag
+        )
+
+
+def main(argv: list[str] | None = None) -> dict:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=365, help="Synthetic ROI days")
+    parser.add_argument(
+        "--etag", action="store_true", help="Revalidate with If-None-Match"
+    )
+    parser.add_argument(
+        "--real", action="store_true", help="Use TM_LOGS_DIR/TM_PRED_DIR data"
+    )
+    parser.add_argument("--json", action="store_true", help="Print JSON only")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("TM_STATS_WATCH_INTERVAL", "2")
+    report = asyncio.run(_main(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return report
+    print(
+        f"{report['requests']} requests from {report['clients']} clients in "
+        f"{report['seconds']}s: {report['rps']} req/s, "
+        f"p50 {report['p50_ms']}ms, p99 {report['p99_ms']}ms, "
+        f"{report['errors']} errors"
+    )
+    for url, stats in report["endpoints"].items():
+        print(f"  {url:<16} p50 {stats['p50_ms']:>8}ms  p99 {stats['p99_ms']:>8}ms")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -1,70 +1,38 @@
 #!/usr/bin/env python3
 """Aggregate past tip logs for self-training.
 
-This script reads `logs/tips_results_*_advised_all.csv` files and
-extracts columns needed for model fine-tuning:
+This script reads `logs/tips_results_*_advised_all.csv` files (or their typed
+`.parquet` tip logs, see `roi/tip_log.py`) and extracts columns needed for
+model fine-tuning:
 `Confidence`, `Tags`, `Race Type`, `Result`, `Odds`, and `odds_delta`.
 The output CSV is saved to `logs/roi/self_train_dataset.csv`.
 """
 
 from __future__ import annotations
 
-import ast
 import glob
 import os
+from pathlib import Path
 from typing import List
 
 import pandas as pd
 
-
-def parse_tags(val: str | list | float | int | None) -> str:
-    """Return a semicolon-separated string of tags."""
-    if val is None or (isinstance(val, float) and pd.isna(val)):
-        return ""
-    if isinstance(val, list):
-        return ";".join(map(str, val))
-    if isinstance(val, str):
-        try:
-            parsed = ast.literal_eval(val)
-            if isinstance(parsed, list):
-                return ";".join(map(str, parsed))
-        except Exception:
-            pass
-        return val
-    return str(val)
-
-
-def parse_result(pos: str | int | float) -> int:
-    """Map finishing position to a binary result (1 = win)."""
-    try:
-        return 1 if int(pos) == 1 else 0
-    except Exception:
-        return 0
+from roi.tip_log import read_tip_log
 
 
 def load_files(paths: List[str]) -> pd.DataFrame:
     frames: List[pd.DataFrame] = []
     for path in paths:
         try:
-            df = pd.read_csv(path)
+            log = read_tip_log(path)
         except Exception as exc:
             print(f"⚠️ Could not read {path}: {exc}")
             continue
-        needed = [
-            col
-            for col in [
-                "Confidence",
-                "tags",
-                "Race Type",
-                "Position",
-                "Odds",
-                "odds_delta",
-            ]
-            if col in df.columns
-        ]
-        df = df[needed]
-        df["Tags"] = df.get("tags").apply(parse_tags) if "tags" in df else ""
-        df["Result"] = df.get("Position", 0).apply(parse_result)
+        df = log.frame.reindex(
+            columns=["Confidence", "Race Type", "Position", "Odds", "odds_delta"]
+        )
+        df["Tags"] = log.joined(";").fillna("").to_numpy()
+        df["Result"] = (pd.to_numeric(df["Position"], errors="coerce") == 1).astype(int)
         frames.append(
             df[["Confidence", "Tags", "Race Type", "Result", "Odds", "odds_delta"]]
         )
@@ -72,7 +40,14 @@ def load_files(paths: List[str]) -> pd.DataFrame:
 
 
 def main() -> None:
-    files = sorted(glob.glob("logs/tips_results_*_advised_all.csv"))
+    # One entry per day; read_tip_log prefers the .parquet log over the CSV
+    files = sorted(
+        {
+            str(Path(p).with_suffix(".csv"))
+            for p in glob.glob("logs/tips_results_*_advised_all.*")
+            if p.endswith((".csv", ".parquet"))
+        }
+    )
     if not files:
         print("No tip result CSVs found in logs/.")
         return
@@ -1,22 +1,30 @@
 from __future__ import annotations
 
-import json
+import asyncio
 import os
+from contextlib import asynccontextmanager
+from datetime import date
 from pathlib import Path
 from typing import List
 
+import orjson
 import pandas as pd
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
 
-app = FastAPI(title="Tipping Monster Stats API")
+from roi.rolling_metrics import WINDOWS, load_daily, rolling_series
+from tippingmonster.dataset_cache import (
+    CachedDataset,
+    CursorError,
+    DirectoryWatcher,
+    latest_file,
+)
 
 LOGS_DIR = Path(os.getenv("TM_LOGS_DIR", "logs"))
 PRED_DIR = Path(os.getenv("TM_PRED_DIR", "predictions"))
-
-
-def _latest_csv(folder: Path) -> Path | None:
-    csv_files = sorted(folder.glob("*.csv"), key=lambda p: p.stat().st_mtime)
-    return csv_files[-1] if csv_files else None
+WATCH_INTERVAL = float(os.getenv("TM_STATS_WATCH_INTERVAL", "2"))
+MAX_LIMIT = 1000
+GZIP_MIN_BYTES = 512
 
 
 def _load_csv(path: Path) -> List[dict]:
@@ -27,43 +35,173 @@ def _load_csv(path: Path) -> List[dict]:
 
 
 def _load_predictions(path: Path) -> List[dict]:
-    if not path.exists():
-        raise HTTPException(status_code=404, detail="Predictions not found")
-    records = []
-    with path.open("r", encoding="utf-8") as fh:
-        for line in fh:
-            records.append(json.loads(line))
-    return records
+    with path.open("rb") as fh:
+        return [orjson.loads(line) for line in fh if line.strip()]
+
+
+def _load_rolling(path: Path) -> List[dict]:
+    daily = load_daily(path)
+    if daily.empty:
+        return []
+    return rolling_series(daily, windows=WINDOWS).to_dict(orient="records")
+
+
+def _latest_predictions() -> Path | None:
+    if not PRED_DIR.is_dir():
+        return None
+    pred_dirs = sorted(d for d in PRED_DIR.iterdir() if d.is_dir())
+    return pred_dirs[-1] / "output.jsonl" if pred_dirs else None
+
+
+def _roi_root():
+    return [LOGS_DIR / "roi"]
+
+
+DATASETS = {
+    "roi": CachedDataset(
+        "roi", lambda: latest_file(LOGS_DIR / "roi", "*.csv"), _load_csv, _roi_root
+    ),
+    "tags": CachedDataset(
+        "tags",
+        lambda: latest_file(LOGS_DIR / "roi", "tag_roi_summary*.csv"),
+        _load_csv,
+        _roi_root,
+    ),
+    "rolling": CachedDataset(
+        "rolling",
+        lambda: LOGS_DIR / "roi" / "daily_roi_summary.csv",
+        _load_rolling,
+        _roi_root,
+    ),
+    "tips": CachedDataset(
+        "tips", _latest_predictions, _load_predictions, lambda: [PRED_DIR]
+    ),
+}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The background task rebuilds payloads when files land; handlers only
+    # read the snapshots in memory and never touch the disk
+    watcher = DirectoryWatcher(DATASETS.values(), interval=WATCH_INTERVAL)
+    app.state.watcher = watcher
+    task = asyncio.create_task(watcher.run())
+    try:
+        yield
+    finally:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+
+app = FastAPI(title="Tipping Monster Stats API", lifespan=lifespan)
+
+
+async def _snapshot(name: str):
+    dataset = DATASETS[name]
+    snapshot = dataset.peek() if dataset.watched else None
+    if snapshot is None:
+        snapshot = await run_in_threadpool(dataset.get)
+    return snapshot
+
+
+async def _respond(
+    name: str,
+    request: Request,
+    missing: str,
+    start: date | None = None,
+    end: date | None = None,
+    cursor: str | None = None,
+    limit: int | None = None,
+    tail: int | None = None,
+) -> Response:
+    snapshot = await _snapshot(name)
+    if snapshot is None or (name == "rolling" and not snapshot.records):
+        raise HTTPException(status_code=404, detail=missing)
+    if limit is not None and not 1 <= limit <= MAX_LIMIT:
+        raise HTTPException(status_code=422, detail=f"limit must be 1-{MAX_LIMIT}")
+    if tail:
+        start = end = None
+        cursor = cursor or snapshot.cursor_at(max(len(snapshot.items) - tail, 0))
+    try:
+        page = snapshot.page(
+            start.isoformat() if start else None,
+            end.isoformat() if end else None,
+            cursor,
+            limit,
+        )
+    except CursorError as exc:
+        raise HTTPException(status_code=410, detail=str(exc)) from exc
+
+    headers = {
+        "ETag": page.etag,
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if request.headers.get("if-none-match") == page.etag:
+        return Response(status_code=304, headers=headers)
+    headers["X-Total-Count"] = str(page.total)
+    if page.next_cursor:
+        headers["X-Next-Cursor"] = page.next_cursor
+        next_url = request.url.include_query_params(cursor=page.next_cursor)
+        headers["Link"] = f'<{next_url}>; rel="next"'
+    body = page.body
+    if len(body) >= GZIP_MIN_BYTES and "gzip" in request.headers.get(
+        "accept-encoding", ""
+    ):
+        body = page.gzip
+        headers["Content-Encoding"] = "gzip"
+    return Response(body, media_type="application/json", headers=headers)
 
 
 @app.get("/roi")
-def get_roi():
-    roi_folder = LOGS_DIR / "roi"
-    latest = _latest_csv(roi_folder)
-    if not latest:
-        raise HTTPException(status_code=404, detail="ROI data unavailable")
-    return _load_csv(latest)
+async def get_roi(
+    request: Request,
+    start: date | None = None,
+    end: date | None = None,
+    cursor: str | None = None,
+    limit: int | None = None,
+):
+    return await _respond(
+        "roi", request, "ROI data unavailable", start, end, cursor, limit
+    )
 
 
 @app.get("/tags")
-def get_tags():
-    roi_folder = LOGS_DIR / "roi"
-    tag_csvs = sorted(
-        roi_folder.glob("tag_roi_summary*.csv"), key=lambda p: p.stat().st_mtime
+async def get_tags(
+    request: Request, cursor: str | None = None, limit: int | None = None
+):
+    return await _respond(
+        "tags", request, "Tag ROI data unavailable", cursor=cursor, limit=limit
+    )
+
+
+@app.get("/rolling")
+async def get_rolling(
+    request: Request,
+    days: int | None = None,
+    start: date | None = None,
+    end: date | None = None,
+):
+    return await _respond(
+        "rolling",
+        request,
+        "Rolling ROI data unavailable",
+        start,
+        end,
+        tail=days,
     )
-    if not tag_csvs:
-        raise HTTPException(status_code=404, detail="Tag ROI data unavailable")
-    return _load_csv(tag_csvs[-1])
 
 
 @app.get("/tips")
-def get_tips():
-    pred_dirs = [d for d in PRED_DIR.iterdir() if d.is_dir()]
-    if not pred_dirs:
-        raise HTTPException(status_code=404, detail="No predictions available")
-    latest_dir = sorted(pred_dirs)[-1]
-    output_file = latest_dir / "output.jsonl"
-    return _load_predictions(output_file)
+async def get_tips(
+    request: Request, cursor: str | None = None, limit: int | None = None
+):
+    return await _respond(
+        "tips", request, "No predictions available", cursor=cursor, limit=limit
+    )
 
 
 if __name__ == "__main__":  # pragma: no cover - manual start
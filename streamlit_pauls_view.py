@@ -6,15 +6,30 @@ import matplotlib.pyplot as plt
 import pandas as pd
 import streamlit as st
 
+from roi import warehouse
+
 st.set_page_config(page_title="Paul's View - Tipping Monster", layout="wide")
 
-# === Load CSV ===
-uploaded_file = st.file_uploader("Upload _all.csv Tip Log", type="csv")
-if not uploaded_file:
-    st.stop()
 
-df = pd.read_csv(uploaded_file)
-df["Date"] = pd.to_datetime(df["Date"])
+@st.cache_data
+def load_warehouse_tips(version: str | None) -> pd.DataFrame:
+    """All tips from the warehouse, cached per build version."""
+    tips = warehouse.load("tips", source="all")
+    return tips if not tips.empty else warehouse.load("tips", source="advised")
+
+
+# === Load Data ===
+data_source = st.sidebar.radio("Data Source", ["Warehouse", "Upload CSV"])
+if data_source == "Upload CSV":
+    uploaded_file = st.file_uploader("Upload _all.csv Tip Log", type="csv")
+    if not uploaded_file:
+        st.stop()
+    df = warehouse.normalise(pd.read_csv(uploaded_file))
+else:
+    df = load_warehouse_tips(warehouse.load_manifest().get("version"))
+if df.empty:
+    st.error("No tip data found. Run `python -m roi.warehouse build`.")
+    st.stop()
 
 # === Sidebar Filters ===
 st.sidebar.header("\U0001f50d Filters")
@@ -23,9 +38,7 @@ selected_dates = st.sidebar.multiselect(
     "Date Range", all_dates, default=all_dates[-14:]
 )
 
-all_tags = sorted(
-    tag for sublist in df["Tags"].dropna().str.split(",") for tag in sublist
-)
+all_tags = sorted(warehouse.explode_tags(df)["Tag"].unique())
 selected_tags = st.sidebar.multiselect("Tags", all_tags)
 
 min_conf, max_conf = st.sidebar.slider("Confidence Range", 0.0, 1.0, (0.8, 1.0))
@@ -37,11 +50,9 @@ use_best_odds = st.sidebar.radio("Profit Mode", ["Default Odds", "Best Odds"], i
 df_filtered = df[df["Date"].dt.date.isin(selected_dates)]
 df_filtered = df_filtered[df_filtered["Confidence"].between(min_conf, max_conf)]
 if only_naps:
-    df_filtered = df_filtered[df_filtered["Tags"].str.contains("NAP", na=False)]
+    df_filtered = df_filtered[df_filtered["NAP"]]
 if selected_tags:
-    df_filtered = df_filtered[
-        df_filtered["Tags"].apply(lambda x: any(tag in str(x) for tag in selected_tags))
-    ]
+    df_filtered = df_filtered[warehouse.tag_mask(df_filtered["Tags"], selected_tags)]
 
 # === ROI Summary ===
 st.subheader("\U0001f4b8 ROI Summary")
@@ -54,12 +65,12 @@ summary = (
             "Profit": "sum",
             "Profit Best Odds": "sum",
             "Stake": "sum",
-            "Position": lambda x: (x == 1).sum(),
+            "Won": "sum",
         }
     )
-    .rename(columns={"Position": "Winners"})
+    .rename(columns={"Won": "Winners"})
 )
-summary["ROI"] = (summary[profit_col] / summary["Stake"]) * 100
+summary["ROI"] = warehouse.roi_pct(summary[profit_col], summary["Stake"])
 
 st.dataframe(summary.round(2))
 
@@ -74,7 +85,7 @@ st.subheader("\U0001f4cc Full Tip Breakdown")
 show_cols = [
     "Date",
     "Time",
-    "Race",
+    "Course",
     "Horse",
     "Confidence",
     "Tags",
@@ -101,13 +112,13 @@ course_stats = (
     )
     .rename(columns={"Horse": "Tips"})
 )
-course_stats["ROI"] = (course_stats[profit_col] / course_stats["Stake"]) * 100
+course_stats["ROI"] = warehouse.roi_pct(course_stats[profit_col], course_stats["Stake"])
 course_stats = course_stats.sort_values("ROI", ascending=False)
 st.dataframe(course_stats.round(2))
 
 # === Flat vs Jumps Summary ===
 st.subheader("\U0001f3c7 Flat vs Jumps Performance")
-df_filtered["Type"] = df_filtered["Race Type"].fillna("Unknown")
+df_filtered = df_filtered.assign(Type=df_filtered["Race Type"].fillna("Unknown"))
 type_stats = (
     df_filtered.groupby("Type")
     .agg(
@@ -120,24 +131,23 @@ type_stats = (
     )
     .rename(columns={"Horse": "Tips"})
 )
-type_stats["ROI"] = (type_stats[profit_col] / type_stats["Stake"]) * 100
+type_stats["ROI"] = warehouse.roi_pct(type_stats[profit_col], type_stats["Stake"])
 st.dataframe(type_stats.round(2))
 
 # === ROI by Tag Summary ===
 st.subheader("\U0001f3f7 ROI by Tag")
-if "Tags" in df_filtered.columns and not df_filtered["Tags"].dropna().empty:
-    tag_df = df_filtered.dropna(subset=["Tags"]).copy()
-    tag_df["Tag"] = tag_df["Tags"].str.split(",")
-    tag_df = tag_df.explode("Tag")
-    tag_df["Tag"] = tag_df["Tag"].str.strip()
-    tag_stats = tag_df.groupby("Tag").agg(
-        Tips=("Horse", "count"),
-        Winners=("Position", lambda x: (x == 1).sum()),
+tag_df = warehouse.explode_tags(df_filtered, extra=["Profit Best Odds"])
+if not tag_df.empty:
+    tag_stats = tag_df.groupby("Tag", observed=True).agg(
+        Tips=("Won", "size"),
+        Winners=("Won", "sum"),
         Profit=(profit_col, "sum"),
         Stake=("Stake", "sum"),
     )
-    tag_stats["ROI %"] = (tag_stats["Profit"] / tag_stats["Stake"]) * 100
-    tag_stats["Strike Rate %"] = (tag_stats["Winners"] / tag_stats["Tips"]) * 100
+    tag_stats["ROI %"] = warehouse.roi_pct(tag_stats["Profit"], tag_stats["Stake"])
+    tag_stats["Strike Rate %"] = warehouse.roi_pct(
+        tag_stats["Winners"], tag_stats["Tips"]
+    )
     tag_stats = tag_stats.sort_values("ROI %", ascending=False)
     st.dataframe(tag_stats[["ROI %", "Strike Rate %", "Profit"]].round(2))
 else:
@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-"""Simple Telegram bot with /roi, /nap, /tip, /ping and /help commands."""
+"""Simple Telegram bot with /roi, /nap, /tip, /tagroi, /ping and /help commands."""
 
 from __future__ import annotations
 
@@ -8,11 +8,10 @@ import os
 from datetime import datetime, timedelta
 from pathlib import Path
 
-import pandas as pd
 from telegram import Update
 from telegram.ext import ApplicationBuilder, CommandHandler, ContextTypes
 
-from tippingmonster import repo_path
+from tippingmonster import repo_path, tip_index
 from tippingmonster.utils import (
     clear_conf_override,
     load_override_or_default,
@@ -30,6 +29,8 @@ def get_roi_summary(date: str, base_dir: Path | None = None) -> str:
     if not csv_path.exists():
         return f"No ROI CSV found for {date}: {csv_path}"
 
+    import pandas as pd
+
     df = pd.read_csv(csv_path)
     df["Position"] = (
         pd.to_numeric(df["Position"], errors="coerce").fillna(0).astype(int)
@@ -45,6 +46,8 @@ def get_weekly_roi_summary(
     date: str | None = None, base_dir: Path | None = None
 ) -> str:
     """Return ROI summary for the ISO week containing ``date`` or today."""
+    import pandas as pd
+
     base_dir = base_dir or repo_path()
     target = datetime.strptime(date, "%Y-%m-%d") if date else datetime.today()
     iso_year, iso_week, _ = target.isocalendar()
@@ -82,58 +85,31 @@ def get_weekly_roi_summary(
     )
 
 
+def _tip_index(base_dir: Path | None = None):
+    """Open the tip index, building it from the logs on first use.
+
+    Dispatch and the ROI pipeline keep it current, so commands only query.
+    """
+    path = tip_index.db_path(base_dir)
+    fresh = not path.exists()
+    conn = tip_index.connect(path)
+    if fresh:
+        tip_index.sync(conn, base_dir or repo_path())
+    return conn
+
+
 def get_recent_naps(days: int = 7, base_dir: Path | None = None) -> str:
     """Return last ``days`` NAPs with win/place/ROI summary."""
-    base_dir = base_dir or repo_path()
-
-    pred_root = base_dir / "predictions"
-    if not pred_root.exists():
-        return "No predictions directory found."
-
-    date_dirs = sorted([d for d in pred_root.iterdir() if d.is_dir()], reverse=True)
-
-    naps: list[dict[str, object]] = []
-    for d in date_dirs:
-        if len(naps) >= days:
-            break
-        pred_file = d / "tips_with_odds.jsonl"
-        if not pred_file.exists():
-            continue
-        nap_tip = None
-        with open(pred_file, "r", encoding="utf-8") as f:
-            for line in f:
-                tip = json.loads(line)
-                tags = tip.get("tags", [])
-                if any("NAP" in t for t in tags):
-                    nap_tip = tip
-                    break
-        if not nap_tip:
-            continue
-
-        date_str = d.name
-        results_csv = base_dir / "logs" / f"tips_results_{date_str}_advised.csv"
-        if not results_csv.exists():
-            continue
-        df = pd.read_csv(results_csv)
-        df["Horse"] = df["Horse"].str.lower()
-        match = df[df["Horse"] == nap_tip["name"].lower()]
-        if match.empty:
-            continue
-        row = match.iloc[0]
-        naps.append(
-            {
-                "date": date_str,
-                "horse": nap_tip["name"],
-                "position": int(row["Position"]),
-                "profit": float(row["Profit"]),
-                "stake": float(row.get("Stake", 1.0)),
-            }
-        )
+    conn = _tip_index(base_dir)
+    try:
+        naps = tip_index.recent_naps(conn, days)
+    finally:
+        conn.close()
 
     if not naps:
         return "No NAP history found."
 
-    naps = naps[:days][::-1]  # chronological order
+    naps = naps[::-1]  # chronological order
 
     wins = sum(1 for n in naps if n["position"] == 1)
     places = sum(1 for n in naps if 0 < n["position"] <= 3)
@@ -153,36 +129,53 @@ def get_recent_naps(days: int = 7, base_dir: Path | None = None) -> str:
 
 def get_tip_info(name: str, base_dir: Path | None = None) -> str:
     """Return the most recent tip info for ``name``."""
-    base_dir = base_dir or repo_path()
-    logs_dir = base_dir / "logs"
-    files = sorted(logs_dir.glob("sent_tips_*.jsonl"), reverse=True)
-    if not files:
-        return "No sent tips logs found."
-
-    target = name.lower()
-    for fpath in files:
-        date_str = fpath.stem.split("_")[-1]
-        with open(fpath, "r", encoding="utf-8") as f:
-            for line in f:
-                tip = json.loads(line)
-                if tip.get("name", "").lower() == target:
-                    confidence = tip.get("confidence")
-                    tags = ", ".join(tip.get("tags", []))
-                    commentary = tip.get("commentary", "")
-                    odds = tip.get("bf_sp")
-                    parts = [f"{date_str}: {tip.get('race', '')}"]
-                    if odds:
-                        parts[0] += f" @ {odds}"
-                    if confidence is not None:
-                        parts.append(f"Confidence {confidence * 100:.1f}%")
-                    if tags:
-                        parts.append(f"Tags: {tags}")
-                    if commentary:
-                        parts.append(commentary)
-                    return "\n".join(parts)
+    conn = _tip_index(base_dir)
+    try:
+        if (
+            conn.execute("SELECT 1 FROM tips WHERE source = 'sent' LIMIT 1").fetchone()
+            is None
+        ):
+            return "No sent tips logs found."
+        tip = tip_index.latest_tip(conn, name)
+    finally:
+        conn.close()
+    if tip:
+        tags = ", ".join(tip["tags"])
+        parts = [f"{tip['date']}: {tip['race'] or ''}"]
+        if tip["odds"]:
+            parts[0] += f" @ {tip['odds']}"
+        if tip["confidence"] is not None:
+            parts.append(f"Confidence {tip['confidence'] * 100:.1f}%")
+        if tags:
+            parts.append(f"Tags: {tags}")
+        if tip["commentary"]:
+            parts.append(tip["commentary"])
+        return "\n".join(parts)
     return f"No recent tip found for {name}."
 
 
+def get_tag_roi(query: str, days: int = 90, base_dir: Path | None = None) -> str:
+    """Return advised sent-tip ROI for tips carrying every tag in ``query``.
+
+    Tags are separated by ``+`` (e.g. ``"Class Drop + Fresh"``) and matched
+    case-insensitively against the precomputed tag cube.
+    """
+    from roi import tag_cube
+
+    base_dir = base_dir or repo_path()
+    cube = tag_cube.load_cube(base_dir / tag_cube.CUBE_FILE)
+    if cube.empty:
+        return "No tag ROI data found."
+    totals = tag_cube.rollup(cube, tags=query, days=days, source="sent", mode="advised")
+    if not totals["Runs"]:
+        return f"No sent tips tagged {query} in the last {days} days."
+    return (
+        f"{query} ({days}d): {int(totals['Runs'])} tips, "
+        f"{int(totals['Wins'])}W/{int(totals['Places'])}P, "
+        f"{totals['Profit']:+.2f} pts ({totals['ROI %']:.2f}% ROI)"
+    )
+
+
 async def _reply(update: Update, message: str) -> None:
     """Send or log ``message`` based on dev mode."""
     if os.getenv("TM_DEV_MODE") == "1":
@@ -211,6 +204,7 @@ async def help_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         "/roi [DATE]",
         "/nap [DAYS]",
         "/tip HORSE",
+        "/tagroi TAG [+ TAG] [DAYS]",
         "/ping",
         "/override_conf VALUE",
         "/reset_conf",
@@ -249,6 +243,19 @@ async def tip(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     await _reply(update, message)
 
 
+async def tagroi(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /tagroi TAG [+ TAG] [DAYS] command."""
+    args = list(context.args or [])
+    if not args:
+        await _reply(update, "Usage: /tagroi Class Drop + Fresh 90")
+        return
+    days = 90
+    if args[-1].isdigit():
+        days = int(args.pop())
+    message = get_tag_roi(" ".join(args), days)
+    await _reply(update, message)
+
+
 def _authorised(update: Update) -> bool:
     return update.effective_user and update.effective_user.id == PAUL_TELEGRAM_ID
 
@@ -307,6 +314,7 @@ def main() -> None:
     application.add_handler(CommandHandler("roi", roi))
     application.add_handler(CommandHandler("nap", nap))
     application.add_handler(CommandHandler("tip", tip))
+    application.add_handler(CommandHandler("tagroi", tagroi))
     application.add_handler(CommandHandler("override_conf", override_conf))
     application.add_handler(CommandHandler("reset_conf", reset_conf))
     application.add_handler(CommandHandler("conf_status", conf_status))
@@ -0,0 +1,35 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from benchmarks import run
+from benchmarks.synthetic import SCALES, parse_overrides
+
+
+def test_suite_runs_every_case_on_synthetic_data(tmp_path):
+    scale = parse_overrides(SCALES["small"], ["history_years=1", "tip_days=3"])
+    results = run.run_suite(tmp_path / "ws", scale, rounds=1, warmup=0)
+
+    assert list(results["cases"]) == list(run.cases())
+    for name, stats in results["cases"].items():
+        assert stats["rounds"] == 1 and stats["median_s"] >= 0, name
+        assert stats["rows"] > 0, name
+    assert results["cases"]["inference"]["tips"] > 0
+    assert results["cases"]["odds_merge"]["matched"] > 0
+    assert results["cases"]["realistic_odds"]["matched"] > 0
+
+
+def test_compare_flags_slower_cases():
+    baseline = {"cases": {"a": {"median_s": 1.0}, "b": {"median_s": 0.0001}}}
+    results = {
+        "cases": {
+            "a": {"median_s": 1.5},
+            "b": {"median_s": 0.0003},
+            "c": {"median_s": 0.2},
+        }
+    }
+    rows = {r["case"]: r for r in run.compare(results, baseline, tolerance=0.3)}
+    assert rows["a"]["regressed"] and rows["a"]["change"] == 0.5
+    # Tripled, but by less than min_seconds
+    assert not rows["b"]["regressed"]
+    assert rows["c"]["change"] is None and not rows["c"]["regressed"]
@@ -0,0 +1,69 @@
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from core import calibration
+
+
+def _simulated_state(n_days: int = 20, per_day: int = 30) -> dict:
+    rng = np.random.default_rng(0)
+    state = calibration.empty_counts()
+    for day in range(n_days):
+        conf = rng.uniform(0.5, 1.0, per_day)
+        # model is over-confident: true win rate is half the raw confidence
+        won = rng.uniform(size=per_day) < conf / 2
+        state = calibration.update_counts(state, f"2025-06-{day + 1:02d}", conf, won)
+    return state
+
+
+def test_update_counts_rerun_replaces_day():
+    state = calibration.empty_counts()
+    state = calibration.update_counts(state, "2025-06-01", [0.9, 0.91], [True, False])
+    state = calibration.update_counts(state, "2025-06-01", [0.9], [False])
+    assert sum(state["tips"]) == 1
+    assert sum(state["wins"]) == 0
+
+
+def test_fit_thresholds_and_monotone_mapping(tmp_path):
+    assert calibration.fit_calibration(_simulated_state(1, 10)) is None
+
+    platt = calibration.fit_calibration(_simulated_state(4, 30))
+    assert platt.method == "platt"
+
+    iso = calibration.fit_calibration(_simulated_state())
+    assert iso.method == "isotonic"
+    probs = iso.transform([0.55, 0.75, 0.95])
+    assert np.all(np.diff(probs) >= 0)
+    assert probs[-1] < 0.8
+
+    path = calibration.calibration_path_for(
+        tmp_path / "tipping-monster-xgb-model-x.tar.gz"
+    )
+    assert path.name == "tipping-monster-xgb-model-x.calibration.json"
+    calibration.save_calibration(iso, path)
+    loaded = calibration.load_calibration(path)
+    assert loaded(0.95) == iso(0.95)
+
+
+def test_load_day_without_odds_or_confidence(tmp_path, monkeypatch):
+    from roi import calibrate_confidence_daily as daily
+
+    monkeypatch.setattr(daily, "PRED_DIR", tmp_path / "predictions")
+    monkeypatch.setattr(daily, "RESULT_DIR", tmp_path / "results")
+    (tmp_path / "predictions" / "2025-06-01").mkdir(parents=True)
+    (tmp_path / "results").mkdir()
+    tip = {"race": "1:30 Ascot", "name": "Alpha"}
+    (tmp_path / "predictions" / "2025-06-01" / "tips_with_odds.jsonl").write_text(
+        json.dumps(tip) + "\n"
+    )
+    (tmp_path / "results" / "2025_06_01.csv").write_text(
+        "course,off,horse,pos\nAscot,1:30,Alpha,1\n"
+    )
+
+    day = daily.load_day("2025-06-01")
+    assert len(day) == 1
+    assert day.loc[0, "odds"] == 0 and day.loc[0, "confidence"] == 0
@@ -0,0 +1,162 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import core.dispatch_tips as dispatch_tips
+from tippingmonster.dispatch_journal import DispatchJournal, latest_date
+from utils.ensure_sent_tips import ensure_sent_tips
+
+
+def _tips():
+    return [(f"12:00 Ascot_{n}", {"race": "12:00 Ascot", "name": n}) for n in "ABC"]
+
+
+def test_journal_replays_state_and_ignores_torn_line(tmp_path):
+    journal = DispatchJournal("2025-06-01", tmp_path)
+    assert journal.record_intents(_tips()) == [k for k, _ in _tips()]
+    assert journal.record_intents(_tips()) == []
+    journal.record_send(["12:00 Ascot_A", "12:00 Ascot_B"])
+    journal.record_ack(["12:00 Ascot_A"], message_id=11)
+    with open(journal.path, "a") as f:
+        f.write('{"event": "ack", "key": "12:00 Asc')
+
+    replayed = DispatchJournal("2025-06-01", tmp_path)
+    assert replayed.acked() == ["12:00 Ascot_A"]
+    assert replayed.in_doubt() == ["12:00 Ascot_B"]
+    assert replayed.pending() == ["12:00 Ascot_C"]
+    assert replayed.pending(include_in_doubt=True) == [
+        "12:00 Ascot_B",
+        "12:00 Ascot_C",
+    ]
+    assert [t["name"] for t in replayed.tips()] == ["A", "B", "C"]
+    assert replayed.state()["12:00 Ascot_A"]["message_id"] == 11
+
+
+def test_index_tracks_latest_date(tmp_path):
+    DispatchJournal("2025-06-01", tmp_path).record_intents(_tips())
+    DispatchJournal("2025-06-03", tmp_path).record_intents(_tips()[:1])
+    assert latest_date(tmp_path) == "2025-06-03"
+
+
+class Killed(BaseException):
+    """Stands in for the process dying (SIGKILL, power loss) mid-dispatch."""
+
+
+def _fake_telegram(delivered, kill_after=None, failing=()):
+    """Mimic ``dispatch_messages``: callbacks per message, optional crash.
+
+    With ``kill_after`` the run dies once that many messages have arrived,
+    after the last one reached Telegram but before its receipt came back.
+    """
+
+    def dispatch(messages, token=None, on_send=None, on_receipt=None):
+        receipts = []
+        for index, (chat, text) in enumerate(messages):
+            on_send(index, chat)
+            if chat in failing:
+                receipt = {"chat_id": chat, "ok": False, "error": "blocked"}
+            else:
+                delivered.append((chat, text))
+                if kill_after is not None and len(delivered) >= kill_after:
+                    raise Killed
+                receipt = {"chat_id": chat, "ok": True, "message_id": len(delivered)}
+            receipts.append(receipt)
+            on_receipt(index, receipt)
+        return receipts
+
+    return dispatch
+
+
+def test_send_batched_messages_acks_and_fails(tmp_path, monkeypatch):
+    journal = DispatchJournal("2025-06-01", tmp_path)
+    journal.record_intents(_tips())
+    keys = [k for k, _ in _tips()]
+
+    def fake_send(messages, token=None, on_send=None, on_receipt=None):
+        assert messages == [("c", "a\n\nb"), ("c", "c")]
+        receipts = [
+            {"ok": True, "message_id": 5, "chat_id": "c"},
+            {"ok": False, "error": "boom", "chat_id": "c"},
+        ]
+        for index, receipt in enumerate(receipts):
+            on_send(index, "c")
+            on_receipt(index, receipt)
+        return receipts
+
+    monkeypatch.setattr(dispatch_tips, "dispatch_messages", fake_send)
+    dispatch_tips.send_batched_messages(
+        ["a", "b", "c"], 2, keys=keys, journal=journal, chats=["c"]
+    )
+    assert journal.acked() == keys[:2]
+    assert journal.pending() == keys[2:]
+    assert journal.state()[keys[2]]["error"] == "boom"
+
+
+def test_crash_midway_delivers_nothing_twice(tmp_path, monkeypatch):
+    keys = [k for k, _ in _tips()]
+    texts = ["A", "B", "C"]
+    chats = ["main", "vip"]
+    delivered = []
+
+    journal = DispatchJournal("2025-06-01", tmp_path)
+    journal.record_intents(_tips())
+    monkeypatch.setattr(
+        dispatch_tips, "dispatch_messages", _fake_telegram(delivered, kill_after=4)
+    )
+    try:
+        dispatch_tips.send_batched_messages(
+            texts, 1, keys=keys, journal=journal, chats=chats
+        )
+    except Killed:
+        pass
+    assert len(delivered) == 4
+
+    # A fresh process replays the journal and sends what is left
+    journal = DispatchJournal("2025-06-01", tmp_path)
+    assert journal.doubtful(chats) == [(keys[0], "vip")]
+    monkeypatch.setattr(dispatch_tips, "dispatch_messages", _fake_telegram(delivered))
+    dispatch_tips.send_batched_messages(
+        texts, 1, keys=keys, journal=journal, chats=chats
+    )
+
+    assert sorted(delivered) == sorted((c, t) for c in chats for t in texts)
+    assert journal.acked() == keys[1:]
+    assert journal.in_doubt() == keys[:1]
+
+
+def test_failed_chat_is_retried_alone(tmp_path, monkeypatch):
+    keys = [k for k, _ in _tips()]
+    chats = ["main", "vip"]
+    delivered = []
+    journal = DispatchJournal("2025-06-01", tmp_path)
+    journal.record_intents(_tips())
+
+    monkeypatch.setattr(
+        dispatch_tips, "dispatch_messages", _fake_telegram(delivered, failing={"vip"})
+    )
+    dispatch_tips.send_batched_messages(
+        ["A", "B", "C"], 2, keys=keys, journal=journal, chats=chats
+    )
+    assert journal.undelivered(chats) == [(k, "vip") for k in keys]
+
+    monkeypatch.setattr(dispatch_tips, "dispatch_messages", _fake_telegram(delivered))
+    dispatch_tips.send_batched_messages(
+        ["A", "B", "C"], 2, keys=keys, journal=journal, chats=chats
+    )
+    assert delivered == [
+        ("main", "A\n\nB"),
+        ("main", "C"),
+        ("vip", "A\n\nB"),
+        ("vip", "C"),
+    ]
+    assert journal.acked() == keys
+    assert journal.state()[keys[0]]["chats"]["vip"]["status"] == "ack"
+
+
+def test_ensure_sent_tips_rebuilds_from_journal(tmp_path):
+    dispatch = tmp_path / "dispatch"
+    DispatchJournal("2025-06-01", dispatch).record_intents(_tips())
+    sent = ensure_sent_tips("2025-06-01", tmp_path / "predictions", dispatch)
+    assert sent == dispatch / "sent_tips_2025-06-01.jsonl"
+    assert len(sent.read_text().splitlines()) == 3
@@ -187,3 +187,8 @@ def test_filter_tips_by_course():
     ]
     out = filter_tips_by_course(tips, "Ascot")
     assert len(out) == 2
+
+
+def test_should_skip_by_roi_uses_calibrated_value():
+    assert not should_skip_by_roi(0.75, {}, 0.80, calibrated=0.30, odds=4.0)
+    assert should_skip_by_roi(0.75, {}, 0.80, calibrated=0.20, odds=4.0)
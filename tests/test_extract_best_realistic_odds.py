@@ -30,3 +30,9 @@ def test_extract_race_key_bad_time_returns_none():
 def test_extract_race_key_empty_course_returns_none():
     minutes, course = extract_race_key("15:30   ")
     assert minutes is None and course is None
+
+
+def test_extract_race_key_reads_racecard_times_as_afternoon():
+    minutes, course = extract_race_key("1:30 Ascot")
+    assert minutes == 13 * 60 + 30
+    assert course == "ascot"
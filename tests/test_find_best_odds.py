@@ -1,5 +1,5 @@
-import os
 import json
+import os
 import sys
 from pathlib import Path
 
@@ -19,9 +19,24 @@ def test_find_best_odds_from_earlier_snapshots(tmp_path):
     snap_dir.mkdir()
     date = "2025-06-07"
 
-    write_snapshot(snap_dir, date, "0930", [{"race": "10:00 Chelmsford", "horse": "My Horse", "price": 5.0}])
-    write_snapshot(snap_dir, date, "0945", [{"race": "10:00 Chelmsford", "horse": "My Horse", "price": 4.5}])
-    write_snapshot(snap_dir, date, "1005", [{"race": "10:00 Chelmsford", "horse": "My Horse", "price": 4.0}])
+    write_snapshot(
+        snap_dir,
+        date,
+        "0930",
+        [{"race": "10:00 Chelmsford", "horse": "My Horse", "price": 5.0}],
+    )
+    write_snapshot(
+        snap_dir,
+        date,
+        "0945",
+        [{"race": "10:00 Chelmsford", "horse": "My Horse", "price": 4.5}],
+    )
+    write_snapshot(
+        snap_dir,
+        date,
+        "1005",
+        [{"race": "10:00 Chelmsford", "horse": "My Horse", "price": 4.0}],
+    )
 
     os.chdir(tmp_path)
     snapshots = load_snapshots(date)
@@ -34,8 +49,34 @@ def test_find_best_odds_returns_none_when_missing(tmp_path):
     snap_dir.mkdir()
     date = "2025-06-07"
 
-    write_snapshot(snap_dir, date, "0930", [{"race": "10:00 Chelmsford", "horse": "Other Horse", "price": 5.0}])
+    write_snapshot(
+        snap_dir,
+        date,
+        "0930",
+        [{"race": "10:00 Chelmsford", "horse": "Other Horse", "price": 5.0}],
+    )
     os.chdir(tmp_path)
     snapshots = load_snapshots(date)
     odds = find_best_odds(10 * 60, "chelmsford", "my horse", snapshots)
     assert odds is None
+
+
+def test_find_best_odds_reads_betfair_snapshot_format(tmp_path):
+    snap_dir = tmp_path / "odds_snapshots"
+    snap_dir.mkdir()
+    date = "2025-06-07"
+
+    # fetch_betfair_odds labels races "Course HH:MM" and stores the price as bf_sp
+    write_snapshot(
+        snap_dir,
+        date,
+        "0930",
+        [
+            {"race": "Chelmsford City 10:00", "horse": "My Horse", "bf_sp": 6.0},
+            {"race": "Ascot 10:00", "horse": "Other Horse", "bf_sp": 3.0},
+        ],
+    )
+    os.chdir(tmp_path)
+    snapshots = load_snapshots(date)
+    assert find_best_odds(10 * 60, "chelmsford city", "my horse", snapshots) == 6.0
+    assert find_best_odds(10 * 60, "ascot", "my horse", snapshots) is None
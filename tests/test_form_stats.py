@@ -0,0 +1,98 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from core.form_stats import FormStats
+from trainer_intent_profiler import load_trainer_form
+
+
+def _results(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 120, n), "D")
+    return pd.DataFrame(
+        {
+            "date": dates.strftime("%Y-%m-%d"),
+            "trainer": rng.choice(["A", "B", "C"], n),
+            "jockey": rng.choice(["J", "K"], n),
+            "course": rng.choice(["Ascot", "York"], n),
+            "pos": rng.choice(["1", "2", "3", "4", "PU"], n),
+            "dec": rng.uniform(1.5, 10, n).round(2),
+            "ran": 8,
+            "race_name": "Maiden",
+        }
+    )
+
+
+def _brute(results, trainer, course, date, days):
+    end = pd.Timestamp(date) - pd.Timedelta(days=1)
+    d = pd.to_datetime(results["date"])
+    rows = results[
+        (results["trainer"] == trainer)
+        & (results["course"] == course)
+        & (d <= end)
+        & (d > end - pd.Timedelta(days=days))
+    ]
+    wins = rows["pos"] == "1"
+    return len(rows), int(wins.sum()), float(np.where(wins, rows["dec"] - 1, -1).sum())
+
+
+def test_attach_matches_brute_force_windows():
+    results = _results()
+    stats = FormStats.from_results(results)
+    runners = pd.DataFrame(
+        {
+            "date": ["2025-02-15", "2025-03-30", "2025-05-01", "2024-12-01"],
+            "trainer": ["A", "B", "C", "A"],
+            "jockey": ["J", "K", "J", "K"],
+            "course": ["Ascot", "York", "Ascot", "York"],
+        }
+    )
+    out = stats.attach(runners)
+    for i, row in runners.iterrows():
+        for w in (14, 30, 90):
+            runs, wins, profit = _brute(results, row.trainer, row.course, row.date, w)
+            assert out.loc[i, f"trainer_course_{w}d_runs"] == runs
+            assert out.loc[i, f"trainer_course_{w}d_wins"] == wins
+            assert np.isclose(out.loc[i, f"trainer_course_{w}d_profit"], profit)
+    assert out.loc[3, "trainer_90d_runs"] == 0
+
+
+def test_update_matches_rebuild_and_feeds_profiler(tmp_path):
+    results = _results()
+    early = results[results["date"] < "2025-03-01"]
+    late = results[results["date"] >= "2025-03-01"]
+
+    incremental = FormStats.from_results(early).update(late)
+    full = FormStats.from_results(results)
+    for name, table in full.tables.items():
+        pd.testing.assert_frame_equal(incremental.tables[name], table)
+
+    incremental.save(tmp_path)
+    form = load_trainer_form("unused", "2025-04-30", 30, form_dir=tmp_path)
+    snap = FormStats.load(tmp_path).snapshot("trainer", "2025-04-30", 30)
+    assert form == dict(zip(snap["trainer"], snap["win_pct"]))
+
+    window = results[
+        (results["date"] >= "2025-04-01") & (results["date"] <= "2025-04-30")
+    ]
+    a = window[window["trainer"] == "A"]
+    assert snap.set_index("trainer").loc["A", "runs"] == len(a)
+
+
+def test_snapshot_window_is_exactly_days_long():
+    dates = ["2025-03-31", "2025-04-01", "2025-04-30", "2025-05-01"]
+    results = pd.DataFrame(
+        {"date": dates, "trainer": "A", "jockey": "J", "course": "Ascot",
+         "pos": "1", "dec": 2.0, "ran": 8, "race_name": "Maiden"}
+    )  # fmt: skip
+    stats = FormStats.from_results(results)
+
+    snap = stats.snapshot("trainer", "2025-04-30", 30)
+    assert snap.loc[0, "runs"] == 2  # 04-01 .. 04-30
+    before = stats.snapshot("trainer", "2025-04-30", 30, inclusive=False)
+    assert before.loc[0, "runs"] == 2  # 03-31 .. 04-29
+    assert stats.snapshot("trainer", "2025-04-30", 1).loc[0, "runs"] == 1
@@ -0,0 +1,172 @@
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from core.horse_form import FEATURES, HorseForm
+
+
+def _results(n=400, seed=1):
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp("2024-01-01") + pd.to_timedelta(
+        rng.choice(730, n, replace=False), "D"
+    )
+    return pd.DataFrame(
+        {
+            "date": dates.strftime("%Y-%m-%d"),
+            "horse": rng.choice(["Alpha (IRE)", "Bravo", "Charlie (FR)"], n),
+            "course": rng.choice(["Ascot", "York"], n),
+            "dist_f": rng.choice(["5f", "8f", "12f", "16f"], n),
+            "going": rng.choice(["Good", "Soft", "Standard"], n),
+            "pos": rng.choice(["1", "2", "5", "PU"], n),
+            "rpr": rng.choice(["80", "95", "", "110"], n),
+            "ovr_btn": rng.uniform(0, 20, n).round(1),
+        }
+    )
+
+
+def _brute(results, i):
+    row = results.loc[i]
+    d = pd.to_datetime(results["date"])
+    prev = results[(results["horse"] == row.horse) & (d < d[i])]
+    prev = prev.iloc[np.argsort(pd.to_datetime(prev["date"]).to_numpy(), kind="stable")]
+    rpr = pd.to_numeric(prev["rpr"], errors="coerce")
+    same_band = prev["dist_f"] == row.dist_f
+    return {
+        "hf_runs": len(prev),
+        "hf_wins": int((prev["pos"] == "1").sum()),
+        "hf_rpr_mean_3": rpr.iloc[-3:].mean(),
+        "hf_best_rpr_band": rpr[same_band].max(),
+        "hf_course_wins": int(
+            ((prev["pos"] == "1") & (prev["course"] == row.course)).sum()
+        ),
+        "hf_days_since": (
+            (d[i] - pd.to_datetime(prev["date"]).max()).days if len(prev) else np.nan
+        ),
+    }
+
+
+def test_features_are_lagged_and_match_brute_force():
+    results = _results()
+    feats = HorseForm.from_results(results).features()
+    assert list(feats.columns) == FEATURES
+    for i in range(0, len(results), 37):
+        expected = _brute(results, i)
+        for name, value in expected.items():
+            got = feats.loc[i, name]
+            assert (np.isnan(value) and np.isnan(got)) or np.isclose(got, value), (
+                i,
+                name,
+            )
+
+
+def test_runner_features_use_only_earlier_runs_and_update_incrementally():
+    results = _results()
+    cutoff = "2024-07-01"
+    form = HorseForm.from_results(results[results["date"] < cutoff])
+    form.update(results[results["date"] >= cutoff])
+    full = HorseForm.from_results(results)
+
+    def by_run(hf):
+        feats = pd.concat([hf.history[["key", "day"]], hf.features()], axis=1)
+        return feats.sort_values(["key", "day"]).reset_index(drop=True)
+
+    pd.testing.assert_frame_equal(by_run(form), by_run(full), check_dtype=False)
+
+    runners = pd.DataFrame(
+        {
+            "date": ["2024-07-01", "2025-01-05"],
+            "name": ["Alpha", "Bravo"],
+            "course": ["Ascot", "York"],
+            "distance_f": [8.0, 12.0],
+            "going": ["Good", "Soft"],
+        }
+    )
+    card = form.for_runners(runners)
+    earlier = HorseForm.from_results(results[results["date"] < "2024-07-01"])
+    alpha = earlier.for_runners(runners.iloc[:1])
+    pd.testing.assert_frame_equal(card.iloc[:1], alpha)
+    bravo = (results["horse"] == "Bravo") & (results["date"] < "2025-01-05")
+    assert card.loc[1, "hf_runs"] == bravo.sum()
+
+
+def test_flatten_racecard_attaches_history(tmp_path):
+    from core.flatten_racecards_v3 import flatten_racecard
+
+    card = {
+        "GB": {
+            "Ascot": {
+                "14:00": {
+                    "course": "Ascot",
+                    "date": "2024-07-01",
+                    "distance_f": 8.0,
+                    "going": "Good",
+                    "runners": [{"name": "Alpha"}, {"name": "Nobody"}],
+                }
+            }
+        }
+    }
+    path = tmp_path / "card.json"
+    path.write_text(json.dumps(card))
+    results = _results()
+    rows = flatten_racecard(
+        path, HorseForm.from_results(results[results["date"] < "2024-07-01"])
+    )
+    alpha = (results["horse"] == "Alpha (IRE)") & (results["date"] < "2024-07-01")
+    assert rows[0]["hf_runs"] == alpha.sum()
+    assert rows[1]["hf_runs"] == 0 and rows[1]["hf_last_rpr"] == -1
+
+
+def test_mixed_id_and_name_sources_share_history():
+    results = _results()
+    earlier = results[results["date"] < "2024-07-01"]
+    names_only = HorseForm.from_results(earlier)
+    with_ids = earlier.assign(horse_id=earlier["horse"].map({"Bravo": 7}))
+    runners = pd.DataFrame(
+        {
+            "date": ["2024-07-01", "2024-07-01"],
+            "name": ["Alpha", "Bravo"],
+            "horse_id": [101, 7],
+            "course": ["Ascot", "York"],
+            "distance_f": [8.0, 12.0],
+            "going": ["Good", "Soft"],
+        }
+    )
+    expected = names_only.for_runners(runners.drop(columns="horse_id"))
+    for form in (names_only, HorseForm.from_results(with_ids)):
+        card = form.for_runners(runners)
+        pd.testing.assert_frame_equal(card, expected)
+    assert (card["hf_runs"] > 0).all()
+
+
+def test_same_named_horses_stay_apart_when_ids_are_known():
+    days = ["2025-01-01", "2025-02-01", "2025-03-01"]
+    legacy = pd.DataFrame({"date": days[:1], "horse": ["Echo (IRE)"], "pos": ["1"]})
+    results = pd.DataFrame(
+        {
+            "date": days[1:] * 2,
+            "horse": ["Echo (IRE)", "Echo (IRE)", "Echo (GB)", "Echo (GB)"],
+            "horse_id": [1, 1, 2, 2],
+            "pos": ["1", "1", "9", "9"],
+        }
+    )
+    form = HorseForm.from_results(legacy).update(results.iloc[[0, 2]])
+    # Both Echos ran on the same day; neither replaces the other
+    assert len(form.history) == 3
+    form.update(results.iloc[[1, 3]])
+    runners = pd.DataFrame(
+        {"date": ["2025-04-01"] * 2, "name": ["Echo", "Echo"], "horse_id": [1, 2]}
+    )
+    card = form.for_runners(runners)
+    # The id-less run is ambiguous once two ids share the name, so it is not
+    # credited to either horse
+    assert list(card["hf_runs"]) == [2, 2]
+    assert list(card["hf_wins"]) == [2, 0]
+
+    # With a single id for the name, the legacy run links to that horse
+    single = HorseForm.from_results(legacy).update(results.iloc[[0, 1]])
+    assert single.for_runners(runners.iloc[:1]).loc[0, "hf_runs"] == 3
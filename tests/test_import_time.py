@@ -0,0 +1,66 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Modules that must stay out of lightweight imports
+HEAVY = ("matplotlib", "pandas", "requests", "shap", "sklearn", "xgboost")
+
+# Cumulative import time budget (ms) as reported by ``python -X importtime``.
+# The SHAP/XGBoost stack alone costs ~2s, so these catch it creeping back in.
+# Timings depend on the machine and on warm caches, so they are only checked
+# with TM_IMPORT_BUDGETS=1.
+CHECK_BUDGETS = os.getenv("TM_IMPORT_BUDGETS") == "1"
+BUDGETS = {
+    "tippingmonster": 300,
+    "tippingmonster.pipeline": 400,
+    "cli.tmcli": 600,
+    "telegram_bot": 1000,
+}
+
+
+def _import(module: str) -> tuple[int, list[str]]:
+    code = (
+        f"import sys, json, {module}; "
+        f"print(json.dumps([m for m in {HEAVY!r} if m in sys.modules]))"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    micros = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        if name.strip() == module:
+            micros = int(cumulative)
+    return micros // 1000, json.loads(proc.stdout)
+
+
+@pytest.mark.parametrize("module", sorted(BUDGETS))
+def test_import_stays_light(module):
+    if module == "telegram_bot":
+        pytest.importorskip("telegram")
+    millis, loaded = _import(module)
+    assert loaded == [], f"{module} imports {loaded} at load time"
+    if CHECK_BUDGETS:
+        assert millis <= BUDGETS[module], f"{module} took {millis}ms to import"
+
+
+def test_lazy_attributes_resolve():
+    import tippingmonster
+
+    assert sorted(tippingmonster.__all__) == sorted(tippingmonster._EXPORTS)
+    assert callable(tippingmonster.logs_path)
+    assert "generate_chart" in dir(tippingmonster)
+    with pytest.raises(AttributeError):
+        tippingmonster.no_such_name
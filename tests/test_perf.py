@@ -0,0 +1,106 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from cli import tmcli
+from tippingmonster import perf
+from tippingmonster.pipeline import Context, Pipeline, Stage, StageError
+
+
+def test_measure_timed_and_count(tmp_path, monkeypatch):
+    metrics = tmp_path / "stages.jsonl"
+    monkeypatch.setenv("TM_PERF_LOG", str(metrics))
+
+    @perf.timed("flatten", pipeline="adhoc")
+    def flatten():
+        return [1, 2, 3]
+
+    assert flatten() == [1, 2, 3]
+    with perf.measure("roi", pipeline="adhoc") as sample:
+        perf.count(7)
+    with pytest.raises(ValueError):
+        with perf.measure("boom"):
+            raise ValueError
+
+    first, second, third = perf.load()
+    assert (first["stage"], first["rows"], first["pipeline"]) == ("flatten", 3, "adhoc")
+    assert second["rows"] == 7 and sample.metric == second
+    assert third["status"] == "failed"
+    assert first["wall_s"] >= 0 and first["cpu_s"] >= 0
+    assert first["peak_rss_mb"] > 0
+
+
+def test_pipeline_records_stage_metrics_and_total(tmp_path):
+    pipe = Pipeline(
+        "p",
+        [
+            Stage(
+                "flatten", lambda ctx: [{"race": "1:30 Ascot"}, {"race": "12:45 York"}]
+            ),
+            Stage("fail", lambda ctx: sys.exit(2), after=("flatten",)),
+        ],
+        summary=lambda ctx: {
+            "first_race": perf.first_race(r["race"] for r in ctx.outputs["flatten"])
+        },
+    )
+    ctx = Context(date="2025-06-01", root=tmp_path)
+    with pytest.raises(StageError):
+        pipe.run(ctx)
+    pipe.run(ctx, resume=True, only=["flatten"])
+
+    samples = perf.load(tmp_path / "logs" / "perf" / "stages.jsonl")
+    assert [(m["stage"], m["status"]) for m in samples] == [
+        ("flatten", "ok"),
+        ("fail", "failed"),
+        ("total", "failed"),
+        ("flatten", "ok"),
+        ("total", "ok"),
+    ]
+    assert samples[0]["rows"] == 2 and samples[0]["date"] == "2025-06-01"
+    assert samples[-1]["first_race"] == "12:45"
+    assert pipe.load_state(ctx)["stages"]["flatten"]["rows"] == 2
+
+
+def test_report_flags_day_over_day_regressions(tmp_path, capsys):
+    path = tmp_path / "stages.jsonl"
+    days = [("2025-06-01", 10.0, "09:05"), ("2025-06-02", 20.0, "09:40")]
+    for day, wall, finished in days:
+        for stage, seconds in (("inference", wall), ("merge", 0.5)):
+            perf.record(
+                {
+                    "pipeline": "morning",
+                    "date": day,
+                    "stage": stage,
+                    "status": "ok",
+                    "wall_s": seconds,
+                    "ts": f"{day}T09:00:00",
+                },
+                path,
+            )
+        perf.record(
+            {
+                "pipeline": "morning",
+                "date": day,
+                "stage": "total",
+                "status": "ok",
+                "wall_s": wall + 1,
+                "finished": finished,
+                "first_race": "12:15",
+                "ts": f"{day}T09:10:00",
+            },
+            path,
+        )
+
+    rows = perf.report(perf.load(path), days=1)
+    by_stage = {r["stage"]: r for r in rows}
+    assert {r["date"] for r in rows} == {"2025-06-02"}
+    assert by_stage["inference"]["change"] == 1.0 and by_stage["inference"]["regressed"]
+    assert not by_stage["merge"]["regressed"]
+    assert by_stage["total"]["margin_min"] == 155
+
+    with pytest.raises(SystemExit):
+        tmcli.main(["perf", "--file", str(path), "--days", "1", "--fail"])
+    out = capsys.readouterr().out
+    assert "inference" in out and "▲" in out and "155 min margin" in out
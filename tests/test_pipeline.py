@@ -0,0 +1,223 @@
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from core import merge_odds_into_tips
+from tippingmonster.pipeline import (
+    MORNING,
+    NIGHTLY,
+    Context,
+    Pipeline,
+    Stage,
+    StageError,
+    backfill,
+    call_main,
+    update_tip_index,
+)
+
+
+def test_order_follows_dependencies_then_declaration():
+    noop = lambda ctx: None  # noqa: E731
+    pipe = Pipeline(
+        "t",
+        [
+            Stage("c", noop, after=("b",)),
+            Stage("a", noop),
+            Stage("b", noop, after=("a",)),
+            Stage("d", noop, after=("a",)),
+        ],
+    )
+    assert pipe.names() == ["a", "b", "c", "d"]
+    # Odds wait on the market, not on inference; nightly ROI waits on results
+    assert MORNING.stages["odds"].after == () and MORNING.stages["odds"].ready
+    assert NIGHTLY.stages["realistic_odds"].after == ("results",)
+    with pytest.raises(ValueError, match="cycle"):
+        Pipeline("t", [Stage("a", noop, after=("b",)), Stage("b", noop, after=("a",))])
+    with pytest.raises(ValueError, match="unknown"):
+        Pipeline("t", [Stage("a", noop, after=("x",))])
+
+
+def test_run_shares_outputs_records_timings_and_resumes(tmp_path):
+    calls = []
+    fail = {"merge": True}
+
+    def odds(ctx):
+        calls.append("odds")
+        return [{"race": "1:00 Ascot", "horse": "Alpha", "bf_sp": 4.0}]
+
+    def merge(ctx):
+        calls.append("merge")
+        if fail["merge"]:
+            sys.exit(1)
+        print("merged")
+        return len(ctx.outputs["odds"])
+
+    pipe = Pipeline(
+        "test",
+        [
+            Stage("odds", odds),
+            Stage("skip", lambda ctx: calls.append("skip"), when=lambda ctx: False),
+            Stage("merge", merge, after=("odds",), log="{logs}/merge_{date}.log"),
+        ],
+    )
+    ctx = Context(date="2025-06-01", root=tmp_path)
+    with pytest.raises(StageError) as exc:
+        pipe.run(ctx)
+    assert exc.value.stage == "merge"
+    state = pipe.load_state(ctx)["stages"]
+    assert [state[n]["status"] for n in ("odds", "skip", "merge")] == [
+        "ok",
+        "skipped",
+        "failed",
+    ]
+    assert state["odds"]["seconds"] >= 0
+
+    fail["merge"] = False
+    record = pipe.run(ctx, resume=True)
+    assert calls == ["odds", "merge", "merge"]
+    assert ctx.outputs["merge"] == 1
+    assert record["stages"]["odds"]["status"] == "ok"
+    assert record["stages"]["merge"]["status"] == "ok"
+    assert "merged" in (tmp_path / "logs" / "merge_2025-06-01.log").read_text()
+    assert Path.cwd() != tmp_path
+
+
+def test_ready_triggers_concurrency_retries_and_backfill(tmp_path):
+    events = []
+    flaky = {"left": 1}
+    marker = tmp_path / "results.csv"
+
+    def slow(ctx):
+        events.append("slow:start")
+        # Written while "slow" still runs; "wait" must start only after it
+        marker.write_text("x")
+        time.sleep(0.2)
+        events.append("slow:end")
+
+    def wait_for_file(ctx):
+        events.append("wait")
+
+    def retry(ctx):
+        events.append("retry")
+        if flaky["left"]:
+            flaky["left"] -= 1
+            raise RuntimeError("transient")
+
+    pipe = Pipeline(
+        "dag",
+        [
+            Stage("slow", slow, log="{logs}/slow.log"),
+            Stage("wait", wait_for_file, ready=lambda ctx: marker.exists()),
+            Stage("retry", retry, after=("wait",), retries=1, retry_delay=0),
+        ],
+    )
+    ctx = Context(date="2025-06-01", root=tmp_path)
+    record = pipe.run(ctx, workers=2, poll=0.01)
+    assert events.index("wait") < events.index("slow:end")
+    assert events.count("retry") == 2
+    assert record["stages"]["retry"]["attempt"] == 2
+    assert {e["status"] for e in record["stages"].values()} == {"ok"}
+
+    never = Pipeline("never", [Stage("x", lambda ctx: None, ready=lambda ctx: False)])
+    with pytest.raises(StageError, match="not ready"):
+        never.run(ctx, poll=0.01, ready_timeout=0.05)
+
+    calls = []
+    days = Pipeline("days", [Stage("a", lambda ctx: calls.append(ctx.date))])
+    results = backfill(days, "2025-06-01", "2025-06-03", root=tmp_path, poll=0.01)
+    assert list(results) == ["2025-06-01", "2025-06-02", "2025-06-03"]
+    # A repeated backfill skips the days already complete
+    backfill(days, "2025-06-01", "2025-06-03", root=tmp_path, poll=0.01)
+    assert calls == ["2025-06-01", "2025-06-02", "2025-06-03"]
+
+
+def test_call_main_and_in_memory_merge(tmp_path, monkeypatch):
+    (tmp_path / "exits.py").write_text(
+        "import sys\ndef main(argv):\n    sys.exit(int(argv[0]))\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    assert call_main("exits", ["0"]) is None
+    with pytest.raises(subprocess.CalledProcessError):
+        call_main("exits", ["2"])
+
+    monkeypatch.chdir(tmp_path)
+    tips = [
+        {"race": "13:00 Ascot", "name": "Alpha", "confidence": 0.8},
+        {"race": "14:00 York", "name": "Beta", "confidence": 0.7},
+    ]
+    odds = [{"race": "Ascot 13:00", "horse": "ALPHA ", "bf_sp": 4.0}]
+    merged = merge_odds_into_tips.main(["--date", "2025-06-01"], tips=tips, odds=odds)
+    assert [(t["name"], t["bf_sp"], t["value_score"]) for t in merged] == [
+        ("Alpha", 4.0, 20.0)
+    ]
+    written = tmp_path / "predictions" / "2025-06-01" / "tips_with_odds.jsonl"
+    assert [json.loads(line)["name"] for line in written.read_text().splitlines()] == [
+        "Alpha"
+    ]
+
+
+def test_tip_index_stage_indexes_the_roi_results(tmp_path, monkeypatch):
+    from tippingmonster import tip_index
+
+    day = "2025-06-01"
+    pred = tmp_path / "predictions" / day
+    pred.mkdir(parents=True)
+    nap = {"race": "13:00 Ascot", "name": "Alpha", "tags": ["🧠 Monster NAP"]}
+    (pred / "tips_with_odds.jsonl").write_text(json.dumps(nap) + "\n")
+    roi = tmp_path / "logs" / "roi"
+    roi.mkdir(parents=True)
+    (roi / f"tips_results_{day}_advised.csv").write_text(
+        "Horse,Position,Profit,Stake\nAlpha,1,3.0,1.0\n"
+    )
+    db = tmp_path / "index.sqlite"
+    monkeypatch.setenv("TM_TIP_INDEX", str(db))
+
+    update_tip_index(Context(date=day, root=tmp_path))
+    conn = tip_index.connect(db)
+    try:
+        assert tip_index.recent_naps(conn) == [
+            {"date": day, "horse": "Alpha", "position": 1, "profit": 3.0, "stake": 1.0}
+        ]
+    finally:
+        conn.close()
+
+
+def test_results_store_stage_is_separate_and_non_fatal(monkeypatch, capsys):
+    from tippingmonster import pipeline
+
+    for name in ("results_store", "form_stats", "horse_form"):
+        assert NIGHTLY.stages[name].after == ("results",)
+        assert NIGHTLY.stages[name].retries == 0
+        assert all(name not in s.after for s in NIGHTLY.stages.values())
+    stage = NIGHTLY.stages["results_store"]
+
+    calls = []
+
+    def failing(module, argv):
+        calls.append((module, argv))
+        raise subprocess.CalledProcessError(1, [module])
+
+    monkeypatch.setattr(pipeline, "call_main", failing)
+    ctx = Context(date="2025-06-01", root=Path("/repo"), dev=True)
+    stage.run(ctx)
+    assert calls == [
+        (
+            "tippingmonster.results_store",
+            ["ingest", "/repo/rpscrape/data/dates/all/2025_06_01.csv"],
+        )
+    ]
+    assert "⚠️ tippingmonster.results_store update failed" in capsys.readouterr().out
+
+    monkeypatch.setattr(pipeline, "call_main", lambda *a: calls.append(a))
+    NIGHTLY.stages["form_stats"].run(ctx)
+    assert calls[-1] == (
+        "core.form_stats",
+        ["update", "/repo/rpscrape/data/dates/all/2025_06_01.csv"],
+    )
+    NIGHTLY.stages["horse_form"].run(ctx)
+    assert calls[-1][0] == "core.horse_form"
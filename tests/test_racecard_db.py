@@ -0,0 +1,90 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from tippingmonster import racecard_db
+
+
+def _runner(horse_id, name, trainer_id=5, trainer="T Smith"):
+    return {
+        "horse_id": horse_id,
+        "name": name,
+        "age": 4,
+        "number": horse_id,
+        "draw": "3",
+        "lbs": 130,
+        "ofr": "85",
+        "headgear": "",
+        "trainer": trainer,
+        "trainer_id": trainer_id,
+        "jockey": "J Doe",
+        "jockey_id": 9,
+        "form": "1-23",
+        "trainer_14_days": {"runs": 10, "wins": 2, "percent": 20},
+        "stats": {
+            "course": {"runs": "3", "wins": "1"},
+            "trainer": {"ovr_wins_pct": "14%", "ovr_profit": "+2.50"},
+        },
+    }
+
+
+def _card(date, race_id, runners):
+    race = {
+        "race_id": race_id,
+        "date": date,
+        "course": "Ascot",
+        "off_time": "2:30",
+        "region": "GB",
+        "distance_f": "8.0",
+        "field_size": len(runners),
+        "going": "Good",
+        "runners": runners,
+    }
+    return {"GB": {"Ascot": {"2:30": race}}}
+
+
+def test_ingest_is_idempotent_and_drops_withdrawn_runners():
+    conn = racecard_db.connect(":memory:")
+    card = _card("2025-06-01", 100, [_runner(1, "Alpha"), _runner(2, "Bravo")])
+    assert racecard_db.ingest_card(conn, card) == (1, 2)
+    assert racecard_db.ingest_card(conn, card) == (1, 2)
+    assert conn.execute("SELECT COUNT(*) FROM runners").fetchone()[0] == 2
+
+    racecard_db.ingest_card(conn, _card("2025-06-01", 100, [_runner(1, "Alpha")]))
+    rows = racecard_db.runners_on(conn, "2025-06-01")
+    assert [r["name"] for r in rows] == ["Alpha"]
+    row = rows[0]
+    assert (row["draw"], row["ofr"], row["headgear"]) == (3, 85, None)
+    assert (row["trainer_win_pct"], row["trainer_profit"]) == (14.0, 2.5)
+    assert (row["course_runs"], row["course_wins"], row["trainer_14d_runs"]) == (
+        3,
+        1,
+        10,
+    )
+
+
+def test_history_queries_use_indexes():
+    conn = racecard_db.connect(":memory:")
+    racecard_db.ingest_card(conn, _card("2025-05-01", 90, [_runner(1, "Alpha")]))
+    racecard_db.ingest_card(
+        conn, _card("2025-06-01", 100, [_runner(1, "Alpha", 6, "A Jones")])
+    )
+
+    history = racecard_db.horse_history(conn, 1)
+    assert [h["race_id"] for h in history] == [100, 90]
+    assert [h["race_id"] for h in racecard_db.horse_history(conn, 1, "2025-06-01")] == [
+        90
+    ]
+    assert [t["trainer"] for t in racecard_db.prior_trainers(conn, 1)] == [
+        "A Jones",
+        "T Smith",
+    ]
+    assert [
+        r["date"] for r in racecard_db.find_runner(conn, "alpha ", "2025-06-01")
+    ] == ["2025-06-01"]
+
+    plan = conn.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM runners WHERE horse_id = 1"
+    ).fetchall()
+    assert "runners_horse" in " ".join(str(tuple(row)) for row in plan)
@@ -0,0 +1,72 @@
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parents[1] / "rpscrape" / "scripts"
+
+# racecards.py imports rpscrape's own ``utils`` package, so run it from its
+# scripts directory in a separate interpreter.
+SNIPPET = textwrap.dedent(
+    """
+    import json, sys, threading, time
+    import racecards
+
+    partial = sys.argv[1]
+    urls = [f"https://x/racecards/1/a/2025-06-01/{n}" for n in range(4)]
+    with open(partial, "w") as f:
+        race = {"region": "GB", "course": "A", "off_time": "0:00", "runners": []}
+        f.write(json.dumps({"url": urls[0], "race": race}) + "\\n")
+        f.write('{"url": "torn')
+
+    built = []
+
+    def fake_build(session, url, going_info, executor=None):
+        n = int(url.rsplit("/", 1)[1])
+        time.sleep(0.05 * (4 - n))
+        built.append(url)
+        if n == 3:
+            return None
+        return {"region": "GB", "course": "A", "off_time": f"{n}:00", "runners": []}
+
+    racecards.build_race = fake_build
+    racecards.get_going_info = lambda session, date: {}
+    races = racecards.parse_races(None, urls, "2025-06-01", partial)
+
+    assert sorted(built) == urls[1:], built
+    assert list(races["GB"]["A"]) == ["0:00", "1:00", "2:00"], races
+    resumed = racecards.load_partial(partial)
+    assert sorted(resumed) == urls[:3], resumed
+
+    active = {"now": 0, "max": 0}
+    lock = threading.Lock()
+
+    class Session:
+        def get(self, url, headers=None):
+            with lock:
+                active["now"] += 1
+                active["max"] = max(active["max"], active["now"])
+            time.sleep(0.05)
+            with lock:
+                active["now"] -= 1
+            return type("R", (), {"content": b"<html><body></body></html>"})
+
+    profiles = [f"https://x/profile/horse/{n}/h-{n}/form" for n in range(8)]
+    with racecards.ThreadPoolExecutor(4) as pool:
+        runners = racecards.get_runners(Session(), profiles, pool)
+    assert list(runners) == list(range(8))
+    assert active["max"] > 1
+    print("ok")
+    """
+)
+
+
+def test_parse_races_resumes_and_fetches_concurrently(tmp_path):
+    result = subprocess.run(
+        [sys.executable, "-c", SNIPPET, str(tmp_path / "card.partial.jsonl")],
+        cwd=SCRIPTS_DIR,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().endswith("ok")
@@ -0,0 +1,98 @@
+import importlib.util
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from tippingmonster.results_store import LocalRemote, ResultsStore, load_history
+
+ROOT = Path(__file__).resolve().parents[1]
+COLUMNS = ["date", "region", "course", "off", "race_id", "horse_id", "horse", "pos"]
+
+
+def _day(path, rows):
+    pd.DataFrame(rows, columns=COLUMNS).to_csv(path, index=False)
+    return path
+
+
+def test_ingest_appends_dedupes_and_skips_seen_files(tmp_path):
+    store = ResultsStore(tmp_path / "store")
+    history = _day(
+        tmp_path / "gb-flat-2015-2025.csv",
+        [
+            ["2024-12-31", "GB", "Ascot", "1:00", None, None, "Alpha (IRE)", 1],
+            ["2025-06-01", "GB", "Ascot", "2:00", None, None, "Bravo", 1],
+        ],
+    )
+    day = _day(
+        tmp_path / "2025_06_01.csv",
+        [
+            ["2025-06-01", "GB", "Ascot", "2:00", 9, 7, "Bravo", 1],
+            ["2025-06-01", "IRE", "Naas", "3:00", 10, 8, "Charlie", 2],
+        ],
+    )
+
+    assert store.ingest([history]) == {"gb/2024": 1, "gb/2025": 1}
+    assert store.ingest([history, day]) == {"gb/2025": 0, "ire/2025": 1}
+    assert store.ingest([day]) == {}
+
+    gb = store.read_partition("gb/2025")
+    assert gb["race_id"].tolist() == [9]
+    manifest = store.manifest("gb/2025")
+    assert manifest["rows"] == 1 and manifest["sources"] == [
+        "2025_06_01.csv",
+        "gb-flat-2015-2025.csv",
+    ]
+    assert store.manifest("ire/2025")["sources"] == ["2025_06_01.csv"]
+
+    df = store.load()
+    assert sorted(df["horse"]) == ["Alpha (IRE)", "Bravo", "Charlie"]
+    assert store.load(regions=["ire"])["horse"].tolist() == ["Charlie"]
+    assert store.load(since="2025-01-01")["date"].min() == "2025-06-01"
+
+
+def test_pull_copies_only_changed_partitions(tmp_path, monkeypatch):
+    bucket = LocalRemote(tmp_path / "bucket")
+    writer = ResultsStore(tmp_path / "writer")
+    writer.ingest(
+        [_day(tmp_path / "a.csv", [["2024-05-01", "GB", "Ayr", "1:00", 1, 1, "A", 1]])]
+    )
+    assert writer.push(bucket) == ["gb/2024"]
+    assert writer.push(bucket) == []
+
+    reader = ResultsStore(tmp_path / "reader")
+    assert reader.pull(bucket) == ["gb/2024"]
+    cached = reader.read_partition("gb/2024")
+    monkeypatch.setattr(
+        pd, "read_csv", lambda *a, **k: (_ for _ in ()).throw(AssertionError)
+    )
+    assert reader.read_partition("gb/2024").equals(cached)
+    monkeypatch.undo()
+
+    writer.ingest(
+        [_day(tmp_path / "b.csv", [["2025-05-01", "GB", "Ayr", "1:00", 2, 2, "B", 1]])]
+    )
+    assert writer.push(bucket) == ["gb/2025"]
+    assert reader.pull(bucket) == ["gb/2025"]
+
+    df = load_history(
+        root=tmp_path / "reader", remote=str(tmp_path / "bucket"), seed=False
+    )
+    assert df["horse"].tolist() == ["A", "B"]
+
+
+def test_scraper_fields_include_dedupe_ids(monkeypatch):
+    pytest.importorskip("tomli")  # rpscrape's settings loader
+    scripts = ROOT / "rpscrape" / "scripts"
+    spec = importlib.util.spec_from_file_location(
+        "rpscrape_settings", scripts / "utils" / "settings.py"
+    )
+    settings_mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(settings_mod)
+    monkeypatch.chdir(scripts)  # settings paths are relative to scripts/
+
+    fields = settings_mod.Settings().fields
+    assert {"race_id", "horse_id"} <= set(fields)
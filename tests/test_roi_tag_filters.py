@@ -76,3 +76,27 @@ def test_roi_tracker_main_tag_filter(tmp_path, capsys):
     roi_main(date, "advised", 0.0, False, False, show=True)
     out2 = capsys.readouterr().out
     assert "Tips: 2" in out2
+
+
+def test_roi_tracker_writes_typed_tip_log(tmp_path, monkeypatch):
+    from roi import roi_tracker_advised
+    from roi.tip_log import read_tip_log, tip_log_path
+
+    date = "2025-06-01"
+    _create_sample_data(tmp_path, date)
+    (tmp_path / "logs" / "roi").mkdir(parents=True)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(
+        roi_tracker_advised, "BANKROLL_FILE", str(tmp_path / "bankroll.csv")
+    )
+    monkeypatch.setattr(
+        roi_tracker_advised, "DRAWDOWN_STATS_FILE", str(tmp_path / "drawdown.csv")
+    )
+
+    roi_main(date, "advised", 0.0, False, False)
+    csv_path = tmp_path / "logs" / "roi" / f"tips_results_{date}_advised.csv"
+    assert tip_log_path(csv_path).exists()
+    log = read_tip_log(csv_path)
+    assert list(log.frame["Horse"]) == list(pd.read_csv(csv_path)["Horse"])
+    nap = log.has_all(["🧠 Monster NAP"])
+    assert list(log.frame.loc[nap, "Horse"]) == ["good"]
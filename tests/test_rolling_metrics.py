@@ -0,0 +1,69 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from roi.rolling_metrics import (
+    latest_windows,
+    load_daily,
+    rolling_series,
+    save_daily,
+    upsert_day,
+)
+
+
+def _row(date: str, profit: float, wins: int = 0, tips: int = 2) -> dict:
+    return {
+        "Date": date,
+        "Tips": tips,
+        "Wins": wins,
+        "Places": 0,
+        "Profit": profit,
+        "Stake": float(tips),
+    }
+
+
+def test_upsert_appends_running_totals(tmp_path):
+    path = tmp_path / "daily.csv"
+    daily = load_daily(path)
+    daily = upsert_day(daily, _row("2025-06-01", 1.0, wins=1))
+    daily = upsert_day(daily, _row("2025-06-02", -2.0))
+    save_daily(daily, path)
+
+    daily = load_daily(path)
+    assert list(daily["CumProfit"]) == [1.0, -1.0]
+    assert list(daily["CumTips"]) == [2, 4]
+
+
+def test_upsert_replaces_earlier_day():
+    daily = load_daily(Path("/nonexistent/daily.csv"))
+    daily = upsert_day(daily, _row("2025-06-01", 1.0))
+    daily = upsert_day(daily, _row("2025-06-03", 2.0))
+    daily = upsert_day(daily, _row("2025-06-01", 5.0))
+    daily = upsert_day(daily, _row("2025-06-02", -1.0))
+    assert list(daily["Date"]) == ["2025-06-01", "2025-06-02", "2025-06-03"]
+    assert list(daily["CumProfit"]) == [5.0, 4.0, 6.0]
+
+
+def test_windows_match_pandas_rolling():
+    daily = load_daily(Path("/nonexistent/daily.csv"))
+    dates = pd.date_range("2025-01-01", periods=60, freq="2D")
+    for i, d in enumerate(dates):
+        daily = upsert_day(
+            daily, _row(d.strftime("%Y-%m-%d"), float(i % 5 - 2), wins=i % 2)
+        )
+
+    series = rolling_series(daily, windows=(7, 30))
+    expected = (
+        daily.assign(Date=pd.to_datetime(daily["Date"]))
+        .set_index("Date")["Profit"]
+        .rolling("7D")
+        .sum()
+    )
+    assert list(series["Profit7d"]) == list(expected)
+
+    latest = latest_windows(daily, windows=(30,))
+    assert latest[30]["Profit"] == series["Profit30d"].iloc[-1]
+    assert latest[30]["Tips"] == 30
@@ -0,0 +1,84 @@
+import asyncio
+import importlib.util
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from aiohttp import web
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+# rpscrape has its own top-level ``utils`` package, so load the module by path
+_spec = importlib.util.spec_from_file_location(
+    "rpscrape_async_funcs", ROOT / "rpscrape" / "scripts" / "utils" / "async_funcs.py"
+)
+async_funcs = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(async_funcs)
+
+
+async def _fixture_site(handler):
+    """Serve ``/results/{n}`` locally in place of the results site."""
+    app = web.Application()
+    app.router.add_get("/results/{n}", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+def _scrape(handler, count, **kwargs):
+    written = []
+
+    def parse(url, content):
+        return [content.decode()]
+
+    async def main():
+        runner, base = await _fixture_site(handler)
+        urls = [f"{base}/results/{n}" for n in range(count)]
+        try:
+            with ThreadPoolExecutor(2) as executor:
+                await async_funcs.scrape_concurrently(
+                    urls, parse, written.extend, executor=executor, **kwargs
+                )
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(main())
+    return written
+
+
+def test_rows_written_in_url_order():
+    active = {"now": 0, "max": 0}
+
+    async def handler(request):
+        n = int(request.match_info["n"])
+        active["now"] += 1
+        active["max"] = max(active["max"], active["now"])
+        await asyncio.sleep(0.02 * (5 - n % 5))  # later urls finish first
+        active["now"] -= 1
+        return web.Response(text=f"race-{n}")
+
+    written = _scrape(handler, 10, concurrency=6, per_host=3)
+    assert written == [f"race-{n}" for n in range(10)]
+    assert 1 < active["max"] <= 3
+
+
+def test_retries_then_skips_failed_pages():
+    hits = {}
+
+    async def handler(request):
+        n = int(request.match_info["n"])
+        hits[n] = hits.get(n, 0) + 1
+        if n == 1 and hits[n] == 1:
+            return web.Response(status=503)
+        if n == 2:
+            return web.Response(status=500)
+        return web.Response(text=f"race-{n}")
+
+    written = _scrape(handler, 4, retries=2, backoff=0.01)
+    assert written == ["race-0", "race-1", "race-3"]
+    assert hits[1] == 2
+    assert hits[2] == 3
@@ -0,0 +1,191 @@
+import importlib.util
+import subprocess
+import sys
+import textwrap
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+SCRIPTS_DIR = ROOT / "rpscrape" / "scripts"
+sys.path.append(str(ROOT))
+
+# rpscrape has its own top-level ``utils`` package, so load the module by path
+_spec = importlib.util.spec_from_file_location(
+    "rpscrape_cache", ROOT / "rpscrape" / "scripts" / "utils" / "cache.py"
+)
+cache_mod = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(cache_mod)
+
+
+@pytest.fixture
+def site():
+    """Local page server that supports ETag revalidation."""
+    hits = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits.append((self.path, self.headers.get("If-None-Match")))
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+                return
+            body = f"page {self.path}".encode()
+            self.send_response(200)
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}", hits
+    server.shutdown()
+
+
+def test_fresh_hits_skip_network_and_stale_pages_revalidate(tmp_path, site):
+    base, hits = site
+    cache = cache_mod.ResponseCache(str(tmp_path), ttls={"profile": 60})
+    session = cache_mod.CachedSession(cache)
+    url = f"{base}/profile/horse/1/a/form"
+
+    assert session.get(url).content == b"page /profile/horse/1/a/form"
+    assert session.get(url).headers["X-Cache"] == "HIT"
+    assert len(hits) == 1
+
+    cache.ttls["profile"] = 0
+    again = session.get(url)
+    assert again.content == b"page /profile/horse/1/a/form"
+    assert hits[-1] == ("/profile/horse/1/a/form", '"v1"')
+    assert list(tmp_path.rglob("*.gz"))
+
+
+def test_offline_replay_serves_cache_only(tmp_path, site):
+    base, hits = site
+    url = f"{base}/results/1/a/2025-06-01/9"
+    cache_mod.CachedSession(cache_mod.ResponseCache(str(tmp_path))).get(url)
+
+    offline = cache_mod.CachedSession(
+        cache_mod.ResponseCache(str(tmp_path), ttls={"results": 0}, offline=True)
+    )
+    assert offline.get(url).content == b"page /results/1/a/2025-06-01/9"
+    with pytest.raises(cache_mod.OfflineMiss):
+        offline.get(f"{base}/results/1/a/2025-06-01/10")
+    assert len(hits) == 1
+
+
+def test_prune_evicts_least_recently_used(tmp_path):
+    cache = cache_mod.ResponseCache(str(tmp_path), max_mb=0)
+    for n in range(3):
+        cache.store(f"http://x/{n}", bytes(range(256)) * 8)
+    size = sum(p.stat().st_size for p in tmp_path.rglob("*.gz"))
+    cache.max_bytes = size - 1
+    assert cache.prune() < size
+    assert len(list(tmp_path.rglob("*.gz"))) == 2
+    assert len(list(tmp_path.rglob("*.json"))) == 2
+
+
+def test_page_types():
+    assert cache_mod.page_type("https://x/profile/horse/1/a/form") == "profile"
+    assert cache_mod.page_type("https://x/results/2025-06-01") == "default"
+    assert cache_mod.page_type("https://x/results/1/ascot/2025-06-01/9") == "results"
+    assert cache_mod.page_type("https://x/non-runners/2025-06-01") == "non_runners"
+
+
+# rpscrape.py and racecards.py import rpscrape's own ``utils`` package, so run
+# them from the scripts directory in a separate interpreter.
+OFFLINE_SETUP = textwrap.dedent(
+    """
+    import os, sys
+    from utils.cache import CachedSession, ResponseCache
+
+    cache_dir, work = sys.argv[1], sys.argv[2]
+    cached = "https://www.racingpost.com/results/1/ascot/2025-06-01/1"
+    missing = "https://www.racingpost.com/results/1/ascot/2025-06-01/2"
+    ResponseCache(cache_dir).store(cached, b"<html></html>")
+    cache = ResponseCache(cache_dir, offline=True)
+    session = CachedSession(cache)
+    """
+)
+
+RPSCRAPE_OFFLINE = """
+import rpscrape
+
+rpscrape.cache, rpscrape.session = cache, session
+rpscrape.settings.toml["concurrency"] = 0
+rpscrape.parse_race = lambda url, content, code, fields: [url]
+assert rpscrape.get_race_urls_date(["2025/06/01"], "gb") == []
+
+os.chdir(work)  # scrape_races writes to ../data
+rpscrape.scrape_races(
+    [cached, missing], "dates/gb", "day", "csv", "flat", rpscrape.writer_csv
+)
+with open("../data/dates/gb/flat/day.csv") as f:
+    assert f.read().splitlines()[1:] == [cached]
+print("ok")
+"""
+
+RACECARDS_OFFLINE = """
+import racecards
+
+assert racecards.get_race_urls(session, "https://www.racingpost.com/racecards") == []
+assert racecards.get_going_info(session, "2025-06-01") == {}
+print("ok")
+"""
+
+
+BACKFILL_OFFLINE = """
+import backfill, rpscrape
+
+gone = "https://www.racingpost.com/results/1/ascot/2025-06-01/3"
+ResponseCache(cache_dir).store(gone, b"", status=404)
+rpscrape.cache, rpscrape.session = cache, session
+rpscrape.get_race_urls_date = lambda dates, region: [cached, missing, gone]
+rpscrape.parse_race = lambda url, content, code, fields: [url]
+
+path = os.path.join(work, "shard.csv")
+shard = backfill.Shard("2025-06", dates=("2025/06/01",))
+assert backfill.scrape_shard(shard, "gb", "flat", path) == {"races": 3, "rows": 1}
+with open(path) as f:
+    assert f.read().splitlines()[1:] == [cached]
+print("ok")
+"""
+
+
+def _run_offline(snippet, tmp_path):
+    work = tmp_path / "work"
+    work.mkdir()
+    result = subprocess.run(
+        [sys.executable, "-c", OFFLINE_SETUP + snippet, str(tmp_path / "c"), str(work)],
+        cwd=SCRIPTS_DIR,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().endswith("ok")
+    return result.stdout
+
+
+def test_offline_scrape_skips_uncached_race_pages(tmp_path):
+    pytest.importorskip("tomli")  # rpscrape.py's settings loader
+    out = _run_offline(RPSCRAPE_OFFLINE, tmp_path)
+    assert "Offline: https://www.racingpost.com/results/1/ascot/2025-06-01/2" in out
+
+
+def test_offline_racecards_skip_uncached_listing_and_going(tmp_path):
+    out = _run_offline(RACECARDS_OFFLINE, tmp_path)
+    assert "racecards not in cache" in out
+    assert "skipping going info" in out
+
+
+def test_offline_backfill_shard_skips_uncached_and_failed_pages(tmp_path):
+    pytest.importorskip("tomli")  # rpscrape.py's settings loader
+    out = _run_offline(BACKFILL_OFFLINE, tmp_path)
+    assert "Offline: https://www.racingpost.com/results/1/ascot/2025-06-01/2" in out
+    assert "2025-06-01/3: 404" in out
@@ -0,0 +1,49 @@
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parents[1] / "rpscrape" / "scripts"
+
+# Race and the benchmark import rpscrape's own ``utils`` package, so run them
+# from the scripts directory in a separate interpreter.
+SNIPPET = textwrap.dedent(
+    """
+    from lxml import html
+    import bench_parse
+    from utils.lxml_funcs import DocIndex, XPathIndex
+    from utils.race import Race, SELECTORS, CONTAINS
+
+    fields = bench_parse.load_fields()
+    url, content = bench_parse.synthetic_page(7, runners=5)
+
+    fast = Race(url, html.fromstring(content), "flat", fields)
+    slow = Race(url, html.fromstring(content), "flat", fields, single_pass=False)
+    assert len(fast.csv_data) == 5, fast.csv_data
+    assert fast.csv_data == slow.csv_data
+    assert fast.runner_info["jockey"][2] == "Jockey 2", fast.runner_info["jockey"]
+    assert fast.runner_info["hg"][:2] == ["p", ""], fast.runner_info["hg"]
+
+    doc = html.fromstring(content)
+    index = DocIndex(doc, SELECTORS, CONTAINS)
+    legacy = XPathIndex(doc)
+    for tag, prop, value in SELECTORS:
+        for fn in ("", "/text()", "/@href"):
+            assert index.xpath(tag, value, prop, fn) == legacy.xpath(tag, value, prop, fn), (tag, value, fn)
+        assert index.find(tag, value, prop) == legacy.find(tag, value, prop), (tag, value)
+    for tag, prop, value in CONTAINS:
+        assert index.containing(tag, value, prop) == legacy.containing(tag, value, prop)
+    print("ok")
+    """
+)
+
+
+def test_single_pass_parser_matches_xpath_parser():
+    result = subprocess.run(
+        [sys.executable, "-c", SNIPPET],
+        cwd=SCRIPTS_DIR,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().endswith("ok")
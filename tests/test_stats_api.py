@@ -1,12 +1,17 @@
+import asyncio
 import json
 import sys
+import time
 from pathlib import Path
 
 import pandas as pd
+from fastapi.testclient import TestClient
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 import stats_api
 
+client = TestClient(stats_api.app)
+
 
 def _make_prediction_dir(tmp_path: Path) -> None:
     pred_dir = tmp_path / "predictions" / "2025-06-24"
@@ -27,11 +32,158 @@ def _make_roi_files(tmp_path: Path) -> None:
 def test_endpoints(tmp_path):
     _make_prediction_dir(tmp_path)
     _make_roi_files(tmp_path)
-    tips = stats_api.get_tips()
+    tips = client.get("/tips").json()
     assert tips[0]["foo"] == "bar"
 
-    roi = stats_api.get_roi()
+    roi = client.get("/roi").json()
     assert roi[0]["a"] == 1
 
-    tags = stats_api.get_tags()
+    tags = client.get("/tags").json()
     assert tags[0]["a"] == 1
+
+
+def test_rolling_endpoint(tmp_path):
+    roi_dir = tmp_path / "logs" / "roi"
+    roi_dir.mkdir(parents=True)
+    pd.DataFrame(
+        {
+            "Date": ["2025-06-01", "2025-06-02"],
+            "Tips": [2, 2],
+            "Wins": [1, 0],
+            "Places": [0, 1],
+            "Profit": [3.0, -2.0],
+            "Stake": [2.0, 2.0],
+            "ROI": [150.0, -100.0],
+            "StrikeRate": [50.0, 0.0],
+            "CumTips": [2, 4],
+            "CumWins": [1, 1],
+            "CumPlaces": [0, 1],
+            "CumProfit": [3.0, 1.0],
+            "CumStake": [2.0, 4.0],
+        }
+    ).to_csv(roi_dir / "daily_roi_summary.csv", index=False)
+    stats_api.LOGS_DIR = tmp_path / "logs"
+
+    rows = client.get("/rolling").json()
+    assert rows[-1]["Profit7d"] == 1.0
+    assert rows[-1]["ROI7d"] == 25.0
+    assert len(client.get("/rolling", params={"days": 1}).json()) == 1
+
+
+def _roi_days(tmp_path: Path, n: int) -> Path:
+    roi_dir = tmp_path / "logs" / "roi"
+    roi_dir.mkdir(parents=True, exist_ok=True)
+    path = roi_dir / "roi_summary.csv"
+    dates = pd.date_range("2025-06-01", periods=n).strftime("%Y-%m-%d")
+    pd.DataFrame({"Date": dates, "Profit": range(n)}).to_csv(path, index=False)
+    stats_api.LOGS_DIR = tmp_path / "logs"
+    return path
+
+
+def test_etag_date_range_and_cursor_pagination(tmp_path):
+    _roi_days(tmp_path, 5)
+    first = client.get("/roi")
+    assert len(first.json()) == 5
+    etag = first.headers["etag"]
+    assert client.get("/roi", headers={"If-None-Match": etag}).status_code == 304
+
+    params = {"start": "2025-06-02", "end": "2025-06-05", "limit": 2}
+    page = client.get("/roi", params=params)
+    assert [r["Date"] for r in page.json()] == ["2025-06-02", "2025-06-03"]
+    assert page.headers["x-total-count"] == "4"
+    cursor = page.headers["x-next-cursor"]
+    rest = client.get("/roi", params={**params, "cursor": cursor})
+    assert [r["Date"] for r in rest.json()] == ["2025-06-04", "2025-06-05"]
+    assert "x-next-cursor" not in rest.headers
+
+    _roi_days(tmp_path, 6)
+    assert client.get("/roi").headers["etag"] != etag
+    assert client.get("/roi", params={**params, "cursor": cursor}).status_code == 410
+
+
+def test_watched_datasets_skip_disk_until_a_file_changes(tmp_path, monkeypatch):
+    path = _roi_days(tmp_path, 3)
+    dataset = stats_api.DATASETS["roi"]
+    monkeypatch.setattr(stats_api, "WATCH_INTERVAL", 3600)
+    with TestClient(stats_api.app) as live:
+        for _ in range(500):
+            if dataset.watched:
+                break
+            time.sleep(0.01)
+        assert len(live.get("/roi").json()) == 3
+        loads = dataset.loads
+        monkeypatch.setattr(
+            stats_api, "latest_file", lambda *a: (_ for _ in ()).throw(AssertionError)
+        )
+        for _ in range(20):
+            assert len(live.get("/roi").json()) == 3
+        assert dataset.loads == loads
+        monkeypatch.undo()
+
+        pd.DataFrame({"Date": ["2025-07-01"], "Profit": [1]}).to_csv(path, index=False)
+        assert "roi" in stats_api.app.state.watcher.refresh()
+        assert len(live.get("/roi").json()) == 1
+
+
+def test_gzip_payloads_and_load_harness(tmp_path):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+    import load_test_stats_api
+
+    load_test_stats_api.make_fixtures(tmp_path, days=60, tips=5)
+    stats_api.LOGS_DIR = tmp_path / "logs"
+    stats_api.PRED_DIR = tmp_path / "predictions"
+
+    resp = client.get("/rolling", headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["content-encoding"] == "gzip"
+    assert len(resp.json()) == 60
+    plain = client.get("/tips", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in plain.headers
+
+    report = asyncio.run(
+        load_test_stats_api.run_load(
+            stats_api.app, clients=8, requests=40, endpoints=["/roi", "/tags"]
+        )
+    )
+    assert report["requests"] == 40 and report["errors"] == 0
+    assert report["p99_ms"] >= report["p50_ms"] > 0
+
+
+def test_watcher_survives_failed_loads_and_retries(tmp_path):
+    from tippingmonster.dataset_cache import CachedDataset, DirectoryWatcher
+
+    path = tmp_path / "data.json"
+    path.write_text('[{"a": 1}]')
+    attempts = []
+
+    def load(p):
+        attempts.append(p)
+        return json.loads(p.read_text())
+
+    dataset = CachedDataset("data", lambda: path, load, lambda: [tmp_path])
+    watcher = DirectoryWatcher([dataset], interval=0.01)
+
+    async def scenario():
+        task = asyncio.create_task(watcher.run())
+        for _ in range(500):
+            if dataset.watched:
+                break
+            await asyncio.sleep(0.01)
+        path.write_text('[{"a": ')  # half-written
+        tries = len(attempts)
+        for _ in range(500):
+            if len(attempts) >= tries + 3:
+                break
+            await asyncio.sleep(0.01)
+        # Retried on every poll, although the file has not changed again
+        assert len(attempts) >= tries + 3
+        assert not task.done() and dataset.watched
+        assert dataset.get().records == [{"a": 1}]
+        path.write_text('[{"a": 2}]')
+        for _ in range(500):
+            if dataset.peek().records == [{"a": 2}]:
+                break
+            await asyncio.sleep(0.01)
+        task.cancel()
+        return dataset.peek().records
+
+    assert asyncio.run(scenario()) == [{"a": 2}]
@@ -0,0 +1,104 @@
+import json
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from roi import tag_cube
+
+
+def _merged(rows):
+    return pd.DataFrame(
+        rows, columns=["tags", "Confidence", "Position", "Stake", "Profit"]
+    )
+
+
+def _sample_cube() -> pd.DataFrame:
+    cube = tag_cube.empty_cube()
+    day1 = _merged(
+        [
+            [["🔽 Class Drop", "⚡ Fresh"], 0.92, "1", 1.0, 3.0],
+            [["🔽 Class Drop"], 0.82, "4", 1.0, -1.0],
+            [["⚡ Fresh"], 0.70, "NR", 1.0, 0.0],
+        ]
+    )
+    day2 = _merged([[["⚡ Fresh", "🔽 Class Drop"], 0.88, "2", 1.0, -1.0]])
+    for date, day in [("2025-06-01", day1), ("2025-06-10", day2)]:
+        rows = tag_cube.cube_rows(day, date, "advised", "sent")
+        cube = tag_cube.update_cube(cube, rows, date, "advised", "sent")
+    return cube
+
+
+def test_cube_rows_groups_identical_tag_sets():
+    cube = _sample_cube()
+    day2 = cube[cube["Date"] == "2025-06-10"]
+    assert len(day2) == 1
+    assert day2.iloc[0]["TagSet"] == tag_cube.tag_key(["🔽 Class Drop", "⚡ Fresh"])
+    assert day2.iloc[0]["Band"] == "0.85–0.90"
+
+
+def test_update_is_idempotent(tmp_path):
+    cube = _sample_cube()
+    rows = cube[cube["Date"] == "2025-06-10"]
+    again = tag_cube.update_cube(cube, rows, "2025-06-10", "advised", "sent")
+    assert len(again) == len(cube)
+
+    path = tmp_path / "cube.csv"
+    tag_cube.save_cube(again, path)
+    loaded = tag_cube.load_cube(path)
+    assert loaded["Runs"].sum() == 4
+
+
+def test_rollup_tag_combination_and_window():
+    cube = _sample_cube()
+    both = tag_cube.rollup(cube, tags="Class Drop + Fresh")
+    assert both["Runs"] == 2
+    assert both["Wins"] == 1
+    assert both["Profit"] == 2.0
+
+    recent = tag_cube.rollup(cube, tags="class drop", days=5)
+    assert recent["Runs"] == 1
+    assert recent["Places"] == 1
+
+    high = tag_cube.rollup(cube, tags="Fresh", min_conf=0.85)
+    assert high["Runs"] == 2
+
+
+def test_tag_summary_explodes_sets():
+    summary = tag_cube.tag_summary(_sample_cube()).set_index("Tag")
+    assert summary.loc["⚡ Fresh", "Runs"] == 3
+    assert summary.loc["🔽 Class Drop", "Runs"] == 3
+    assert summary.loc["🔽 Class Drop", "ROI %"] == round(1.0 / 3 * 100, 2)
+
+
+def test_tracker_cube_ignores_tag_filter(tmp_path, monkeypatch):
+    from roi import tag_roi_tracker
+
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "logs" / "dispatch").mkdir(parents=True)
+    (tmp_path / "logs" / "roi").mkdir(parents=True)
+    results_dir = tmp_path / "rpscrape" / "data" / "dates" / "all"
+    results_dir.mkdir(parents=True)
+    tips = [
+        {"race": "12:00 Ascot", "name": "Nap", "confidence": 0.95, "bf_sp": 3.0,
+         "realistic_odds": 3.0, "tags": ["🧠 Monster NAP"]},
+        {"race": "12:30 Ascot", "name": "Other", "confidence": 0.70, "bf_sp": 2.0,
+         "realistic_odds": 2.0, "tags": ["⚡ Fresh"]},
+    ]  # fmt: skip
+    with open(tmp_path / "logs/dispatch/sent_tips_2025-06-01.jsonl", "w") as f:
+        f.writelines(json.dumps(t) + "\n" for t in tips)
+    pd.DataFrame(
+        {"off": ["12:00", "12:30"], "course": ["Ascot", "Ascot"],
+         "horse": ["Nap", "Other"], "num": [8, 8], "pos": ["1", "5"]}
+    ).to_csv(results_dir / "2025_06_01.csv", index=False)  # fmt: skip
+
+    tag_roi_tracker.main("2025-06-01", "advised", 0.8, False, tag="NAP")
+
+    cube = tag_cube.load_cube()
+    sent = tag_cube.select(cube, source="sent")
+    assert sent["Runs"].sum() == 2
+    assert tag_cube.rollup(cube, tags="Fresh", source="sent")["Runs"] == 1
+    summary = pd.read_csv("logs/roi/tips_results_2025-06-01_advised_sent.csv")
+    assert summary["Horse"].tolist() == ["nap"]
@@ -6,6 +6,7 @@ import pandas as pd
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 import telegram_bot
+from tippingmonster import tip_index
 
 
 def test_get_roi_summary(tmp_path):
@@ -78,6 +79,29 @@ def test_get_recent_naps(tmp_path):
     assert "Horse1" in summary
     assert "ROI" in summary
 
+    # Later days reach the index through the writers, not a rescan per command
+    date = "2025-06-04"
+    (base / "predictions" / date).mkdir()
+    nap.update(name="Horse3")
+    (base / "predictions" / date / "tips_with_odds.jsonl").write_text(
+        json.dumps(nap) + "\n"
+    )
+    (base / "logs" / "roi").mkdir()
+    df.assign(Date=date, Horse="Horse3").to_csv(
+        base / "logs" / "roi" / f"tips_results_{date}_advised.csv", index=False
+    )
+    assert "Horse3" not in telegram_bot.get_recent_naps(2, base)
+    conn = tip_index.connect(tip_index.db_path(base))
+    for path in (
+        base / "predictions" / date / "tips_with_odds.jsonl",
+        base / "logs" / "roi" / f"tips_results_{date}_advised.csv",
+    ):
+        tip_index.update_file(conn, path)
+    conn.close()
+    summary = telegram_bot.get_recent_naps(2, base)
+    assert "Horse3" in summary
+    assert "Horse1" not in summary
+
 
 def test_get_tip_info(tmp_path):
     base = tmp_path
@@ -99,3 +123,31 @@ def test_get_tip_info(tmp_path):
     assert "🚀" in summary
     assert "Nice chance" in summary
     assert "5.0" in summary
+
+
+def test_get_tag_roi(tmp_path):
+    cube = pd.DataFrame(
+        {
+            "Date": ["2025-06-01", "2025-06-02", "2025-06-01"],
+            "TagSet": [
+                "⚡ Fresh | 🔽 Class Drop",
+                "🔽 Class Drop",
+                "⚡ Fresh | 🔽 Class Drop",
+            ],
+            "Band": ["0.90+", "0.80–0.85", "0.90+"],
+            # A --mode level run adds a second slice for the same tips
+            "Mode": ["advised", "advised", "level"],
+            "Source": ["sent", "sent", "sent"],
+            "Runs": [2, 1, 2],
+            "Wins": [1, 0, 1],
+            "Places": [0, 1, 0],
+            "Stake": [2.0, 1.0, 2.0],
+            "Profit": [3.0, -1.0, 5.0],
+        }
+    )
+    (tmp_path / "logs" / "roi").mkdir(parents=True)
+    cube.to_csv(tmp_path / "logs" / "roi" / "tag_cube.csv", index=False)
+
+    summary = telegram_bot.get_tag_roi("Class Drop + Fresh", 90, tmp_path)
+    assert "2 tips" in summary
+    assert "+3.00 pts" in summary
@@ -0,0 +1,145 @@
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+from aiohttp import web
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from tippingmonster.telegram_dispatch import TelegramDispatcher, resolve_chat_ids
+
+
+async def _mock_telegram(handler):
+    """Start a local stand-in for the Telegram Bot API on a free port."""
+    app = web.Application()
+    app.router.add_post("/bot{token}/sendMessage", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+def _run(handler, messages, tmp_path, callbacks=(None, None), **kwargs):
+    async def main():
+        runner, url = await _mock_telegram(handler)
+        try:
+            async with TelegramDispatcher(
+                token="T",
+                api_url=url,
+                receipts_path=tmp_path / "receipts.jsonl",
+                **kwargs,
+            ) as bot:
+                return await bot.send_many(messages, *callbacks)
+        finally:
+            await runner.cleanup()
+
+    return asyncio.run(main())
+
+
+def test_send_many_keeps_per_chat_order_and_logs_receipts(tmp_path, monkeypatch):
+    monkeypatch.delenv("TM_DEV_MODE", raising=False)
+    seen = []
+
+    async def handler(request):
+        data = await request.post()
+        seen.append((data["chat_id"], data["text"]))
+        return web.json_response({"ok": True, "result": {"message_id": len(seen)}})
+
+    messages = [("a", "1"), ("b", "x"), ("a", "2"), ("a", "3")]
+    receipts = _run(handler, messages, tmp_path, per_chat_interval=0, global_rate=0)
+
+    assert [r["ok"] for r in receipts] == [True] * 4
+    assert [t for c, t in seen if c == "a"] == ["1", "2", "3"]
+    logged = [json.loads(line) for line in open(tmp_path / "receipts.jsonl")]
+    assert len(logged) == 4
+    assert {r["message_id"] for r in logged} == {1, 2, 3, 4}
+
+
+def test_retry_after_is_honoured(tmp_path, monkeypatch):
+    monkeypatch.delenv("TM_DEV_MODE", raising=False)
+    calls = {"n": 0}
+
+    async def handler(request):
+        calls["n"] += 1
+        if calls["n"] == 1:
+            return web.json_response(
+                {"ok": False, "parameters": {"retry_after": 0.05}}, status=429
+            )
+        return web.json_response({"ok": True, "result": {"message_id": 7}})
+
+    receipts = _run(handler, [("a", "hi")], tmp_path, per_chat_interval=0)
+    assert receipts[0]["ok"] is True
+    assert receipts[0]["attempts"] == 2
+    assert receipts[0]["message_id"] == 7
+
+
+def test_client_error_is_not_retried(tmp_path, monkeypatch):
+    monkeypatch.delenv("TM_DEV_MODE", raising=False)
+
+    async def handler(request):
+        return web.json_response({"ok": False, "description": "bad"}, status=400)
+
+    receipts = _run(handler, [("a", "hi")], tmp_path, per_chat_interval=0)
+    assert receipts[0]["ok"] is False
+    assert receipts[0]["attempts"] == 1
+    assert "400" in receipts[0]["error"]
+
+
+def test_resolve_chat_ids_includes_extra_channels(monkeypatch):
+    monkeypatch.delenv("TM_DEV", raising=False)
+    monkeypatch.setenv("TELEGRAM_CHAT_ID", "main")
+    monkeypatch.setenv("TELEGRAM_EXTRA_CHAT_IDS", "vip, main,free")
+    assert resolve_chat_ids() == ["main", "vip", "free"]
+    assert resolve_chat_ids("only") == ["only"]
+
+
+def test_disconnect_and_bad_body_fail_only_that_chat(tmp_path, monkeypatch):
+    monkeypatch.delenv("TM_DEV_MODE", raising=False)
+
+    async def handler(request):
+        data = await request.post()
+        if data["chat_id"] == "gone":
+            request.transport.close()
+            return web.Response()
+        if data["chat_id"] == "html":
+            return web.Response(text="<html>502 Bad Gateway</html>")
+        return web.json_response({"ok": True, "result": {"message_id": 1}})
+
+    messages = [("gone", "hi"), ("ok", "hi"), ("html", "hi"), ("ok", "again")]
+    receipts = _run(
+        handler, messages, tmp_path, per_chat_interval=0, global_rate=0, max_retries=2
+    )
+
+    assert [r["ok"] for r in receipts] == [False, True, False, True]
+    assert receipts[0]["attempts"] == 2
+    assert "Disconnected" in receipts[0]["error"]
+    assert "JSONDecodeError" in receipts[2]["error"]
+    logged = [json.loads(line) for line in open(tmp_path / "receipts.jsonl")]
+    assert len(logged) == 4
+
+
+def test_callbacks_bracket_each_message(tmp_path, monkeypatch):
+    monkeypatch.delenv("TM_DEV_MODE", raising=False)
+    events = []
+
+    async def handler(request):
+        data = await request.post()
+        events.append(("post", data["chat_id"], data["text"]))
+        return web.json_response({"ok": True, "result": {"message_id": 3}})
+
+    callbacks = (
+        lambda index, chat: events.append(("send", chat, index)),
+        lambda index, receipt: events.append(("receipt", receipt["ok"], index)),
+    )
+    _run(handler, [("a", "x"), ("a", "y")], tmp_path, callbacks, per_chat_interval=0)
+    assert events == [
+        ("send", "a", 0),
+        ("post", "a", "x"),
+        ("receipt", True, 0),
+        ("send", "a", 1),
+        ("post", "a", "y"),
+        ("receipt", True, 1),
+    ]
@@ -0,0 +1,83 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+import telegram_bot
+from tippingmonster import tip_index
+
+
+def _write_sent(base, date, tips):
+    path = base / "logs" / "dispatch" / f"sent_tips_{date}.jsonl"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("".join(json.dumps(t) + "\n" for t in tips))
+    return path
+
+
+def test_sync_is_incremental_and_latest_tip_wins(tmp_path):
+    old = _write_sent(
+        tmp_path, "2025-06-01", [{"race": "1:00 Ascot", "name": "Knebworth"}]
+    )
+    _write_sent(
+        tmp_path,
+        "2025-06-03",
+        [{"race": "3:00 York", "name": "KNEBWORTH", "bf_sp": 4.0, "tags": ["🚀"]}],
+    )
+    conn = tip_index.connect(tip_index.db_path(tmp_path))
+    assert tip_index.sync(conn, tmp_path) == 2
+    assert tip_index.sync(conn, tmp_path) == 0
+
+    tip = tip_index.latest_tip(conn, "knebworth")
+    assert (tip["date"], tip["race"], tip["odds"], tip["tags"]) == (
+        "2025-06-03",
+        "3:00 York",
+        4.0,
+        ["🚀"],
+    )
+
+    # Rewriting a day replaces its rows rather than appending
+    old.write_text(json.dumps({"race": "2:00 Ascot", "name": "Other"}) + "\n")
+    os.utime(old, ns=(1, 1))
+    assert tip_index.sync(conn, tmp_path) == 1
+    count = conn.execute("SELECT COUNT(*) FROM tips WHERE date = '2025-06-01'")
+    assert count.fetchone()[0] == 1
+    assert tip_index.latest_tip(conn, "missing") is None
+    conn.close()
+
+
+def test_recent_naps_joins_results(tmp_path):
+    for i, date in enumerate(["2025-06-01", "2025-06-02", "2025-06-03"]):
+        pred = tmp_path / "predictions" / date
+        pred.mkdir(parents=True)
+        tips = [
+            {"name": f"Other{i}", "tags": []},
+            {"name": f"Nap{i}", "tags": ["🧠 Monster NAP"]},
+        ]
+        (pred / "tips_with_odds.jsonl").write_text(
+            "".join(json.dumps(t) + "\n" for t in tips)
+        )
+    (tmp_path / "logs").mkdir()
+    # No results yet for the latest day, so it is not a settled NAP
+    for i, date in enumerate(["2025-06-01", "2025-06-02"]):
+        pd.DataFrame(
+            {
+                "Horse": [f"nap{i}", f"Other{i}"],
+                "Position": [i + 1, 1],
+                "Profit": [1.5, 2.0],
+                "Stake": [1.0, 1.0],
+            }
+        ).to_csv(tmp_path / "logs" / f"tips_results_{date}_advised.csv", index=False)
+
+    summary = telegram_bot.get_recent_naps(5, tmp_path)
+    assert summary.splitlines()[:2] == [
+        "2025-06-01: Nap0 - Pos 1 (+1.50 pts)",
+        "2025-06-02: Nap1 - Pos 2 (+1.50 pts)",
+    ]
+    assert "Nap2" not in summary
+
+    conn = tip_index.connect(tip_index.db_path(tmp_path))
+    assert [n["horse"] for n in tip_index.recent_naps(conn, 1)] == ["Nap1"]
+    conn.close()
@@ -0,0 +1,67 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from roi import tip_log
+from roi.nap_tracker import log_day
+
+
+def _tips(tags):
+    return pd.DataFrame(
+        {
+            "Horse": [f"h{i}" for i in range(len(tags))],
+            "Confidence": np.linspace(0.7, 0.95, len(tags)),
+            "Position": [1.0, "NR", 3, 1][: len(tags)],
+            "Stake": 1.0,
+            "Profit": [2.0, 0.0, -1.0, 4.0][: len(tags)],
+            "tags": tags,
+        }
+    )
+
+
+def test_round_trip_and_masks(tmp_path):
+    df = _tips([["🧠 Monster NAP", "⚡ Fresh"], ["⚡ Fresh"], [], ["🔽 Class Drop"]])
+    path = tip_log.write_tip_log(
+        df, tmp_path / "tips_results_2025-06-01_advised.parquet"
+    )
+
+    log = tip_log.read_tip_log(path)
+    assert log.vocab == ["⚡ Fresh", "🔽 Class Drop", "🧠 Monster NAP"]
+    assert log.frame["Confidence"].dtype == np.float32
+    assert log.frame["Position"].tolist() == ["1", "NR", "3", "1"]
+    assert "tags" not in log.frame.columns
+    assert log.has_all(["⚡ Fresh", "🧠 Monster NAP"]).tolist() == [1, 0, 0, 0]
+    assert log.has_any(["🔽 Class Drop", "⚡ Fresh"]).tolist() == [1, 1, 0, 1]
+    assert not log.has_all(["Unknown"]).any()
+    assert log.matching("nap") == ["🧠 Monster NAP"]
+    assert log.tag_lists()[:3] == [["⚡ Fresh", "🧠 Monster NAP"], ["⚡ Fresh"], []]
+
+
+def test_legacy_csv_and_vocab_merge(tmp_path):
+    old = tmp_path / "tips_results_2025-06-01_advised.csv"
+    df = _tips([str(["🧠 Monster NAP"]), None, str(["⚡ Fresh"])])
+    df.to_csv(old, index=False)
+    # Enough distinct tags to need a second bitset word
+    many = [[f"🔥 Trainer {i}%" for i in range(j, j + 70)] for j in range(2)]
+    new = tip_log.write_tip_log(
+        _tips(many), tmp_path / "tips_results_2025-06-02_advised.parquet"
+    )
+
+    log = tip_log.read_tip_log([old, new])
+    assert len(log) == 5
+    assert log.bits.shape == (5, 2)
+    assert log.has_all(["🧠 Monster NAP"]).tolist() == [1, 0, 0, 0, 0]
+    assert log.has_all(["🔥 Trainer 70%"]).tolist() == [0, 0, 0, 0, 1]
+    assert log.has_all(["🔥 Trainer 5%", "🔥 Trainer 69%"]).tolist() == [0, 0, 0, 1, 1]
+
+    # A parquet sibling supersedes the CSV, and NAP tracking reads it
+    tip_log.write_tip_log(
+        _tips([["🧠 Monster NAP"], ["🧠 Monster NAP"]]), old.with_suffix(".parquet")
+    )
+    assert len(tip_log.read_tip_log(old)) == 2
+    old.unlink()
+    row = log_day("2025-06-01", tmp_path / "nap_history.csv", old)
+    assert (row["Tips"], row["Wins"]) == (2, 1)
@@ -0,0 +1,154 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from core.horse_form import FEATURES as HORSE_FEATURES
+from core.horse_form import HorseForm
+from core.training_set import (
+    CARD_FEATURES,
+    build_training_set,
+    check_leakage,
+    feature_columns,
+    serving_matrix,
+)
+from tippingmonster import racecard_db
+
+COLUMNS = [
+    "date",
+    "course",
+    "off",
+    "race_id",
+    "horse_id",
+    "horse",
+    "pos",
+    "draw",
+    "or",
+    "rpr",
+    "prize",
+    "ran",
+    "class",
+    "dist_f",
+    "going",
+    "trainer",
+    "jockey",
+]
+
+
+def _results():
+    rows = []
+    for n, date in enumerate(["2025-05-10", "2025-06-01", "2025-06-20", "2025-07-02"]):
+        race_id = 100 + n
+        for horse_id, horse in ((1, "Alpha"), (2, "Bravo")):
+            won = (horse_id + n) % 2 == 0
+            rows.append(
+                [
+                    date,
+                    "Ascot",
+                    "2:30",
+                    race_id,
+                    horse_id,
+                    horse,
+                    "1" if won else "2",
+                    horse_id,
+                    80,
+                    999,
+                    "£5,000" if won else "£1,000",
+                    2,
+                    "Class 4",
+                    "8f",
+                    "Good",
+                    "T Smith",
+                    "J Doe",
+                ]
+            )
+    return pd.DataFrame(rows, columns=COLUMNS)
+
+
+def _card(db):
+    conn = racecard_db.connect(db)
+    race = {
+        "race_id": 101,
+        "date": "2025-06-01",
+        "course": "Ascot",
+        "off_time": "2:30",
+        "distance_f": 8.0,
+        "race_class": "Class 4",
+        "going": "Good",
+        "prize": "£5,000",
+        "runners": [
+            {
+                "horse_id": 1,
+                "name": "Alpha",
+                "draw": 7,
+                "ofr": 81,
+                "rpr": 90,
+                "form": "21",
+                "last_run": 22,
+                "trainer": "T Smith",
+                "jockey": "J Doe",
+            },
+            {
+                "horse_id": 2,
+                "name": "Bravo",
+                "draw": 8,
+                "ofr": 79,
+                "rpr": 88,
+                "trainer": "T Smith",
+                "jockey": "J Doe",
+            },
+            {"horse_id": 3, "name": "Withdrawn", "draw": 9, "trainer": "X"},
+        ],
+    }
+    racecard_db.ingest_card(conn, {"GB": {"Ascot": {"2:30": race}}})
+    conn.close()
+
+
+def test_rows_use_pre_race_card_and_lagged_form_only(tmp_path):
+    db = tmp_path / "cards.sqlite"
+    _card(db)
+    results = _results()
+    df = build_training_set(results, db=db, workers=1)
+
+    assert len(df) == len(results)
+    assert df.groupby("source").size().to_dict() == {"card": 2, "results": 6}
+    card = df[df["source"] == "card"].set_index("name")
+    assert card.loc["Alpha", ["draw", "or", "rpr", "days_since_run"]].tolist() == [
+        7,
+        81,
+        90,
+        22.0,
+    ]
+    assert card.loc["Alpha", "draw_bias_rank"] == 7 / 3
+
+    fallback = df[df["source"] == "results"]
+    # Post-race RPR and per-runner prize money never reach the features
+    assert (fallback["rpr"] == -1).all()
+    assert fallback.groupby("race_id")["prize"].nunique().eq(1).all()
+    assert not (serving_matrix(df, CARD_FEATURES) == 999).any().any()
+    assert set(CARD_FEATURES + HORSE_FEATURES) <= set(feature_columns(df))
+
+    expected = HorseForm.from_results(results).features()
+    got = df.sort_values(["date", "horse_id"])[HORSE_FEATURES].reset_index(drop=True)
+    pd.testing.assert_frame_equal(got, expected, check_dtype=False)
+
+    june = df[df["date"] == "2025-06-20"].set_index("name")
+    assert june.loc["Alpha", "trainer_30d_runs"] == 2
+    assert df["won"].sum() == 4
+
+
+def test_parallel_months_match_serial_and_leaky_columns_rejected(tmp_path):
+    results = _results()
+    serial = build_training_set(results, db=tmp_path / "none.sqlite", workers=1)
+    parallel = build_training_set(results, db=tmp_path / "none.sqlite", workers=2)
+    pd.testing.assert_frame_equal(serial, parallel)
+    only_june = build_training_set(
+        results, db=tmp_path / "none.sqlite", workers=1, months=["2025-06"]
+    )
+    assert set(only_june["date"]) == {"2025-06-01", "2025-06-20"}
+
+    with pytest.raises(ValueError, match="tip_confidence"):
+        check_leakage(["draw", "tip_confidence"])
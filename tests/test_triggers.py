@@ -0,0 +1,60 @@
+import json
+import sys
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from tippingmonster import triggers
+from tippingmonster.pipeline import Context
+
+
+class SevenAM(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return cls.combine(date.today(), time(7, 0))
+
+
+def _snapshot(root, today, label, prices):
+    path = root / "odds_snapshots" / f"{today}_{label}.json"
+    path.parent.mkdir(exist_ok=True)
+    path.write_text(
+        json.dumps([{"horse": str(i), "bf_sp": p} for i, p in enumerate(prices)])
+    )
+
+
+def test_market_ready_waits_for_formed_market_or_deadline(tmp_path, monkeypatch):
+    monkeypatch.setattr(triggers, "datetime", SevenAM)
+    monkeypatch.delenv("TM_MARKET_TIME", raising=False)
+    today = date.today().isoformat()
+    ctx = Context(date=today, root=tmp_path)
+    ready = triggers.market_ready(at="08:50", min_priced=0.9)
+
+    assert not ready(ctx)
+    _snapshot(tmp_path, today, "0700", [2.0, None, 3.0])
+    assert not ready(ctx)
+    _snapshot(tmp_path, today, "0705", [2.0, 5.5, 3.0])
+    assert ready(ctx)
+
+    monkeypatch.setenv("TM_MARKET_TIME", "06:30")
+    assert triggers.market_ready()(Context(date=today, root=tmp_path / "empty"))
+
+
+def test_file_and_time_triggers_pass_for_past_dates(tmp_path, monkeypatch):
+    monkeypatch.setattr(triggers, "datetime", SevenAM)
+    today = date.today().isoformat()
+    results = triggers.file_ready("rpscrape/data/dates/all/{date_}.csv")
+    late = triggers.not_before("22:30")
+    ctx = Context(date=today, root=tmp_path)
+    assert not results(ctx) and not late(ctx)
+    assert not triggers.any_of(results, late)(ctx)
+
+    path = tmp_path / "rpscrape" / "data" / "dates" / "all"
+    path.mkdir(parents=True)
+    (path / f"{today.replace('-', '_')}.csv").write_text("pos,horse\n")
+    assert results(ctx)
+    assert not triggers.all_of(results, late)(ctx)
+
+    yesterday = Context(
+        date=(date.today() - timedelta(days=1)).isoformat(), root=tmp_path
+    )
+    assert results(yesterday) and late(yesterday)
@@ -223,3 +223,12 @@ def test_upload_to_s3_respects_dev_mode(monkeypatch, tmp_path):
     upload_to_s3(file_path, "b", "k")
 
     assert not calls
+
+
+def test_racecard_minutes_reads_low_hours_as_afternoon():
+    from tippingmonster.utils import racecard_minutes
+
+    assert racecard_minutes(1, 30) == 13 * 60 + 30
+    assert racecard_minutes(9, 55) == 21 * 60 + 55
+    assert racecard_minutes(12, 45) == 12 * 60 + 45
+    assert racecard_minutes(15, 0) == 15 * 60
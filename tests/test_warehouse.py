@@ -0,0 +1,116 @@
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from roi import warehouse
+
+
+def _write_day(folder, date, suffix="", positions=(1, 4, 2)):
+    folder.mkdir(parents=True, exist_ok=True)
+    df = pd.DataFrame(
+        {
+            "Horse": ["Alpha", "Bravo", "Charlie"],
+            "Race Time": ["13:30", "14:00", "15:10"],
+            "Course": ["Ascot", "York", "Ascot"],
+            "Confidence": [0.95, 0.82, 0.4],
+            "Position": list(positions),
+            "Stake": [1.0, 1.0, 2.0],
+            "Profit": [3.0, -1.0, -2.0],
+            "tags": ["['🧠 Monster NAP', '⚡ Fresh']", "['⚡ Fresh']", None],
+        }
+    )
+    path = folder / f"tips_results_{date}_advised{suffix}.csv"
+    df.to_csv(path, index=False)
+    return path
+
+
+def test_normalise_types_and_tags():
+    raw = pd.DataFrame(
+        {
+            "Date": ["2025-06-01", "2025-06-02"],
+            "Horse": ["A", "B"],
+            "Tags": ["⚡ Fresh, 🧠 Monster NAP", ""],
+            "Position": ["1", "PU"],
+            "Profit": ["2.5", None],
+        }
+    )
+    tips = warehouse.normalise(raw)
+    assert list(tips.columns) == list(warehouse.TIP_COLUMNS)
+    assert tips["Tags"].tolist() == ["⚡ Fresh | 🧠 Monster NAP", ""]
+    assert tips["NAP"].tolist() == [True, False]
+    assert tips["Won"].tolist() == [True, False]
+    assert tips["Profit"].tolist() == [2.5, 0.0]
+    assert warehouse.tag_mask(tips["Tags"], ["⚡ Fresh"]).tolist() == [True, False]
+
+
+def test_build_is_incremental(tmp_path):
+    logs = tmp_path / "logs"
+    out = tmp_path / "warehouse"
+    _write_day(logs / "roi", "2025-06-02")
+    _write_day(logs / "roi", "2025-06-09")
+    sent = _write_day(logs, "2025-06-02", "_sent", positions=(1, 1, 1))
+
+    manifest = warehouse.build(out, [logs, logs / "roi"])
+    assert manifest["reread"] == 3
+    assert manifest["rows"]["tips"] == 9
+    assert warehouse.build(out, [logs, logs / "roi"])["reread"] == 0
+
+    daily = warehouse.load("daily", out, source="advised")
+    assert daily["Tips"].tolist() == [3, 3]
+    assert daily["Winners"].tolist() == [1, 1]
+    assert daily["ROI %"].iloc[0] == 0.0
+    weekly = warehouse.load("weekly", out, source="advised")
+    assert weekly["Week"].tolist() == ["2025-W23", "2025-W24"]
+    tags = warehouse.load("tag_daily", out, source="sent").set_index("Tag")
+    assert tags.loc["⚡ Fresh", "Tips"] == 2
+
+    # Only the rewritten file is re-read and its day replaced
+    _write_day(logs, "2025-06-02", "_sent", positions=(5, 5, 5))
+    os.utime(sent, ns=(1, 1))
+    manifest = warehouse.build(out, [logs, logs / "roi"])
+    assert manifest["reread"] == 1
+    sent_daily = warehouse.load("daily", out, source="sent")
+    assert sent_daily["Winners"].tolist() == [0]
+    assert manifest["rows"]["tips"] == 9
+
+    sent.unlink()
+    manifest = warehouse.build(out, [logs, logs / "roi"])
+    assert warehouse.load("tips", out, source="sent").empty
+    assert manifest["rows"]["tips"] == 6
+
+
+def test_build_prefers_tip_log(tmp_path):
+    from roi import tip_log
+
+    logs = tmp_path / "logs"
+    csv = _write_day(logs, "2025-06-02", "_sent")
+    tip_log.write_tip_log(pd.read_csv(csv).iloc[:1], csv.with_suffix(".parquet"))
+
+    manifest = warehouse.build(tmp_path / "warehouse", [logs])
+    assert list(manifest["files"]) == [str(csv.with_suffix(".parquet"))]
+    tips = warehouse.load("tips", tmp_path / "warehouse")
+    assert tips["Tags"].tolist() == ["⚡ Fresh | 🧠 Monster NAP"]
+
+
+def test_day_in_logs_and_logs_roi_is_counted_once(tmp_path):
+    logs = tmp_path / "logs"
+    out = tmp_path / "warehouse"
+    _write_day(logs, "2025-06-02", positions=(4, 4, 4))
+    roi = _write_day(logs / "roi", "2025-06-02")
+    _write_day(logs, "2025-06-03")
+
+    manifest = warehouse.build(out, [logs, logs / "roi"])
+    assert str(roi) in manifest["files"] and len(manifest["files"]) == 2
+    daily = warehouse.load("daily", out, source="advised")
+    assert daily["Tips"].tolist() == [3, 3]
+    assert daily["Winners"].tolist() == [1, 1]
+
+    # Without the logs/roi file the day falls back to the logs/ one
+    roi.unlink()
+    warehouse.build(out, [logs, logs / "roi"])
+    daily = warehouse.load("daily", out, source="advised")
+    assert daily["Tips"].tolist() == [3, 3]
+    assert daily["Winners"].tolist() == [0, 1]
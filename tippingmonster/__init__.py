@@ -1,27 +1,40 @@
+"""Shared helpers for Tipping Monster scripts.
+
+Attributes are loaded lazily (PEP 562): ``from tippingmonster import logs_path``
+imports only :mod:`tippingmonster.utils`, and the SHAP/XGBoost/matplotlib stack
+behind ``generate_chart`` is imported on first call. Keep heavy imports inside
+the functions that need them so lightweight jobs and the Telegram bot start
+quickly; ``tests/test_import_time.py`` guards this.
+"""
+
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
 from dotenv import load_dotenv
 
 load_dotenv()
 
-from .env_loader import load_env
-
-# isort: off
-from .utils import (
-    calculate_profit,
-    in_dev_mode,
-    logs_path,
-    predictions_path,
-    repo_path,
-    repo_root,
-    send_telegram_message,
-    send_telegram_photo,
-    load_xgb_model,
-    get_place_terms,
-    tip_has_tag,
-    upload_to_s3,
-)
-from .helpers import dispatch, send_daily_roi, generate_chart
-
-# isort: on
+# Public name -> submodule that defines it
+_EXPORTS = {
+    "repo_root": "utils",
+    "repo_path": "utils",
+    "logs_path": "utils",
+    "predictions_path": "utils",
+    "in_dev_mode": "utils",
+    "send_telegram_message": "utils",
+    "send_telegram_photo": "utils",
+    "load_xgb_model": "utils",
+    "calculate_profit": "utils",
+    "get_place_terms": "utils",
+    "tip_has_tag": "utils",
+    "upload_to_s3": "utils",
+    "dispatch": "helpers",
+    "send_daily_roi": "helpers",
+    "generate_chart": "helpers",
+    "load_env": "env_loader",
+}
 
 __all__ = [
     "repo_root",
@@ -41,3 +54,34 @@ __all__ = [
     "generate_chart",
     "load_env",
 ]
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .env_loader import load_env
+    from .helpers import dispatch, generate_chart, send_daily_roi
+    from .utils import (
+        calculate_profit,
+        get_place_terms,
+        in_dev_mode,
+        load_xgb_model,
+        logs_path,
+        predictions_path,
+        repo_path,
+        repo_root,
+        send_telegram_message,
+        send_telegram_photo,
+        tip_has_tag,
+        upload_to_s3,
+    )
+
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,308 @@
+"""In-memory cache of parsed datasets for the stats API.
+
+A ``CachedDataset`` resolves its current source file (for example "newest CSV
+in ``logs/roi``"), parses it once and keeps a ``Snapshot``. The snapshot holds
+the records, each record pre-serialised with orjson, a normalised date per
+record for range filters, and an ETag derived from the file's path, mtime and
+size.
+
+While a ``DirectoryWatcher`` runs (``await watcher.run()`` as a background
+task), requests read the current snapshot from memory with no filesystem
+access. The watcher polls the watched directories off the event loop. When a
+file appears, changes or disappears, it rebuilds the affected snapshots, so
+requests never wait for a parse. Without a watcher each ``get`` re-stats the
+source, so scripts and tests still see fresh files.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import gzip
+import hashlib
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterable
+
+import orjson
+import pandas as pd
+
+__all__ = [
+    "CachedDataset",
+    "DirectoryWatcher",
+    "Page",
+    "Snapshot",
+    "CursorError",
+    "latest_file",
+]
+
+logger = logging.getLogger(__name__)
+
+DATE_FIELDS = ("Date", "date")
+PAGE_CACHE_SIZE = 256
+
+
+class CursorError(ValueError):
+    """Raised for malformed cursors or cursors from an older snapshot."""
+
+
+def latest_file(folder: Path, pattern: str) -> Path | None:
+    """Newest file in ``folder`` matching ``pattern`` by mtime."""
+    if not folder.is_dir():
+        return None
+    files = sorted(folder.glob(pattern), key=lambda p: p.stat().st_mtime)
+    return files[-1] if files else None
+
+
+def _signature(path: Path | None) -> tuple | None:
+    if path is None:
+        return None
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return (str(path), st.st_mtime_ns, st.st_size)
+
+
+@dataclass
+class Page:
+    body: bytes
+    etag: str
+    next_cursor: str | None
+    total: int
+    _gzip: bytes | None = field(default=None, repr=False)
+
+    @property
+    def gzip(self) -> bytes:
+        """``body`` gzip-compressed, computed once per page."""
+        if self._gzip is None:
+            self._gzip = gzip.compress(self.body, compresslevel=6, mtime=0)
+        return self._gzip
+
+
+@dataclass
+class Snapshot:
+    records: list[dict]
+    version: str
+    source: Path
+    items: list[bytes] = field(repr=False)
+    dates: list[str | None] = field(repr=False)
+    body: bytes = field(repr=False)
+    full: Page = field(init=False, repr=False)
+    _pages: dict = field(default_factory=dict, repr=False)
+
+    def __post_init__(self) -> None:
+        self.full = Page(self.body, self.etag, None, len(self.items))
+
+    @classmethod
+    def build(cls, records: list[dict], source: Path, signature: tuple):
+        digest = hashlib.sha1(repr(signature).encode()).hexdigest()[:16]
+        items = [orjson.dumps(r, option=orjson.OPT_SERIALIZE_NUMPY) for r in records]
+        date_field = next((f for f in DATE_FIELDS if records and f in records[0]), None)
+        if date_field:
+            parsed = pd.to_datetime(
+                pd.Series([r.get(date_field) for r in records], dtype=object),
+                errors="coerce",
+                format="mixed",
+            )
+            dates = [None if pd.isna(d) else d.strftime("%Y-%m-%d") for d in parsed]
+        else:
+            dates = [None] * len(records)
+        return cls(
+            records=records,
+            version=digest,
+            source=source,
+            items=items,
+            dates=dates,
+            body=b"[" + b",".join(items) + b"]",
+        )
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.version}"'
+
+    def cursor_at(self, offset: int) -> str:
+        raw = f"{offset}:{self.version}".encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def _offset(self, cursor: str) -> int:
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            offset, tag = raw.decode().split(":", 1)
+            offset = int(offset)
+        except (ValueError, UnicodeDecodeError) as exc:
+            raise CursorError("Invalid cursor") from exc
+        if tag != self.version:
+            raise CursorError("Cursor refers to an older version of the data")
+        return offset
+
+    def page(
+        self,
+        start: str | None = None,
+        end: str | None = None,
+        cursor: str | None = None,
+        limit: int | None = None,
+    ) -> Page:
+        """Records dated within ``[start, end]``, ``limit`` at a time."""
+        if not (start or end or cursor or limit):
+            return self.full
+        key = (start, end, cursor, limit)
+        cached = self._pages.get(key)
+        if cached is None:
+            cached = self._page(start, end, cursor, limit)
+            if len(self._pages) >= PAGE_CACHE_SIZE:
+                self._pages.pop(next(iter(self._pages)))
+            self._pages[key] = cached
+        return cached
+
+    def _page(self, start, end, cursor, limit) -> Page:
+        if start or end:
+            index = [
+                i
+                for i, d in enumerate(self.dates)
+                if d is None or ((not start or d >= start) and (not end or d <= end))
+            ]
+        else:
+            index = range(len(self.items))
+        offset = self._offset(cursor) if cursor else 0
+        stop = len(index) if limit is None else offset + limit
+        chosen = index[offset:stop]
+        next_cursor = self.cursor_at(stop) if stop < len(index) else None
+        body = b"[" + b",".join(self.items[i] for i in chosen) + b"]"
+        params = f"{start}|{end}|{offset}|{limit}"
+        tag = hashlib.sha1(params.encode()).hexdigest()[:8]
+        return Page(body, f'"{self.version}-{tag}"', next_cursor, len(index))
+
+
+class CachedDataset:
+    """One logical dataset whose source file is found by ``locate``."""
+
+    def __init__(
+        self,
+        name: str,
+        locate: Callable[[], Path | None],
+        load: Callable[[Path], list[dict]],
+        roots: Callable[[], Iterable[Path]] | None = None,
+    ):
+        self.name = name
+        self.locate = locate
+        self.load = load
+        self.roots = roots or (lambda: [])
+        self.watched = False
+        self._dirty = True
+        self._signature: tuple | None = None
+        self._snapshot: Snapshot | None = None
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def mark_dirty(self) -> None:
+        self._dirty = True
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+
+    def peek(self) -> Snapshot | None:
+        """The snapshot in memory, without checking the source."""
+        return self._snapshot
+
+    def get(self) -> Snapshot | None:
+        """Current snapshot, re-parsing only when the source file changed."""
+        if self.watched and not self._dirty:
+            return self._snapshot
+        with self._lock:
+            self._dirty = False
+            path = self.locate()
+            signature = _signature(path)
+            if signature is None:
+                self._signature = self._snapshot = None
+                return None
+            if signature != self._signature:
+                records = self.load(path)
+                self._snapshot = Snapshot.build(records, path, signature)
+                self._signature = signature
+                self.loads += 1
+            return self._snapshot
+
+
+class DirectoryWatcher:
+    """Poll directories and mark datasets dirty when their contents change."""
+
+    def __init__(self, datasets: Iterable[CachedDataset], interval: float = 2.0):
+        self.datasets = list(datasets)
+        self.interval = interval
+        self._state: dict[Path, frozenset] = {}
+        self._failed: set[str] = set()
+
+    @staticmethod
+    def _scan(root: Path) -> frozenset:
+        entries = set()
+        try:
+            for dirpath, dirnames, filenames in os.walk(root):
+                for name in filenames:
+                    try:
+                        st = os.stat(os.path.join(dirpath, name))
+                    except FileNotFoundError:
+                        continue
+                    entries.add((dirpath, name, st.st_mtime_ns, st.st_size))
+        except OSError:
+            pass
+        return frozenset(entries)
+
+    def poll(self) -> list[str]:
+        """Scan once; return the names of datasets marked dirty."""
+        changed = []
+        scanned: dict[Path, frozenset] = {}
+        for ds in self.datasets:
+            for root in ds.roots():
+                root = Path(root)
+                if root not in scanned:
+                    scanned[root] = self._scan(root)
+                if self._state.get(root) != scanned[root]:
+                    ds.mark_dirty()
+                    changed.append(ds.name)
+                    break
+        self._state.update(scanned)
+        return changed
+
+    def refresh(self) -> list[str]:
+        """Poll once and rebuild the snapshots of datasets that changed.
+
+        A dataset whose load fails keeps serving its last good snapshot and is
+        retried on every later refresh until it loads. One without a snapshot
+        stays dirty, so requests try the load themselves meanwhile.
+        """
+        changed = self.poll()
+        for ds in self.datasets:
+            if not (ds.dirty or ds.name in self._failed):
+                continue
+            ds.mark_dirty()
+            try:
+                ds.get()
+            except Exception:
+                logger.exception("Reloading dataset %r failed", ds.name)
+                self._failed.add(ds.name)
+                if ds.peek() is None:
+                    ds.mark_dirty()
+            else:
+                self._failed.discard(ds.name)
+        return changed
+
+    async def run(self) -> None:
+        """Keep datasets fresh until cancelled; run as a background task."""
+        for ds in self.datasets:
+            ds.mark_dirty()
+        try:
+            await asyncio.to_thread(self.refresh)
+            # Only trust the in-memory snapshots once they are current
+            for ds in self.datasets:
+                ds.watched = True
+            while True:
+                await asyncio.sleep(self.interval)
+                await asyncio.to_thread(self.refresh)
+        finally:
+            for ds in self.datasets:
+                ds.watched = False
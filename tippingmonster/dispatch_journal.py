@@ -0,0 +1,264 @@
+"""Durable per-day journal of tip dispatches.
+
+Each dispatch date has an append-only ``journal_<date>.jsonl`` under
+``logs/dispatch``. Every tip moves through three events keyed by its
+idempotency key (``core.dispatch_tips.get_tip_composite_id``):
+
+``intent``
+    the tip was selected for dispatch (the record carries the tip itself)
+``send``
+    a Telegram request containing the tip is about to be made to ``chat``
+``ack``
+    Telegram confirmed delivery to ``chat`` (``message_id`` recorded)
+
+A ``fail`` event returns the tip to pending for that chat. Delivery is
+tracked per ``(key, chat)``: a tip that reached the main channel but failed
+for an extra one is only resent to the extra one. Events written without a
+``chat`` apply to every chat. Appends are flushed and ``fsync``'d before the
+next step, so after a crash the journal shows exactly which deliveries
+completed. Deliveries with ``send`` but no ``ack`` are *in doubt* (the
+request may or may not have reached Telegram) and are reported rather than
+silently re-sent. A torn final line from a crash is ignored on replay.
+
+``journal_index.json`` maps each date to its counts so "latest dispatch" and
+per-date lookups never scan the logs directory.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable
+
+from .utils import logs_path
+
+INDEX_FILE = "journal_index.json"
+STATUSES = ("intent", "send", "ack", "fail")
+ALL_CHATS = "*"
+
+__all__ = [
+    "DispatchJournal",
+    "load_index",
+    "latest_date",
+    "journal_dir",
+]
+
+
+def journal_dir(directory: Path | str | None = None) -> Path:
+    return Path(directory) if directory is not None else logs_path("dispatch")
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat(timespec="seconds")
+
+
+def load_index(directory: Path | str | None = None) -> dict:
+    """Return ``{date: {"path", "tips", "acked", "updated"}}`` for ``directory``."""
+    path = journal_dir(directory) / INDEX_FILE
+    if not path.exists():
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def latest_date(directory: Path | str | None = None) -> str | None:
+    index = load_index(directory)
+    return max(index) if index else None
+
+
+class DispatchJournal:
+    """Append-only intent/send/ack journal for one dispatch date."""
+
+    def __init__(self, date: str, directory: Path | str | None = None):
+        self.date = date
+        self.directory = journal_dir(directory)
+        self.path = self.directory / f"journal_{date}.jsonl"
+        self._state: dict[str, dict] | None = None
+
+    # --- replay -----------------------------------------------------------
+    def state(self) -> dict[str, dict]:
+        """Return ``{key: {"status", "tip", "message_id", "error", "chats"}}``.
+
+        Keys are in intent order. ``chats`` maps each chat to its own
+        ``{"status", "message_id", "error"}``; ``status`` rolls those up
+        (``send`` if any chat is in doubt, then ``fail``, else ``ack``).
+        """
+        if self._state is None:
+            self._state = {}
+            if self.path.exists():
+                with open(self.path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            self._apply(json.loads(line))
+                        except ValueError:
+                            continue  # torn write from an interrupted append
+        return self._state
+
+    def _apply(self, record: dict) -> None:
+        key, event = record.get("key"), record.get("event")
+        if key is None or event not in STATUSES:
+            return
+        entry = self._state.setdefault(
+            key,
+            {
+                "status": None,
+                "tip": None,
+                "message_id": None,
+                "error": None,
+                "chats": {},
+            },
+        )
+        if event == "intent":
+            entry["tip"] = record.get("tip")
+            if entry["status"] is None:
+                entry["status"] = "intent"
+            return
+        chat = str(record.get("chat") or ALL_CHATS)
+        delivery = entry["chats"].setdefault(
+            chat, {"status": None, "message_id": None, "error": None}
+        )
+        if event == "ack":
+            delivery.update(
+                status="ack", message_id=record.get("message_id"), error=None
+            )
+        elif delivery["status"] != "ack":
+            delivery["status"] = event
+            if event == "fail":
+                delivery["error"] = record.get("error")
+        self._roll_up(entry)
+
+    @staticmethod
+    def _roll_up(entry: dict) -> None:
+        deliveries = list(entry["chats"].values())
+        statuses = [d["status"] for d in deliveries]
+        for status in ("send", "fail", "ack"):
+            if status in statuses:
+                entry["status"] = status
+                break
+        failed = [d["error"] for d in deliveries if d["status"] == "fail"]
+        entry["error"] = failed[-1] if failed else None
+        acked = [d["message_id"] for d in deliveries if d["status"] == "ack"]
+        entry["message_id"] = acked[0] if acked else None
+
+    # --- durable appends --------------------------------------------------
+    def _append(self, records: list[dict]) -> None:
+        if not records:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.state()
+        data = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        for record in records:
+            self._apply(record)
+        self._update_index()
+
+    def _update_index(self) -> None:
+        index = load_index(self.directory)
+        state = self.state()
+        index[self.date] = {
+            "path": self.path.name,
+            "tips": len(state),
+            "acked": sum(e["status"] == "ack" for e in state.values()),
+            "updated": _now(),
+        }
+        path = self.directory / INDEX_FILE
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=2, sort_keys=True)
+            f.flush()
+            os.fsync(f.fileno())
+        tmp.replace(path)
+
+    def record_intents(self, tips: Iterable[tuple[str, dict]]) -> list[str]:
+        """Journal ``(key, tip)`` pairs not seen before and return the new keys."""
+        state = self.state()
+        ts = _now()
+        records = [
+            {"event": "intent", "key": key, "tip": tip, "ts": ts}
+            for key, tip in tips
+            if key not in state
+        ]
+        self._append(records)
+        return [r["key"] for r in records]
+
+    @staticmethod
+    def _events(event: str, keys: Iterable[str], chat: str | None, **fields):
+        ts = _now()
+        extra = {"chat": str(chat)} if chat is not None else {}
+        return [{"event": event, "key": k, **extra, **fields, "ts": ts} for k in keys]
+
+    def record_send(self, keys: Iterable[str], chat: str | None = None) -> None:
+        self._append(self._events("send", keys, chat))
+
+    def record_ack(
+        self, keys: Iterable[str], message_id=None, chat: str | None = None
+    ) -> None:
+        self._append(self._events("ack", keys, chat, message_id=message_id))
+
+    def record_failure(
+        self, keys: Iterable[str], error: str | None = None, chat: str | None = None
+    ) -> None:
+        self._append(self._events("fail", keys, chat, error=error))
+
+    # --- lookups ----------------------------------------------------------
+    def _keys_with(self, *statuses: str) -> list[str]:
+        return [k for k, e in self.state().items() if e["status"] in statuses]
+
+    def delivery_status(self, key: str, chat: str) -> str | None:
+        """Status of ``key`` for ``chat`` (chat-less events count for every chat)."""
+        entry = self.state().get(key)
+        if entry is None:
+            return None
+        chats = entry["chats"]
+        delivery = chats.get(str(chat)) or chats.get(ALL_CHATS)
+        return delivery["status"] if delivery else "intent"
+
+    def acked(self) -> list[str]:
+        return self._keys_with("ack")
+
+    def in_doubt(self) -> list[str]:
+        """Keys whose send started but was never acknowledged or failed."""
+        return self._keys_with("send")
+
+    def pending(self, include_in_doubt: bool = False) -> list[str]:
+        """Keys that still need sending (optionally including in-doubt ones)."""
+        statuses = ("intent", "fail") + (("send",) if include_in_doubt else ())
+        return self._keys_with(*statuses)
+
+    def undelivered(
+        self, chats: Iterable[str], include_in_doubt: bool = False
+    ) -> list[tuple[str, str]]:
+        """``(key, chat)`` pairs still to send, in intent order then ``chats`` order.
+
+        Deliveries in doubt are left out unless ``include_in_doubt`` is set.
+        """
+        statuses = ("intent", "fail") + (("send",) if include_in_doubt else ())
+        chats = [str(c) for c in chats]
+        return [
+            (key, chat)
+            for key in self.state()
+            for chat in chats
+            if self.delivery_status(key, chat) in statuses
+        ]
+
+    def doubtful(self, chats: Iterable[str]) -> list[tuple[str, str]]:
+        """``(key, chat)`` pairs whose send started but never completed."""
+        chats = [str(c) for c in chats]
+        return [
+            (key, chat)
+            for key in self.state()
+            for chat in chats
+            if self.delivery_status(key, chat) == "send"
+        ]
+
+    def tips(self) -> list[dict]:
+        """Journaled tips in intent order."""
+        return [e["tip"] for e in self.state().values() if e["tip"] is not None]
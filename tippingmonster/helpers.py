@@ -1,16 +1,9 @@
 from __future__ import annotations
 
 import os
-import subprocess
-import sys
 from pathlib import Path
 
-import matplotlib.pyplot as plt
-import pandas as pd
-import shap
-import xgboost as xgb
-
-from .utils import repo_path, send_telegram_message, send_telegram_photo
+from .utils import send_telegram_message, send_telegram_photo
 
 __all__ = ["dispatch", "send_daily_roi", "generate_chart"]
 
@@ -27,27 +20,31 @@ def dispatch(
     dev: bool = False,
     course: str | None = None,
 ) -> None:
-    """Run ``dispatch_tips.py`` for ``date``."""
+    """Run ``dispatch_tips.py`` for ``date`` in this process."""
+    from .pipeline import call_main
+
     _apply_dev_env(dev)
-    cmd = [sys.executable, str(repo_path("core", "dispatch_tips.py")), "--date", date]
+    argv = ["--date", date]
     if telegram:
-        cmd.append("--telegram")
+        argv.append("--telegram")
     if dev:
-        cmd.append("--dev")
+        argv.append("--dev")
     if course:
-        cmd += ["--course", course]
-    subprocess.run(cmd, check=True)
+        argv += ["--course", course]
+    call_main("core.dispatch_tips", argv)
 
 
 def send_daily_roi(date: str | None = None, dev: bool = False) -> None:
     """Send the daily ROI summary via ``send_daily_roi_summary.py``."""
+    from .pipeline import call_main
+
     _apply_dev_env(dev)
-    cmd = [sys.executable, str(repo_path("roi", "send_daily_roi_summary.py"))]
+    argv = []
     if date:
-        cmd += ["--date", date]
+        argv += ["--date", date]
     if dev:
-        cmd.append("--dev")
-    subprocess.run(cmd, check=True)
+        argv.append("--dev")
+    call_main("roi.send_daily_roi_summary", argv)
 
 
 def generate_chart(
@@ -57,6 +54,11 @@ def generate_chart(
     telegram: bool = False,
 ) -> None:
     """Create a SHAP feature importance chart and optionally send to Telegram."""
+    import matplotlib.pyplot as plt
+    import pandas as pd
+    import shap
+    import xgboost as xgb
+
     model = xgb.Booster()
     if model_path.endswith(".gz"):
         import gzip
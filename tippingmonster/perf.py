@@ -0,0 +1,371 @@
+"""Stage timing and resource metrics, kept as a local time series.
+
+Each measured block appends one JSON line to ``logs/perf/stages.jsonl``
+(override with ``TM_PERF_LOG``)::
+
+    {"ts": "...", "pipeline": "morning", "stage": "inference",
+     "date": "2025-06-01", "status": "ok", "wall_s": 41.2, "cpu_s": 55.0,
+     "peak_rss_mb": 1890.4, "rss_growth_mb": 620.1, "rows": 412}
+
+``wall_s`` is elapsed time and ``cpu_s`` the process CPU time spent during
+the block. The CPU figure includes native thread pools such as XGBoost's, and
+it overlaps when stages run concurrently. ``peak_rss_mb`` is the process
+high-water mark after the block. ``rss_growth_mb`` is how far the block raised
+it. ``rows`` is the length of the block's result, or whatever it passed to
+:func:`count`.
+
+:class:`~tippingmonster.pipeline.Pipeline` measures every stage. A
+pipeline-level sample (``stage == "total"``) records when the run finished.
+The morning pipeline also records the first race off time, so ``report``
+shows how much margin the tips leave before racing. Use :func:`measure` or
+:func:`timed` to instrument anything else::
+
+    with perf.measure("flatten", pipeline="adhoc") as sample:
+        rows = flatten(...)
+        sample.rows = len(rows)
+
+``python -m tippingmonster.perf report`` (or ``tmcli perf``) prints the
+day-over-day change for each stage and flags regressions.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import functools
+import json
+import os
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator
+
+from .utils import logs_path, racecard_minutes
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
+__all__ = [
+    "Sample",
+    "add_report_args",
+    "count",
+    "first_race",
+    "load",
+    "main",
+    "measure",
+    "metrics_path",
+    "print_report",
+    "record",
+    "report",
+    "run_report",
+    "timed",
+]
+
+TOTAL = "total"
+_lock = threading.Lock()
+_local = threading.local()
+_TIME_RE = re.compile(r"^(\d{1,2}):(\d{2})\b")
+
+
+def metrics_path() -> Path:
+    return Path(os.getenv("TM_PERF_LOG", logs_path("perf", "stages.jsonl")))
+
+
+def _peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+@dataclass
+class Sample:
+    """One measured block; set ``rows`` (or call :func:`count`) inside it.
+
+    ``metric`` holds the record written when the block ended.
+    """
+
+    stage: str
+    labels: dict[str, Any] = field(default_factory=dict)
+    rows: int | None = None
+    status: str = "ok"
+    metric: dict[str, Any] = field(default_factory=dict)
+
+
+def count(rows: int) -> None:
+    """Set the row count of the innermost :func:`measure` block in this thread."""
+    sample = getattr(_local, "sample", None)
+    if sample is not None:
+        sample.rows = rows
+
+
+def record(metric: dict, path: Path | str | None = None) -> None:
+    """Append ``metric`` to the time series at ``path``."""
+    path = Path(path or metrics_path())
+    with _lock:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(metric) + "\n")
+
+
+@contextlib.contextmanager
+def measure(
+    stage: str, path: Path | str | None = None, **labels: Any
+) -> Iterator[Sample]:
+    """Time the block and append its metrics to the time series.
+
+    ``labels`` (for example ``pipeline`` and ``date``) are stored with the
+    sample. The sample is written with status ``failed`` if the block raises.
+    """
+    sample = Sample(stage, labels)
+    outer = getattr(_local, "sample", None)
+    _local.sample = sample
+    peak_before = _peak_rss_mb()
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    try:
+        yield sample
+    except BaseException as exc:
+        if not (isinstance(exc, SystemExit) and exc.code in (None, 0)):
+            sample.status = "failed"
+        raise
+    finally:
+        _local.sample = outer
+        peak = _peak_rss_mb()
+        sample.metric = metric = {
+            "ts": datetime.now().isoformat(timespec="seconds"),
+            **sample.labels,
+            "stage": sample.stage,
+            "status": sample.status,
+            "wall_s": round(time.perf_counter() - wall, 3),
+            "cpu_s": round(time.process_time() - cpu, 3),
+            "peak_rss_mb": None if peak is None else round(peak, 1),
+            "rss_growth_mb": (
+                None if peak is None else round(peak - (peak_before or 0.0), 1)
+            ),
+            "rows": sample.rows,
+        }
+        record(metric, path)
+
+
+def _rows(result: Any) -> int | None:
+    try:
+        return len(result)
+    except TypeError:
+        return None
+
+
+def timed(stage: str | None = None, **labels: Any) -> Callable:
+    """Decorator form of :func:`measure`; the result's ``len`` is its rows."""
+
+    def decorate(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with measure(stage or fn.__name__, **labels) as sample:
+                result = fn(*args, **kwargs)
+                if sample.rows is None:
+                    sample.rows = _rows(result)
+                return result
+
+        return wrapper
+
+    return decorate
+
+
+def first_race(races: Iterable[str]) -> str | None:
+    """Earliest off time (``HH:MM``, 24h) among racecard labels like ``1:30 Ascot``."""
+    minutes = []
+    for race in races:
+        match = _TIME_RE.match(str(race).strip())
+        if match:
+            minutes.append(racecard_minutes(int(match.group(1)), int(match.group(2))))
+    if not minutes:
+        return None
+    first = min(minutes)
+    return f"{first // 60:02d}:{first % 60:02d}"
+
+
+def load(path: Path | str | None = None) -> list[dict]:
+    """All samples in the time series at ``path`` (skipping corrupt lines)."""
+    path = Path(path or metrics_path())
+    if not path.exists():
+        return []
+    metrics = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                metrics.append(json.loads(line))
+            except ValueError:
+                continue
+    return metrics
+
+
+def _clock(hhmm: str | None) -> int | None:
+    if not hhmm:
+        return None
+    hour, minute = map(int, hhmm.split(":")[:2])
+    return hour * 60 + minute
+
+
+def _change(now: float | None, before: float | None) -> float | None:
+    if now is None or not before:
+        return None
+    return round((now - before) / before, 3)
+
+
+def report(
+    metrics: Iterable[dict],
+    pipeline: str | None = None,
+    days: int = 7,
+    threshold: float = 0.25,
+    min_seconds: float = 1.0,
+) -> list[dict]:
+    """Day-over-day comparison of the last ``days`` race days per stage.
+
+    The latest successful sample per ``(pipeline, stage, date)`` is compared
+    with the same stage on the previous recorded day. A stage regressed when
+    its wall time grew by more than ``threshold`` (a fraction) and by at least
+    ``min_seconds``. ``total`` rows also carry the finish time and, for the
+    morning run, the minutes left before the first race.
+    """
+    latest: dict[tuple[str, str, str], dict] = {}
+    for m in metrics:
+        if m.get("status") != "ok" or not m.get("date"):
+            continue
+        if pipeline and m.get("pipeline") != pipeline:
+            continue
+        key = (m.get("pipeline") or "-", m["stage"], m["date"])
+        if key not in latest or m.get("ts", "") >= latest[key].get("ts", ""):
+            latest[key] = m
+
+    by_stage: dict[tuple[str, str], list[dict]] = {}
+    for (name, stage, _), m in sorted(latest.items(), key=lambda kv: kv[0][2]):
+        by_stage.setdefault((name, stage), []).append(m)
+
+    recent = sorted({d for (_, _, d) in latest})[-days:]
+    rows = []
+    for (name, stage), samples in by_stage.items():
+        previous = None
+        for m in samples:
+            if m["date"] in recent:
+                row = {
+                    "pipeline": name,
+                    "stage": stage,
+                    "date": m["date"],
+                    "wall_s": m.get("wall_s"),
+                    "cpu_s": m.get("cpu_s"),
+                    "peak_rss_mb": m.get("peak_rss_mb"),
+                    "rows": m.get("rows"),
+                    "change": _change(
+                        m.get("wall_s"), previous and previous.get("wall_s")
+                    ),
+                }
+                before = previous.get("wall_s") if previous else None
+                row["regressed"] = bool(
+                    row["change"] is not None
+                    and row["change"] > threshold
+                    and m["wall_s"] - before >= min_seconds
+                )
+                if stage == TOTAL:
+                    row["finished"] = m.get("finished")
+                    row["first_race"] = m.get("first_race")
+                    off, done = _clock(m.get("first_race")), _clock(m.get("finished"))
+                    if off is not None and done is not None:
+                        row["margin_min"] = off - done
+                rows.append(row)
+            previous = m
+    rows.sort(key=lambda r: (r["pipeline"], r["date"], r["stage"] != TOTAL))
+    return rows
+
+
+def _fmt(value: Any, spec: str, width: int, unit: str = "") -> str:
+    text = format(value, spec) + unit if value is not None else "-"
+    return text.rjust(width)
+
+
+def print_report(rows: list[dict]) -> int:
+    """Print ``report`` rows grouped by pipeline and day; return regressions."""
+    if not rows:
+        print("No stage metrics recorded yet.")
+        return 0
+    regressions = 0
+    current = None
+    for row in rows:
+        if (row["pipeline"], row["date"]) != current:
+            current = (row["pipeline"], row["date"])
+            print(f"\n{row['pipeline']} {row['date']}")
+            print(
+                f"  {'stage':<16} {'wall':>9} {'change':>8} {'cpu':>9} "
+                f"{'peak MB':>9} {'rows':>7}"
+            )
+        change = f"{row['change']:+.0%}" if row["change"] is not None else "-"
+        flag = " ▲" if row["regressed"] else ""
+        regressions += row["regressed"]
+        print(
+            f"  {row['stage']:<16} {_fmt(row['wall_s'], '.2f', 9, 's')} {change:>8} "
+            f"{_fmt(row['cpu_s'], '.2f', 9, 's')} {_fmt(row['peak_rss_mb'], '.0f', 9)} "
+            f"{_fmt(row['rows'], 'd', 7)}{flag}"
+        )
+        if row["stage"] == TOTAL and row.get("finished"):
+            margin = row.get("margin_min")
+            note = (
+                f", first race {row['first_race']} ({margin} min margin)"
+                if margin is not None
+                else ""
+            )
+            print(f"  {'':<16} finished at {row['finished']}{note}")
+    if regressions:
+        print(f"\n▲ {regressions} stage(s) slower than the previous day")
+    return regressions
+
+
+def add_report_args(parser: argparse.ArgumentParser) -> None:
+    """Options shared by ``python -m tippingmonster.perf report`` and ``tmcli perf``."""
+    parser.add_argument("--pipeline", help="Only this pipeline")
+    parser.add_argument("--days", type=int, default=7, help="Race days to show")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="Flag stages this much slower than the previous day (0.25 = 25%%)",
+    )
+    parser.add_argument(
+        "--min-seconds",
+        type=float,
+        default=1.0,
+        help="Ignore slowdowns smaller than this many seconds",
+    )
+    parser.add_argument("--file", help="Metrics file (default logs/perf/stages.jsonl)")
+    parser.add_argument(
+        "--fail", action="store_true", help="Exit non-zero when a stage regressed"
+    )
+
+
+def run_report(args: argparse.Namespace) -> None:
+    rows = report(
+        load(args.file),
+        pipeline=args.pipeline,
+        days=args.days,
+        threshold=args.threshold,
+        min_seconds=args.min_seconds,
+    )
+    if print_report(rows) and args.fail:
+        sys.exit(1)
+
+
+def main(argv: Iterable[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Stage timing reports")
+    sub = parser.add_subparsers(dest="command", required=True)
+    add_report_args(sub.add_parser("report", help="Day-over-day stage timings"))
+    run_report(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    main()
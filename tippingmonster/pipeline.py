@@ -0,0 +1,1029 @@
+"""In-process runner and scheduler for the morning, ROI and nightly pipelines.
+
+``core/run_pipeline_with_venv.sh`` and ``roi/run_roi_pipeline.sh`` used to
+start a new interpreter for every step. Each one re-imported pandas, xgboost
+and boto3 and re-read the files the previous step had just written. Here each
+step is a :class:`Stage`: a function of one shared :class:`Context`, run in
+this process.
+
+* Each stage names the stages it runs ``after``. :class:`Pipeline` orders them,
+  with declaration order breaking ties, and rejects unknown names and cycles.
+* ``ready=`` attaches a readiness trigger (see :mod:`tippingmonster.triggers`):
+  a time, a file or a formed market. ``Pipeline.run`` starts a stage once its
+  dependencies are done and its trigger fires, instead of sleeping to a fixed
+  time. With ``workers > 1``, independent stages run concurrently in threads.
+* A stage's return value is kept in ``ctx.outputs`` for later stages. For
+  example the odds snapshot and the tips go straight from ``odds`` and
+  ``inference`` to ``merge``.
+* ``ctx.cached`` keeps loaded objects (the model bundle, the results history,
+  a day's results CSV) for the life of the process.
+* Each stage's stdout/stderr is appended to its own log, as in the shell
+  scripts. Its status, attempts, wait and wall time are recorded in
+  ``logs/pipeline/<name>_<date>.json``. Wall/CPU time, peak RSS and row
+  counts are also appended to the :mod:`tippingmonster.perf` time series.
+* ``retries=`` re-runs a failing stage. ``start=`` re-runs from a named stage,
+  and ``resume=True`` starts at the first stage that did not finish in the
+  recorded run. ``backfill`` resumes a pipeline over a range of dates.
+
+Run it with ``python -m tippingmonster.pipeline run morning`` (or
+``run nightly``, ``run roi --date YYYY-MM-DD``), or with ``tmcli pipeline`` /
+``tmcli roi``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import importlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field, replace
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator
+
+from . import perf
+from .triggers import Trigger, file_ready, market_ready, not_before
+from .utils import in_dev_mode, repo_root, send_telegram_message, upload_to_s3
+
+if TYPE_CHECKING:  # pragma: no cover
+    import pandas as pd
+
+__all__ = [
+    "Context",
+    "Stage",
+    "Pipeline",
+    "StageError",
+    "MORNING",
+    "ROI",
+    "NIGHTLY",
+    "PIPELINES",
+    "backfill",
+    "call_main",
+    "main",
+]
+
+BUCKET = "tipping-monster"
+MIN_CONF = 0.80
+RESULTS_FILE = "rpscrape/data/dates/all/{date_}.csv"
+DONE = ("ok", "skipped")
+
+
+class StageError(RuntimeError):
+    """A stage raised or exited non-zero; ``stage`` names it."""
+
+    def __init__(self, stage: str, message: str):
+        super().__init__(f"Stage '{stage}' failed: {message}")
+        self.stage = stage
+
+
+@dataclass
+class Context:
+    """State shared by the stages of one run (and, via ``cache``, across runs)."""
+
+    date: str = field(default_factory=lambda: date.today().isoformat())
+    dev: bool = False
+    root: Path = field(default_factory=repo_root)
+    outputs: dict[str, Any] = field(default_factory=dict)
+    cache: dict[Any, Any] = field(default_factory=dict)
+    _lock: threading.RLock = field(default_factory=threading.RLock, repr=False)
+
+    def cached(self, key, load: Callable[[], Any]) -> Any:
+        """``load()`` once for ``key`` and keep the result."""
+        with self._lock:
+            if key not in self.cache:
+                self.cache[key] = load()
+            return self.cache[key]
+
+    def path(self, *parts: str) -> Path:
+        return self.root.joinpath(*parts)
+
+    @property
+    def logs(self) -> str:
+        return "logs/dev" if self.dev or in_dev_mode() else "logs"
+
+
+@dataclass(frozen=True)
+class Stage:
+    """One pipeline step.
+
+    ``log`` is relative to the repo root and may use ``{logs}`` (``logs`` or
+    ``logs/dev``) and ``{date}``. A stage whose ``when`` returns false is
+    recorded as skipped. ``ready`` is polled until it returns true. A failing
+    stage is tried again up to ``retries`` times, ``retry_delay`` seconds apart.
+    """
+
+    name: str
+    run: Callable[[Context], Any]
+    after: tuple[str, ...] = ()
+    log: str | None = None
+    when: Callable[[Context], bool] | None = None
+    help: str = ""
+    ready: Trigger | None = None
+    retries: int = 0
+    retry_delay: float = 60.0
+
+
+def _ensure_importable(root: Path) -> None:
+    # Stage scripts import ``core``, ``roi`` and top-level modules by name
+    if str(root) not in sys.path:
+        sys.path.insert(0, str(root))
+
+
+def call_main(module: str, argv: list[str] | None = None, **kwargs) -> Any:
+    """Import ``module`` and call its ``main(argv, **kwargs)`` in this process.
+
+    A non-zero ``sys.exit`` in the script raises
+    :class:`subprocess.CalledProcessError`, like a ``check=True`` subprocess.
+    """
+    _ensure_importable(repo_root())
+    func = importlib.import_module(module).main
+    try:
+        return func(argv, **kwargs)
+    except SystemExit as exc:
+        if exc.code in (None, 0):
+            return None
+        code = exc.code if isinstance(exc.code, int) else 1
+        raise subprocess.CalledProcessError(code, [module, *(argv or [])]) from exc
+
+
+class _StreamRouter:
+    """``sys.stdout``/``sys.stderr`` stand-in that writes to the current stage's log.
+
+    Stages can run in worker threads, so ``contextlib.redirect_stdout`` (which
+    swaps the process-wide stream) would mix their logs together.
+    """
+
+    def __init__(self, default):
+        self.default = default
+        self.local = threading.local()
+
+    @property
+    def target(self):
+        return getattr(self.local, "stream", None) or self.default
+
+    def write(self, text: str) -> int:
+        return self.target.write(text)
+
+    def flush(self) -> None:
+        self.target.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.target, name)
+
+
+@contextlib.contextmanager
+def _environment(ctx: Context) -> Iterator[None]:
+    """Run from the repo root, importable, with dev mode and log routing."""
+    cwd = Path.cwd()
+    saved = {k: os.environ.get(k) for k in ("TM_DEV_MODE", "TM_LOG_DIR")}
+    streams = sys.stdout, sys.stderr
+    _ensure_importable(ctx.root)
+    if ctx.dev:
+        os.environ["TM_DEV_MODE"] = "1"
+        os.environ["TM_LOG_DIR"] = "logs/dev"
+    os.chdir(ctx.root)
+    sys.stdout, sys.stderr = _StreamRouter(sys.stdout), _StreamRouter(sys.stderr)
+    try:
+        yield
+    finally:
+        sys.stdout, sys.stderr = streams
+        os.chdir(cwd)
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+@contextlib.contextmanager
+def _stage_log(ctx: Context, stage: Stage) -> Iterator[None]:
+    if stage.log is None:
+        yield
+        return
+    path = ctx.path(stage.log.format(logs=ctx.logs, date=ctx.date))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    routers = [s for s in (sys.stdout, sys.stderr) if isinstance(s, _StreamRouter)]
+    with open(path, "a", encoding="utf-8") as fh:
+        for router in routers:
+            router.local.stream = fh
+        try:
+            yield
+        finally:
+            for router in routers:
+                router.local.stream = None
+
+
+def _perf_path(ctx: Context) -> Path:
+    return Path(os.getenv("TM_PERF_LOG") or ctx.path(ctx.logs, "perf", "stages.jsonl"))
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+class Pipeline:
+    """A named graph of :class:`Stage` objects.
+
+    ``summary(ctx)`` may return extra fields for the run's ``total`` perf
+    sample, such as the first race off time.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        stages: Iterable[Stage],
+        summary: Callable[[Context], dict] | None = None,
+    ):
+        self.name = name
+        self.summary = summary
+        self._lock = threading.Lock()
+        self.stages: dict[str, Stage] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate stage: {stage.name}")
+            self.stages[stage.name] = stage
+        for stage in self.stages.values():
+            unknown = [d for d in stage.after if d not in self.stages]
+            if unknown:
+                raise ValueError(f"Stage '{stage.name}' runs after unknown {unknown}")
+        self.order = self._order()
+
+    def _order(self) -> list[Stage]:
+        done: set[str] = set()
+        order = []
+        pending = list(self.stages.values())
+        while pending:
+            ready = next((s for s in pending if done.issuperset(s.after)), None)
+            if ready is None:
+                names = ", ".join(s.name for s in pending)
+                raise ValueError(f"Stage dependencies form a cycle: {names}")
+            pending.remove(ready)
+            done.add(ready.name)
+            order.append(ready)
+        return order
+
+    def names(self) -> list[str]:
+        return [s.name for s in self.order]
+
+    def state_path(self, ctx: Context) -> Path:
+        return ctx.path(ctx.logs, "pipeline", f"{self.name}_{ctx.date}.json")
+
+    def load_state(self, ctx: Context) -> dict:
+        """The run record written by the last run for ``ctx.date``."""
+        path = self.state_path(ctx)
+        if not path.exists():
+            return {}
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_state(self, ctx: Context, record: dict) -> None:
+        path = self.state_path(ctx)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".json.tmp")
+        with self._lock:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(record, f, indent=2)
+            tmp.replace(path)
+
+    def select(
+        self, start: str | None = None, only: Iterable[str] | None = None
+    ) -> list[Stage]:
+        """Stages from ``start`` onwards, or just those in ``only``."""
+        wanted = list(only or []) + ([start] if start else [])
+        unknown = [n for n in wanted if n not in self.stages]
+        if unknown:
+            raise ValueError(f"Unknown stage(s) for {self.name}: {unknown}")
+        if only:
+            return [s for s in self.order if s.name in set(only)]
+        if start:
+            return self.order[self.names().index(start) :]
+        return list(self.order)
+
+    def run(
+        self,
+        ctx: Context,
+        start: str | None = None,
+        only: Iterable[str] | None = None,
+        resume: bool = False,
+        workers: int = 1,
+        poll: float = 30.0,
+        ready_timeout: float | None = None,
+    ) -> dict:
+        """Run the selected stages and return the run record.
+
+        A stage starts once the stages it runs ``after`` are done (or not
+        selected) and its ``ready`` trigger fires; at most ``workers`` run at
+        once. Triggers are polled every ``poll`` seconds, and a stage whose
+        trigger has not fired after ``ready_timeout`` seconds fails.
+
+        With ``resume`` the run starts at the first stage that did not finish
+        in the recorded run for ``ctx.date``. The statuses of the stages
+        before it are kept in the record.
+        """
+        previous = self.load_state(ctx).get("stages", {}) if resume else {}
+        if resume and start is None and not only:
+            start = next(
+                (
+                    n
+                    for n in self.names()
+                    if previous.get(n, {}).get("status") not in DONE
+                ),
+                None,
+            )
+            if start is None:
+                print(f"✅ {self.name} already complete for {ctx.date}")
+                return self.load_state(ctx)
+        stages = self.select(start, only)
+        record = {
+            "pipeline": self.name,
+            "date": ctx.date,
+            "started": _now(),
+            "stages": {n: previous[n] for n in self.names() if n in previous},
+        }
+        selected = {s.name for s in stages}
+        # Stages outside the selection count as done
+        done = {n for n in self.names() if n not in selected}
+        pending = list(stages)
+        running: dict[Future, Stage] = {}
+        attempts: dict[str, int] = {}
+        not_until: dict[str, float] = {}
+        waiting: dict[str, float] = {}
+        failure: StageError | None = None
+        began = time.perf_counter()
+
+        with _environment(ctx), ThreadPoolExecutor(max_workers=workers) as pool:
+            while pending or running:
+                now = time.monotonic()
+                for stage in list(pending) if failure is None else []:
+                    if len(running) >= workers:
+                        break
+                    if not done.issuperset(stage.after):
+                        continue
+                    if now < not_until.get(stage.name, 0.0):
+                        continue
+                    if stage.when is not None and not stage.when(ctx):
+                        pending.remove(stage)
+                        done.add(stage.name)
+                        self._skip(ctx, stage, record)
+                        continue
+                    since = waiting.setdefault(stage.name, now)
+                    if stage.ready is not None and not stage.ready(ctx):
+                        if ready_timeout is not None and now - since >= ready_timeout:
+                            pending.remove(stage)
+                            failure = self._not_ready(ctx, stage, record, now - since)
+                        continue
+                    pending.remove(stage)
+                    attempts[stage.name] = attempts.get(stage.name, 0) + 1
+                    future = pool.submit(
+                        self._run_stage,
+                        ctx,
+                        stage,
+                        record,
+                        attempts[stage.name],
+                        now - since,
+                    )
+                    running[future] = stage
+                if not running:
+                    if failure is not None or not pending:
+                        break
+                    time.sleep(poll)
+                    continue
+                finished, _ = wait(
+                    list(running), timeout=poll, return_when=FIRST_COMPLETED
+                )
+                for future in finished:
+                    stage = running.pop(future)
+                    try:
+                        future.result()
+                    except StageError as exc:
+                        if attempts[stage.name] <= stage.retries and failure is None:
+                            print(
+                                f"🔁 Retrying {stage.name} in {stage.retry_delay:.0f}s"
+                            )
+                            not_until[stage.name] = time.monotonic() + stage.retry_delay
+                            pending.insert(0, stage)
+                        elif failure is None:
+                            failure = exc
+                    else:
+                        done.add(stage.name)
+
+        record["finished"] = _now()
+        self._save_state(ctx, record)
+        self._record_total(ctx, record, time.perf_counter() - began, failure)
+        if failure is not None:
+            raise failure
+        return record
+
+    def _record_total(
+        self,
+        ctx: Context,
+        record: dict,
+        seconds: float,
+        failure: StageError | None,
+    ) -> None:
+        metric = {
+            "ts": record["finished"],
+            "pipeline": self.name,
+            "date": ctx.date,
+            "stage": perf.TOTAL,
+            "status": "failed" if failure else "ok",
+            "wall_s": round(seconds, 3),
+            "finished": datetime.now().strftime("%H:%M"),
+        }
+        if self.summary is not None and failure is None:
+            try:
+                metric.update(self.summary(ctx))
+            except Exception as exc:  # metrics must never fail a run
+                print(f"⚠️ {self.name} summary failed: {exc!r}")
+        perf.record(metric, _perf_path(ctx))
+
+    def _skip(self, ctx: Context, stage: Stage, record: dict) -> None:
+        entry = {"started": _now(), "status": "skipped", "seconds": 0.0}
+        record["stages"][stage.name] = entry
+        print(f"⏭️ {stage.name}: skipped ({stage.help or 'condition not met'})")
+        self._save_state(ctx, record)
+
+    def _not_ready(
+        self, ctx: Context, stage: Stage, record: dict, waited: float
+    ) -> StageError:
+        error = (
+            f"not ready after {waited:.0f}s ({getattr(stage.ready, '__name__', '')})"
+        )
+        record["stages"][stage.name] = {
+            "started": _now(),
+            "status": "failed",
+            "seconds": 0.0,
+            "waited": round(waited, 3),
+            "error": error,
+        }
+        self._save_state(ctx, record)
+        print(f"❌ {stage.name}: {error}")
+        return StageError(stage.name, error)
+
+    def _run_stage(
+        self,
+        ctx: Context,
+        stage: Stage,
+        record: dict,
+        attempt: int = 1,
+        waited: float = 0.0,
+    ) -> None:
+        entry = {"started": _now(), "status": "running", "attempt": attempt}
+        if waited:
+            entry["waited"] = round(waited, 3)
+        record["stages"][stage.name] = entry
+        self._save_state(ctx, record)
+        print(f"▶️ {stage.name}...", flush=True)
+        error = None
+        measured = perf.measure(
+            stage.name,
+            _perf_path(ctx),
+            pipeline=self.name,
+            date=ctx.date,
+            attempt=attempt,
+        )
+        try:
+            with measured as sample, _stage_log(ctx, stage):
+                result = ctx.outputs[stage.name] = stage.run(ctx)
+                if sample.rows is None and isinstance(result, (list, dict)):
+                    sample.rows = len(result)
+        except SystemExit as exc:
+            if exc.code not in (None, 0):
+                error = f"exit status {exc.code}"
+        except Exception as exc:
+            error = repr(exc)
+        metric = sample.metric
+        seconds = metric["wall_s"]
+        entry.update(status="failed" if error else "ok", seconds=seconds)
+        for key in ("cpu_s", "peak_rss_mb", "rows"):
+            if metric.get(key) is not None:
+                entry[key] = metric[key]
+        if error:
+            entry["error"] = error
+        self._save_state(ctx, record)
+        if error:
+            print(f"❌ {stage.name} failed after {seconds:.2f}s: {error}")
+            raise StageError(stage.name, error)
+        print(f"✅ {stage.name} ({seconds:.2f}s)")
+
+
+def backfill(
+    pipeline: Pipeline,
+    start: str,
+    end: str,
+    only: Iterable[str] | None = None,
+    dev: bool = False,
+    root: Path | None = None,
+    **options,
+) -> dict[str, dict | str]:
+    """Run ``pipeline`` for each date in ``[start, end]``, resuming each day.
+
+    Days already complete in their run record are not re-run, so a backfill
+    can be repeated after a failure. ``options`` go to :meth:`Pipeline.run`.
+    Returns the record (or the error) per date.
+    """
+    day = date.fromisoformat(start)
+    cache: dict = {}
+    results: dict[str, dict | str] = {}
+    while day <= date.fromisoformat(end):
+        # One cache for the whole range: the model and history load once
+        ctx = Context(
+            date=day.isoformat(), dev=dev, root=root or repo_root(), cache=cache
+        )
+        try:
+            results[ctx.date] = pipeline.run(
+                ctx, only=only, resume=only is None, **options
+            )
+        except StageError as exc:
+            results[ctx.date] = str(exc)
+        day += timedelta(days=1)
+    return results
+
+
+def _module(name: str):
+    return importlib.import_module(name)
+
+
+def _dev_args(ctx: Context) -> list[str]:
+    return ["--dev"] if ctx.dev else []
+
+
+# === Morning pipeline ===
+
+
+def _script(ctx: Context, script: str, *args: str) -> None:
+    proc = subprocess.run(
+        ["bash", str(ctx.path(script)), *args],
+        capture_output=True,
+        text=True,
+        env={**os.environ, "TM_DEV_MODE": os.getenv("TM_DEV_MODE", "0")},
+    )
+    sys.stdout.write(proc.stdout)
+    sys.stderr.write(proc.stderr)
+    proc.check_returncode()
+
+
+def upload_racecards(ctx: Context) -> None:
+    """Scrape today's racecards, ingest them and upload them to S3."""
+    # rpscrape runs from its own checkout, so this step stays a script
+    _script(ctx, "core/daily_upload_racecards.sh")
+
+
+def flatten(ctx: Context) -> list[dict]:
+    racecards = ctx.path("rpscrape", "racecards", f"{ctx.date}.json")
+    output = ctx.path("rpscrape", "batch_inputs", f"{ctx.date}.jsonl")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    rows = call_main("core.flatten_racecards_v3", [str(racecards), str(output)])
+    upload_to_s3(output, BUCKET, f"batch_inputs/{ctx.date}.jsonl")
+    return rows
+
+
+def inference(ctx: Context) -> list[dict]:
+    module = _module("core.run_inference_and_select_top1")
+    model = module.resolve_model(module.latest_model())
+    bundle = ctx.cached(
+        ("model", model, os.path.getmtime(model)),
+        lambda: module.load_model_bundle(model),
+    )
+    history = ctx.cached(("results_history", ctx.date), module.load_combined_results)
+    return call_main(
+        module.__name__, _dev_args(ctx), bundle=bundle, combined_results=history
+    )
+
+
+def fetch_odds(ctx: Context) -> list[dict] | None:
+    return call_main("core.fetch_betfair_odds", _dev_args(ctx))
+
+
+def merge(ctx: Context) -> list[dict]:
+    # Tips/odds from this run skip re-reading output.jsonl and the snapshot
+    return call_main(
+        "core.merge_odds_into_tips",
+        ["--date", ctx.date],
+        tips=ctx.outputs.get("inference"),
+        odds=ctx.outputs.get("odds"),
+    )
+
+
+def dispatch(ctx: Context) -> None:
+    argv = ["--date", ctx.date, "--min_conf", f"{MIN_CONF:.2f}", "--telegram"]
+    call_main("core.dispatch_tips", argv + _dev_args(ctx))
+    perf.count(len(ctx.outputs.get("merge") or []))
+
+
+def sent_tips_file(ctx: Context) -> Path:
+    return ctx.path(ctx.logs, "dispatch", f"sent_tips_{ctx.date}.jsonl")
+
+
+def confirm_dispatch(ctx: Context) -> int:
+    """Count the tips sent and alert Telegram when there were none."""
+    path = sent_tips_file(ctx)
+    count = 0
+    if path.exists():
+        with open(path, "r", encoding="utf-8") as f:
+            count = sum(1 for line in f if line.strip())
+    print(f"🧾 Dispatched {count} tip(s) to Telegram")
+    if not count:
+        log = ctx.path(ctx.logs, "dispatch", f"dispatch_{ctx.date}.log")
+        print("⚠️ Warning: No tips were dispatched today.")
+        if not ctx.dev:
+            send_telegram_message(
+                f"⚠️ *No tips were dispatched this morning.*\nCheck logs: `{log}`"
+            )
+    return count
+
+
+def upload_outputs(ctx: Context) -> None:
+    files = [
+        (sent_tips_file(ctx), "sent_tips"),
+        (ctx.path("logs", "roi", f"tips_results_{ctx.date}_advised.csv"), "results"),
+    ]
+    for path, prefix in files:
+        if path.exists():
+            upload_to_s3(path, BUCKET, f"{prefix}/{path.name}")
+        else:
+            print(f"⚠️ {path} not found, skipping S3 upload")
+
+
+def morning_summary(ctx: Context) -> dict:
+    """The first race off time, to compare with when the tips went out."""
+    rows = ctx.outputs.get("flatten")
+    if rows is None:
+        path = ctx.path("rpscrape", "batch_inputs", f"{ctx.date}.jsonl")
+        if not path.exists():
+            return {}
+        with open(path, "r", encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+    return {"first_race": perf.first_race(r.get("race", "") for r in rows)}
+
+
+MORNING = Pipeline(
+    "morning",
+    [
+        Stage("racecards", upload_racecards, log="{logs}/racecards.log"),
+        Stage("flatten", flatten, after=("racecards",), log="{logs}/flatten.log"),
+        Stage(
+            "inference",
+            inference,
+            after=("flatten",),
+            log="{logs}/inference/inference.log",
+        ),
+        # Odds wait for a formed market (08:50 at the latest), not for inference
+        Stage(
+            "odds",
+            fetch_odds,
+            log="{logs}/odds.log",
+            ready=market_ready(),
+            retries=2,
+        ),
+        Stage("merge", merge, after=("inference", "odds"), log="{logs}/merge.log"),
+        Stage(
+            "dispatch",
+            dispatch,
+            after=("merge",),
+            log="{logs}/dispatch/dispatch_{date}.log",
+        ),
+        Stage("confirm", confirm_dispatch, after=("dispatch",)),
+        Stage("upload", upload_outputs, after=("dispatch",)),
+    ],
+    summary=morning_summary,
+)
+
+
+# === ROI pipeline ===
+
+
+def results_frame(ctx: Context) -> pd.DataFrame | None:
+    """The day's raw results CSV, read once and shared by the ROI trackers."""
+    path = ctx.path(RESULTS_FILE.format(date_=ctx.date.replace("-", "_")))
+    if not path.exists():
+        return None
+    import pandas as pd
+
+    key = ("results", str(path), path.stat().st_mtime_ns)
+    frame = ctx.cached(key, lambda: pd.read_csv(path))
+    perf.count(len(frame))
+    return frame
+
+
+def realistic_odds(ctx: Context) -> None:
+    _module("core.extract_best_realistic_odds").main(ctx.date)
+
+
+def roi_csv(ctx: Context) -> None:
+    _module("roi.generate_tip_results_csv_with_mode_FINAL").main(ctx.date, "advised")
+
+
+def roi_advised(ctx: Context) -> None:
+    tracker = _module("roi.roi_tracker_advised")
+    tracker.main(ctx.date, "advised", MIN_CONF, False, True, results=results_frame(ctx))
+
+
+def roi_level(ctx: Context) -> None:
+    tracker = _module("roi.roi_tracker_advised")
+    tracker.main(ctx.date, "level", MIN_CONF, False, False, results=results_frame(ctx))
+
+
+def send_roi(ctx: Context) -> None:
+    _module("roi.send_daily_roi_summary").send_daily_roi(ctx.date, dev=ctx.dev)
+
+
+def tag_roi(ctx: Context) -> None:
+    tracker = _module("roi.tag_roi_tracker")
+    tracker.main(ctx.date, "advised", MIN_CONF, False, results=results_frame(ctx))
+
+
+def update_tip_index(ctx: Context) -> None:
+    paths = [
+        ctx.path("logs", "dispatch", f"sent_tips_{ctx.date}.jsonl"),
+        ctx.path("predictions", ctx.date, "tips_with_odds.jsonl"),
+        ctx.path("logs", "roi", f"tips_results_{ctx.date}_advised.csv"),
+    ]
+    call_main("tippingmonster.tip_index", ["add", *map(str, paths)])
+
+
+def rolling_roi(ctx: Context) -> None:
+    _module("generate_rolling_roi").main(30)
+
+
+def build_warehouse(ctx: Context) -> None:
+    call_main("roi.warehouse", ["build"])
+
+
+def _has_sent_tips(ctx: Context) -> bool:
+    return ctx.path("logs", "dispatch", f"sent_tips_{ctx.date}.jsonl").exists()
+
+
+def _has_predictions(ctx: Context) -> bool:
+    return ctx.path("predictions", ctx.date, "tips_with_odds.jsonl").exists()
+
+
+results_ready = file_ready(RESULTS_FILE)
+
+ROI_STAGES = [
+    Stage(
+        "realistic_odds",
+        realistic_odds,
+        log="logs/roi/inject_real_odds_{date}.log",
+    ),
+    Stage(
+        "roi_csv",
+        roi_csv,
+        after=("realistic_odds",),
+        log="logs/roi/generate_roi_csv_{date}.log",
+    ),
+    Stage(
+        "roi_advised",
+        roi_advised,
+        after=("roi_csv",),
+        log="logs/roi/roi_advised_{date}.log",
+        when=_has_sent_tips,
+        help="sent tips file not found",
+        ready=results_ready,
+    ),
+    # Both trackers update the bankroll files, so they never overlap
+    Stage(
+        "roi_level",
+        roi_level,
+        after=("roi_advised",),
+        log="logs/roi/roi_level_{date}.log",
+        when=_has_predictions,
+        help="predictions file not found",
+        ready=results_ready,
+    ),
+    Stage(
+        "send_roi",
+        send_roi,
+        after=("roi_advised", "roi_level"),
+        log="logs/roi/roi_telegram_{date}.log",
+    ),
+    Stage(
+        "tag_roi",
+        tag_roi,
+        after=("roi_csv",),
+        log="logs/roi/tag_roi_{date}.log",
+        ready=results_ready,
+    ),
+    Stage(
+        "tip_index",
+        update_tip_index,
+        after=("roi_advised",),
+        log="logs/roi/tip_index_{date}.log",
+    ),
+    Stage(
+        "rolling_roi",
+        rolling_roi,
+        after=("roi_advised",),
+        log="logs/roi/rolling_roi_{date}.log",
+    ),
+    Stage(
+        "warehouse",
+        build_warehouse,
+        after=("roi_advised", "roi_level", "tag_roi"),
+        log="logs/roi/warehouse_{date}.log",
+    ),
+]
+
+ROI = Pipeline("roi", ROI_STAGES)
+
+
+# === Nightly pipeline: results, calibration and ROI ===
+
+
+def upload_results(ctx: Context) -> None:
+    """Scrape the day's results and upload them."""
+    _script(ctx, "core/daily_upload_results.sh", ctx.date)
+
+
+def _update_store(ctx: Context, module: str, *args: str) -> None:
+    """Fold the day's results CSV into a derived store, warning on failure.
+
+    These stores are only read by later training and inference runs, so a
+    failure must not re-run the results scrape or block the stages after it.
+    """
+    path = ctx.path(RESULTS_FILE.format(date_=ctx.date.replace("-", "_")))
+    try:
+        call_main(module, [*args, str(path)])
+    except Exception as exc:
+        print(f"⚠️ {module} update failed: {exc!r}")
+
+
+def update_results_store(ctx: Context) -> None:
+    push = [] if ctx.dev or in_dev_mode() else ["--push"]
+    _update_store(ctx, "tippingmonster.results_store", "ingest", *push)
+
+
+def update_form_stats(ctx: Context) -> None:
+    _update_store(ctx, "core.form_stats", "update")
+
+
+def update_horse_form(ctx: Context) -> None:
+    _update_store(ctx, "core.horse_form", "update")
+
+
+def calibrate(ctx: Context) -> None:
+    call_main("roi.calibrate_confidence_daily", ["--date", ctx.date])
+
+
+def subscriber_log(ctx: Context) -> None:
+    _module("roi.generate_subscriber_log").main(ctx.date)
+    master = ctx.path("logs", "roi", "master_subscriber_log.csv")
+    upload_to_s3(master, "tipping-monster-data", master.name)
+
+
+NIGHTLY = Pipeline(
+    "nightly",
+    [
+        Stage(
+            "results",
+            upload_results,
+            log="logs/inference/upload_results_{date}.log",
+            ready=not_before("22:30", "TM_RESULTS_TIME"),
+            retries=2,
+            retry_delay=600.0,
+        ),
+        Stage(
+            "calibrate",
+            calibrate,
+            after=("results",),
+            log="logs/inference/calibrate_conf_{date}.log",
+            ready=results_ready,
+        ),
+        Stage(
+            "subscriber_log",
+            subscriber_log,
+            after=("results",),
+            log="logs/roi/generate_subscriber_log_{date}.log",
+        ),
+        # The ROI stages that had no dependency now wait for the results upload
+        *[replace(s, after=s.after or ("results",)) for s in ROI_STAGES],
+        # Stores for later training/inference runs go last, off the ROI path
+        Stage(
+            "results_store",
+            update_results_store,
+            after=("results",),
+            log="logs/inference/results_store_{date}.log",
+        ),
+        Stage(
+            "form_stats",
+            update_form_stats,
+            after=("results",),
+            log="logs/inference/form_stats_{date}.log",
+        ),
+        Stage(
+            "horse_form",
+            update_horse_form,
+            after=("results",),
+            log="logs/inference/horse_form_{date}.log",
+        ),
+    ],
+)
+
+PIPELINES = {p.name: p for p in (MORNING, ROI, NIGHTLY)}
+
+
+def _print_record(record: dict) -> None:
+    for name, entry in record.get("stages", {}).items():
+        seconds = entry.get("seconds")
+        took = f"{seconds:8.2f}s" if seconds is not None else " " * 9
+        waited = f"  waited {entry['waited']:.0f}s" if entry.get("waited") else ""
+        print(f"  {name:<16} {entry.get('status', '?'):<8} {took}{waited}")
+
+
+def add_run_args(parser: argparse.ArgumentParser) -> None:
+    """Options shared by ``run``/``backfill`` here and ``tmcli pipeline``/``roi``."""
+    parser.add_argument("--dev", action="store_true", help="Enable dev mode")
+    parser.add_argument("--only", nargs="+", help="Run just these stages")
+    parser.add_argument(
+        "--workers", type=int, default=2, help="Stages to run at once (default 2)"
+    )
+    parser.add_argument(
+        "--poll", type=float, default=30.0, help="Seconds between trigger checks"
+    )
+    parser.add_argument(
+        "--ready-timeout",
+        type=float,
+        default=4 * 3600,
+        help="Fail a stage whose trigger has not fired after this many seconds",
+    )
+
+
+def run_options(args: argparse.Namespace) -> dict:
+    return {
+        "workers": args.workers,
+        "poll": args.poll,
+        "ready_timeout": args.ready_timeout,
+    }
+
+
+def main(argv: Iterable[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Run a pipeline in-process")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run", help="Run a pipeline's stages")
+    run.add_argument("pipeline", choices=sorted(PIPELINES))
+    run.add_argument("--date", help="Date YYYY-MM-DD (default today)")
+    run.add_argument("--from", dest="start", help="Start at this stage")
+    run.add_argument(
+        "--resume", action="store_true", help="Start at the first unfinished stage"
+    )
+    add_run_args(run)
+    fill = sub.add_parser("backfill", help="Run a pipeline over a range of dates")
+    fill.add_argument("pipeline", choices=sorted(PIPELINES))
+    fill.add_argument("--start", required=True, help="First date YYYY-MM-DD")
+    fill.add_argument("--end", default=date.today().isoformat(), help="Last date")
+    add_run_args(fill)
+    show = sub.add_parser("list", help="Show a pipeline's stages in run order")
+    show.add_argument("pipeline", choices=sorted(PIPELINES))
+    status = sub.add_parser("status", help="Show the recorded run for a date")
+    status.add_argument("pipeline", choices=sorted(PIPELINES))
+    status.add_argument("--date", default=date.today().isoformat())
+    args = parser.parse_args(argv)
+
+    pipeline = PIPELINES[args.pipeline]
+    if args.command == "list":
+        for stage in pipeline.order:
+            after = ", ".join(stage.after) or "-"
+            ready = getattr(stage.ready, "__name__", "")
+            print(f"{stage.name:<16} after: {after:<32} {ready}".rstrip())
+        return
+    if args.command == "status":
+        _print_record(pipeline.load_state(Context(date=args.date)))
+        return
+    if args.command == "backfill":
+        results = backfill(
+            pipeline, args.start, args.end, args.only, args.dev, **run_options(args)
+        )
+        failed = {d: r for d, r in results.items() if isinstance(r, str)}
+        for day, error in failed.items():
+            print(f"❌ {day}: {error}")
+        print(f"Backfilled {len(results) - len(failed)}/{len(results)} day(s)")
+        if failed:
+            sys.exit(1)
+        return
+
+    ctx = Context(date=args.date or date.today().isoformat(), dev=args.dev)
+    print(f"🔄 Starting {pipeline.name} pipeline for {ctx.date}")
+    try:
+        record = pipeline.run(
+            ctx,
+            start=args.start,
+            only=args.only,
+            resume=args.resume,
+            **run_options(args),
+        )
+    except StageError as exc:
+        _print_record(pipeline.load_state(ctx))
+        print(f"Resume with: --resume (from '{exc.stage}')")
+        sys.exit(1)
+    _print_record(record)
+    print(f"✅ {pipeline.name} pipeline complete")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,419 @@
+"""Indexed SQLite store of full racecards.
+
+``rpscrape/racecards/<date>.json`` (``{region: {course: {off: race}}}``) is
+flattened into two typed tables:
+
+``races``
+    one row per ``race_id``: course, off time, distance, class, going, ...
+``runners``
+    one row per ``(race_id, horse_id)``: weights, ratings, draw, headgear,
+    form, jockey/trainer ids, pedigree and the racecard stats blocks
+
+Runners are indexed by horse, trainer and jockey (each with date), so "every
+past card for this horse" or "which trainers has it had" is an index lookup
+instead of a scan over the JSON files. ``ingest_file`` upserts a whole day in
+one transaction and is idempotent: re-ingesting a card updates rows in place
+and drops runners that have since been taken out of a race.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from .utils import repo_path
+
+__all__ = [
+    "connect",
+    "db_path",
+    "flatten_card",
+    "ingest_card",
+    "ingest_file",
+    "horse_history",
+    "prior_trainers",
+    "runners_on",
+    "find_runner",
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS races (
+    race_id        INTEGER PRIMARY KEY,
+    date           TEXT NOT NULL,
+    region         TEXT,
+    course         TEXT,
+    course_id      INTEGER,
+    off_time       TEXT,
+    race_name      TEXT,
+    type           TEXT,
+    race_class     TEXT,
+    pattern        TEXT,
+    age_band       TEXT,
+    rating_band    TEXT,
+    distance       TEXT,
+    distance_round TEXT,
+    distance_f     REAL,
+    prize          TEXT,
+    field_size     INTEGER,
+    going          TEXT,
+    going_detailed TEXT,
+    surface        TEXT,
+    ingested_at    TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS races_date_course ON races (date, course);
+
+CREATE TABLE IF NOT EXISTS runners (
+    race_id            INTEGER NOT NULL REFERENCES races (race_id),
+    horse_id           INTEGER NOT NULL,
+    date               TEXT NOT NULL,
+    name               TEXT,
+    age                INTEGER,
+    sex_code           TEXT,
+    region             TEXT,
+    number             INTEGER,
+    draw               INTEGER,
+    lbs                INTEGER,
+    ofr                INTEGER,
+    rpr                INTEGER,
+    ts                 INTEGER,
+    headgear           TEXT,
+    headgear_first     TEXT,
+    form               TEXT,
+    last_run           INTEGER,
+    jockey             TEXT,
+    jockey_id          INTEGER,
+    trainer            TEXT,
+    trainer_id         INTEGER,
+    trainer_rtf        REAL,
+    trainer_14d_runs   INTEGER,
+    trainer_14d_wins   INTEGER,
+    trainer_win_pct    REAL,
+    trainer_profit     REAL,
+    jockey_win_pct     REAL,
+    jockey_profit      REAL,
+    course_runs        INTEGER,
+    course_wins        INTEGER,
+    distance_runs      INTEGER,
+    distance_wins      INTEGER,
+    going_runs         INTEGER,
+    going_wins         INTEGER,
+    owner              TEXT,
+    sire               TEXT,
+    dam                TEXT,
+    damsire            TEXT,
+    comment            TEXT,
+    spotlight          TEXT,
+    PRIMARY KEY (race_id, horse_id)
+);
+CREATE INDEX IF NOT EXISTS runners_horse ON runners (horse_id, date);
+CREATE INDEX IF NOT EXISTS runners_trainer ON runners (trainer_id, date);
+CREATE INDEX IF NOT EXISTS runners_jockey ON runners (jockey_id, date);
+CREATE INDEX IF NOT EXISTS runners_date_name ON runners (date, name COLLATE NOCASE);
+"""
+
+RACE_COLUMNS = [
+    "race_id",
+    "date",
+    "region",
+    "course",
+    "course_id",
+    "off_time",
+    "race_name",
+    "type",
+    "race_class",
+    "pattern",
+    "age_band",
+    "rating_band",
+    "distance",
+    "distance_round",
+    "distance_f",
+    "prize",
+    "field_size",
+    "going",
+    "going_detailed",
+    "surface",
+    "ingested_at",
+]
+
+RUNNER_COLUMNS = [
+    "race_id",
+    "horse_id",
+    "date",
+    "name",
+    "age",
+    "sex_code",
+    "region",
+    "number",
+    "draw",
+    "lbs",
+    "ofr",
+    "rpr",
+    "ts",
+    "headgear",
+    "headgear_first",
+    "form",
+    "last_run",
+    "jockey",
+    "jockey_id",
+    "trainer",
+    "trainer_id",
+    "trainer_rtf",
+    "trainer_14d_runs",
+    "trainer_14d_wins",
+    "trainer_win_pct",
+    "trainer_profit",
+    "jockey_win_pct",
+    "jockey_profit",
+    "course_runs",
+    "course_wins",
+    "distance_runs",
+    "distance_wins",
+    "going_runs",
+    "going_wins",
+    "owner",
+    "sire",
+    "dam",
+    "damsire",
+    "comment",
+    "spotlight",
+]
+
+INT_COLUMNS = (
+    "age",
+    "number",
+    "draw",
+    "lbs",
+    "ofr",
+    "rpr",
+    "ts",
+    "last_run",
+    "jockey_id",
+    "trainer_id",
+)
+
+
+def db_path(path: Path | str | None = None) -> Path:
+    if path is not None:
+        return Path(path)
+    return Path(os.getenv("TM_RACECARD_DB", repo_path("data", "racecards.sqlite")))
+
+
+def connect(path: Path | str | None = None) -> sqlite3.Connection:
+    path = db_path(path)
+    if str(path) != ":memory:":
+        path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _int(value) -> int | None:
+    try:
+        return int(float(str(value).strip().rstrip("%")))
+    except (TypeError, ValueError):
+        return None
+
+
+def _float(value) -> float | None:
+    try:
+        return float(str(value).strip().rstrip("%"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _races(card: dict) -> Iterator[dict]:
+    for courses in card.values():
+        if not isinstance(courses, dict):
+            continue
+        for races in courses.values():
+            if not isinstance(races, dict):
+                continue
+            for race in races.values():
+                if isinstance(race, dict) and race.get("race_id") is not None:
+                    yield race
+
+
+def _race_row(race: dict, ingested_at: str) -> dict:
+    return {
+        **{c: race.get(c) for c in RACE_COLUMNS},
+        "race_id": _int(race["race_id"]),
+        "course_id": _int(race.get("course_id")),
+        "distance_f": _float(race.get("distance_f")),
+        "field_size": _int(race.get("field_size")),
+        "ingested_at": ingested_at,
+    }
+
+
+def _runner_row(race: dict, runner: dict) -> dict:
+    stats = runner.get("stats") or {}
+    trainer = stats.get("trainer") or {}
+    jockey = stats.get("jockey") or {}
+    t14 = runner.get("trainer_14_days") or {}
+    row = {c: runner.get(c) for c in RUNNER_COLUMNS}
+    for c in INT_COLUMNS:
+        row[c] = _int(runner.get(c))
+    for block in ("course", "distance", "going"):
+        row[f"{block}_runs"] = _int((stats.get(block) or {}).get("runs"))
+        row[f"{block}_wins"] = _int((stats.get(block) or {}).get("wins"))
+    row.update(
+        race_id=_int(race["race_id"]),
+        horse_id=_int(runner.get("horse_id")),
+        date=race.get("date"),
+        headgear=runner.get("headgear") or None,
+        headgear_first=runner.get("headgear_first") or None,
+        trainer_rtf=_float(runner.get("trainer_rtf")),
+        trainer_14d_runs=_int(t14.get("runs")),
+        trainer_14d_wins=_int(t14.get("wins")),
+        trainer_win_pct=_float(trainer.get("ovr_wins_pct")),
+        trainer_profit=_float(trainer.get("ovr_profit")),
+        jockey_win_pct=_float(jockey.get("ovr_wins_pct")),
+        jockey_profit=_float(jockey.get("ovr_profit")),
+    )
+    return row
+
+
+def flatten_card(
+    card: dict, ingested_at: str | None = None
+) -> tuple[list[tuple], list[tuple]]:
+    """Return ``(race_rows, runner_rows)`` in ``RACE_COLUMNS``/``RUNNER_COLUMNS`` order."""
+    ingested_at = ingested_at or datetime.utcnow().isoformat(timespec="seconds")
+    race_rows = []
+    runner_rows = []
+
+    for race in _races(card):
+        row = _race_row(race, ingested_at)
+        race_rows.append(tuple(row[c] for c in RACE_COLUMNS))
+        for runner in race.get("runners", []):
+            row = _runner_row(race, runner)
+            if row["horse_id"] is not None:
+                runner_rows.append(tuple(row[c] for c in RUNNER_COLUMNS))
+
+    return race_rows, runner_rows
+
+
+def _upsert_sql(table: str, columns: list[str], key: list[str]) -> str:
+    updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c not in key)
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)})"
+        f" VALUES ({', '.join('?' for _ in columns)})"
+        f" ON CONFLICT ({', '.join(key)}) DO UPDATE SET {updates}"
+    )
+
+
+def ingest_card(conn: sqlite3.Connection, card: dict) -> tuple[int, int]:
+    """Upsert one racecard dict; returns ``(races, runners)`` written."""
+    race_rows, runner_rows = flatten_card(card)
+    with conn:
+        conn.executemany(_upsert_sql("races", RACE_COLUMNS, ["race_id"]), race_rows)
+        conn.executemany(
+            _upsert_sql("runners", RUNNER_COLUMNS, ["race_id", "horse_id"]), runner_rows
+        )
+        # Runners withdrawn since the last scrape of the same card
+        current: dict[int, list[int]] = {}
+        for row in runner_rows:
+            current.setdefault(row[0], []).append(row[1])
+        for race_id, horses in current.items():
+            conn.execute(
+                f"DELETE FROM runners WHERE race_id = ?"
+                f" AND horse_id NOT IN ({', '.join('?' for _ in horses)})",
+                (race_id, *horses),
+            )
+    return len(race_rows), len(runner_rows)
+
+
+def ingest_file(
+    path: Path | str, conn: sqlite3.Connection | None = None
+) -> tuple[int, int]:
+    with open(path, "r", encoding="utf-8") as f:
+        card = json.load(f)
+    own = conn is None
+    conn = conn or connect()
+    try:
+        return ingest_card(conn, card)
+    finally:
+        if own:
+            conn.close()
+
+
+def _rows(cursor: sqlite3.Cursor) -> list[dict]:
+    return [dict(row) for row in cursor.fetchall()]
+
+
+def horse_history(
+    conn: sqlite3.Connection, horse_id: int, before: str | None = None
+) -> list[dict]:
+    """Every card entry for ``horse_id`` (optionally before a date), newest first."""
+    sql = (
+        "SELECT r.*, races.course, races.off_time, races.race_name, races.going,"
+        " races.distance_f, races.race_class"
+        " FROM runners r JOIN races USING (race_id) WHERE r.horse_id = ?"
+    )
+    params: list = [horse_id]
+    if before:
+        sql += " AND r.date < ?"
+        params.append(before)
+    return _rows(conn.execute(sql + " ORDER BY r.date DESC", params))
+
+
+def prior_trainers(conn: sqlite3.Connection, horse_id: int) -> list[dict]:
+    """Trainers ``horse_id`` has been carded with, most recent first."""
+    return _rows(
+        conn.execute(
+            "SELECT trainer_id, trainer, MIN(date) AS first_date, MAX(date) AS last_date,"
+            " COUNT(*) AS runs FROM runners WHERE horse_id = ?"
+            " GROUP BY trainer_id, trainer ORDER BY last_date DESC",
+            (horse_id,),
+        )
+    )
+
+
+def runners_on(conn: sqlite3.Connection, date: str) -> list[dict]:
+    return _rows(
+        conn.execute(
+            "SELECT r.*, races.course, races.off_time FROM runners r"
+            " JOIN races USING (race_id) WHERE r.date = ?"
+            " ORDER BY races.off_time, races.course, r.number",
+            (date,),
+        )
+    )
+
+
+def find_runner(
+    conn: sqlite3.Connection, name: str, date: str | None = None
+) -> list[dict]:
+    """Card entries whose horse name matches ``name`` (case-insensitive)."""
+    sql = (
+        "SELECT r.*, races.course, races.off_time FROM runners r"
+        " JOIN races USING (race_id) WHERE r.name = ? COLLATE NOCASE"
+    )
+    params: list = [name.strip()]
+    if date:
+        sql += " AND r.date = ?"
+        params.append(date)
+    return _rows(conn.execute(sql + " ORDER BY r.date DESC", params))
+
+
+def main(argv: Iterable[str] | None = None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Ingest racecard JSON into SQLite")
+    parser.add_argument("paths", nargs="+", help="racecards/<date>.json files")
+    parser.add_argument("--db", help="SQLite path (default data/racecards.sqlite)")
+    args = parser.parse_args(argv)
+
+    conn = connect(args.db)
+    try:
+        for path in args.paths:
+            races, runners = ingest_file(path, conn)
+            print(f"{path}: {races} races, {runners} runners")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
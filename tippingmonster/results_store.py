@@ -0,0 +1,452 @@
+"""Partitioned historical results store with incremental ingestion.
+
+Results live under ``data/results_store`` (``TM_RESULTS_STORE``) as one
+gzip'd CSV per region and year::
+
+    <root>/<region>/<year>/results.csv.gz
+    <root>/<region>/<year>/manifest.json   rows, dates, sha256, sources
+    <root>/ingested.json                   source file name -> sha256
+
+``ingest`` appends scraped results files (the daily
+``rpscrape/data/dates/all/<date>.csv`` or a multi-year backfill) into the
+partitions they touch, dropping duplicate runners by ``race_id``/``horse_id``
+and by ``date``/``course``/``off``/``horse`` for files scraped without ids.
+Each partition is rewritten atomically before its manifest.
+
+``load`` returns the history as one DataFrame. Parsed partitions are cached
+as pickles keyed by the partition sha256, so an unchanged year is never
+re-parsed. ``push``/``pull`` copy only partitions whose manifest differs to or
+from a remote: ``s3://bucket/prefix`` or a local directory.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable
+
+import pandas as pd
+
+from .utils import in_dev_mode, repo_path
+
+BUCKET = "tipping-monster"
+DEFAULT_REMOTE = f"s3://{BUCKET}/results_store"
+# Multi-year files the store is seeded from on first use
+LEGACY_KEYS = [
+    "results/gb-flat-2015-2025.csv",
+    "results/gb-jumps-2015-2025.csv",
+    "results/ire-flat-2015-2025.csv",
+    "results/ire-jumps-2015-2025.csv",
+]
+DATA_FILE = "results.csv.gz"
+MANIFEST_FILE = "manifest.json"
+CACHE_FILE = "results.pkl"
+INGESTED_FILE = "ingested.json"
+
+ID_KEY = ["race_id", "horse_id"]
+NATURAL_KEY = ["date", "course", "off", "horse"]
+
+__all__ = [
+    "ResultsStore",
+    "LocalRemote",
+    "S3Remote",
+    "remote_from_url",
+    "store_root",
+    "load_history",
+    "seed_from_s3",
+]
+
+
+def store_root(root: Path | str | None = None) -> Path:
+    if root is not None:
+        return Path(root)
+    return Path(os.getenv("TM_RESULTS_STORE", repo_path("data", "results_store")))
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat(timespec="seconds")
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _read_json(path: Path) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_json(path: Path, data: dict) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def dedupe(df: pd.DataFrame) -> pd.DataFrame:
+    """Drop repeated runners, keeping the most recently ingested row."""
+    natural = [c for c in NATURAL_KEY if c in df.columns]
+    if natural:
+        df = df.drop_duplicates(subset=natural, keep="last")
+    if all(c in df.columns for c in ID_KEY):
+        has_ids = df[ID_KEY].notna().all(axis=1)
+        with_ids = df[has_ids].drop_duplicates(subset=ID_KEY, keep="last")
+        df = pd.concat([df[~has_ids], with_ids]).sort_index()
+    return df
+
+
+class ResultsStore:
+    """Region/year partitioned results with per-partition manifests."""
+
+    def __init__(self, root: Path | str | None = None):
+        self.root = store_root(root)
+
+    # --- layout -------------------------------------------------------------
+    def partition_dir(self, partition: str) -> Path:
+        return self.root / partition
+
+    def partitions(self) -> list[str]:
+        if not self.root.exists():
+            return []
+        return sorted(
+            f"{p.parent.parent.name}/{p.parent.name}"
+            for p in self.root.glob(f"*/*/{MANIFEST_FILE}")
+        )
+
+    def manifest(self, partition: str) -> dict:
+        return _read_json(self.partition_dir(partition) / MANIFEST_FILE)
+
+    def ingested(self) -> dict:
+        return _read_json(self.root / INGESTED_FILE)
+
+    # --- reading ------------------------------------------------------------
+    def read_partition(self, partition: str) -> pd.DataFrame:
+        directory = self.partition_dir(partition)
+        manifest = self.manifest(partition)
+        cache = directory / CACHE_FILE
+        if not manifest:
+            return pd.DataFrame()
+
+        if cache.exists():
+            try:
+                cached = pd.read_pickle(cache)
+            except Exception:
+                cached = None
+            if cached is not None and cached.attrs.get("sha256") == manifest["sha256"]:
+                return cached
+
+        df = pd.read_csv(directory / DATA_FILE, low_memory=False)
+        df.attrs["sha256"] = manifest["sha256"]
+        df.to_pickle(cache)
+        return df
+
+    def load(
+        self,
+        regions: Iterable[str] | None = None,
+        since: str | None = None,
+    ) -> pd.DataFrame:
+        """Return stored results, optionally limited to ``regions`` and dates ``>= since``."""
+        wanted = {r.lower() for r in regions} if regions else None
+        frames = []
+        for partition in self.partitions():
+            region, year = partition.split("/")
+            if wanted and region not in wanted:
+                continue
+            if since and year < since[:4]:
+                continue
+            frames.append(self.read_partition(partition))
+        if not frames:
+            return pd.DataFrame()
+        df = pd.concat(frames, ignore_index=True)
+        df.attrs = {}
+        if since:
+            df = df[df["date"].astype(str) >= since].reset_index(drop=True)
+        return df
+
+    # --- writing ------------------------------------------------------------
+    def ingest(
+        self, paths: Iterable[Path | str], force: bool = False
+    ) -> dict[str, int]:
+        """Append results files to their partitions; return rows added per partition."""
+        seen = self.ingested()
+        frames = []
+        sources = {}
+        for path in map(Path, paths):
+            sha = _sha256(path)
+            if not force and seen.get(path.name) == sha:
+                continue
+            df = pd.read_csv(path, low_memory=False)
+            if df.empty:
+                sources[path.name] = sha
+                continue
+            frames.append(df.assign(_source=path.name))
+            sources[path.name] = sha
+
+        added: dict[str, int] = {}
+        if frames:
+            new = pd.concat(frames, ignore_index=True)
+            new["date"] = new["date"].astype(str).str.replace("/", "-", regex=False)
+            keys = new["region"].astype(str).str.lower() + "/" + new["date"].str[:4]
+            for partition, rows in new.groupby(keys, sort=True):
+                names = sorted(rows.pop("_source").unique())
+                added[partition] = self._merge_partition(partition, rows, names)
+
+        if sources:
+            self.root.mkdir(parents=True, exist_ok=True)
+            _write_json(self.root / INGESTED_FILE, {**seen, **sources})
+        return added
+
+    def _merge_partition(
+        self, partition: str, rows: pd.DataFrame, sources: list[str]
+    ) -> int:
+        directory = self.partition_dir(partition)
+        directory.mkdir(parents=True, exist_ok=True)
+        existing = self.read_partition(partition)
+        before = len(existing)
+
+        merged = dedupe(pd.concat([existing, rows], ignore_index=True))
+        merged = merged.sort_values("date", kind="stable").reset_index(drop=True)
+
+        tmp = directory / (DATA_FILE + ".tmp")
+        merged.to_csv(tmp, index=False, compression="gzip")
+        os.replace(tmp, directory / DATA_FILE)
+
+        manifest = self.manifest(partition)
+        _write_json(
+            directory / MANIFEST_FILE,
+            {
+                "partition": partition,
+                "rows": len(merged),
+                "min_date": str(merged["date"].min()),
+                "max_date": str(merged["date"].max()),
+                "sha256": _sha256(directory / DATA_FILE),
+                "updated": _now(),
+                "sources": sorted(set(manifest.get("sources", [])) | set(sources)),
+            },
+        )
+        return len(merged) - before
+
+    # --- sync ---------------------------------------------------------------
+    def push(self, remote) -> list[str]:
+        """Upload partitions whose manifest differs from ``remote``."""
+        if in_dev_mode() and isinstance(remote, S3Remote):
+            print(f"[DEV] Skipping results store push to {remote}")
+            return []
+        pushed = []
+        for partition in self.partitions():
+            local = self.manifest(partition)
+            if (
+                remote.read_json(f"{partition}/{MANIFEST_FILE}").get("sha256")
+                == local["sha256"]
+            ):
+                continue
+            directory = self.partition_dir(partition)
+            remote.put(directory / DATA_FILE, f"{partition}/{DATA_FILE}")
+            remote.put(directory / MANIFEST_FILE, f"{partition}/{MANIFEST_FILE}")
+            pushed.append(partition)
+        if (self.root / INGESTED_FILE).exists():
+            remote.put(self.root / INGESTED_FILE, INGESTED_FILE)
+        return pushed
+
+    def pull(self, remote) -> list[str]:
+        """Download partitions whose remote manifest differs from the local one."""
+        pulled = []
+        for partition in remote.partitions():
+            manifest = remote.read_json(f"{partition}/{MANIFEST_FILE}")
+            if (
+                not manifest
+                or self.manifest(partition).get("sha256") == manifest["sha256"]
+            ):
+                continue
+            directory = self.partition_dir(partition)
+            directory.mkdir(parents=True, exist_ok=True)
+            remote.get(f"{partition}/{DATA_FILE}", directory / DATA_FILE)
+            _write_json(directory / MANIFEST_FILE, manifest)
+            pulled.append(partition)
+        ingested = remote.read_json(INGESTED_FILE)
+        if ingested:
+            self.root.mkdir(parents=True, exist_ok=True)
+            _write_json(self.root / INGESTED_FILE, {**self.ingested(), **ingested})
+        return pulled
+
+
+class LocalRemote:
+    """Directory standing in for the S3 bucket (tests, NAS mirrors)."""
+
+    def __init__(self, directory: Path | str):
+        self.directory = Path(directory)
+
+    def __str__(self) -> str:
+        return str(self.directory)
+
+    def partitions(self) -> list[str]:
+        return sorted(
+            f"{p.parent.parent.name}/{p.parent.name}"
+            for p in self.directory.glob(f"*/*/{MANIFEST_FILE}")
+        )
+
+    def read_json(self, key: str) -> dict:
+        return _read_json(self.directory / key)
+
+    def get(self, key: str, dest: Path) -> None:
+        tmp = Path(str(dest) + ".tmp")
+        shutil.copyfile(self.directory / key, tmp)
+        os.replace(tmp, dest)
+
+    def put(self, path: Path, key: str) -> None:
+        target = self.directory / key
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(str(target) + ".tmp")
+        shutil.copyfile(path, tmp)
+        os.replace(tmp, target)
+
+
+class S3Remote:
+    def __init__(self, bucket: str, prefix: str = ""):
+        import boto3
+
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.s3 = boto3.client("s3")
+
+    def __str__(self) -> str:
+        return f"s3://{self.bucket}/{self.prefix}"
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def partitions(self) -> list[str]:
+        found = []
+        paginator = self.s3.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key("")):
+            for obj in page.get("Contents", []):
+                key = obj["Key"][len(self._key("")) :]
+                if key.endswith(f"/{MANIFEST_FILE}") and key.count("/") == 2:
+                    found.append(key.rsplit("/", 1)[0])
+        return sorted(found)
+
+    def read_json(self, key: str) -> dict:
+        try:
+            body = self.s3.get_object(Bucket=self.bucket, Key=self._key(key))["Body"]
+        except self.s3.exceptions.NoSuchKey:
+            return {}
+        return json.loads(body.read())
+
+    def get(self, key: str, dest: Path) -> None:
+        tmp = Path(str(dest) + ".tmp")
+        self.s3.download_file(self.bucket, self._key(key), str(tmp))
+        os.replace(tmp, dest)
+
+    def put(self, path: Path, key: str) -> None:
+        self.s3.upload_file(str(path), self.bucket, self._key(key))
+
+
+def remote_from_url(url: str | None = None):
+    url = url or os.getenv("TM_RESULTS_REMOTE", DEFAULT_REMOTE)
+    if url.startswith("s3://"):
+        bucket, _, prefix = url[5:].partition("/")
+        return S3Remote(bucket, prefix)
+    return LocalRemote(url)
+
+
+def seed_from_s3(
+    store: ResultsStore, keys: Iterable[str] = LEGACY_KEYS, bucket: str = BUCKET
+) -> dict[str, int]:
+    """One-off import of the legacy multi-year CSVs into an empty store."""
+    import tempfile
+
+    import boto3
+
+    s3 = boto3.client("s3")
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for key in keys:
+            local_path = Path(tmp) / os.path.basename(key)
+            s3.download_file(bucket, key, str(local_path))
+            paths.append(local_path)
+        return store.ingest(paths)
+
+
+def load_history(
+    regions: Iterable[str] | None = None,
+    since: str | None = None,
+    root: Path | str | None = None,
+    remote: str | None = None,
+    sync: bool = True,
+    seed: bool = True,
+) -> pd.DataFrame:
+    """Results history for training, pulling only changed partitions first.
+
+    An empty store (first run on a new machine with nothing to pull) is seeded
+    from the legacy multi-year CSVs when ``seed`` is set.
+    """
+    store = ResultsStore(root)
+    if sync:
+        try:
+            pulled = store.pull(remote_from_url(remote))
+        except Exception as exc:  # offline runs train on what is already local
+            print(f"⚠️ Results store sync failed, using local partitions: {exc}")
+        else:
+            if pulled:
+                print(f"⬇️ Pulled {len(pulled)} changed partitions: {', '.join(pulled)}")
+    if seed and not store.partitions():
+        print("📥 Results store empty, seeding from legacy S3 CSVs...")
+        seed_from_s3(store)
+    return store.load(regions, since)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Historical results store")
+    parser.add_argument("--root", help="Store directory (default data/results_store)")
+    parser.add_argument("--remote", help="s3://bucket/prefix or directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+    ingest = sub.add_parser("ingest", help="Append results CSVs")
+    ingest.add_argument("paths", nargs="+")
+    ingest.add_argument(
+        "--force", action="store_true", help="Re-ingest unchanged files"
+    )
+    ingest.add_argument(
+        "--push", action="store_true", help="Push changed partitions after ingesting"
+    )
+    sub.add_parser("push", help="Upload changed partitions")
+    sub.add_parser("pull", help="Download changed partitions")
+    sub.add_parser("info", help="List partitions")
+    args = parser.parse_args(argv)
+
+    store = ResultsStore(args.root)
+    if args.command == "ingest":
+        paths = []
+        for p in map(Path, args.paths):
+            paths.extend(sorted(p.glob("*.csv")) if p.is_dir() else [p])
+        added = store.ingest(paths, force=args.force)
+        for partition, rows in added.items():
+            print(f"{partition}: +{rows} rows")
+        if not added:
+            print("Nothing new to ingest")
+        if args.push:
+            pushed = store.push(remote_from_url(args.remote))
+            print(f"Pushed {len(pushed)} partitions")
+    elif args.command == "push":
+        print(f"Pushed {len(store.push(remote_from_url(args.remote)))} partitions")
+    elif args.command == "pull":
+        print(f"Pulled {len(store.pull(remote_from_url(args.remote)))} partitions")
+    else:
+        for partition in store.partitions():
+            m = store.manifest(partition)
+            print(f"{partition}: {m['rows']} rows {m['min_date']}..{m['max_date']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""Asynchronous, rate-limit aware Telegram dispatch.
+
+Messages are queued per chat and sent over a single pooled ``aiohttp`` session.
+Each chat gets its own worker so different chats and channels are served
+concurrently while messages to the same chat keep their order. Telegram's
+limits are respected with a per-chat minimum interval, a global messages per
+second cap, and ``retry_after`` back-off on HTTP 429 responses. Every attempt
+ends with a delivery receipt appended to ``logs/dispatch/receipts_<date>.jsonl``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterable
+
+from .utils import in_dev_mode, logs_path
+
+__all__ = [
+    "TelegramDispatcher",
+    "dispatch_messages",
+    "send_messages",
+    "resolve_chat_ids",
+    "DEFAULT_API_URL",
+]
+
+DEFAULT_API_URL = "https://api.telegram.org"
+PER_CHAT_INTERVAL = 1.0  # Telegram allows roughly one message per second per chat
+GLOBAL_RATE = 25  # stay under the ~30 messages/second bot-wide limit
+MAX_RETRIES = 5
+
+
+def resolve_chat_ids(chat_ids: Iterable[str] | str | None = None) -> list[str]:
+    """Return target chat IDs, defaulting to the configured channel(s).
+
+    ``TELEGRAM_CHAT_ID`` (or ``TELEGRAM_DEV_CHAT_ID`` when ``TM_DEV`` is set) is
+    always first; ``TELEGRAM_EXTRA_CHAT_IDS`` may add comma-separated channels.
+    """
+    if isinstance(chat_ids, str):
+        chat_ids = [chat_ids]
+    if chat_ids:
+        return [str(c) for c in chat_ids if c]
+    primary = os.getenv("TELEGRAM_CHAT_ID")
+    if os.getenv("TM_DEV"):
+        return [c for c in [os.getenv("TELEGRAM_DEV_CHAT_ID", primary)] if c]
+    extra = os.getenv("TELEGRAM_EXTRA_CHAT_IDS", "")
+    ids = [primary] + [c.strip() for c in extra.split(",")]
+    return list(dict.fromkeys(c for c in ids if c))
+
+
+class _GlobalLimiter:
+    """Space requests so no more than ``rate`` start per second."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class TelegramDispatcher:
+    """Send messages to many chats over one pooled HTTP session.
+
+    Use as an async context manager::
+
+        async with TelegramDispatcher(token) as bot:
+            receipts = await bot.send_many([(chat_id, text), ...])
+    """
+
+    def __init__(
+        self,
+        token: str | None = None,
+        api_url: str | None = None,
+        per_chat_interval: float = PER_CHAT_INTERVAL,
+        global_rate: float = GLOBAL_RATE,
+        max_retries: int = MAX_RETRIES,
+        receipts_path: Path | None = None,
+        parse_mode: str | None = "Markdown",
+    ):
+        self.token = token or os.getenv("TELEGRAM_BOT_TOKEN")
+        self.api_url = (
+            api_url or os.getenv("TELEGRAM_API_URL") or DEFAULT_API_URL
+        ).rstrip("/")
+        self.per_chat_interval = per_chat_interval
+        self.max_retries = max_retries
+        self.parse_mode = parse_mode
+        self.receipts_path = receipts_path or logs_path(
+            "dispatch", f"receipts_{datetime.utcnow():%Y-%m-%d}.jsonl"
+        )
+        self._limiter = _GlobalLimiter(global_rate)
+        self._chat_next: dict[str, float] = defaultdict(float)
+        self._session = None
+
+    async def __aenter__(self) -> "TelegramDispatcher":
+        if not in_dev_mode():
+            if not self.token:
+                raise ValueError("TELEGRAM_BOT_TOKEN must be set")
+            import aiohttp
+
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=20, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=15),
+            )
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _write_receipt(self, receipt: dict) -> None:
+        self.receipts_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.receipts_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(receipt, ensure_ascii=False) + "\n")
+
+    async def _wait_for_chat(self, chat_id: str) -> None:
+        delay = self._chat_next[chat_id] - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await self._limiter.wait()
+
+    async def send(self, chat_id: str, text: str) -> dict:
+        """Send ``text`` to ``chat_id`` with retries and return its receipt."""
+        chat_id = str(chat_id)
+        receipt = {
+            "chat_id": chat_id,
+            "text_sha1": hashlib.sha1(text.encode("utf-8")).hexdigest(),
+            "ok": False,
+            "message_id": None,
+            "attempts": 0,
+            "error": None,
+        }
+
+        if in_dev_mode():
+            log_file = logs_path("telegram.log")
+            log_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(log_file, "a", encoding="utf-8") as f:
+                f.write(text + "\n")
+            print(f"[DEV] Telegram message suppressed: {text}")
+            receipt.update(ok=True, suppressed=True)
+        else:
+            receipt.update(await self._post_with_retries(chat_id, text))
+
+        receipt["sent_at"] = datetime.utcnow().isoformat(timespec="seconds")
+        self._write_receipt(receipt)
+        return receipt
+
+    async def _post_with_retries(self, chat_id: str, text: str) -> dict:
+        from aiohttp import ClientError
+
+        url = f"{self.api_url}/bot{self.token}/sendMessage"
+        payload = {
+            "chat_id": chat_id,
+            "text": text,
+            "disable_web_page_preview": True,
+        }
+        if self.parse_mode:
+            payload["parse_mode"] = self.parse_mode
+
+        error = None
+        for attempt in range(1, self.max_retries + 1):
+            await self._wait_for_chat(chat_id)
+            self._chat_next[chat_id] = time.monotonic() + self.per_chat_interval
+            try:
+                async with self._session.post(url, data=payload) as resp:
+                    body = await resp.json(content_type=None)
+                    if resp.status == 429:
+                        params = (body or {}).get("parameters", {})
+                        retry_after = float(
+                            params.get("retry_after")
+                            or resp.headers.get("Retry-After", 1)
+                        )
+                        self._chat_next[chat_id] = time.monotonic() + retry_after
+                        error = f"429 retry after {retry_after}s"
+                        continue
+                    if resp.status >= 500:
+                        error = f"Telegram API error {resp.status}"
+                        await asyncio.sleep(min(2**attempt * 0.1, 5))
+                        continue
+                    if resp.status >= 400 or not (body or {}).get("ok"):
+                        return {
+                            "attempts": attempt,
+                            "error": f"Telegram API error {resp.status}: {body}",
+                        }
+                    return {
+                        "ok": True,
+                        "attempts": attempt,
+                        "message_id": body.get("result", {}).get("message_id"),
+                    }
+            except (asyncio.TimeoutError, OSError, ClientError, ValueError) as exc:
+                # Timeouts, dropped connections and non-JSON bodies (proxy error
+                # pages) are retried; a failed receipt is returned at the end
+                error = f"{type(exc).__name__}: {exc}"
+                await asyncio.sleep(min(2**attempt * 0.1, 5))
+        return {"attempts": self.max_retries, "error": error}
+
+    async def _chat_worker(
+        self,
+        chat_id: str,
+        queue: asyncio.Queue,
+        out: list,
+        on_send: Callable[[int, str], None] | None = None,
+        on_receipt: Callable[[int, dict], None] | None = None,
+    ):
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            index, text = item
+            if on_send is not None:
+                on_send(index, chat_id)
+            out[index] = await self.send(chat_id, text)
+            if on_receipt is not None:
+                on_receipt(index, out[index])
+
+    async def send_many(
+        self,
+        messages: Iterable[tuple[str, str]],
+        on_send: Callable[[int, str], None] | None = None,
+        on_receipt: Callable[[int, dict], None] | None = None,
+    ) -> list[dict]:
+        """Send ``(chat_id, text)`` pairs and return receipts in input order.
+
+        Chats are served concurrently; each chat's messages go out in order.
+        ``on_send(index, chat_id)`` runs just before a message's first request
+        and ``on_receipt(index, receipt)`` as soon as its receipt is known, so
+        callers can journal each delivery without waiting for the batch.
+        """
+        messages = list(messages)
+        receipts: list[dict] = [{} for _ in messages]
+        queues: dict[str, asyncio.Queue] = {}
+        for index, (chat_id, text) in enumerate(messages):
+            queue = queues.setdefault(str(chat_id), asyncio.Queue())
+            queue.put_nowait((index, text))
+        workers = []
+        for chat_id, queue in queues.items():
+            queue.put_nowait(None)
+            workers.append(
+                self._chat_worker(chat_id, queue, receipts, on_send, on_receipt)
+            )
+        await asyncio.gather(*workers)
+        return receipts
+
+
+def dispatch_messages(
+    messages: Iterable[tuple[str, str]],
+    token: str | None = None,
+    on_send: Callable[[int, str], None] | None = None,
+    on_receipt: Callable[[int, dict], None] | None = None,
+    **kwargs,
+) -> list[dict]:
+    """Blocking :meth:`TelegramDispatcher.send_many` for ``(chat_id, text)`` pairs."""
+    messages = list(messages)
+
+    async def _run() -> list[dict]:
+        async with TelegramDispatcher(token=token, **kwargs) as bot:
+            return await bot.send_many(messages, on_send, on_receipt)
+
+    return asyncio.run(_run())
+
+
+def send_messages(
+    texts: Iterable[str],
+    chat_ids: Iterable[str] | str | None = None,
+    token: str | None = None,
+    **kwargs,
+) -> list[dict]:
+    """Send every text to every chat and return delivery receipts.
+
+    Blocking convenience wrapper around :class:`TelegramDispatcher` for
+    scripts that are not already running an event loop.
+    """
+    texts = list(texts)
+    messages = [(chat, text) for chat in resolve_chat_ids(chat_ids) for text in texts]
+    return dispatch_messages(messages, token=token, **kwargs)
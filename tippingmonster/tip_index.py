@@ -0,0 +1,283 @@
+"""Indexed SQLite store of sent tips, NAPs and settled results for the bot.
+
+The Telegram bot's ``/tip`` and ``/nap`` commands used to open every
+``sent_tips_*.jsonl``, ``tips_with_odds.jsonl`` and results CSV on each
+request. This module keeps three small tables instead:
+
+``tips``
+    sent tips (``source = 'sent'``) and each day's NAP from the predictions
+    (``source = 'nap'``), indexed by horse name and by date
+``results``
+    settled position/profit/stake per ``(date, horse)``
+``sources``
+    path, mtime and size of every file already ingested
+
+Dispatch and the ROI pipeline call ``update_file`` or ``sync`` after writing
+their files. ``sync`` only re-reads files whose mtime or size changed, so
+keeping the index current is incremental. Each command is then one indexed
+query, whatever the length of the history.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+from pathlib import Path
+from typing import Iterable
+
+from .utils import logs_path
+
+__all__ = [
+    "connect",
+    "db_path",
+    "ingest_sent_tips",
+    "ingest_predictions",
+    "ingest_results",
+    "update_file",
+    "sync",
+    "latest_tip",
+    "recent_naps",
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tips (
+    source     TEXT NOT NULL,
+    date       TEXT NOT NULL,
+    seq        INTEGER NOT NULL,
+    race       TEXT,
+    name       TEXT NOT NULL COLLATE NOCASE,
+    confidence REAL,
+    odds       REAL,
+    tags       TEXT,
+    commentary TEXT,
+    PRIMARY KEY (source, date, seq)
+);
+CREATE INDEX IF NOT EXISTS tips_name ON tips (name, source, date);
+
+CREATE TABLE IF NOT EXISTS results (
+    date     TEXT NOT NULL,
+    horse    TEXT NOT NULL COLLATE NOCASE,
+    position INTEGER,
+    profit   REAL,
+    stake    REAL,
+    PRIMARY KEY (date, horse)
+);
+
+CREATE TABLE IF NOT EXISTS sources (
+    path     TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size     INTEGER NOT NULL
+);
+"""
+
+DATE = r"(\d{4}-\d{2}-\d{2})"
+SENT_RE = re.compile(rf"^sent_tips_{DATE}\.jsonl$")
+RESULTS_RE = re.compile(rf"^tips_results_{DATE}_advised\.csv$")
+# Relative to the repo (or test) base directory
+PATTERNS = [
+    "logs/sent_tips_*.jsonl",
+    "logs/dispatch/sent_tips_*.jsonl",
+    "predictions/*/tips_with_odds.jsonl",
+    "logs/tips_results_*_advised.csv",
+    "logs/roi/tips_results_*_advised.csv",
+]
+
+
+def db_path(base_dir: Path | str | None = None) -> Path:
+    if base_dir is not None:
+        return Path(base_dir) / "logs" / "tip_index.sqlite"
+    return Path(os.getenv("TM_TIP_INDEX", logs_path("tip_index.sqlite")))
+
+
+def connect(path: Path | str | None = None) -> sqlite3.Connection:
+    path = db_path() if path is None else Path(path)
+    if str(path) != ":memory:":
+        path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _float(value) -> float | None:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _tip_row(source: str, date: str, seq: int, tip: dict) -> tuple:
+    return (
+        source,
+        date,
+        seq,
+        tip.get("race", ""),
+        tip.get("name", ""),
+        _float(tip.get("confidence")),
+        _float(tip.get("bf_sp")),
+        json.dumps(tip.get("tags", []), ensure_ascii=False),
+        tip.get("commentary", ""),
+    )
+
+
+def _replace_tips(
+    conn: sqlite3.Connection, source: str, date: str, rows: list[tuple]
+) -> int:
+    with conn:
+        conn.execute("DELETE FROM tips WHERE source = ? AND date = ?", (source, date))
+        conn.executemany(
+            "INSERT INTO tips (source, date, seq, race, name, confidence, odds,"
+            " tags, commentary) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+    return len(rows)
+
+
+def _read_jsonl(path: Path) -> list[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def ingest_sent_tips(conn: sqlite3.Connection, path: Path | str) -> int:
+    """Replace the sent tips for the day in ``sent_tips_<date>.jsonl``."""
+    path = Path(path)
+    date = SENT_RE.match(path.name).group(1)
+    tips = _read_jsonl(path)
+    rows = [_tip_row("sent", date, i, tip) for i, tip in enumerate(tips)]
+    return _replace_tips(conn, "sent", date, rows)
+
+
+def ingest_predictions(conn: sqlite3.Connection, path: Path | str) -> int:
+    """Record the NAP from ``predictions/<date>/tips_with_odds.jsonl``."""
+    path = Path(path)
+    date = path.parent.name
+    nap = next(
+        (
+            t
+            for t in _read_jsonl(path)
+            if any("NAP" in tag for tag in t.get("tags", []))
+        ),
+        None,
+    )
+    rows = [_tip_row("nap", date, 0, nap)] if nap else []
+    return _replace_tips(conn, "nap", date, rows)
+
+
+def ingest_results(conn: sqlite3.Connection, path: Path | str) -> int:
+    """Replace the settled results for the day in ``tips_results_<date>_advised.csv``."""
+    import pandas as pd
+
+    path = Path(path)
+    date = RESULTS_RE.match(path.name).group(1)
+    df = pd.read_csv(path)
+    if "Horse" not in df.columns:
+        return 0
+    position = pd.to_numeric(df.get("Position"), errors="coerce").fillna(0)
+    profit = pd.to_numeric(df.get("Profit"), errors="coerce")
+    stake = pd.to_numeric(df.get("Stake", 1.0), errors="coerce")
+    rows = [
+        (date, str(h), int(p), _float(pr), _float(s))
+        for h, p, pr, s in zip(df["Horse"], position, profit, stake)
+    ]
+    with conn:
+        conn.execute("DELETE FROM results WHERE date = ?", (date,))
+        # The first row for a horse wins, as in the CSV scan this replaces
+        conn.executemany(
+            "INSERT OR IGNORE INTO results (date, horse, position, profit, stake)"
+            " VALUES (?, ?, ?, ?, ?)",
+            rows,
+        )
+    return len(rows)
+
+
+def update_file(conn: sqlite3.Connection, path: Path | str) -> bool:
+    """Ingest ``path`` if it is new or changed since it was last ingested."""
+    path = Path(path)
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return False
+    known = conn.execute(
+        "SELECT mtime_ns, size FROM sources WHERE path = ?", (str(path),)
+    ).fetchone()
+    if known and (known["mtime_ns"], known["size"]) == (st.st_mtime_ns, st.st_size):
+        return False
+    if SENT_RE.match(path.name):
+        ingest_sent_tips(conn, path)
+    elif RESULTS_RE.match(path.name):
+        ingest_results(conn, path)
+    elif path.name == "tips_with_odds.jsonl":
+        ingest_predictions(conn, path)
+    else:
+        return False
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO sources (path, mtime_ns, size) VALUES (?, ?, ?)",
+            (str(path), st.st_mtime_ns, st.st_size),
+        )
+    return True
+
+
+def sync(conn: sqlite3.Connection, base_dir: Path | str) -> int:
+    """Ingest every new or changed tip/results file under ``base_dir``."""
+    base_dir = Path(base_dir)
+    paths: Iterable[Path] = (p for pattern in PATTERNS for p in base_dir.glob(pattern))
+    return sum(update_file(conn, p) for p in sorted(paths))
+
+
+def _tip(row: sqlite3.Row) -> dict:
+    tip = dict(row)
+    tip["tags"] = json.loads(tip["tags"] or "[]")
+    return tip
+
+
+def latest_tip(conn: sqlite3.Connection, name: str) -> dict | None:
+    """Most recent sent tip for horse ``name`` (case-insensitive)."""
+    row = conn.execute(
+        "SELECT * FROM tips WHERE name = ? AND source = 'sent'"
+        " ORDER BY date DESC, seq LIMIT 1",
+        (name.strip(),),
+    ).fetchone()
+    return _tip(row) if row else None
+
+
+def recent_naps(conn: sqlite3.Connection, days: int = 7) -> list[dict]:
+    """The last ``days`` settled NAPs, newest first."""
+    rows = conn.execute(
+        "SELECT t.date, t.name AS horse, r.position, r.profit, r.stake"
+        " FROM tips t JOIN results r ON r.date = t.date AND r.horse = t.name"
+        " WHERE t.source = 'nap' ORDER BY t.date DESC LIMIT ?",
+        (days,),
+    )
+    return [dict(row) for row in rows]
+
+
+def main(argv: Iterable[str] | None = None) -> None:
+    from .utils import repo_root
+
+    parser = argparse.ArgumentParser(description="Tip/NAP index for the bot")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sync_cmd = sub.add_parser("sync", help="Ingest new or changed files")
+    sync_cmd.add_argument("--base", default=str(repo_root()))
+    add = sub.add_parser("add", help="Ingest specific files")
+    add.add_argument("paths", nargs="+")
+    parser.add_argument("--db", help="Index path (default logs/tip_index.sqlite)")
+    args = parser.parse_args(argv)
+
+    conn = connect(args.db)
+    try:
+        if args.command == "sync":
+            count = sync(conn, args.base)
+        else:
+            count = sum(update_file(conn, p) for p in args.paths)
+    finally:
+        conn.close()
+    print(f"Indexed {count} file(s)")
+
+
+if __name__ == "__main__":
+    main()
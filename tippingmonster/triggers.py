@@ -0,0 +1,115 @@
+"""Readiness triggers for pipeline stages.
+
+A trigger is a callable ``trigger(ctx) -> bool``. It is attached to a
+:class:`~tippingmonster.pipeline.Stage` as ``ready=``. Once a stage's
+dependencies have finished, the runner polls its trigger and starts the stage
+as soon as the trigger returns true. This replaces fixed sleeps and cron
+offsets with the condition the stage actually needs: a file on disk, a time of
+day or a formed betting market.
+
+Triggers for a date before today are always ready, so backfills never wait.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from datetime import date, datetime
+from typing import TYPE_CHECKING, Callable
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .pipeline import Context
+
+__all__ = ["Trigger", "all_of", "any_of", "file_ready", "market_ready", "not_before"]
+
+Trigger = Callable[["Context"], bool]
+
+
+def _past(ctx: "Context") -> bool:
+    return ctx.date < date.today().isoformat()
+
+
+def _clock(hhmm: str) -> datetime:
+    hour, minute = map(int, hhmm.split(":"))
+    return datetime.now().replace(hour=hour, minute=minute, second=0, microsecond=0)
+
+
+def not_before(hhmm: str, env: str | None = None) -> Trigger:
+    """Ready from ``hhmm`` local time (overridable by environment ``env``)."""
+
+    def trigger(ctx: "Context") -> bool:
+        at = os.getenv(env, hhmm) if env else hhmm
+        return _past(ctx) or datetime.now() >= _clock(at)
+
+    trigger.__name__ = f"not_before({hhmm})"
+    return trigger
+
+
+def file_ready(template: str, min_size: int = 1) -> Trigger:
+    """Ready once ``template`` exists under the repo root with ``min_size`` bytes.
+
+    ``template`` may use ``{date}`` (``2025-06-01``) and ``{date_}``
+    (``2025_06_01``, as in the rpscrape results file names).
+    """
+
+    def trigger(ctx: "Context") -> bool:
+        if _past(ctx):
+            return True
+        path = ctx.path(
+            template.format(date=ctx.date, date_=ctx.date.replace("-", "_"))
+        )
+        try:
+            return path.stat().st_size >= min_size
+        except FileNotFoundError:
+            return False
+
+    trigger.__name__ = f"file_ready({template})"
+    return trigger
+
+
+def _priced_share(path) -> float:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            runners = json.load(f)
+    except (OSError, ValueError):
+        return 0.0
+    if not runners:
+        return 0.0
+    return sum(1 for r in runners if r.get("bf_sp")) / len(runners)
+
+
+def market_ready(
+    at: str = "08:50", min_priced: float = 0.95, env: str = "TM_MARKET_TIME"
+) -> Trigger:
+    """Ready at ``at``, or earlier once the market has formed.
+
+    The market counts as formed when the day's latest odds snapshot (for
+    example the 08:00 cron snapshot) has a back price for at least
+    ``min_priced`` of its runners.
+    """
+    deadline = not_before(at, env)
+
+    def trigger(ctx: "Context") -> bool:
+        if deadline(ctx):
+            return True
+        snapshots = sorted(ctx.path("odds_snapshots").glob(f"{ctx.date}_*.json"))
+        return bool(snapshots) and _priced_share(snapshots[-1]) >= min_priced
+
+    trigger.__name__ = f"market_ready({at})"
+    return trigger
+
+
+def all_of(*triggers: Trigger) -> Trigger:
+    def trigger(ctx: "Context") -> bool:
+        return all(t(ctx) for t in triggers)
+
+    trigger.__name__ = " & ".join(t.__name__ for t in triggers)
+    return trigger
+
+
+def any_of(*triggers: Trigger) -> Trigger:
+    def trigger(ctx: "Context") -> bool:
+        return any(t(ctx) for t in triggers)
+
+    trigger.__name__ = " | ".join(t.__name__ for t in triggers)
+    return trigger
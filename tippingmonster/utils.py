@@ -4,14 +4,13 @@ import shutil
 from datetime import datetime, timedelta
 from pathlib import Path
 
-import requests
-
 __all__ = [
     "repo_root",
     "repo_path",
     "logs_path",
     "predictions_path",
     "in_dev_mode",
+    "racecard_minutes",
     "send_telegram_message",
     "send_telegram_photo",
     "load_xgb_model",
@@ -49,6 +48,15 @@ def predictions_path(date: str) -> Path:
     return repo_path("predictions", date)
 
 
+def racecard_minutes(hour: int, minute: int) -> int:
+    """Minutes after midnight of a racecard off time such as ``1:30``.
+
+    Racecards use a 12-hour clock without am/pm, so hours below 10 are read as
+    afternoon or evening.
+    """
+    return (hour + 12 if hour < 10 else hour) * 60 + minute
+
+
 def upload_to_s3(local_path: str | Path, bucket: str, key: str) -> None:
     """Upload ``local_path`` to ``bucket``/``key`` unless in dev mode."""
     if in_dev_mode():
@@ -78,6 +86,8 @@ def send_telegram_message(
     if not token or not chat_id:
         raise ValueError("TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID must be set")
 
+    import requests
+
     url = f"https://api.telegram.org/bot{token}/sendMessage"
     payload = {
         "chat_id": chat_id,
@@ -121,6 +131,8 @@ def send_telegram_photo(
     if not token or not chat_id:
         raise ValueError("TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID must be set")
 
+    import requests
+
     url = f"https://api.telegram.org/bot{token}/sendPhoto"
     with open(photo, "rb") as f:
         files = {"photo": f}
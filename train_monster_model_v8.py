@@ -28,8 +28,9 @@ from sklearn.metrics import accuracy_score, brier_score_loss, classification_rep
 from sklearn.model_selection import train_test_split
 from tensorflow import keras
 
+from core.training_set import feature_columns, serving_matrix
+from tippingmonster.results_store import load_history
 from tippingmonster.utils import get_place_terms, upload_to_s3
-from train_model_v6 import load_all_results
 from validate_features import validate_dataset_features
 
 BUCKET = "tipping-monster"
@@ -190,24 +191,26 @@ def main(argv: list[str] | None = None) -> None:
     parser.add_argument(
         "--self-train", action="store_true", help="Include tip logs for self-training"
     )
+    parser.add_argument(
+        "--dataset",
+        help="Point-in-time training set from core.training_set (train on live features)",
+    )
     args = parser.parse_args(argv)
 
     if args.dev:
         os.environ["TM_DEV_MODE"] = "1"
 
-    s3_keys = [
-        "results/gb-flat-2015-2025.csv",
-        "results/gb-jumps-2015-2025.csv",
-        "results/ire-flat-2015-2025.csv",
-        "results/ire-jumps-2015-2025.csv",
-    ]
-    print("📅 Downloading historical data from S3…")
-    df = load_all_results(s3_keys)
-    df = preprocess(df)
+    if args.dataset:
+        print(f"📅 Loading point-in-time training set {args.dataset}…")
+        df = pd.read_csv(args.dataset, low_memory=False)
+    else:
+        print("📅 Loading historical results from the results store…")
+        df = load_history()
+        df = preprocess(df)
 
     tip_logs: list[str] = []
     merged_tips = 0
-    if args.self_train:
+    if args.self_train and not args.dataset:
         tip_logs = sorted(glob.glob("logs/roi/tips_results_*_advised.csv"))
         if tip_logs:
             print(f"📝 Injecting tip logs: {tip_logs[-3:]}…")
@@ -226,6 +229,9 @@ def main(argv: list[str] | None = None) -> None:
     ]
     if "stale_penalty" in df.columns:
         feature_cols.append("stale_penalty")
+    if args.dataset:
+        # Same columns and coercion as inference, so train and serve match
+        feature_cols = feature_columns(df)
 
     missing, extra = validate_dataset_features(feature_cols, df)
     if missing:
@@ -233,7 +239,7 @@ def main(argv: list[str] | None = None) -> None:
     if extra:
         print(f"Ignoring extra columns: {extra}")
 
-    X = df[feature_cols]
+    X = serving_matrix(df, feature_cols) if args.dataset else df[feature_cols]
     y_win = df["won"]
     y_place = df["placed"]
 
@@ -9,14 +9,28 @@ from pathlib import Path
 
 import pandas as pd
 
-from core.trainer_stable_profile import (compute_trainer_stats,
-                                         load_recent_results)
-
-
-def load_trainer_form(results_dir: str, ref_date: str, window: int = 30) -> dict:
+from core.form_stats import FormStats, default_dir
+from core.trainer_stable_profile import compute_trainer_stats, load_recent_results
+
+
+def load_trainer_form(
+    results_dir: str,
+    ref_date: str,
+    window: int = 30,
+    form_dir: str | Path | None = None,
+) -> dict:
+    """Return ``{trainer: win %}`` over ``window`` days up to ``ref_date``.
+
+    Reads the precomputed form tables when they exist and only falls back to
+    scanning ``results_dir``.
+    """
+    form = FormStats.load(form_dir or default_dir())
+    if "trainer" in form.tables:
+        snap = form.snapshot("trainer", ref_date, window)
+        return dict(zip(snap["trainer"], snap["win_pct"]))
     df = load_recent_results(Path(results_dir), ref_date, window)
     stats = compute_trainer_stats(df)
-    return {row["Trainer"]: row["Win %"] for _, row in stats.iterrows()}
+    return dict(zip(stats["Trainer"], stats["Win %"]))
 
 
 def load_tips(path: Path) -> list[dict]:
@@ -67,10 +81,13 @@ def main() -> None:
     parser.add_argument("--results_dir", default="rpscrape/data/dates/all")
     parser.add_argument("--date", default=pd.Timestamp.today().strftime("%Y-%m-%d"))
     parser.add_argument("--window", type=int, default=30)
+    parser.add_argument("--form_dir", help="Precomputed form tables directory")
     parser.add_argument("--out", help="Output JSONL file")
     args = parser.parse_args()
 
-    trainer_form = load_trainer_form(args.results_dir, args.date, args.window)
+    trainer_form = load_trainer_form(
+        args.results_dir, args.date, args.window, args.form_dir
+    )
     tips = load_tips(Path(args.tips_file))
     tagged = tag_tips(tips, trainer_form)
 
@@ -1,42 +1,22 @@
-import ast
-import glob
 from pathlib import Path
 
 import pandas as pd
 import seaborn as sns
 import streamlit as st
 
+from roi import warehouse
+
 st.set_page_config(page_title="Ultimate Dashboard", layout="wide")
 
 
 @st.cache_data
-def load_tip_results(sent_only: bool) -> pd.DataFrame:
-    """Load tip result CSVs into a dataframe."""
-    pattern = (
-        "logs/tips_results_*_advised_sent.csv"
-        if sent_only
-        else "logs/tips_results_*_advised*.csv"
-    )
-    rows = []
-    for path in sorted(glob.glob(pattern)):
-        try:
-            df = pd.read_csv(path)
-        except Exception:
-            continue
-        date_str = Path(path).stem.split("_")[1]
-        df["Date"] = pd.to_datetime(date_str)
-        rows.append(df)
-    if not rows:
-        return pd.DataFrame()
-    df = pd.concat(rows, ignore_index=True)
-    df["Profit"] = pd.to_numeric(df.get("Profit"), errors="coerce").fillna(0)
-    df["Stake"] = pd.to_numeric(df.get("Stake"), errors="coerce").fillna(0)
-    if "confidence" in df.columns:
-        df["Confidence"] = pd.to_numeric(df.get("confidence"), errors="coerce").fillna(
-            0
-        )
-    df["Position"] = df.get("Position").astype(str)
-    return df
+def load_tip_results(source: str, version: str | None) -> pd.DataFrame:
+    """Typed tips for ``source`` from the warehouse.
+
+    ``version`` is the warehouse manifest version so the cache is refreshed
+    after each nightly build.
+    """
+    return warehouse.load("tips", source=source)
 
 
 @st.cache_data
@@ -49,28 +29,11 @@ def load_confidence_roi() -> pd.DataFrame:
     return df
 
 
-@st.cache_data
-def parse_tags(val: str) -> list[str]:
-    if pd.isna(val):
-        return []
-    try:
-        out = ast.literal_eval(val)
-        return out if isinstance(out, list) else []
-    except Exception:
-        return []
-
-
 def filter_dataframe(df: pd.DataFrame) -> pd.DataFrame:
-    all_tags = (
-        sorted({tag for tags in df["tags"].dropna().apply(parse_tags) for tag in tags})
-        if "tags" in df.columns
-        else []
-    )
-    trainers = (
-        sorted(df["Trainer"].dropna().unique()) if "Trainer" in df.columns else []
-    )
-    courses = sorted(df["Course"].dropna().unique()) if "Course" in df.columns else []
-    horses = sorted(df["Horse"].dropna().unique()) if "Horse" in df.columns else []
+    all_tags = sorted(warehouse.explode_tags(df)["Tag"].unique())
+    trainers = sorted(df["Trainer"].dropna().unique())
+    courses = sorted(df["Course"].dropna().unique())
+    horses = sorted(df["Horse"].dropna().unique())
     dates = sorted(df["Date"].dt.date.unique())
     weekdays = sorted(df["Date"].dt.day_name().unique())
 
@@ -85,19 +48,16 @@ def filter_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     sel_weekdays = st.sidebar.multiselect("Day of Week", weekdays, default=weekdays)
 
     df_filt = df[df["Date"].dt.date.isin(sel_dates)] if sel_dates else df
-    if "Confidence" in df_filt.columns:
-        df_filt = df_filt[df_filt["Confidence"].between(conf_min, conf_max)]
-    if sel_tags and "tags" in df_filt.columns:
-        df_filt = df_filt[
-            df_filt["tags"].apply(lambda x: any(t in parse_tags(x) for t in sel_tags))
-        ]
-    if tip_type != "All" and "EW/Win" in df_filt.columns:
+    df_filt = df_filt[df_filt["Confidence"].fillna(0).between(conf_min, conf_max)]
+    if sel_tags:
+        df_filt = df_filt[warehouse.tag_mask(df_filt["Tags"], sel_tags)]
+    if tip_type != "All":
         df_filt = df_filt[df_filt["EW/Win"] == tip_type]
-    if sel_trainers and "Trainer" in df_filt.columns:
+    if sel_trainers:
         df_filt = df_filt[df_filt["Trainer"].isin(sel_trainers)]
-    if sel_courses and "Course" in df_filt.columns:
+    if sel_courses:
         df_filt = df_filt[df_filt["Course"].isin(sel_courses)]
-    if sel_horses and "Horse" in df_filt.columns:
+    if sel_horses:
         df_filt = df_filt[df_filt["Horse"].isin(sel_horses)]
     if sel_weekdays:
         df_filt = df_filt[df_filt["Date"].dt.day_name().isin(sel_weekdays)]
@@ -109,8 +69,8 @@ def summary_header(df: pd.DataFrame) -> None:
     stake = df["Stake"].sum()
     pnl = profit
     roi = (profit / stake * 100) if stake else 0
-    winners = (df["Position"] == "1").sum()
-    placed = df["Position"].isin(["1", "2", "3"]).sum()
+    winners = df["Won"].sum()
+    placed = df["Placed"].sum()
     total = len(df)
     win_pct = (winners / total * 100) if total else 0
     place_pct = (placed / total * 100) if total else 0
@@ -127,21 +87,21 @@ def roi_trends(df: pd.DataFrame) -> None:
     daily = df.groupby(df["Date"].dt.date).agg(
         Profit=("Profit", "sum"), Stake=("Stake", "sum")
     )
-    daily["ROI"] = (daily["Profit"] / daily["Stake"] * 100).fillna(0)
+    daily["ROI"] = warehouse.roi_pct(daily["Profit"], daily["Stake"])
     st.line_chart(daily["ROI"])
 
     st.subheader("Weekly ROI")
     weekly = df.groupby(df["Date"].dt.to_period("W")).agg(
         Profit=("Profit", "sum"), Stake=("Stake", "sum")
     )
-    weekly["ROI"] = (weekly["Profit"] / weekly["Stake"] * 100).fillna(0)
+    weekly["ROI"] = warehouse.roi_pct(weekly["Profit"], weekly["Stake"])
     st.bar_chart(weekly["ROI"])
 
     st.subheader("Monthly ROI")
     monthly = df.groupby(df["Date"].dt.to_period("M")).agg(
         Profit=("Profit", "sum"), Stake=("Stake", "sum")
     )
-    monthly["ROI"] = (monthly["Profit"] / monthly["Stake"] * 100).fillna(0)
+    monthly["ROI"] = warehouse.roi_pct(monthly["Profit"], monthly["Stake"])
     st.line_chart(monthly["ROI"])
 
 
@@ -155,34 +115,27 @@ def confidence_heatmap(df_conf: pd.DataFrame) -> None:
 
 
 def tag_breakdown(df: pd.DataFrame) -> None:
-    if "tags" not in df.columns:
+    tag_df = warehouse.explode_tags(df)
+    if tag_df.empty:
         st.write("No tag data available")
         return
-    tag_df = df.dropna(subset=["tags"]).copy()
-    tag_df["Tag"] = tag_df["tags"].apply(parse_tags)
-    tag_df = tag_df.explode("Tag")
-    tag_stats = tag_df.groupby("Tag").agg(
-        Profit=("Profit", "sum"), Stake=("Stake", "sum"), Tips=("Horse", "count")
+    tag_stats = tag_df.groupby("Tag", observed=True).agg(
+        Profit=("Profit", "sum"), Stake=("Stake", "sum"), Tips=("Profit", "size")
     )
-    tag_stats["ROI %"] = (tag_stats["Profit"] / tag_stats["Stake"] * 100).fillna(0)
+    tag_stats["ROI %"] = warehouse.roi_pct(tag_stats["Profit"], tag_stats["Stake"])
     st.dataframe(tag_stats.sort_values("ROI %", ascending=False).round(2))
 
 
 def top_winners(df: pd.DataFrame) -> None:
-    winners = df[df["Position"] == "1"].copy()
+    winners = df[df["Won"]]
     if winners.empty:
         st.write("No winners available")
         return
 
-    cols = [
-        c
-        for c in ["Date", "Horse", "bf_sp", "confidence", "Profit"]
-        if c in winners.columns
-    ]
-
-    by_profit = winners.sort_values("Profit", ascending=False)[cols].head(10)
-    by_conf = winners.sort_values("confidence", ascending=False)[cols].head(10)
-    by_odds = winners.sort_values("bf_sp", ascending=False)[cols].head(10)
+    cols = ["Date", "Horse", "Odds", "Confidence", "Profit"]
+    by_profit = winners.nlargest(10, "Profit")[cols]
+    by_conf = winners.nlargest(10, "Confidence")[cols]
+    by_odds = winners.nlargest(10, "Odds")[cols]
 
     col1, col2, col3 = st.columns(3)
     col1.subheader("By Profit")
@@ -207,10 +160,11 @@ def tips_table(df: pd.DataFrame) -> None:
 
 def main() -> None:
     mode = st.sidebar.radio("Mode", ["Premium", "Public"])
-    sent_only = mode == "Public"
-    df = load_tip_results(sent_only=sent_only)
+    source = "sent" if mode == "Public" else "advised"
+    version = warehouse.load_manifest().get("version")
+    df = load_tip_results(source, version)
     if df.empty:
-        st.error("No tip data found")
+        st.error("No tip data found. Run `python -m roi.warehouse build`.")
         return
     df_conf = load_confidence_roi()
     df_filtered = filter_dataframe(df)
@@ -1,21 +1,39 @@
 #!/usr/bin/env python3
 import argparse
+import json
 import shutil
-from pathlib import Path
+import sys
 from datetime import datetime
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from tippingmonster.dispatch_journal import DispatchJournal
 
 
-def ensure_sent_tips(date: str,
-                     predictions_dir: Path = Path('predictions'),
-                     dispatch_dir: Path = Path('logs/dispatch')) -> Path | None:
-    """Ensure sent tips file exists by copying from predictions if missing."""
-    predictions_file = predictions_dir / date / 'tips_with_odds.jsonl'
-    sent_file = dispatch_dir / f'sent_tips_{date}.jsonl'
+def ensure_sent_tips(
+    date: str,
+    predictions_dir: Path = Path("predictions"),
+    dispatch_dir: Path = Path("logs/dispatch"),
+) -> Path | None:
+    """Ensure sent tips file exists, rebuilding it from the dispatch journal or
+    copying from predictions if missing."""
+    predictions_file = predictions_dir / date / "tips_with_odds.jsonl"
+    sent_file = dispatch_dir / f"sent_tips_{date}.jsonl"
 
     if sent_file.exists():
         print(f"✅ Sent tips already present: {sent_file}")
         return sent_file
 
+    journaled = DispatchJournal(date, dispatch_dir).tips()
+    if journaled:
+        tmp = sent_file.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for tip in journaled:
+                f.write(json.dumps(tip) + "\n")
+        tmp.replace(sent_file)
+        print(f"📄 Rebuilt {sent_file} from dispatch journal")
+        return sent_file
+
     if not predictions_file.exists():
         print(f"❌ Missing predictions: {predictions_file}")
         return None
@@ -27,18 +45,14 @@ def ensure_sent_tips(date: str,
 
 
 def main() -> None:
-    parser = argparse.ArgumentParser(description='Ensure sent tips file exists')
-    parser.add_argument('--date', default=datetime.now().strftime('%Y-%m-%d'))
-    parser.add_argument('--predictions-dir', default='predictions')
-    parser.add_argument('--dispatch-dir', default='logs/dispatch')
+    parser = argparse.ArgumentParser(description="Ensure sent tips file exists")
+    parser.add_argument("--date", default=datetime.now().strftime("%Y-%m-%d"))
+    parser.add_argument("--predictions-dir", default="predictions")
+    parser.add_argument("--dispatch-dir", default="logs/dispatch")
     args = parser.parse_args()
 
-    ensure_sent_tips(
-        args.date,
-        Path(args.predictions_dir),
-        Path(args.dispatch_dir)
-    )
+    ensure_sent_tips(args.date, Path(args.predictions_dir), Path(args.dispatch_dir))
 
 
-if __name__ == '__main__':
+if __name__ == "__main__":
     main()
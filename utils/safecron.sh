@@ -15,7 +15,7 @@ case "$JOB_NAME" in
   dispatch*|load_sniper_intel)
     SUBDIR="dispatch"
     ;;
-  roi_*|weekly_*|generate_subscriber_log)
+  roi_*|weekly_*|generate_subscriber_log|nightly)
     SUBDIR="roi"
     ;;
   *sniper*)
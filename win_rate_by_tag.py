@@ -9,10 +9,18 @@ import re
 from pathlib import Path
 from typing import List
 
+import numpy as np
 import pandas as pd
 
+from roi import tag_cube
 from tippingmonster import calculate_profit
 
+# tips_with_odds.jsonl holds every selected tip, settled with advised staking.
+# The source label keeps these rows apart from tag_roi_tracker's "all" slice,
+# which settles the same tips with realistic-odds deltas and value-win tags.
+CUBE_MODE = "advised"
+CUBE_SOURCE = "predictions"
+
 
 def normalize_horse_name(name: str) -> str:
     """Return a lowercased horse name without parenthetical notes."""
@@ -90,47 +98,31 @@ def merge_tips_results(tips_df: pd.DataFrame, results_df: pd.DataFrame) -> pd.Da
     return merged
 
 
-def summarise(df: pd.DataFrame) -> pd.DataFrame:
-    """Return time-decayed win rate and ROI per tag."""
-    if df.empty:
-        return pd.DataFrame()
+def _decay_weight(dates: pd.Series) -> np.ndarray:
+    """Return 1.0 / 0.5 / 0.1 weights for <=30, <=90 and older days."""
+    dates = pd.to_datetime(dates)
+    days = (dates.max() - dates).dt.days.to_numpy()
+    return np.select([days <= 30, days <= 90], [1.0, 0.5], default=0.1)
 
-    df = df.copy()
-    df["Date"] = pd.to_datetime(df["Date"])
-    now = df["Date"].max()
-
-    def _weight(date: pd.Timestamp) -> float:
-        days = (now - date).days
-        if days <= 30:
-            return 1.0
-        if days <= 90:
-            return 0.5
-        return 0.1
-
-    df["Weight"] = df["Date"].apply(_weight)
-
-    rows = []
-    for _, row in df.iterrows():
-        for tag in row.get("tags", []) or []:
-            rows.append(
-                {
-                    "Tag": tag,
-                    "Profit": row["Profit"],
-                    "Position": row["Position"],
-                    "Weight": row["Weight"],
-                }
-            )
 
-    tag_df = pd.DataFrame(rows)
-    if tag_df.empty:
+def summarise_cube(cube: pd.DataFrame) -> pd.DataFrame:
+    """Return time-decayed win rate and ROI per tag from tag cube rows."""
+    if cube.empty:
+        return pd.DataFrame()
+
+    df = cube.assign(Weight=_decay_weight(cube["Date"]))
+    df = df.assign(Tag=df["TagSet"].str.split(tag_cube.TAG_SEP, regex=False)).explode(
+        "Tag"
+    )
+    df = df[df["Tag"] != ""]
+    if df.empty:
         return pd.DataFrame()
 
-    tag_df["Win"] = (tag_df["Position"].astype(str) == "1").astype(float)
-    tag_df["WeightedTips"] = tag_df["Weight"]
-    tag_df["WeightedWins"] = tag_df["Win"] * tag_df["Weight"]
-    tag_df["WeightedProfit"] = tag_df["Profit"] * tag_df["Weight"]
+    df["WeightedTips"] = df["Runs"] * df["Weight"]
+    df["WeightedWins"] = df["Wins"] * df["Weight"]
+    df["WeightedProfit"] = df["Profit"] * df["Weight"]
 
-    summary = tag_df.groupby("Tag").agg(
+    summary = df.groupby("Tag").agg(
         Tips=("WeightedTips", "sum"),
         Wins=("WeightedWins", "sum"),
         Profit=("WeightedProfit", "sum"),
@@ -140,26 +132,57 @@ def summarise(df: pd.DataFrame) -> pd.DataFrame:
     return summary.sort_values("ROI %", ascending=False)
 
 
-def compute_summary(
-    pred_dir: str, results_dir: str, min_conf: float = 0.8
+def summarise(df: pd.DataFrame) -> pd.DataFrame:
+    """Return time-decayed win rate and ROI per tag."""
+    if df.empty:
+        return pd.DataFrame()
+    rows = [
+        tag_cube.cube_rows(day, date_str, CUBE_MODE, CUBE_SOURCE)
+        for date_str, day in df.groupby(df["Date"].astype(str))
+    ]
+    return summarise_cube(pd.concat(rows, ignore_index=True))
+
+
+def update_tag_cube(
+    cube: pd.DataFrame, pred_dir: str, results_dir: str
 ) -> pd.DataFrame:
-    """Aggregate ROI by tag across all dates."""
-    pred_root = Path(pred_dir)
+    """Settle every prediction date not yet in ``cube`` and return the cube."""
+    settled = tag_cube.settled_dates(cube, CUBE_MODE, CUBE_SOURCE)
     result_root = Path(results_dir)
-    merged_rows = []
-    for tips_path in sorted(pred_root.glob("*/tips_with_odds.jsonl")):
+    for tips_path in sorted(Path(pred_dir).glob("*/tips_with_odds.jsonl")):
         date_str = tips_path.parent.name
+        if date_str in settled:
+            continue
         result_path = result_root / f"{date_str.replace('-', '_')}.csv"
         if not result_path.exists():
             continue
-        tips_df = load_tips(tips_path, date_str, min_conf)
-        results_df = load_results(result_path)
-        merged_rows.append(merge_tips_results(tips_df, results_df))
+        tips_df = load_tips(tips_path, date_str, 0.0)
+        if tips_df.empty:
+            continue
+        merged = merge_tips_results(tips_df, load_results(result_path))
+        rows = tag_cube.cube_rows(merged, date_str, CUBE_MODE, CUBE_SOURCE)
+        cube = tag_cube.update_cube(cube, rows, date_str, CUBE_MODE, CUBE_SOURCE)
+    return cube
 
-    if not merged_rows:
-        return pd.DataFrame()
-    full_df = pd.concat(merged_rows, ignore_index=True)
-    return summarise(full_df)
+
+def compute_summary(
+    pred_dir: str,
+    results_dir: str,
+    min_conf: float = 0.8,
+    cube_path: Path | None = None,
+) -> pd.DataFrame:
+    """Aggregate ROI by tag across all dates.
+
+    When ``cube_path`` is given the tag cube stored there is reused and only
+    dates missing from it are read; otherwise the cube is built in memory.
+    ``min_conf`` is applied at confidence-band granularity.
+    """
+    cube = tag_cube.load_cube(cube_path) if cube_path else tag_cube.empty_cube()
+    cube = update_tag_cube(cube, pred_dir, results_dir)
+    if cube_path:
+        tag_cube.save_cube(cube, cube_path)
+    rows = tag_cube.select(cube, mode=CUBE_MODE, source=CUBE_SOURCE, min_conf=min_conf)
+    return summarise_cube(rows)
 
 
 def main() -> None:
@@ -173,9 +196,19 @@ def main() -> None:
     parser.add_argument(
         "--min_conf", type=float, default=0.8, help="Minimum confidence to include"
     )
+    parser.add_argument(
+        "--cube",
+        default=str(tag_cube.CUBE_FILE),
+        help="Tag cube CSV to reuse and update (use '' to rebuild in memory)",
+    )
     args = parser.parse_args()
 
-    summary = compute_summary(args.pred_dir, args.results_dir, args.min_conf)
+    summary = compute_summary(
+        args.pred_dir,
+        args.results_dir,
+        args.min_conf,
+        Path(args.cube) if args.cube else None,
+    )
     if summary.empty:
         print("No tips or results found.")
         return